@@ -8,9 +8,11 @@ from __future__ import annotations
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .logs import ensure_log_schema, OperationLogContext
+from .jobs import get_job_runner
+from .logs import OperationLogContext, get_log_writer
+from .metrics import MetricsMiddleware
+from .migrations import apply_migrations
 from .services.config_svc import ensure_default_config
-from .services.watchlist_svc import ensure_watchlist_schema
 
 
 app = FastAPI(title="portfolio-ui-api", version="0.1.0")
@@ -33,16 +35,27 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# 请求耗时 / SQL / span 指标，GET /metrics 导出；PORT_SLOW_REQUEST_MS 开启慢请求日志
+app.add_middleware(MetricsMiddleware)
 
 
 @app.on_event("startup")
 def on_startup():
-    ensure_log_schema()
-    ensure_default_config()
+    # 表结构迁移（schema_version 记录版本，每个迁移只执行一次）
     try:
-        ensure_watchlist_schema()
+        apply_migrations()
     except Exception as e:
-        OperationLogContext("STARTUP").write("ERROR", f"ensure_watchlist_schema_failed: {e}")
+        OperationLogContext("STARTUP").write("ERROR", f"apply_migrations_failed: {e}")
+    ensure_default_config()
+    # 后台任务：回收上次退出时未完成的任务并继续执行排队中的任务
+    get_job_runner().start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # 停止认领新的后台任务；写完队列中剩余的操作日志
+    get_job_runner().close()
+    get_log_writer().close()
 
 
 # Include routers (split by business domain)
@@ -60,6 +73,7 @@ from .routes import logs as logs_routes
 from .routes import maintenance as maintenance_routes
 from .routes import reports as reports_routes
 from .routes import aggregated as aggregated_routes
+from .routes import jobs as jobs_routes
 
 app.include_router(base_routes.router)
 app.include_router(dashboard_routes.router)
@@ -75,3 +89,4 @@ app.include_router(logs_routes.router)
 app.include_router(maintenance_routes.router)
 app.include_router(reports_routes.router)
 app.include_router(aggregated_routes.router)
+app.include_router(jobs_routes.router)
@@ -2,11 +2,15 @@ from __future__ import annotations
 
 # backend/db.py
 import sqlite3
+import threading
 from contextlib import contextmanager
 from typing import Iterator
 import os
+import time
 import yaml
 
+from . import metrics
+
 # DB 路径解析顺序：
 # 1) 环境变量 PORT_DB_PATH（最高优先级）
 # 2) config.yaml 的 test_db_path（当检测到测试环境时）
@@ -16,30 +20,49 @@ _PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
 _ROOT_DB = os.path.join(_PROJECT_ROOT, "portfolio.db")
 _LEGACY_DB = os.path.join(_PROJECT_ROOT, "backend", "data", "portfolio.db")
 
+# 每个连接建立时执行一次的 PRAGMA
+CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -32000",        # 约 32MB 页缓存
+    "PRAGMA mmap_size = 268435456",      # 256MB 内存映射读
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+# 每个线程每个库最多保留的空闲连接数（嵌套 get_conn 时会同时借出多个）
+MAX_IDLE_PER_THREAD = 4
+
+_config_cache: dict | None = None
+_path_cache: dict[tuple[str | None, bool], str] = {}
+_path_lock = threading.Lock()
+
 
 def _read_config_yaml() -> dict:
+    """config.yaml 中的 db_path / test_db_path（进程内缓存，reset_db_path_cache() 后重新读取）"""
+    global _config_cache
+    if _config_cache is not None:
+        return _config_cache
     cfg_path = os.path.join(_PROJECT_ROOT, "config.yaml")
-    if not os.path.exists(cfg_path):
-        return {}
-    try:
-        with open(cfg_path, "r", encoding="utf-8") as f:
-            cfg = yaml.safe_load(f) or {}
-        out = {}
-        for k in ("db_path", "test_db_path"):
-            v = cfg.get(k)
-            if isinstance(v, str) and v.strip():
-                out[k] = v.strip()
-        return out
-    except Exception:
-        return {}
+    out = {}
+    if os.path.exists(cfg_path):
+        try:
+            with open(cfg_path, "r", encoding="utf-8") as f:
+                cfg = yaml.safe_load(f) or {}
+            for k in ("db_path", "test_db_path"):
+                v = cfg.get(k)
+                if isinstance(v, str) and v.strip():
+                    out[k] = v.strip()
+        except Exception:
+            out = {}
+    _config_cache = out
+    return out
 
 
-def get_db_path(_: str | None = None) -> str:
-    env_path = os.environ.get("PORT_DB_PATH")
+def _resolve_db_path(env_path: str | None, is_test: bool) -> str:
     cfg = _read_config_yaml()
     cfg_db = cfg.get("db_path")
     cfg_test = cfg.get("test_db_path")
-    is_test = (os.environ.get("APP_ENV") == "test") or (os.environ.get("PYTEST_CURRENT_TEST") is not None)
 
     if env_path:
         path = env_path
@@ -57,22 +80,217 @@ def get_db_path(_: str | None = None) -> str:
     return path
 
 
+def get_db_path(_: str | None = None) -> str:
+    """
+    解析结果按 (PORT_DB_PATH, 是否测试环境) 缓存：config.yaml 只读一次、目录只创建一次；
+    PORT_DB_PATH 变化（测试/基准脚本切换临时库）时自动按新值解析。
+    """
+    env_path = os.environ.get("PORT_DB_PATH")
+    is_test = (os.environ.get("APP_ENV") == "test") or (os.environ.get("PYTEST_CURRENT_TEST") is not None)
+    key = (env_path, is_test)
+    path = _path_cache.get(key)
+    if path is None:
+        with _path_lock:
+            path = _path_cache.get(key)
+            if path is None:
+                path = _resolve_db_path(env_path, is_test)
+                _path_cache[key] = path
+    return path
+
+
+def reset_db_path_cache():
+    """config.yaml 修改后调用：下次 get_db_path() 重新解析"""
+    global _config_cache
+    with _path_lock:
+        _config_cache = None
+        _path_cache.clear()
+
+
+class TracedConnection(sqlite3.Connection):
+    """execute / executemany / executescript 计时，计入 backend.metrics（见该模块说明）"""
+
+    def execute(self, *args):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(*args)
+        finally:
+            metrics.record_query("execute", time.perf_counter() - t0)
+
+    def executemany(self, *args):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(*args)
+        finally:
+            metrics.record_query("executemany", time.perf_counter() - t0)
+
+    def executescript(self, *args):
+        t0 = time.perf_counter()
+        try:
+            return super().executescript(*args)
+        finally:
+            metrics.record_query("executescript", time.perf_counter() - t0)
+
+
+class ConnectionPool:
+    """
+    进程级 SQLite 连接池
+    - 每个线程按 DB 路径维护自己的空闲连接栈：同一线程内嵌套 get_conn 拿到的是不同连接，
+      连接也不会跨线程共享
+    - 连接建立时执行一次 CONNECTION_PRAGMAS；归还时回滚未提交的事务并恢复 row_factory
+    - fork 后的子进程首次使用时丢弃继承来的连接
+    """
+
+    def __init__(self, max_idle_per_thread: int = MAX_IDLE_PER_THREAD):
+        self.max_idle_per_thread = max_idle_per_thread
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._generation = 0
+        self._open: dict[int, tuple[sqlite3.Connection, int]] = {}   # id(conn) -> (conn, generation)
+        self._idle_ids: set[int] = set()
+        self._stats = {"created": 0, "reused": 0, "returned": 0, "rolled_back": 0, "discarded": 0, "closed": 0}
+
+    def _stack(self, path: str) -> list[sqlite3.Connection]:
+        if self._pid != os.getpid():
+            self._after_fork()
+        stacks = getattr(self._local, "stacks", None)
+        if stacks is None or self._local.generation != self._generation:
+            stacks = self._local.stacks = {}
+            self._local.generation = self._generation
+        return stacks.setdefault(path, [])
+
+    def _after_fork(self):
+        # 父进程的连接不能在子进程里使用：直接丢弃（不 close，避免影响父进程的文件锁）
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open = {}
+        self._idle_ids = set()
+        self._stats = {k: 0 for k in self._stats}
+
+    def _connect(self, path: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            path,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            check_same_thread=False,
+            isolation_level=None,
+            factory=TracedConnection,
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            sqlite3.Connection.execute(conn, pragma)   # 建连开销不计入 SQL 指标
+        conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._open[id(conn)] = (conn, self._generation)
+            self._stats["created"] += 1
+        return conn
+
+    def acquire(self, path: str) -> sqlite3.Connection:
+        stack = self._stack(path)
+        with self._lock:
+            while stack:
+                conn = stack.pop()
+                if id(conn) in self._idle_ids:
+                    self._idle_ids.discard(id(conn))
+                    self._stats["reused"] += 1
+                    return conn
+        return self._connect(path)
+
+    def release(self, path: str, conn: sqlite3.Connection):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+                with self._lock:
+                    self._stats["rolled_back"] += 1
+            conn.row_factory = sqlite3.Row
+            conn.isolation_level = None
+        except sqlite3.ProgrammingError:
+            # 调用方自行关闭了连接
+            with self._lock:
+                self._open.pop(id(conn), None)
+                self._stats["discarded"] += 1
+            return
+        stack = self._stack(path)
+        with self._lock:
+            entry = self._open.get(id(conn))
+            keep = entry is not None and entry[1] == self._generation and len(stack) < self.max_idle_per_thread
+            if keep:
+                stack.append(conn)
+                self._idle_ids.add(id(conn))
+                self._stats["returned"] += 1
+                return
+            self._open.pop(id(conn), None)
+            self._stats["closed"] += 1
+        conn.close()
+
+    def close_all(self):
+        """关闭本进程池内所有空闲连接（恢复数据库文件、切换库等场景）；借出中的连接在归还时关闭"""
+        with self._lock:
+            self._generation += 1
+            idle = [self._open.pop(i)[0] for i in list(self._idle_ids) if i in self._open]
+            self._idle_ids.clear()
+            self._stats["closed"] += len(idle)
+        for c in idle:
+            try:
+                c.close()
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["open"] = len(self._open)
+            out["idle"] = len(self._idle_ids)
+        checkouts = out["created"] + out["reused"]
+        out["checkouts"] = checkouts
+        out["in_use"] = out["open"] - out["idle"]
+        out["reuse_rate"] = (out["reused"] / checkouts) if checkouts else None
+        out["max_idle_per_thread"] = self.max_idle_per_thread
+        out["pragmas"] = list(CONNECTION_PRAGMAS)
+        return out
+
+    def reset_stats(self):
+        with self._lock:
+            for k in self._stats:
+                self._stats[k] = 0
+
+
+_pool = ConnectionPool()
+
+
+def get_pool() -> ConnectionPool:
+    return _pool
+
+
+def _pool_gauges():
+    s = _pool.stats()
+    return [
+        ("portfolio_db_pool_open_connections", "Connections currently open in the pool", s["open"]),
+        ("portfolio_db_pool_idle_connections", "Idle pooled connections", s["idle"]),
+        ("portfolio_db_pool_checkouts_total", "Connections handed out by get_conn", s["checkouts"]),
+    ]
+
+
+metrics.register_collector(_pool_gauges)
+
+
+def pool_stats() -> dict:
+    out = _pool.stats()
+    out["db_path"] = get_db_path()
+    return out
+
+
 @contextmanager
 def get_conn(db_path: str | None = None) -> Iterator[sqlite3.Connection]:
     """
     获取 SQLite 连接。优先使用显式传入的 db_path，否则走 get_db_path()。
-    打开 foreign_keys，设置 row_factory 为 Row。
+    连接来自进程级连接池（autocommit，foreign_keys 已打开，row_factory 为 Row），
+    退出 with 时归还；未提交的事务会被回滚。
     """
     path = db_path or get_db_path()
-    conn = sqlite3.connect(
-        path,
-        detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
-        check_same_thread=False,
-        isolation_level=None,
-    )
+    conn = _pool.acquire(path)
+    t0 = time.perf_counter()
     try:
-        conn.execute("PRAGMA foreign_keys = ON;")
-        conn.row_factory = sqlite3.Row
         yield conn
     finally:
-        conn.close()
+        metrics.record_conn_hold(time.perf_counter() - t0)
+        _pool.release(path, conn)
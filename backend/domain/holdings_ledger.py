@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+"""
+Historical holdings replay: (shares, avg_cost) at the end of every day on which they change.
+
+Transactions are applied with the same rules txn_svc.create_txn uses for the live
+`position` row:
+
+- BUY / SELL move the position through compute_position_after_trade;
+- on the cash instrument, AUTO-MIRROR ADJ rows (signed shares) and user ADJ rows
+  (signed amount) are cash BUY / SELL at price 1;
+- DIV / FEE / non-cash ADJ leave the position untouched.
+
+Manual snapshots (opening positions, hand edits) are end-of-day states: they override
+the transactions of their own day, later transactions apply on top.
+"""
+
+from .txn_engine import compute_position_after_trade
+
+MIRROR_NOTE_PREFIX = "AUTO-MIRROR"
+EPS = 1e-6
+
+
+def txn_effect(shares: float, avg_cost: float, txn: dict, is_cash: bool) -> tuple[float, float] | None:
+    """New (shares, avg_cost) after one txn row, or None when the row does not move the position."""
+    action = (txn.get("action") or "").upper()
+    qty = float(txn.get("shares") or 0.0)
+    if action in ("BUY", "SELL"):
+        new_shares, new_cost, _ = compute_position_after_trade(
+            shares, avg_cost, action, abs(qty), txn.get("price"), txn.get("fee") or 0.0
+        )
+        return new_shares, new_cost
+    if action != "ADJ" or not is_cash:
+        return None
+    if str(txn.get("notes") or "").startswith(MIRROR_NOTE_PREFIX):
+        amt = qty
+    else:
+        amount = txn.get("amount")
+        amt = float(amount) if amount is not None else abs(qty) * float(txn.get("price") or 0.0)
+        if amt == 0:
+            amt = abs(qty)
+    if abs(amt) <= 0:
+        return None
+    new_shares, new_cost, _ = compute_position_after_trade(
+        shares, avg_cost, "BUY" if amt > 0 else "SELL", abs(amt), 1.0, 0.0
+    )
+    return new_shares, new_cost
+
+
+def replay(txns: list[dict], snapshots: dict[str, tuple[float, float]] | None = None,
+           is_cash: bool = False) -> list[tuple[str, float, float, str]]:
+    """
+    Args:
+        txns: rows with trade_date (YYYY-MM-DD), action, shares, price, fee, amount, notes;
+              ascending by (trade_date, rowid)
+        snapshots: {date: (shares, avg_cost)} manual end-of-day states
+        is_cash: whether the instrument is the cash account
+
+    Returns:
+        [(date, shares, avg_cost, source)] ascending, one row per day whose end-of-day
+        holdings were set; source is "MANUAL" for snapshot days, else "TXN".
+    """
+    snapshots = snapshots or {}
+    by_day: dict[str, list[dict]] = {}
+    for t in txns:
+        by_day.setdefault(t["trade_date"], []).append(t)
+
+    out: list[tuple[str, float, float, str]] = []
+    shares, avg_cost = 0.0, 0.0
+    for day in sorted(set(by_day) | set(snapshots)):
+        moved = False
+        for t in by_day.get(day, []):
+            nxt = txn_effect(shares, avg_cost, t, is_cash)
+            if nxt is not None:
+                shares, avg_cost = nxt
+                moved = True
+        if day in snapshots:
+            shares, avg_cost = (float(v) for v in snapshots[day])
+            out.append((day, shares, avg_cost, "MANUAL"))
+        elif moved:
+            out.append((day, shares, avg_cost, "TXN"))
+    return out
+
+
+def same_holding(a: tuple[float, float], b: tuple[float, float]) -> bool:
+    return abs(float(a[0]) - float(b[0])) <= EPS and abs(float(a[1]) - float(b[1])) <= EPS
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+"""
+Portfolio KPI time series over a calendar-day range in one pass.
+
+Closes and holdings are pivoted into (days x instruments) matrices, forward-filled
+as-of each day, and multiplied together, reproducing get_dashboard() for every day:
+holdings are those valid on the day (position_ledger), market value uses the latest
+close on or before the day and falls back to avg_cost for instruments without any
+price yet.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+def day_range(start_dash: str, end_dash: str) -> np.ndarray:
+    """Every calendar day from start to end inclusive (datetime64[D])."""
+    return np.arange(np.datetime64(start_dash), np.datetime64(end_dash) + 1, dtype="datetime64[D]")
+
+
+def asof_matrix(days: np.ndarray, codes: list[str], rows) -> np.ndarray:
+    """
+    rows: (ts_code, date, value) with date YYYY-MM-DD; rows before days[0] seed the
+    first day. Returns float64 (len(days), len(codes)), NaN until the first value.
+    """
+    n_days, n_codes = len(days), len(codes)
+    grid = np.full((n_days, n_codes), np.nan, dtype=np.float64)
+    if n_days == 0 or n_codes == 0:
+        return grid
+    col = {c: j for j, c in enumerate(codes)}
+    rows = [r for r in rows if r[0] in col and r[2] is not None]
+    if rows:
+        dates = np.array([r[1] for r in rows], dtype="datetime64[D]")
+        order = np.argsort(dates, kind="stable")   # later bars win when several map to day 0
+        i = np.searchsorted(days, dates[order], side="left").clip(0, n_days - 1)
+        j = np.array([col[rows[k][0]] for k in order])
+        grid[i, j] = np.array([float(rows[k][2]) for k in order])
+    # forward fill along time: index of the last valid row at or before each day
+    idx = np.where(~np.isnan(grid), np.arange(n_days)[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return grid[idx, np.arange(n_codes)[None, :]]
+
+
+@dataclass
+class KpiSeries:
+    days: np.ndarray            # datetime64[D]
+    market_value: np.ndarray
+    cost: np.ndarray
+    unrealized_pnl: np.ndarray
+    ret: np.ndarray             # NaN where cost <= 0
+
+    @classmethod
+    def compute(cls, days: np.ndarray, shares: np.ndarray, avg_cost: np.ndarray, closes: np.ndarray) -> "KpiSeries":
+        """shares / avg_cost: per-instrument vectors (constant holdings) or (days x instruments) matrices."""
+        shares = np.broadcast_to(np.nan_to_num(np.asarray(shares, dtype=np.float64)), closes.shape)
+        avg_cost = np.broadcast_to(np.nan_to_num(np.asarray(avg_cost, dtype=np.float64)), closes.shape)
+        held = shares > 0
+        price = np.where(np.isnan(closes), avg_cost, closes)
+        mv = np.where(held, shares * price, 0.0).sum(axis=1)
+        cost = np.where(held, shares * avg_cost, 0.0).sum(axis=1)
+        pnl = mv - cost
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret = np.where(cost > 0, pnl / cost, np.nan)
+        return cls(days=days, market_value=mv, cost=cost, unrealized_pnl=pnl, ret=ret)
+
+    def resample(self, period: str) -> "KpiSeries":
+        """day: unchanged; week / month: last day of each ISO week / calendar month."""
+        idx = period_end_index(self.days, period)
+        return KpiSeries(self.days[idx], self.market_value[idx], self.cost[idx],
+                         self.unrealized_pnl[idx], self.ret[idx])
+
+    def to_records(self) -> list[dict]:
+        return [
+            {
+                "date": str(d),
+                "market_value": float(mv),
+                "cost": float(c),
+                "unrealized_pnl": float(p),
+                "ret": None if np.isnan(r) else float(r),
+            }
+            for d, mv, c, p, r in zip(self.days, self.market_value, self.cost, self.unrealized_pnl, self.ret)
+        ]
+
+
+def period_end_index(days: np.ndarray, period: str) -> np.ndarray:
+    p = (period or "day").lower()
+    if p == "day" or len(days) == 0:
+        return np.arange(len(days))
+    if p == "week":
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday (ISO weeks)
+        key = (days.astype(np.int64) + 3) // 7
+    else:
+        key = days.astype("datetime64[M]").astype(np.int64)
+    return np.flatnonzero(np.append(key[1:] != key[:-1], True))
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+"""
+Trailing close windows for a whole universe in one contiguous matrix.
+
+Row i holds the last `counts[i]` closes of `codes[i]` right-aligned (oldest -> newest);
+shorter histories are left-padded with NaN, so column -1 is always the latest bar.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class CloseWindow:
+    codes: list[str]
+    closes: np.ndarray      # shape (len(codes), n), float64
+    counts: np.ndarray      # shape (len(codes),), int
+    last_dates: list[str]
+
+    @property
+    def n(self) -> int:
+        return self.closes.shape[1]
+
+    def series(self, i: int) -> np.ndarray:
+        """Valid closes of row i, oldest first."""
+        return self.closes[i, self.n - int(self.counts[i]):]
+
+    @classmethod
+    def from_rows(cls, rows, n: int) -> "CloseWindow":
+        """rows: (ts_code, trade_date, close) ordered by ts_code, trade_date ascending, at most n per code."""
+        codes: list[str] = []
+        last_dates: list[str] = []
+        chunks: list[list[float]] = []
+        for code, trade_date, close in rows:
+            if not codes or codes[-1] != code:
+                codes.append(code)
+                last_dates.append(trade_date)
+                chunks.append([])
+            chunks[-1].append(np.nan if close is None else float(close))
+            last_dates[-1] = trade_date
+        closes = np.full((len(codes), n), np.nan, dtype=np.float64)
+        counts = np.zeros(len(codes), dtype=np.int64)
+        for i, vals in enumerate(chunks):
+            vals = vals[-n:]
+            counts[i] = len(vals)
+            if vals:
+                closes[i, n - len(vals):] = vals
+        return cls(codes=codes, closes=closes, counts=counts, last_dates=last_dates)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+"""
+Vectorized nine-turn (九转) structure flags over a full close series.
+
+Equivalent to evaluating TdxStructureSignalGenerator._calculate_buy_structure /
+_calculate_sell_structure on the trailing 30-close window ending at every index:
+
+    TA := EVERY(CLOSE < REF(CLOSE, 4), 9)      (TE uses >)
+    TC := BACKSET(TA, 9);  TD := IF(TC=1, SUM(TC, 9), DRAWNULL)
+    signal := TD = 9 AND REF(TD, 1) = 8
+
+Because BACKSET cannot look past the evaluation day, TD = 9 on day t iff TA[t] = 1,
+and REF(TD, 1) = 8 iff additionally TA was 0 on each of the 9 previous days.
+"""
+
+import numpy as np
+
+EVERY_N = 9
+REF_N = 4
+# 单日路径要求窗口内至少 15 根收盘价，TA 从窗口下标 13 起才计算
+MIN_BARS = 15
+TA_FIRST_INDEX = EVERY_N + REF_N
+
+
+def _every_vs_ref(closes: np.ndarray, greater: bool) -> np.ndarray:
+    n = len(closes)
+    ta = np.zeros(n, dtype=bool)
+    if n <= TA_FIRST_INDEX:
+        return ta
+    cmp = np.zeros(n, dtype=np.int64)
+    cmp[REF_N:] = (closes[REF_N:] > closes[:-REF_N]) if greater else (closes[REF_N:] < closes[:-REF_N])
+    run = np.concatenate(([0], np.cumsum(cmp)))
+    idx = np.arange(TA_FIRST_INDEX, n)
+    ta[TA_FIRST_INDEX:] = (run[idx + 1] - run[idx + 1 - EVERY_N]) == EVERY_N
+    return ta
+
+
+def _first_of_run(ta: np.ndarray) -> np.ndarray:
+    """TA[t] 为 1 且之前 9 天 TA 全为 0"""
+    n = len(ta)
+    out = np.zeros(n, dtype=bool)
+    if n < MIN_BARS:
+        return out
+    run = np.concatenate(([0], np.cumsum(ta.astype(np.int64))))
+    idx = np.arange(MIN_BARS - 1, n)
+    prev9 = run[idx] - run[idx - EVERY_N]
+    out[MIN_BARS - 1:] = ta[idx] & (prev9 == 0)
+    return out
+
+
+def structure_flags(closes) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns (buy, sell) boolean arrays: element t is the single-day result for the
+    window ending at closes[t] (ascending by date).
+    """
+    c = np.asarray(closes, dtype=np.float64)
+    return _first_of_run(_every_vs_ref(c, greater=False)), _first_of_run(_every_vs_ref(c, greater=True))
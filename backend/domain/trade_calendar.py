@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+"""
+In-memory trading calendar index.
+
+Built once from (cal_date, is_open) rows; every lookup is a dict access plus list
+indexing, so callers can ask open/prev/next questions in hot loops without IO.
+Dates may be given as YYYYMMDD or YYYY-MM-DD; results use the caller's format.
+"""
+
+from datetime import datetime, timedelta
+from typing import Iterable
+
+
+# Listings on the Shanghai / Shenzhen / Beijing exchanges (stocks and exchange-traded funds)
+EXCHANGE_SUFFIXES = (".SH", ".SZ", ".BJ")
+
+
+def follows_exchange_calendar(ts_code: str) -> bool:
+    """True for A-share listings; HK stocks and off-exchange funds (.OF) keep their own holidays."""
+    return (ts_code or "").upper().endswith(EXCHANGE_SUFFIXES)
+
+
+def _norm(d: str) -> str:
+    return d.replace("-", "")
+
+
+def _like(out: str | None, sample: str) -> str | None:
+    if out is None or "-" not in sample:
+        return out
+    return f"{out[0:4]}-{out[4:6]}-{out[6:8]}"
+
+
+class TradingCalendar:
+    def __init__(self, days: Iterable[tuple[str, int | bool]]):
+        rows = sorted((_norm(str(d)), bool(int(o))) for d, o in days)
+        self._open: list[str] = [d for d, o in rows if o]
+        self._open_set: set[str] = set(self._open)
+        # 对每个已知日历日：其当天或之前最近一个开市日在 _open 中的下标（-1 表示之前没有）
+        self._pos: dict[str, int] = {}
+        self.first = rows[0][0] if rows else None
+        self.last = rows[-1][0] if rows else None
+        if rows:
+            # 连续展开日历日，避免数据源缺行导致查找落空
+            cur = datetime.strptime(self.first, "%Y%m%d")
+            end = datetime.strptime(self.last, "%Y%m%d")
+            p = -1
+            while cur <= end:
+                key = cur.strftime("%Y%m%d")
+                if key in self._open_set:
+                    p += 1
+                self._pos[key] = p
+                cur += timedelta(days=1)
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+    def covers(self, d: str) -> bool:
+        return _norm(d) in self._pos
+
+    def is_open(self, d: str) -> bool | None:
+        """True/False；日历未覆盖该日期时返回 None"""
+        k = _norm(d)
+        if k not in self._pos:
+            return None
+        return k in self._open_set
+
+    def prev_open(self, d: str, inclusive: bool = False) -> str | None:
+        """d 之前（inclusive=True 时含 d）最近一个开市日"""
+        k = _norm(d)
+        p = self._pos.get(k)
+        if p is None:
+            return None
+        if k in self._open_set and not inclusive:
+            p -= 1
+        return _like(self._open[p], d) if p >= 0 else None
+
+    def next_open(self, d: str, inclusive: bool = False) -> str | None:
+        """d 之后（inclusive=True 时含 d）最近一个开市日；超出已加载范围返回 None"""
+        k = _norm(d)
+        p = self._pos.get(k)
+        if p is None:
+            return None
+        if inclusive and k in self._open_set:
+            return _like(k, d)
+        q = p + 1
+        return _like(self._open[q], d) if q < len(self._open) else None
+
+    def n_trading_days_back(self, d: str, n: int) -> str | None:
+        """d 当天或之前最近一个开市日再往前数 n 个开市日（n=0 即该开市日本身）"""
+        p = self._pos.get(_norm(d))
+        if p is None or p - n < 0:
+            return None
+        return _like(self._open[p - n], d)
+
+    def open_days_between(self, start: str, end: str) -> list[str] | None:
+        """[start, end] 内的开市日；区间超出日历覆盖范围时返回 None"""
+        ks, ke = _norm(start), _norm(end)
+        if ks not in self._pos or ke not in self._pos:
+            return None
+        lo = self._pos[ks] + (0 if ks in self._open_set else 1)
+        hi = self._pos[ke]
+        return [_like(x, start) for x in self._open[max(lo, 0): hi + 1]]
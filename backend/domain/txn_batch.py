@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+"""
+In-memory planning for bulk transaction ingestion.
+
+A batch is validated up front, sorted by (ts_code, trade_date) and replayed per
+instrument with the rules txn_svc.create_txn applies row by row:
+
+- realized_pnl on SELL from the average cost before the trade;
+- T+0 detection: a BUY/SELL pairs with the earliest ungrouped opposite trade of the
+  same instrument and day and equal size (rows already in the table or earlier in
+  the batch); both share group_id = the smaller id, other rows use their own id;
+- BUY/SELL move the position through compute_position_after_trade, a SELL beyond the
+  held shares is rejected;
+- non-cash rows write an AUTO-MIRROR ADJ row on the cash instrument
+  (compute_cash_mirror); cash ADJ rows adjust the cash position directly.
+
+The cash position is replayed last, chronologically over mirrors and direct cash
+rows, so its result does not depend on the order instruments are processed in.
+Transaction ids are assigned here (from next_id) so groups and mirrors can
+reference them before anything is written.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from .txn_engine import compute_cash_mirror, compute_position_after_trade, round_amount
+
+ACTIONS = ("BUY", "SELL", "DIV", "FEE", "ADJ")
+T_TOLERANCE = 0.001
+EPS = 1e-6
+
+
+def _opt_float(v, name: str) -> float | None:
+    if v is None or v == "":
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {name}: {v!r}")
+
+
+def normalize_row(index: int, data: dict) -> dict:
+    """Validate one request row; raises ValueError with the same messages as create_txn where they overlap."""
+    ts_code = str(data.get("ts_code") or "").strip()
+    if not ts_code:
+        raise ValueError("Missing ts_code")
+    action = str(data.get("action") or "").upper()
+    if action not in ACTIONS:
+        raise ValueError("Unsupported action")
+    date = str(data.get("date") or "").strip()
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"Invalid date: {date!r}, expected YYYY-MM-DD")
+    raw_shares = _opt_float(data.get("shares"), "shares")
+    if raw_shares is None:
+        raise ValueError("Missing shares")
+    return {
+        "index": index,
+        "ts_code": ts_code,
+        "date": date,
+        "action": action,
+        "raw_shares": raw_shares,
+        "shares": -abs(raw_shares) if action == "SELL" else abs(raw_shares),
+        "price": _opt_float(data.get("price"), "price") or 0.0,
+        "amount": _opt_float(data.get("amount"), "amount"),
+        "fee": _opt_float(data.get("fee"), "fee") or 0.0,
+        "notes": data.get("notes", ""),
+    }
+
+
+@dataclass
+class BulkPlan:
+    # (id, ts_code, trade_date, action, shares, price, amount, fee, notes, group_id, realized_pnl)
+    txns: list[tuple] = field(default_factory=list)
+    # (group_id, id) for rows already in the table that joined a T+0 group
+    group_updates: list[tuple[int, int]] = field(default_factory=list)
+    # ts_code -> (shares, avg_cost, last_update)
+    positions: dict[str, tuple[float, float, str]] = field(default_factory=dict)
+    # ts_code -> [(date, shares, avg_cost)] end-of-day holdings, ascending
+    points: dict[str, list[tuple[str, float, float]]] = field(default_factory=dict)
+    # instruments sold down to zero (moved to the watchlist by the caller)
+    emptied: set[str] = field(default_factory=set)
+    errors: list[dict] = field(default_factory=list)
+    ok_indexes: list[int] = field(default_factory=list)
+
+
+class _Planner:
+    def __init__(self, positions, t_candidates, cash_code, next_id):
+        self.pos = {k: (float(v[0] or 0.0), float(v[1] or 0.0)) for k, v in positions.items()}
+        self.cands = {k: [dict(c) for c in v] for k, v in t_candidates.items()}
+        self.cash_code = cash_code
+        self.next_id = int(next_id)
+        self.plan = BulkPlan()
+
+    def _new_id(self) -> int:
+        i = self.next_id
+        self.next_id += 1
+        return i
+
+    def _move(self, code: str, date: str, shares: float, avg_cost: float):
+        self.pos[code] = (shares, avg_cost)
+        self.plan.positions[code] = (shares, avg_cost, date)
+        pts = self.plan.points.setdefault(code, [])
+        if pts and pts[-1][0] == date:
+            pts[-1] = (date, shares, avg_cost)
+        else:
+            pts.append((date, shares, avg_cost))
+
+    def _t_match(self, r: dict) -> dict | None:
+        if r["action"] not in ("BUY", "SELL"):
+            return None
+        opposite = "SELL" if r["action"] == "BUY" else "BUY"
+        for c in self.cands.get((r["ts_code"], r["date"]), []):
+            free = c["group_id"] is None or c["group_id"] == c["id"]
+            if c["action"] == opposite and free and abs(abs(float(c["shares"])) - abs(r["shares"])) <= T_TOLERANCE:
+                return c
+        return None
+
+    def apply(self, r: dict) -> int:
+        """Apply one row to its own instrument; returns its txn id. Raises ValueError to reject the row."""
+        code, action = r["ts_code"], r["action"]
+        old_shares, old_cost = self.pos.get(code, (0.0, 0.0))
+        qty_abs = abs(r["shares"])
+        new_pos = None
+        if action in ("BUY", "SELL"):
+            new_shares, new_cost, _ = compute_position_after_trade(old_shares, old_cost, action, qty_abs, r["price"], r["fee"])
+            if action == "SELL" and new_shares < -EPS:
+                raise ValueError("Sell exceeds current shares")
+            new_pos = (new_shares, new_cost)
+        realized_pnl = None
+        if action == "SELL":
+            realized_pnl = round_amount(qty_abs * (r["price"] - old_cost) - r["fee"])
+
+        txn_id = self._new_id()
+        match = self._t_match(r)
+        if match is not None:
+            group_id = min(txn_id, match["id"])
+            if match.get("group_id") != group_id:
+                if match.get("existing"):
+                    self.plan.group_updates.append((group_id, match["id"]))
+                match["group_id"] = group_id
+        else:
+            group_id = txn_id
+            if action in ("BUY", "SELL"):
+                self.cands.setdefault((code, r["date"]), []).append(
+                    {"id": txn_id, "action": action, "shares": r["shares"], "group_id": txn_id}
+                )
+        self.plan.txns.append((txn_id, code, r["date"], action, r["shares"], r["price"], r["amount"], r["fee"],
+                               r["notes"], group_id, realized_pnl))
+        if new_pos is not None:
+            self._move(code, r["date"], *new_pos)
+            if action == "SELL" and abs(new_pos[0]) <= EPS and old_shares > 0:
+                self.plan.emptied.add(code)
+        return txn_id
+
+    def cash_adjust(self, date: str, amt: float):
+        shares, cost = self.pos.get(self.cash_code, (0.0, 0.0))
+        new_shares, new_cost, _ = compute_position_after_trade(shares, cost, "BUY" if amt > 0 else "SELL", abs(amt), 1.0, 0.0)
+        self._move(self.cash_code, date, new_shares, new_cost)
+
+
+def plan_bulk(rows: list[dict], positions: dict[str, tuple[float, float]],
+              t_candidates: dict[tuple[str, str], list[dict]], cash_codes: set[str], cash_code: str,
+              next_id: int) -> BulkPlan:
+    """
+    Args:
+        rows: normalize_row() output
+        positions: ts_code -> (shares, avg_cost) currently stored, for every code in the batch and the cash code
+        t_candidates: (ts_code, date) -> ungrouped stored BUY/SELL rows {id, action, shares, group_id}, id ascending
+        cash_codes: instruments treated as cash (type CASH or the configured cash code)
+        cash_code: the configured cash instrument that receives mirrors
+        next_id: first free txn id
+
+    Rejected rows are reported in plan.errors and leave no trace in the plan.
+    """
+    for v in t_candidates.values():
+        for c in v:
+            c["existing"] = True
+    p = _Planner(positions, t_candidates, cash_code, next_id)
+    ordered = sorted(rows, key=lambda r: (r["ts_code"], r["date"], r["index"]))
+
+    cash_events: list[tuple[str, int, object]] = []   # (date, seq, amount | row)
+    seq = 0
+    for r in ordered:
+        seq += 1
+        if r["ts_code"] in cash_codes:
+            cash_events.append((r["date"], len(ordered) + seq, r))
+            continue
+        try:
+            txn_id = p.apply(r)
+        except ValueError as e:
+            p.plan.errors.append({"index": r["index"], "ts_code": r["ts_code"], "error": str(e)})
+            continue
+        p.plan.ok_indexes.append(r["index"])
+        mirror_action, mirror_abs = compute_cash_mirror(r["action"], r["raw_shares"], r["price"], r["fee"], r["amount"])
+        if mirror_action and mirror_abs > 0:
+            mirror_shares = mirror_abs if mirror_action == "BUY" else -mirror_abs
+            p.plan.txns.append((p._new_id(), cash_code, r["date"], "ADJ", mirror_shares, 1.0, None, 0.0,
+                                f"AUTO-MIRROR for {r['ts_code']} {r['action']}", txn_id, None))
+            cash_events.append((r["date"], seq, mirror_shares))
+
+    # cash: replay mirrors and direct cash rows by date
+    for date, _, ev in sorted(cash_events, key=lambda e: (e[0], e[1])):
+        if not isinstance(ev, dict):
+            p.cash_adjust(date, ev)
+            continue
+        try:
+            p.apply(ev)
+        except ValueError as e:
+            p.plan.errors.append({"index": ev["index"], "ts_code": ev["ts_code"], "error": str(e)})
+            continue
+        p.plan.ok_indexes.append(ev["index"])
+        if ev["action"] == "ADJ":
+            amt = ev["amount"] if ev["amount"] is not None else abs(ev["raw_shares"]) * ev["price"]
+            if amt == 0:
+                amt = abs(ev["raw_shares"])
+            if abs(amt) > 0:
+                p.cash_adjust(date, amt)
+
+    p.plan.errors.sort(key=lambda e: e["index"])
+    p.plan.ok_indexes.sort()
+    return p.plan
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+"""
+XIRR for many cashflow series at once.
+
+Every series is a row of a zero-padded (series x flows) matrix of amounts and of
+year fractions to the series' last date, so f(r) = sum(a * (1 + r) ** t) is
+evaluated for all series in one NumPy expression. Newton's method runs on all rows
+simultaneously with the same start, clamp and tolerance as the scalar solver it
+replaces; rows that do not converge are retried with a vectorized bisection on the
+sign change of f nearest to the Newton start.
+"""
+
+import numpy as np
+
+R0 = 0.10
+R_MIN = -0.999999
+TOL = 1e-8
+MAX_ITER = 100
+# candidate bracket endpoints for rows Newton could not solve: -0.999999 .. 9999
+_GRID = -1.0 + np.logspace(-6, 4, 121)
+_BISECT_ITER = 200
+
+
+def cashflow_matrix(series: list[list[tuple[str, float]]]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Args:
+        series: per series [(date YYYY-MM-DD, amount)], at least one flow each
+
+    Returns:
+        (amounts, years): float64 (n_series, max_flows); years is (last date - date) / 365,
+        padding cells are 0 in both and contribute nothing to f or f'.
+    """
+    n = len(series)
+    width = max((len(s) for s in series), default=0)
+    amounts = np.zeros((n, width), dtype=np.float64)
+    years = np.zeros((n, width), dtype=np.float64)
+    if n == 0 or width == 0:
+        return amounts, years
+    lengths = np.array([len(s) for s in series])
+    mask = np.arange(width)[None, :] < lengths[:, None]
+    flat = [cf for s in series for cf in s]
+    dates = np.array([d for d, _ in flat], dtype="datetime64[D]")
+    amounts[mask] = np.array([a for _, a in flat], dtype=np.float64)
+    day_grid = np.zeros((n, width), dtype=np.int64)
+    day_grid[mask] = dates.astype(np.int64)
+    last = np.where(mask, day_grid, np.iinfo(np.int64).min).max(axis=1)
+    years[mask] = ((last[:, None] - day_grid) / 365.0)[mask]
+    return amounts, years
+
+
+def _npv(amounts: np.ndarray, years: np.ndarray, r: np.ndarray) -> np.ndarray:
+    return (amounts * (1.0 + r[:, None]) ** years).sum(axis=1)
+
+
+def _newton(amounts: np.ndarray, years: np.ndarray) -> np.ndarray:
+    n = amounts.shape[0]
+    r = np.full(n, R0)
+    out = np.full(n, np.nan)
+    active = np.ones(n, dtype=bool)
+    with np.errstate(all="ignore"):
+        for _ in range(MAX_ITER):
+            if not active.any():
+                break
+            a, t, ra = amounts[active], years[active], r[active]
+            base = 1.0 + ra[:, None]
+            f = (a * base ** t).sum(axis=1)
+            df = (a * t * base ** (t - 1)).sum(axis=1)
+            r_new = ra - f / df
+            flat = np.abs(df) < 1e-12
+            bad = ~np.isfinite(r_new) | ~np.isfinite(f) | ~np.isfinite(df)
+            r_new = np.maximum(r_new, R_MIN)
+            done = ~flat & ~bad & (np.abs(r_new - ra) < TOL)
+            idx = np.flatnonzero(active)
+            out[idx[done]] = r_new[done]
+            r[idx] = r_new
+            active[idx[done | flat | bad]] = False
+    return out
+
+
+def _bisect(amounts: np.ndarray, years: np.ndarray) -> np.ndarray:
+    n = amounts.shape[0]
+    out = np.full(n, np.nan)
+    with np.errstate(all="ignore"):
+        grid_f = np.stack([_npv(amounts, years, np.full(n, g)) for g in _GRID], axis=1)
+    sign_change = np.isfinite(grid_f[:, :-1]) & np.isfinite(grid_f[:, 1:]) & (
+        np.sign(grid_f[:, :-1]) * np.sign(grid_f[:, 1:]) <= 0
+    )
+    has = sign_change.any(axis=1)
+    if not has.any():
+        return out
+    # among all brackets take the one closest to the Newton start
+    mid = (_GRID[:-1] + _GRID[1:]) / 2
+    dist = np.where(sign_change, np.abs(mid - R0)[None, :], np.inf)
+    k = dist.argmin(axis=1)[has]
+    a, t = amounts[has], years[has]
+    lo, hi = _GRID[k], _GRID[k + 1]
+    f_lo = grid_f[has, k]
+    with np.errstate(all="ignore"):
+        for _ in range(_BISECT_ITER):
+            m = (lo + hi) / 2
+            f_m = _npv(a, t, m)
+            left = np.sign(f_m) == np.sign(f_lo)
+            lo = np.where(left, m, lo)
+            f_lo = np.where(left, f_m, f_lo)
+            hi = np.where(left, hi, m)
+            if np.max(hi - lo) < TOL * 1e-2:
+                break
+    out[has] = (lo + hi) / 2
+    return out
+
+
+def xirr_many(series: list[list[tuple[str, float]]]) -> list[float | None]:
+    """
+    Annualized IRR of every series (dates YYYY-MM-DD); None for series with fewer than
+    two flows or without any root in (-1, 1e4).
+    """
+    out: list[float | None] = [None] * len(series)
+    rows = [i for i, s in enumerate(series) if len(s) >= 2]
+    if not rows:
+        return out
+    amounts, years = cashflow_matrix([series[i] for i in rows])
+    r = _newton(amounts, years)
+    failed = np.flatnonzero(np.isnan(r))
+    if len(failed):
+        r[failed] = _bisect(amounts[failed], years[failed])
+    for i, v in zip(rows, r):
+        out[i] = None if np.isnan(v) else float(v)
+    return out
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+"""
+Streaming ZIG(3, 10) state machine.
+
+Advancing one bar is O(1) and reproduces what TdxZigSignalGenerator computes over the
+full close history (_identify_initial_pivot + _peak_valley_pivots + detect on the
+piecewise-linear ZIG line):
+
+- the ZIG line only changes direction at pivots, so a ZIG_BUY / ZIG_SELL fires on the
+  bar right after a valley / peak pivot whose neighbouring segments slope down-then-up
+  (up-then-down);
+- once a pivot is confirmed (the opposite 10% move happened) its signal is final;
+  only the signal of the tentative extreme can still appear, move or disappear;
+- the initial pivot needs look-ahead, so until the first 10% move both hypotheses
+  (first point is a valley / a peak) are advanced side by side.
+
+State is a plain dict so it can be persisted as JSON.
+"""
+
+PEAK = 1
+VALLEY = -1
+TURN_PERCENT = 10.0
+
+BUY = "ZIG_BUY"
+SELL = "ZIG_SELL"
+
+
+def _safe_ratio(numerator: float, denominator: float) -> float:
+    if denominator == 0:
+        if numerator == 0:
+            return 1.0
+        return float("inf") if numerator > 0 else float("-inf")
+    return numerator / denominator
+
+
+def _sign(x: float) -> int:
+    return (x > 0) - (x < 0)
+
+
+def _turn(before: int, after: int) -> str | None:
+    if before < 0 < after:
+        return BUY
+    if before > 0 > after:
+        return SELL
+    return None
+
+
+def _new_machine(initial: int, x0: float) -> dict:
+    return {
+        "trend": -initial,
+        "piv_idx": 0,
+        "piv_price": x0,
+        "piv_next_date": None,   # 极值点之后一根 K 线的日期（信号落在这一天）
+        "anchor_price": x0,      # 上一个确认拐点（或首根 K 线）的价格
+        "confirmed": None,       # 最近一个确认拐点产生的信号 [date, type]，已定稿
+    }
+
+
+def new_state() -> dict:
+    return {
+        "n": 0,
+        "first_date": None,
+        "last_date": None,
+        "last_price": None,
+        "x0": None,
+        # 初始拐点识别（_identify_initial_pivot）
+        "initial": 0,
+        "max_x": None, "min_x": None, "max_idx": 0, "min_idx": 0,
+        "machines": {},
+    }
+
+
+def _step_machine(m: dict, idx: int, date: str, price: float, up_ratio: float, down_ratio: float):
+    if m["piv_idx"] == idx - 1 and m["piv_next_date"] is None:
+        m["piv_next_date"] = date
+    ratio = _safe_ratio(price, m["piv_price"])
+    crossed = ratio >= up_ratio if m["trend"] == VALLEY else ratio <= down_ratio
+    if crossed:
+        # 当前极值点确认为拐点，其信号就此定稿
+        sig = _turn(_sign(m["piv_price"] - m["anchor_price"]), _sign(price - m["piv_price"]))
+        if m["piv_idx"] != 0 and sig and m["piv_next_date"]:
+            m["confirmed"] = [m["piv_next_date"], sig]
+        m["anchor_price"] = m["piv_price"]
+        m["trend"] = PEAK if m["trend"] == VALLEY else VALLEY
+        m["piv_idx"], m["piv_price"], m["piv_next_date"] = idx, price, None
+    elif (price < m["piv_price"]) if m["trend"] == VALLEY else (price > m["piv_price"]):
+        m["piv_idx"], m["piv_price"], m["piv_next_date"] = idx, price, None
+
+
+def advance(state: dict, date: str, price: float, turn_percent: float = TURN_PERCENT) -> dict:
+    """Return a new state with one more bar appended (date must be after state['last_date'])."""
+    s = {k: (dict(v) if isinstance(v, dict) else v) for k, v in state.items()}
+    s["machines"] = {k: dict(m) for k, m in state["machines"].items()}
+    price = float(price)
+    up_ratio = turn_percent / 100.0 + 1.0
+    down_ratio = -turn_percent / 100.0 + 1.0
+    idx = s["n"]
+
+    if idx == 0:
+        s.update(first_date=date, x0=price, max_x=price, min_x=price, max_idx=0, min_idx=0)
+        s["machines"] = {str(VALLEY): _new_machine(VALLEY, price), str(PEAK): _new_machine(PEAK, price)}
+    else:
+        if not s["initial"]:
+            if _safe_ratio(price, s["min_x"]) >= up_ratio:
+                s["initial"] = VALLEY if s["min_idx"] == 0 else PEAK
+            elif _safe_ratio(price, s["max_x"]) <= down_ratio:
+                s["initial"] = PEAK if s["max_idx"] == 0 else VALLEY
+            else:
+                if price > s["max_x"]:
+                    s["max_x"], s["max_idx"] = price, idx
+                if price < s["min_x"]:
+                    s["min_x"], s["min_idx"] = price, idx
+            if s["initial"]:
+                s["machines"] = {str(s["initial"]): s["machines"][str(s["initial"])]}
+        for m in s["machines"].values():
+            _step_machine(m, idx, date, price, up_ratio, down_ratio)
+
+    s["n"] = idx + 1
+    s["last_date"] = date
+    s["last_price"] = price
+    return s
+
+
+def _machine(state: dict) -> dict | None:
+    if not state["machines"]:
+        return None
+    initial = state["initial"]
+    if not initial:
+        # 尚未出现 10% 波动：与 _identify_initial_pivot 的收尾规则一致
+        initial = VALLEY if state["x0"] < state["last_price"] else PEAK
+    return state["machines"][str(initial)]
+
+
+def confirmed_signal(state: dict) -> tuple[str, str] | None:
+    m = _machine(state)
+    return tuple(m["confirmed"]) if m and m["confirmed"] else None
+
+
+def live_signals(state: dict) -> set[tuple[str, str]]:
+    """Signals that depend on the tail of the series: last confirmed pivot + tentative extreme."""
+    m = _machine(state)
+    if m is None:
+        return set()
+    out: set[tuple[str, str]] = set()
+    if m["confirmed"]:
+        out.add(tuple(m["confirmed"]))
+    if 0 < m["piv_idx"] < state["n"] - 1 and m["piv_next_date"]:
+        sig = _turn(_sign(m["piv_price"] - m["anchor_price"]), _sign(state["last_price"] - m["piv_price"]))
+        if sig:
+            out.add((m["piv_next_date"], sig))
+    return out
+
+
+def diff(before: dict, after: dict, base: dict | None = None) -> tuple[set[tuple[str, str]], set[tuple[str, str]]]:
+    """
+    (added, removed) ZIG signals going from `before` to `after`.
+
+    `after` was advanced from `base` (defaults to `before`; pass the saved previous state
+    when the last bar is being replaced). Signals already final in `base` are never removed.
+    """
+    old, new = live_signals(before), live_signals(after)
+    keep = {confirmed_signal(base if base is not None else before), confirmed_signal(after)}
+    removed = {s for s in old - new if s not in keep}
+    return new - old, removed
+
+
+def replay(bars, turn_percent: float = TURN_PERCENT) -> tuple[dict, dict | None, list[tuple[str, str]]]:
+    """
+    Full recompute over (date, close) bars in ascending order.
+
+    Returns (state, state before the last bar, every ZIG signal on the full history).
+    """
+    state, prev = new_state(), None
+    signals: list[tuple[str, str]] = []
+    for date, close in bars:
+        prev, state = state, advance(state, date, close, turn_percent)
+        c = confirmed_signal(state)
+        if c and (not signals or signals[-1] != c):
+            signals.append(c)
+    tail = sorted(live_signals(state) - set(signals))
+    return state, (prev if state["n"] > 1 else None), signals + tail
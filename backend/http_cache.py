@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+# backend/http_cache.py
+"""
+聚合接口的响应缓存（进程内 LRU + ETag）
+- 缓存键：(库路径, 接口, 参数, 当天日期, 各表数据版本)。数据版本见 migrations/m0007_data_version.py，
+  任何一张业务表写入后键随之变化，旧条目不再命中、按 LRU 淘汰；当天日期覆盖“未传日期按今天算”的接口
+- ETag 由缓存键散列得到，不必先算出响应体：If-None-Match 一致时直接 304
+- 带 _meta.errors 的部分结果不缓存、不发 ETag；库中还没有 data_version 时不缓存
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from . import metrics
+from .db import get_conn, get_db_path
+from .repository import data_version_repo
+
+RESPONSE_CACHE_SIZE = int(os.environ.get("PORT_RESPONSE_CACHE_SIZE") or 256)
+
+
+class ResponseCache:
+    """键为缓存键散列、值为已序列化的 JSON 响应体的 LRU"""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0, "uncached": 0, "evicted": 0}
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            body = self._items.get(key)
+            if body is None:
+                self._stats["misses"] += 1
+                return None
+            self._items.move_to_end(key)
+            self._stats["hits"] += 1
+            return body
+
+    def put(self, key: str, body: bytes):
+        with self._lock:
+            self._items[key] = body
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self._stats["evicted"] += 1
+
+    def count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["entries"] = len(self._items)
+        out["maxsize"] = self.maxsize
+        return out
+
+
+_cache = ResponseCache()
+
+
+def get_response_cache() -> ResponseCache:
+    return _cache
+
+
+def _cache_gauges():
+    s = _cache.stats()
+    return [
+        ("portfolio_response_cache_entries", "Aggregated responses held in the LRU", s["entries"]),
+        ("portfolio_response_cache_hits_total", "Aggregated responses served from the LRU", s["hits"]),
+        ("portfolio_response_cache_misses_total", "Aggregated responses computed", s["misses"]),
+        ("portfolio_response_cache_not_modified_total", "Aggregated requests answered with 304", s["not_modified"]),
+    ]
+
+
+metrics.register_collector(_cache_gauges)
+
+
+def current_versions() -> dict[str, int] | None:
+    with get_conn() as conn:
+        return data_version_repo.get_versions(conn)
+
+
+def _cache_key(endpoint: str, params: dict, versions: dict[str, int]) -> str:
+    raw = json.dumps(
+        [get_db_path(), endpoint, params, date.today().isoformat(), versions],
+        sort_keys=True, default=str, separators=(",", ":"),
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _etag_matches(header: str | None, key: str) -> bool:
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or any(t.removeprefix("W/").strip('"') == key for t in tags)
+
+
+def _encode(payload: Any) -> bytes:
+    # 与 FastAPI 默认 JSONResponse 的序列化口径一致
+    return json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _is_partial(payload: Any) -> bool:
+    return isinstance(payload, dict) and bool((payload.get("_meta") or {}).get("errors"))
+
+
+def cached_json(request: Request, endpoint: str, params: dict, compute: Callable[[], Any]) -> Response:
+    """
+    按数据版本缓存 compute() 的 JSON 结果
+
+    Args:
+        request: 当前请求（读取 If-None-Match）
+        endpoint: 接口标识，与 params 一起组成缓存键
+        params: 影响结果的全部参数（须可 JSON 序列化）
+        compute: 未命中时计算响应数据的无参函数
+    """
+    versions = current_versions()
+    if versions is None:
+        _cache.count("uncached")
+        return Response(_encode(compute()), media_type="application/json")
+
+    key = _cache_key(endpoint, params, versions)
+    headers = {"ETag": f'"{key}"', "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), key):
+        _cache.count("not_modified")
+        return Response(status_code=304, headers=headers)
+
+    body = _cache.get(key)
+    if body is None:
+        payload = compute()
+        body = _encode(payload)
+        if _is_partial(payload):
+            return Response(body, media_type="application/json")
+        _cache.put(key, body)
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,458 @@
+from __future__ import annotations
+
+# backend/jobs.py
+"""
+持久化后台任务队列（job 表见 migrations/m0008_job.py）
+- register(kind) 登记任务处理函数 fn(params: dict) -> dict（结果须可 JSON 序列化）；
+  处理函数可能在进程重启后从头重跑，必须可重复执行
+- submit(kind, params) 入队后立即返回任务 id；同一 kind + 参数已有排队中/运行中的任务时直接复用
+  （部分唯一索引保证，多进程同样成立）
+- JobRunner：每个进程 JOB_WORKERS 个工作线程从库中认领排队中的任务执行，不占用 HTTP 工作线程；
+  运行中的任务定期刷新心跳。进程退出或崩溃后，心跳超时（同机且原进程已不存在时立即）的任务重新排队，
+  最多执行 JOB_MAX_ATTEMPTS 次
+- report_progress() 在任务内汇报进度（已完成 / 总数 / 吞吐 / 预计剩余），不在任务内调用时为空操作
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Callable
+
+from . import metrics
+from .db import get_conn
+
+JOB_WORKERS = int(os.environ.get("PORT_JOB_WORKERS") or 2)   # 每进程工作线程数
+JOB_POLL_INTERVAL = 1.0        # 无任务时轮询间隔（秒）；本进程提交的任务会立即唤醒
+JOB_HEARTBEAT_SECONDS = 5.0    # 运行中任务的心跳间隔（秒）
+JOB_STALE_SECONDS = 60.0       # 心跳超过该时长视为执行者已退出，重新排队
+JOB_MAX_ATTEMPTS = 3           # 单个任务最多执行次数（含重启后的重跑）
+PROGRESS_MIN_INTERVAL = 0.5    # 进度落库的最小间隔（秒）
+
+FINISHED = ("succeeded", "failed")
+
+_handlers: dict[str, Callable[[dict], Any]] = {}
+
+
+def register(kind: str):
+    """装饰器：登记 kind 类任务的处理函数"""
+
+    def deco(fn):
+        _handlers[kind] = fn
+        return fn
+
+    return deco
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _dedup_key(kind: str, params: dict) -> str:
+    return f"{kind}:{_dumps(params)}"
+
+
+def _owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name != "posix":
+        return True   # 非 POSIX 平台只按心跳超时判断
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _iso(ts: float | None) -> str | None:
+    if ts is None:
+        return None
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts))
+
+
+def _row_to_job(r) -> dict:
+    started, finished = r["started_at"], r["finished_at"]
+    elapsed = None
+    if started is not None:
+        elapsed = round((finished if finished is not None else time.time()) - started, 3)
+    return {
+        "id": r["id"],
+        "kind": r["kind"],
+        "params": json.loads(r["params_json"]),
+        "status": r["status"],
+        "progress": json.loads(r["progress_json"]) if r["progress_json"] else None,
+        "result": json.loads(r["result_json"]) if r["result_json"] else None,
+        "error": r["error"],
+        "attempts": r["attempts"],
+        "created_at": _iso(r["created_at"]),
+        "started_at": _iso(started),
+        "finished_at": _iso(finished),
+        "elapsed_sec": elapsed,
+    }
+
+
+class _Progress:
+    """
+    单个任务的进度：内存中保留最新值，按 PROGRESS_MIN_INTERVAL 节流落库
+    - 带 stage 的汇报另按阶段保留（嵌套调用时外层按日期、内层按标的汇报，互不覆盖）
+    - 吞吐按阶段计：阶段首次汇报或已完成数回退（进入下一轮）时重新计时
+    """
+
+    def __init__(self, job_id: int, owner: str, started: float):
+        self.job_id = job_id
+        self.owner = owner
+        self.started = started
+        self.latest: dict | None = None
+        self._stages: dict[str, dict] = {}
+        self._clock: dict[str | None, tuple[float, int]] = {}
+        self._written = 0.0
+
+    def update(self, done: int, total: int | None, unit: str, extra: dict):
+        now = time.time()
+        stage = extra.get("stage")
+        t0, last = self._clock.get(stage, (self.started if stage is None else now, 0))
+        if done < last:
+            t0 = now
+        self._clock[stage] = (t0, done)
+        data = {"done": done, "total": total, "unit": unit, **extra}
+        elapsed = now - t0
+        if done and elapsed > 0:
+            rate = done / elapsed
+            data["rate_per_sec"] = round(rate, 3)
+            if total:
+                data["eta_sec"] = round(max(total - done, 0) / rate, 1)
+        if stage is not None:
+            self._stages[stage] = {k: v for k, v in data.items() if k != "stage"}
+            data["stages"] = dict(self._stages)
+        self.latest = data
+        if now - self._written < PROGRESS_MIN_INTERVAL and done != total:
+            return
+        self._written = now
+        with get_conn() as conn:
+            conn.execute(
+                "UPDATE job SET progress_json=?, heartbeat_at=? WHERE id=? AND owner=? AND status='running'",
+                (_dumps(data), now, self.job_id, self.owner),
+            )
+
+
+_current: contextvars.ContextVar[_Progress | None] = contextvars.ContextVar("job_progress", default=None)
+
+
+def report_progress(done: int, total: int | None = None, unit: str = "items", **extra):
+    """
+    汇报当前任务的进度；不在任务内（同步调用服务函数）时为空操作
+
+    Args:
+        done: 已完成数量
+        total: 总数（未知时为 None）
+        unit: 数量的单位，如 "dates" / "codes"
+        **extra: 其它附加信息（如 stage），原样写入 progress
+    """
+    p = _current.get()
+    if p is not None:
+        p.update(done, total, unit, extra)
+
+
+class JobRunner:
+    """
+    本进程的任务执行器
+    - start() 启动工作线程与心跳线程（幂等；fork 出的子进程首次 submit 时重建），并先回收失效任务
+    - 工作线程以单条 UPDATE ... RETURNING 认领最早的排队任务，多进程间不会重复认领
+    - 只认领本进程已登记处理函数的任务
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._done = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._pid = os.getpid()
+        self._owner = _owner()
+        self._running: set[int] = set()
+        self._stats = {"claimed": 0, "succeeded": 0, "failed": 0, "requeued": 0}
+
+    def _alive(self) -> bool:
+        return self._pid == os.getpid() and bool(self._threads) and all(t.is_alive() for t in self._threads)
+
+    def start(self):
+        if self._alive():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._owner = _owner()
+                self._running = set()
+                self._stats = {k: 0 for k in self._stats}
+                self._threads = []
+            if self._alive():
+                return
+            self._stop.clear()
+            try:
+                self.recover()
+            except sqlite3.OperationalError as e:
+                print(f"Warning: job recovery skipped: {e}", file=sys.stderr)
+            threads = [
+                threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            threads.append(threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True))
+            for t in threads:
+                t.start()
+            self._threads = threads
+
+    def wake(self):
+        self._wake.set()
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self._stats[key] += n
+
+    def recover(self) -> int:
+        """运行中但执行者已不在的任务重新排队（超过最多执行次数的置为失败），返回处理的任务数"""
+        now = time.time()
+        host = socket.gethostname()
+        n = 0
+        with get_conn() as conn:
+            rows = conn.execute(
+                "SELECT id, owner, heartbeat_at, attempts FROM job WHERE status='running'"
+            ).fetchall()
+            for r in rows:
+                owner = r["owner"] or ""
+                o_host, _, o_pid = owner.rpartition(":")
+                with self._lock:
+                    mine_alive = owner == self._owner and r["id"] in self._running
+                if mine_alive:
+                    continue
+                stale = (r["heartbeat_at"] or 0) < now - JOB_STALE_SECONDS
+                if owner == self._owner:
+                    stale = True   # 同 pid 的前一个进程留下的任务
+                elif o_host == host and o_pid.isdigit() and not _pid_alive(int(o_pid)):
+                    stale = True
+                if not stale:
+                    continue
+                if r["attempts"] >= JOB_MAX_ATTEMPTS:
+                    cur = conn.execute(
+                        "UPDATE job SET status='failed', error=?, finished_at=? "
+                        "WHERE id=? AND status='running' AND owner IS ?",
+                        (f"abandoned after {r['attempts']} attempts", now, r["id"], r["owner"]),
+                    )
+                else:
+                    cur = conn.execute(
+                        "UPDATE job SET status='queued', owner=NULL, started_at=NULL, heartbeat_at=NULL "
+                        "WHERE id=? AND status='running' AND owner IS ?",
+                        (r["id"], r["owner"]),
+                    )
+                n += cur.rowcount
+        if n:
+            self._count("requeued", n)
+            self.wake()
+        return n
+
+    def _claim(self) -> tuple[int, str, dict] | None:
+        kinds = list(_handlers)
+        if not kinds:
+            return None
+        now = time.time()
+        marks = ",".join("?" for _ in kinds)
+        with self._lock:
+            with get_conn() as conn:
+                row = conn.execute(
+                    f"""
+                    UPDATE job SET status='running', owner=?, attempts=attempts+1,
+                                   started_at=?, heartbeat_at=?, progress_json=NULL
+                    WHERE id = (SELECT id FROM job WHERE status='queued' AND kind IN ({marks}) ORDER BY id LIMIT 1)
+                      AND status='queued'
+                    RETURNING id, kind, params_json
+                    """,
+                    (self._owner, now, now, *kinds),
+                ).fetchone()
+            if row is None:
+                return None
+            self._running.add(row["id"])
+            self._stats["claimed"] += 1
+        return row["id"], row["kind"], json.loads(row["params_json"])
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.OperationalError as e:
+                # 库繁忙 / 还未迁移：稍后重试
+                print(f"Warning: job claim failed: {e}", file=sys.stderr)
+                job = None
+            if job is None:
+                self._wake.wait(JOB_POLL_INTERVAL)
+                self._wake.clear()
+                continue
+            self._execute(*job)
+
+    def _execute(self, job_id: int, kind: str, params: dict):
+        progress = _Progress(job_id, self._owner, time.time())
+        token = _current.set(progress)
+        result_json, error = None, None
+        try:
+            with metrics.span("job", kind):
+                result = _handlers[kind](params)
+            result_json = _dumps(result)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            print(f"[job] {kind}#{job_id} failed: {error}\n{traceback.format_exc()}", file=sys.stderr)
+        finally:
+            _current.reset(token)
+        status = "failed" if error is not None else "succeeded"
+        try:
+            with get_conn() as conn:
+                conn.execute(
+                    "UPDATE job SET status=?, result_json=?, error=?, finished_at=?, progress_json=? "
+                    "WHERE id=? AND owner=? AND status='running'",
+                    (status, result_json, error, time.time(),
+                     _dumps(progress.latest) if progress.latest else None, job_id, self._owner),
+                )
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+                self._stats[status] += 1
+            with self._done:
+                self._done.notify_all()
+
+    def _heartbeat(self):
+        while not self._stop.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                with self._lock:
+                    ids = list(self._running)
+                if ids:
+                    with get_conn() as conn:
+                        conn.executemany(
+                            "UPDATE job SET heartbeat_at=? WHERE id=? AND owner=? AND status='running'",
+                            [(time.time(), i, self._owner) for i in ids],
+                        )
+                self.recover()
+            except sqlite3.OperationalError as e:
+                print(f"Warning: job heartbeat failed: {e}", file=sys.stderr)
+
+    def wait_finished(self, timeout: float):
+        """等待本进程任意任务结束（最多 timeout 秒）"""
+        with self._done:
+            self._done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        """停止认领新任务；正在执行的任务由心跳超时后的下一个进程重跑"""
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["running"] = len(self._running)
+        out["workers"] = self.workers
+        out["alive"] = self._alive()
+        return out
+
+
+_runner = JobRunner()
+atexit.register(_runner.close)
+
+
+def _runner_gauges():
+    s = _runner.stats()
+    return [
+        ("portfolio_jobs_running", "Background jobs executing in this process", s["running"]),
+        ("portfolio_jobs_succeeded_total", "Background jobs finished successfully", s["succeeded"]),
+        ("portfolio_jobs_failed_total", "Background jobs finished with an error", s["failed"]),
+        ("portfolio_jobs_requeued_total", "Background jobs requeued after their runner disappeared", s["requeued"]),
+    ]
+
+
+metrics.register_collector(_runner_gauges)
+
+
+def get_job_runner() -> JobRunner:
+    return _runner
+
+
+def submit(kind: str, params: dict | None = None) -> tuple[int, bool]:
+    """
+    提交任务
+
+    Returns:
+        (任务 id, 是否复用了已在排队/运行中的相同任务)
+    """
+    if kind not in _handlers:
+        raise ValueError(f"unknown job kind: {kind}")
+    params = params or {}
+    key = _dedup_key(kind, params)
+    job_id, deduplicated = None, False
+    with get_conn() as conn:
+        for _ in range(3):
+            row = conn.execute(
+                "SELECT id FROM job WHERE dedup_key=? AND status IN ('queued','running')", (key,)
+            ).fetchone()
+            if row is not None:
+                job_id, deduplicated = row["id"], True
+                break
+            try:
+                cur = conn.execute(
+                    "INSERT INTO job(kind, params_json, dedup_key, status, created_at) VALUES(?,?,?,'queued',?)",
+                    (kind, _dumps(params), key, time.time()),
+                )
+                job_id = cur.lastrowid
+                break
+            except sqlite3.IntegrityError:
+                continue   # 并发提交了相同任务：重新读取
+    if job_id is None:
+        raise RuntimeError(f"failed to enqueue job {kind}")
+    _runner.start()
+    _runner.wake()
+    return job_id, deduplicated
+
+
+def get_job(job_id: int) -> dict | None:
+    with get_conn() as conn:
+        r = conn.execute("SELECT * FROM job WHERE id=?", (job_id,)).fetchone()
+    return _row_to_job(r) if r else None
+
+
+def list_jobs(status: str | None = None, kind: str | None = None, limit: int = 50) -> list[dict]:
+    sql = "SELECT * FROM job WHERE 1=1"
+    params: list[Any] = []
+    if status:
+        sql += " AND status=?"
+        params.append(status)
+    if kind:
+        sql += " AND kind=?"
+        params.append(kind)
+    sql += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    with get_conn() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [_row_to_job(r) for r in rows]
+
+
+def wait(job_id: int, timeout: float | None = None) -> dict | None:
+    """阻塞等待任务结束（或超时）并返回任务；其它进程执行的任务按 0.5 秒轮询"""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        job = get_job(job_id)
+        if job is None or job["status"] in FINISHED:
+            return job
+        remaining = 0.5 if deadline is None else min(0.5, deadline - time.monotonic())
+        if remaining <= 0:
+            return job
+        _runner.wait_finished(remaining)
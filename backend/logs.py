@@ -1,33 +1,188 @@
 from __future__ import annotations
 
-import json, time, uuid, datetime as dt
+import atexit, json, os, queue, sys, threading, time, uuid, datetime as dt
 from typing import Any
-from .db import get_conn
-
-DDL = """
-CREATE TABLE IF NOT EXISTS operation_log (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
-  ts TEXT NOT NULL,
-  user TEXT NOT NULL,
-  action TEXT NOT NULL,
-  entity_type TEXT,
-  entity_id TEXT,
-  request_id TEXT,
-  before_json TEXT,
-  after_json TEXT,
-  payload_json TEXT,
-  result TEXT,
-  err_msg TEXT,
-  latency_ms INTEGER
-);
-CREATE INDEX IF NOT EXISTS idx_log_ts ON operation_log(ts);
-CREATE INDEX IF NOT EXISTS idx_log_action ON operation_log(action);
-"""
+from . import metrics
+from .db import get_conn, get_db_path
+
+# 异步批量写入：请求路径只负责组装记录并入队，后台线程攒批后单事务写入
+LOG_QUEUE_MAX = 10000        # 队列上限（条）
+LOG_BATCH_SIZE = 200         # 每批最多写入条数
+LOG_FLUSH_INTERVAL = 0.2     # 攒批最长等待（秒）
+LOG_PUT_TIMEOUT = 0.05       # 队列满时最多阻塞（秒），超时丢弃该条并计数
+
+# 日志搜索
+LOG_COUNT_TTL = 30.0         # 带过滤条件的总数缓存（秒）
+FTS_MIN_QUERY = 3            # trigram 全文索引至少 3 个字符，更短的关键字退回 LIKE
+_count_cache: dict[tuple, tuple[float, int]] = {}
+_count_lock = threading.Lock()
+_fts_paths: dict[str, bool] = {}
+
+_INSERT_SQL = """INSERT INTO operation_log
+    (ts,user,action,entity_type,entity_id,request_id,before_json,after_json,payload_json,result,err_msg,latency_ms)
+    VALUES(:ts,:user,:action,:entity_type,:entity_id,:request_id,:before_json,:after_json,:payload_json,:result,:err_msg,:latency_ms)"""
 
 def ensure_log_schema():
-    with get_conn() as conn:
-        conn.executescript(DDL)
-        conn.commit()
+    """operation_log 由表结构迁移维护（见 backend/migrations），这里执行未执行的迁移"""
+    from .migrations import apply_migrations
+
+    apply_migrations()
+
+class LogWriter:
+    """
+    operation_log 后台写入器
+    - submit() 把 (db_path, 记录) 放入有界队列后立即返回；写线程按 LOG_BATCH_SIZE 条或
+      LOG_FLUSH_INTERVAL 秒攒批，按库分组后单事务 executemany
+    - 背压：队列满时最多阻塞 put_timeout 秒，仍满则丢弃该条（计入 dropped），不拖慢请求
+    - flush() 等待此前入队的记录全部落库；close() 在进程退出 / 应用关闭时调用
+    - 写线程按需启动，fork 出的子进程首次写日志时重建队列与线程
+    """
+
+    _FLUSH = object()
+    _STOP = object()
+
+    def __init__(self, maxsize: int = LOG_QUEUE_MAX, batch_size: int = LOG_BATCH_SIZE,
+                 flush_interval: float = LOG_FLUSH_INTERVAL, put_timeout: float = LOG_PUT_TIMEOUT):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._thread: threading.Thread | None = None
+        self._pid = os.getpid()
+        self._stats = {"enqueued": 0, "written": 0, "dropped": 0, "batches": 0, "errors": 0}
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._queue = queue.Queue(self.maxsize)
+                self._stats = {k: 0 for k in self._stats}
+                self._thread = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="operation-log-writer", daemon=True)
+                self._thread.start()
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self._stats[key] += n
+
+    def submit(self, db_path: str, rec: dict) -> bool:
+        """入队；队列满且等待超时时丢弃并返回 False"""
+        self._ensure_thread()
+        try:
+            self._queue.put((db_path, rec), timeout=self.put_timeout)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("enqueued")
+        return True
+
+    def _run(self):
+        q = self._queue
+        while True:
+            item = q.get()
+            batch, markers = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is self._STOP:
+                    markers.append(item)
+                    break
+                if isinstance(item, tuple) and item[0] is self._FLUSH:
+                    markers.append(item)
+                    break
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    item = q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for m in markers:
+                if m is self._STOP:
+                    return
+                m[1].set()
+
+    def _write(self, batch: list[tuple[str, dict]]):
+        by_path: dict[str, list[dict]] = {}
+        for path, rec in batch:
+            by_path.setdefault(path, []).append(rec)
+        for path, recs in by_path.items():
+            try:
+                with get_conn(path) as conn:
+                    conn.execute("BEGIN")
+                    conn.executemany(_INSERT_SQL, recs)
+                    conn.commit()
+                self._count("written", len(recs))
+                self._count("batches")
+            except Exception as e:
+                # 日志写入失败不影响业务：丢弃本批并计数
+                self._count("errors")
+                self._count("dropped", len(recs))
+                print(f"Warning: operation_log batch write failed ({len(recs)} rows): {e}", file=sys.stderr)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待此前入队的记录写完；写线程未运行时直接返回"""
+        if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put((self._FLUSH, done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        """写完剩余记录并停止写线程（之后再 submit 会重新启动）"""
+        thread = self._thread
+        if thread is None or not thread.is_alive() or self._pid != os.getpid():
+            return
+        try:
+            self._queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        out["pending"] = self._queue.qsize()
+        out["maxsize"] = self.maxsize
+        out["batch_size"] = self.batch_size
+        out["flush_interval"] = self.flush_interval
+        out["running"] = self._thread is not None and self._thread.is_alive()
+        return out
+
+
+_writer = LogWriter()
+atexit.register(_writer.close)
+
+
+def _writer_gauges():
+    s = _writer.stats()
+    return [
+        ("portfolio_oplog_pending", "Operation log entries waiting in the writer queue", s["pending"]),
+        ("portfolio_oplog_written_total", "Operation log entries written", s["written"]),
+        ("portfolio_oplog_dropped_total", "Operation log entries dropped (queue full or write error)", s["dropped"]),
+    ]
+
+
+metrics.register_collector(_writer_gauges)
+
+
+def get_log_writer() -> LogWriter:
+    return _writer
+
+
+def flush_operation_logs(timeout: float = 5.0) -> bool:
+    return _writer.flush(timeout)
+
 
 class OperationLogContext:
     def __init__(self, action: str, user: str = "owner"):
@@ -65,34 +220,97 @@ class OperationLogContext:
             "err_msg": err,
             "latency_ms": elapsed_ms,
         }
-        with get_conn() as conn:
-            conn.execute(
-                """INSERT INTO operation_log
-                (ts,user,action,entity_type,entity_id,request_id,before_json,after_json,payload_json,result,err_msg,latency_ms)
-                VALUES(:ts,:user,:action,:entity_type,:entity_id,:request_id,:before_json,:after_json,:payload_json,:result,:err_msg,:latency_ms)""",
-                rec
-            )
-            conn.commit()
-
-def search_operation_logs(q: str | None, action: str | None, ts_from: str | None, ts_to: str | None, page:int, size:int):
-    where = []
-    params = {}
-    if q:
-        where.append("(payload_json LIKE :q OR before_json LIKE :q OR after_json LIKE :q)")
-        params["q"] = f"%{q}%"
-    if action:
-        where.append("action = :action")
-        params["action"] = action
-    if ts_from:
-        where.append("ts >= :from")
-        params["from"] = ts_from
-    if ts_to:
-        where.append("ts <= :to")
-        params["to"] = ts_to
-    wh = " WHERE " + " AND ".join(where) if where else ""
-    sql = f"SELECT * FROM operation_log{wh} ORDER BY ts DESC LIMIT :limit OFFSET :offset"
-    count_sql = f"SELECT COUNT(1) AS cnt FROM operation_log{wh}"
+        # before/after/payload 在入队前序列化：调用方之后修改这些对象不影响已记录的内容
+        _writer.submit(get_db_path(), rec)
+
+def encode_log_cursor(ts: str, log_id: int) -> str:
+    return f"{ts}|{log_id}"
+
+
+def _decode_log_cursor(cursor: str) -> tuple[str, int]:
+    ts, sep, log_id = str(cursor).rpartition("|")
+    if not sep or not ts or not log_id.isdigit():
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return ts, int(log_id)
+
+
+def _has_fts(conn, path: str) -> bool:
+    """库中是否已有 operation_log_fts（迁移 0006 创建；SQLite 不支持 FTS5/trigram 时没有）"""
+    if _fts_paths.get(path):
+        return True
+    ok = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='operation_log_fts'").fetchone() is not None
+    if ok:
+        _fts_paths[path] = True
+    return ok
+
+
+def _approx_total(conn, key: tuple, where: list[str], params: dict) -> int:
+    if not where:
+        # 无过滤条件：按自增 id 区间估算（只有恢复 / 手工删除留下的空洞会偏大），O(1)
+        row = conn.execute("SELECT MIN(id) AS lo, MAX(id) AS hi FROM operation_log").fetchone()
+        return (row["hi"] - row["lo"] + 1) if row["hi"] is not None else 0
+    now = time.monotonic()
+    with _count_lock:
+        hit = _count_cache.get(key)
+        if hit is not None and now - hit[0] < LOG_COUNT_TTL:
+            return hit[1]
+    total = conn.execute(f"SELECT COUNT(1) AS cnt FROM operation_log WHERE {' AND '.join(where)}", params).fetchone()["cnt"]
+    with _count_lock:
+        if len(_count_cache) >= 256:
+            _count_cache.clear()
+        _count_cache[key] = (now, total)
+    return total
+
+
+def search_operation_logs(q: str | None, action: str | None, ts_from: str | None, ts_to: str | None,
+                          page: int = 1, size: int = 20, cursor: str | None = None) -> dict:
+    """
+    操作日志搜索，按 (ts, id) 倒序
+    - q 匹配 payload/before/after JSON 子串：走 operation_log_fts 全文索引，
+      不足 FTS_MIN_QUERY 个字符或库中没有全文索引时退回 LIKE
+    - cursor 为上一页返回的 next_cursor，按 (ts, id) keyset 翻页；不传时按 page 定位（OFFSET，兼容旧调用）
+    - total 为近似值：无过滤条件时按 id 区间估算，有过滤条件时 COUNT 结果缓存 LOG_COUNT_TTL 秒
+
+    Returns:
+        dict: {"total", "total_approx": True, "items", "next_cursor"}；没有下一页时 next_cursor 为 None
+    """
+    # 先等待已入队的日志落库，查询能看到刚刚发生的操作
+    flush_operation_logs()
+    path = get_db_path()
     with get_conn() as conn:
-        total = conn.execute(count_sql, params).fetchone()["cnt"]
-        rows = conn.execute(sql, {**params, "limit": size, "offset": (page-1)*size}).fetchall()
-        return total, [dict(r) for r in rows]
+        where = []
+        params: dict[str, Any] = {}
+        if q:
+            if len(q) >= FTS_MIN_QUERY and _has_fts(conn, path):
+                where.append("id IN (SELECT rowid FROM operation_log_fts WHERE operation_log_fts MATCH :q)")
+                params["q"] = '"' + q.replace('"', '""') + '"'   # 整体作为短语：trigram 下即子串匹配
+            else:
+                where.append("(payload_json LIKE :q OR before_json LIKE :q OR after_json LIKE :q)")
+                params["q"] = f"%{q}%"
+        if action:
+            where.append("action = :action")
+            params["action"] = action
+        if ts_from:
+            where.append("ts >= :from")
+            params["from"] = ts_from
+        if ts_to:
+            where.append("ts <= :to")
+            params["to"] = ts_to
+        total = _approx_total(conn, (path, q, action, ts_from, ts_to), where, params)
+
+        page_where = list(where)
+        page_params = {**params, "limit": size + 1}
+        offset = ""
+        if cursor:
+            page_params["c_ts"], page_params["c_id"] = _decode_log_cursor(cursor)
+            page_where.append("(ts < :c_ts OR (ts = :c_ts AND id < :c_id))")
+        elif page > 1:
+            offset = " OFFSET :offset"
+            page_params["offset"] = (page - 1) * size
+        wh = " WHERE " + " AND ".join(page_where) if page_where else ""
+        rows = conn.execute(
+            f"SELECT * FROM operation_log{wh} ORDER BY ts DESC, id DESC LIMIT :limit{offset}", page_params
+        ).fetchall()
+    items = [dict(r) for r in rows[:size]]
+    next_cursor = encode_log_cursor(items[-1]["ts"], items[-1]["id"]) if len(rows) > size else None
+    return {"total": total, "total_approx": True, "items": items, "next_cursor": next_cursor}
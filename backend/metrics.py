@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+# backend/metrics.py
+"""
+进程内性能指标，/metrics 以 Prometheus 文本格式输出
+- MetricsMiddleware：每个 HTTP 请求的耗时直方图、状态码计数，以及该请求内的 SQL 次数/耗时、连接借出次数
+- SQL：db.py 的连接类在 execute / executemany / executescript 上计时（语句准备 + 首步执行；
+  逐行 fetch 不计入，排序/聚合类查询的主要开销在首步）
+- span(kind, name) / traced(kind)：行情源远程调用、信号计算等代码段的次数与耗时
+- 慢请求：耗时超过 PORT_SLOW_REQUEST_MS（毫秒，默认 0 关闭）时写一条 SLOW_REQUEST 操作日志，附 SQL / span 分解
+- register_collector()：导出时读取的瞬时值（连接池、日志写入队列等）
+"""
+
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SLOW_REQUEST_MS = float(os.environ.get("PORT_SLOW_REQUEST_MS") or 0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_lock = threading.Lock()
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, labelnames: tuple[str, ...] = ()):
+        self.name, self.doc, self.labelnames = name, doc, labelnames
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), v: float = 1.0):
+        with _lock:
+            self._values[labels] = self._values.get(labels, 0.0) + v
+
+    def value(self, labels: tuple = ()) -> float:
+        with _lock:
+            return self._values.get(labels, 0.0)
+
+    def render(self) -> list[str]:
+        with _lock:
+            items = sorted(self._values.items())
+        out = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        out += [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+        return out
+
+
+class Histogram:
+    def __init__(self, name: str, doc: str, labelnames: tuple[str, ...] = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name, self.doc, self.labelnames, self.buckets = name, doc, labelnames, tuple(buckets)
+        self._values: dict[tuple, list] = {}   # labels -> [各桶计数..., sum, count]
+
+    def observe(self, labels: tuple, v: float):
+        with _lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if v <= b:
+                    row[i] += 1
+                    break
+            row[-2] += v
+            row[-1] += 1
+
+    def count(self, labels: tuple = ()) -> int:
+        with _lock:
+            row = self._values.get(labels)
+            return row[-1] if row else 0
+
+    def render(self) -> list[str]:
+        with _lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        out = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        for k, row in items:
+            acc = 0
+            for b, n in zip(self.buckets, row):
+                acc += n
+                le = 'le="%s"' % _num(b)
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, k, le)} {acc}")
+            le = 'le="+Inf"'
+            lbl = _labels(self.labelnames, k)
+            out.append(f"{self.name}_bucket{_labels(self.labelnames, k, le)} {row[-1]}")
+            out.append(f"{self.name}_sum{lbl} {_num(row[-2])}")
+            out.append(f"{self.name}_count{lbl} {row[-1]}")
+        return out
+
+
+HTTP_REQUESTS = Counter("portfolio_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("portfolio_http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+HTTP_DB_QUERIES = Counter("portfolio_http_db_queries_total", "SQL statements executed while serving the route", ("route",))
+HTTP_DB_SECONDS = Counter("portfolio_http_db_seconds_total", "SQL execution time while serving the route", ("route",))
+HTTP_SLOW = Counter("portfolio_http_slow_requests_total", "Requests slower than PORT_SLOW_REQUEST_MS", ("route",))
+DB_QUERY = Histogram("portfolio_db_query_duration_seconds", "SQL execution time", ("op",),
+                     buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+DB_CONN_HOLD = Histogram("portfolio_db_conn_hold_seconds", "Time a pooled connection is checked out by get_conn")
+SPAN = Histogram("portfolio_span_duration_seconds", "Traced code sections (provider calls, signal computation)",
+                 ("kind", "name"))
+SPAN_ERRORS = Counter("portfolio_span_errors_total", "Traced code sections that raised", ("kind", "name"))
+
+_METRICS = (HTTP_REQUESTS, HTTP_LATENCY, HTTP_DB_QUERIES, HTTP_DB_SECONDS, HTTP_SLOW, DB_QUERY, DB_CONN_HOLD,
+            SPAN, SPAN_ERRORS)
+_collectors: list[Callable[[], Iterable[tuple[str, str, float]]]] = []
+
+
+class RequestStats:
+    """单个请求内累计的 SQL / 连接 / span 开销（经 contextvar 传到线程池里的同步路由）"""
+
+    __slots__ = ("db_queries", "db_seconds", "conn_checkouts", "spans")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.conn_checkouts = 0
+        self.spans: dict[str, list] = {}   # "kind:name" -> [次数, 秒]
+
+    def as_dict(self) -> dict:
+        return {
+            "db_queries": self.db_queries,
+            "db_ms": round(self.db_seconds * 1000, 2),
+            "conn_checkouts": self.conn_checkouts,
+            "spans": {k: {"count": v[0], "ms": round(v[1] * 1000, 2)} for k, v in self.spans.items()},
+        }
+
+
+_current: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> RequestStats | None:
+    return _current.get()
+
+
+def record_query(op: str, seconds: float):
+    DB_QUERY.observe((op,), seconds)
+    rs = _current.get()
+    if rs is not None:
+        rs.db_queries += 1
+        rs.db_seconds += seconds
+
+
+def record_conn_hold(seconds: float):
+    DB_CONN_HOLD.observe((), seconds)
+    rs = _current.get()
+    if rs is not None:
+        rs.conn_checkouts += 1
+
+
+@contextmanager
+def span(kind: str, name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        SPAN_ERRORS.inc((kind, name))
+        raise
+    finally:
+        dt = time.perf_counter() - t0
+        SPAN.observe((kind, name), dt)
+        rs = _current.get()
+        if rs is not None:
+            acc = rs.spans.setdefault(f"{kind}:{name}", [0, 0.0])
+            acc[0] += 1
+            acc[1] += dt
+
+
+def traced(kind: str, name: str | None = None):
+    """函数装饰器版 span；name 默认取函数的 __qualname__"""
+
+    def deco(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(kind, label):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
+
+
+def register_collector(fn: Callable[[], Iterable[tuple[str, str, float]]]):
+    """fn() 返回 [(指标名, 说明, 当前值)]，导出时以 gauge 输出"""
+    _collectors.append(fn)
+
+
+def render() -> str:
+    lines: list[str] = []
+    for m in _METRICS:
+        lines += m.render()
+    for fn in _collectors:
+        try:
+            gauges = list(fn())
+        except Exception:
+            continue
+        for name, doc, value in gauges:
+            if value is None:
+                continue
+            lines += [f"# HELP {name} {doc}", f"# TYPE {name} gauge", f"{name} {_num(value)}"]
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """清空所有指标（测试 / 基准用）"""
+    with _lock:
+        for m in _METRICS:
+            m._values.clear()
+
+
+class MetricsMiddleware:
+    """
+    ASGI 中间件：按路由模板（如 /api/txn/{id}）统计，未匹配路由的请求归入 "<unmatched>"
+    slow_ms 为 None 时取 SLOW_REQUEST_MS；<= 0 不记录慢请求
+    """
+
+    def __init__(self, app, slow_ms: float | None = None):
+        self.app = app
+        self.slow_ms = SLOW_REQUEST_MS if slow_ms is None else float(slow_ms)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            _current.reset(token)
+            self._record(scope, status, elapsed, stats, t0)
+
+    def _record(self, scope, status: int, elapsed: float, stats: RequestStats, t0: float):
+        route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+        method = scope.get("method", "")
+        HTTP_REQUESTS.inc((method, route, str(status)))
+        HTTP_LATENCY.observe((method, route), elapsed)
+        if stats.db_queries:
+            HTTP_DB_QUERIES.inc((route,), stats.db_queries)
+            HTTP_DB_SECONDS.inc((route,), stats.db_seconds)
+        if self.slow_ms > 0 and elapsed * 1000 >= self.slow_ms:
+            HTTP_SLOW.inc((route,))
+            try:
+                from .logs import OperationLogContext
+
+                log = OperationLogContext("SLOW_REQUEST")
+                log.start = t0
+                log.set_entity("route", route)
+                query = scope.get("query_string", b"").decode("latin-1")
+                log.set_payload({"method": method, "path": scope.get("path"), "query": query, "status": status,
+                                 **stats.as_dict()})
+                log.write()
+            except Exception:
+                pass
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+"""
+版本化表结构迁移
+- schema_version 记录已执行的迁移；迁移模块按 VERSION 升序登记在 MIGRATIONS 中，
+  每个模块提供 VERSION / NAME / upgrade(conn)（upgrade 不自行提交）
+- 每个迁移单独一个 BEGIN IMMEDIATE 事务，版本登记与表结构变更同事务提交：
+  失败整体回滚，下次启动重试；多进程同时启动时拿到写锁后重新检查，只执行一次
+- 由 api.on_startup 与命令行 python -m backend.migrations 调用；请求路径不再做 DDL 探测
+"""
+
+from ..db import get_conn
+from . import (
+    m0001_baseline,
+    m0002_txn_group_columns,
+    m0003_signal_scope,
+    m0004_derived_tables,
+    m0005_query_indexes,
+    m0006_operation_log_fts,
+    m0007_data_version,
+    m0008_job,
+    m0009_dirty_set,
+)
+
+MIGRATIONS = (
+    m0001_baseline,
+    m0002_txn_group_columns,
+    m0003_signal_scope,
+    m0004_derived_tables,
+    m0005_query_indexes,
+    m0006_operation_log_fts,
+    m0007_data_version,
+    m0008_job,
+    m0009_dirty_set,
+)
+LATEST_VERSION = MIGRATIONS[-1].VERSION
+
+_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TEXT NOT NULL DEFAULT (datetime('now'))
+)
+"""
+
+
+def _applied_versions(conn) -> set[int]:
+    return {int(r[0]) for r in conn.execute("SELECT version FROM schema_version").fetchall()}
+
+
+def apply_migrations(db_path: str | None = None) -> list[dict]:
+    """
+    执行所有未执行的迁移
+
+    Returns:
+        list: 本次执行的迁移 [{"version", "name"}]，已是最新时为空
+    """
+    applied: list[dict] = []
+    with get_conn(db_path) as conn:
+        conn.execute(_VERSION_DDL)
+        done = _applied_versions(conn)
+        for m in MIGRATIONS:
+            if m.VERSION in done:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if m.VERSION in _applied_versions(conn):
+                    # 其它进程已抢先执行
+                    conn.rollback()
+                    continue
+                m.upgrade(conn)
+                conn.execute("INSERT INTO schema_version(version, name) VALUES(?, ?)", (m.VERSION, m.NAME))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append({"version": m.VERSION, "name": m.NAME})
+    return applied
+
+
+def migration_status(db_path: str | None = None) -> dict:
+    """{"current": 已执行的最高版本, "latest": 代码中的最新版本, "pending": [未执行的 {"version","name"}]}"""
+    with get_conn(db_path) as conn:
+        conn.execute(_VERSION_DDL)
+        done = _applied_versions(conn)
+    return {
+        "current": max(done) if done else 0,
+        "latest": LATEST_VERSION,
+        "pending": [{"version": m.VERSION, "name": m.NAME} for m in MIGRATIONS if m.VERSION not in done],
+    }
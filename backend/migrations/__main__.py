@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令行执行表结构迁移：
+    python -m backend.migrations            # 执行未执行的迁移
+    python -m backend.migrations --status   # 只查看版本
+    python -m backend.migrations --db path/to/portfolio.db
+"""
+
+from __future__ import annotations
+import argparse
+
+from ..db import get_db_path
+from . import apply_migrations, migration_status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="执行 SQLite 表结构迁移")
+    parser.add_argument("--db", default=None, help="数据库路径，默认按 PORT_DB_PATH / config.yaml 解析")
+    parser.add_argument("--status", action="store_true", help="只打印当前版本与待执行迁移")
+    args = parser.parse_args()
+
+    db_path = args.db or get_db_path()
+    if not args.status:
+        for m in apply_migrations(db_path):
+            print(f"[migrate] applied {m['version']:04d}_{m['name']}")
+    st = migration_status(db_path)
+    print(f"[migrate] {db_path}: version {st['current']}/{st['latest']}, pending={len(st['pending'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+"""schema.sql 中的建表 / 建索引语句（均为 IF NOT EXISTS）：补齐旧库缺失的表"""
+
+import sqlite3
+from pathlib import Path
+
+VERSION = 1
+NAME = "baseline"
+
+_SCHEMA = Path(__file__).resolve().parent.parent.parent / "schema.sql"
+
+
+def _statements(sql: str) -> list[str]:
+    out, buf = [], ""
+    for line in sql.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            stmt = buf.strip()
+            buf = ""
+            # PRAGMA 由连接池统一设置（journal_mode 也不能在事务内切换）
+            if stmt and not stmt.upper().startswith("PRAGMA"):
+                out.append(stmt)
+    return out
+
+
+def upgrade(conn):
+    for stmt in _statements(_SCHEMA.read_text(encoding="utf-8")):
+        conn.execute(stmt)
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+"""txn 补 group_id（原始交易与现金镜像、T+0 配对分组）与 realized_pnl 列"""
+
+VERSION = 2
+NAME = "txn_group_columns"
+
+
+def upgrade(conn):
+    names = {r[1] for r in conn.execute("PRAGMA table_info(txn)").fetchall()}
+    if "group_id" not in names:
+        conn.execute("ALTER TABLE txn ADD COLUMN group_id INTEGER")
+    if "realized_pnl" not in names:
+        conn.execute("ALTER TABLE txn ADD COLUMN realized_pnl REAL")
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+"""signal 补 scope_type / scope_data 列，并按 ts_code / category_id 回填"""
+
+VERSION = 3
+NAME = "signal_scope"
+
+
+def upgrade(conn):
+    names = {r[1] for r in conn.execute("PRAGMA table_info(signal)").fetchall()}
+    if "scope_type" not in names:
+        conn.execute("ALTER TABLE signal ADD COLUMN scope_type TEXT DEFAULT 'INSTRUMENT'")
+    if "scope_data" not in names:
+        conn.execute("ALTER TABLE signal ADD COLUMN scope_data TEXT")
+
+    conn.execute(
+        """
+        UPDATE signal
+        SET scope_type = CASE
+            WHEN ts_code IS NOT NULL THEN 'INSTRUMENT'
+            WHEN category_id IS NOT NULL THEN 'CATEGORY'
+            ELSE 'INSTRUMENT'
+        END
+        WHERE scope_type = 'INSTRUMENT'
+        """
+    )
+    conn.execute("UPDATE signal SET scope_data = json_array(ts_code) WHERE ts_code IS NOT NULL AND scope_data IS NULL")
+    conn.execute(
+        "UPDATE signal SET scope_data = json_array(category_id) WHERE category_id IS NOT NULL AND scope_data IS NULL"
+    )
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+"""
+派生表回填：price_latest 按 price_eod、position_ledger 按 txn / position（表为空时整体重建）
+表结构由 m0001（schema.sql）创建；回填全部经由 conn，现金标的代码也取自被迁移的库
+"""
+
+from ..repository import position_ledger_repo, price_repo
+
+VERSION = 4
+NAME = "derived_tables"
+
+
+def upgrade(conn):
+    from ..services.position_ledger_svc import rebuild_all
+
+    if conn.execute("SELECT 1 FROM price_latest LIMIT 1").fetchone() is None:
+        price_repo.rebuild_price_latest(conn)
+    if position_ledger_repo.is_empty(conn):
+        rebuild_all(conn)
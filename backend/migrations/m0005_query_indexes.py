@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+"""热点查询索引：按标的/日期取交易、按日期分页、信号按标的/类型/日期过滤、按日期取行情"""
+
+VERSION = 5
+NAME = "query_indexes"
+
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_txn_code_date ON txn(ts_code, trade_date)",
+    "CREATE INDEX IF NOT EXISTS idx_txn_date_id ON txn(trade_date, id)",
+    "CREATE INDEX IF NOT EXISTS idx_signal_code_type_date ON signal(ts_code, type, trade_date)",
+    "CREATE INDEX IF NOT EXISTS idx_signal_date_type ON signal(trade_date, type)",
+    "CREATE INDEX IF NOT EXISTS idx_price_eod_date ON price_eod(trade_date)",
+)
+
+
+def upgrade(conn):
+    for stmt in INDEXES:
+        conn.execute(stmt)
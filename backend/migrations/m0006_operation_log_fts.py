@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+"""
+operation_log 全文索引与分页索引
+- operation_log_fts：FTS5 外部内容表（trigram 分词，子串匹配与原 LIKE '%q%' 口径一致，
+  中文无需分词），由触发器随 operation_log 增删改同步，建表后按现有日志整体重建
+- idx_log_ts_id：按 (ts, id) 倒序的 keyset 分页
+SQLite 未编译 FTS5 / trigram 时只建分页索引，搜索退回 LIKE
+"""
+
+import sqlite3
+
+VERSION = 6
+NAME = "operation_log_fts"
+
+FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS operation_log_fts USING fts5("
+    "payload_json, before_json, after_json, content='operation_log', content_rowid='id', tokenize='trigram')",
+    """
+    CREATE TRIGGER IF NOT EXISTS operation_log_fts_ai AFTER INSERT ON operation_log BEGIN
+        INSERT INTO operation_log_fts(rowid, payload_json, before_json, after_json)
+        VALUES (new.id, new.payload_json, new.before_json, new.after_json);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS operation_log_fts_ad AFTER DELETE ON operation_log BEGIN
+        INSERT INTO operation_log_fts(operation_log_fts, rowid, payload_json, before_json, after_json)
+        VALUES ('delete', old.id, old.payload_json, old.before_json, old.after_json);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS operation_log_fts_au AFTER UPDATE ON operation_log BEGIN
+        INSERT INTO operation_log_fts(operation_log_fts, rowid, payload_json, before_json, after_json)
+        VALUES ('delete', old.id, old.payload_json, old.before_json, old.after_json);
+        INSERT INTO operation_log_fts(rowid, payload_json, before_json, after_json)
+        VALUES (new.id, new.payload_json, new.before_json, new.after_json);
+    END
+    """,
+)
+
+
+def fts_supported(conn) -> bool:
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._fts_probe USING fts5(x, tokenize='trigram')")
+    except sqlite3.OperationalError:
+        return False
+    conn.execute("DROP TABLE temp._fts_probe")
+    return True
+
+
+def upgrade(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_log_ts_id ON operation_log(ts, id)")
+    if not fts_supported(conn):
+        return
+    for stmt in FTS_DDL:
+        conn.execute(stmt)
+    conn.execute("INSERT INTO operation_log_fts(operation_log_fts) VALUES('rebuild')")
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+"""
+数据版本号：data_version 每张业务表一行，表内容变化时 version 单调递增（响应缓存 / ETag 的失效依据）
+- TRIGGER_TABLES：行级触发器在增删改后递增，任何写入路径（含数据恢复、其它进程）都会被覆盖
+- price_eod 是批量入库表，行级触发器会让入库耗时翻倍：插入/更新由 price_repo.upsert_price_eod_many
+  每批递增一次，只给删除加触发器
+表与触发器在同一个迁移事务内创建：存在 data_version 即说明触发器已就位
+"""
+
+VERSION = 7
+NAME = "data_version"
+
+TRIGGER_TABLES = (
+    "txn", "position", "position_ledger", "signal", "config",
+    "instrument", "category", "watchlist", "trade_cal", "price_latest",
+)
+TRACKED_TABLES = TRIGGER_TABLES + ("price_eod",)
+
+
+def _trigger(table: str, event: str) -> str:
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN "
+        f"UPDATE data_version SET version = version + 1 WHERE table_name = '{table}'; END"
+    )
+
+
+def upgrade(conn):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS data_version ("
+        "table_name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)"
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO data_version(table_name, version) VALUES(?, 0)",
+        [(t,) for t in TRACKED_TABLES],
+    )
+    for table in TRIGGER_TABLES:
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(_trigger(table, event))
+    conn.execute(_trigger("price_eod", "DELETE"))
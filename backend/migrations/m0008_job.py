@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+"""
+后台任务队列（backend/jobs.py）
+- job：每个长耗时操作（行情同步、信号重建、重算）一行，status 依次为 queued → running → succeeded / failed；
+  进度、结果为 JSON，时间为 unix 秒
+- idx_job_inflight：同一 dedup_key（kind + 参数）最多一个排队中/运行中的任务，相同请求并发提交时复用
+- idx_job_queue：工作线程按 id 顺序认领排队中的任务
+"""
+
+VERSION = 8
+NAME = "job"
+
+
+def upgrade(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS job (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            params_json TEXT NOT NULL,
+            dedup_key TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            progress_json TEXT,
+            result_json TEXT,
+            error TEXT,
+            owner TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            heartbeat_at REAL
+        )
+        """
+    )
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_job_inflight ON job(dedup_key) "
+        "WHERE status IN ('queued', 'running')"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_job_queue ON job(status, id)")
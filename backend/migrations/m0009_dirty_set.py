@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+"""
+变更集（dirty set）：业务表写入时追加 (表, 标的, 日期范围) 到 dirty_set，增量重算只处理其中的标的
+- dirty_set 只追加；各消费者（calc / ZIG 刷新等）在 dirty_cursor 中记录已消费到的 seq，
+  读取游标之后的行并推进游标，所有消费者都越过的旧行由 dirty_repo 按批清理；
+  as_of 为按日期消费者（calc）上次处理到的日期，回算更早的日期时不能只看变更集；
+  dirty_set.consumer 非空的行是该消费者留待之后处理的部分，只对它自己可见
+- min_date / max_date 为受影响的日期范围（YYYY-MM-DD），'' 表示影响全部日期（持仓、标的属性等）
+- txn / position / position_ledger / instrument 挂行级触发器；price_eod 与 m0007 相同只给删除加触发器，
+  插入/更新由 price_repo.upsert_price_eod_many 按批合并登记（每个标的一行）
+"""
+
+VERSION = 9
+NAME = "dirty_set"
+
+# 表 -> 触发器内取日期的列（None 表示影响全部日期）
+DATE_COLUMNS = {
+    "txn": "trade_date",
+    "position": None,
+    "position_ledger": "valid_from",
+}
+
+
+def _values(table: str, ref: str, date_col: str | None) -> str:
+    d = f"{ref}.{date_col}" if date_col else "''"
+    return f"INSERT INTO dirty_set(table_name, ts_code, min_date, max_date) VALUES('{table}', {ref}.ts_code, {d}, {d});"
+
+
+def _trigger(table: str, event: str, body: str, of: str = "") -> str:
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {table}_dirty_{event.lower()} AFTER {event}{of} ON {table} BEGIN {body} END"
+    )
+
+
+def upgrade(conn):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS dirty_set ("
+        "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "table_name TEXT NOT NULL, "
+        "ts_code TEXT NOT NULL, "
+        "min_date TEXT NOT NULL DEFAULT '', "
+        "max_date TEXT NOT NULL DEFAULT '', "
+        "consumer TEXT)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS dirty_cursor ("
+        "consumer TEXT PRIMARY KEY, seq INTEGER NOT NULL, as_of TEXT)"
+    )
+    for table, date_col in DATE_COLUMNS.items():
+        conn.execute(_trigger(table, "INSERT", _values(table, "NEW", date_col)))
+        conn.execute(_trigger(table, "UPDATE", _values(table, "OLD", date_col) + " " + _values(table, "NEW", date_col)))
+        conn.execute(_trigger(table, "DELETE", _values(table, "OLD", date_col)))
+    # 标的只有启用状态 / 类型 / 类别变化会影响信号与 KPI
+    conn.execute(_trigger("instrument", "INSERT", _values("instrument", "NEW", None)))
+    conn.execute(_trigger("instrument", "UPDATE", _values("instrument", "NEW", None), of=" OF active, type, category_id"))
+    conn.execute(_trigger("instrument", "DELETE", _values("instrument", "OLD", None)))
+    conn.execute(_trigger("price_eod", "DELETE", _values("price_eod", "OLD", "trade_date")))
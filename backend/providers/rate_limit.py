@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+"""
+Thread-safe token buckets for provider endpoints.
+
+One bucket per endpoint family (e.g. all fund_* endpoints share the TuShare fund quota),
+shared by every worker thread of a provider instance. Waiting happens outside the lock so
+one sleeping caller never blocks others from reading stats or taking freshly refilled tokens.
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Classic token bucket: `rate_per_min` tokens/minute, holding at most `burst` tokens.
+
+    The bucket starts with `burst` tokens (default 1), so calls are paced at 60/rate seconds from
+    the first one and no 60 s window exceeds the per-minute quota even right after a cold start.
+    A larger burst trades that guarantee for up to `burst` extra calls in the first window.
+
+    rate_per_min=None (or <= 0) means unlimited; acquire() then only counts calls.
+    """
+
+    def __init__(self, rate_per_min: int | None, burst: int = 1):
+        self.rate = rate_per_min if (rate_per_min and rate_per_min > 0) else None
+        self.capacity = float(burst if burst and burst > 0 else 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.waited_sec = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate / 60.0)
+        self._updated = now
+
+    def acquire(self):
+        if self.rate is None:
+            with self._lock:
+                self.calls += 1
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self.calls += 1
+                    return
+                wait = (1.0 - self._tokens) * 60.0 / self.rate
+                self.waited_sec += wait
+            time.sleep(wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"rate_per_min": self.rate, "calls": self.calls, "waited_sec": round(self.waited_sec, 3)}
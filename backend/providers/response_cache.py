@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+"""
+Persistent response cache for data providers (local SQLite file).
+
+- Entries are keyed by (endpoint, canonical params JSON); payloads are DataFrames
+  serialized as JSON (orient=split) so they survive process restarts.
+- TTL policy per endpoint: data for closed dates never expires; anything that touches
+  "today" (or is not date-bound, e.g. fund_manager) expires after the endpoint TTL.
+  Empty answers always get the endpoint TTL: a late publication or a provider hiccup
+  must not become a permanent "no data".
+- Window endpoints (per-code date ranges) are interval-aware: a request for
+  [start, end] is answered locally when the union of cached ranges covers it.
+"""
+
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# Seconds an entry lives when it touches data that may still change (today / open-ended).
+ENDPOINT_TTL = {
+    "daily": 600,
+    "hk_daily": 600,
+    "fund_daily": 600,
+    "fund_nav": 1800,
+    "trade_cal": 86400,
+    "stock_basic": 86400,
+    "fund_basic": 86400,
+    "fund_portfolio": 43200,
+    "fund_share": 43200,
+    "fund_manager": 86400,
+}
+DEFAULT_TTL = 600
+
+# Date-bound endpoints: an entry whose last date is at least `lag` days before today is
+# considered closed and never expires. fund_nav gets a longer lag because NAVs are
+# published (and sometimes restated) a day or two after the valuation date.
+CLOSED_LAG_DAYS = {
+    "daily": 1,
+    "hk_daily": 1,
+    "fund_daily": 1,
+    "fund_nav": 3,
+    "trade_cal": 1,
+}
+
+DDL = """
+CREATE TABLE IF NOT EXISTS response_cache (
+  endpoint TEXT NOT NULL,
+  params TEXT NOT NULL,
+  ts_code TEXT,
+  start TEXT,
+  end TEXT,
+  fetched_at REAL NOT NULL,
+  expires_at REAL,
+  payload TEXT NOT NULL,
+  PRIMARY KEY (endpoint, params)
+);
+CREATE INDEX IF NOT EXISTS idx_rc_window ON response_cache(endpoint, ts_code, start, end);
+"""
+
+
+def _default_cache_path() -> str:
+    env_path = os.environ.get("PORT_PROVIDER_CACHE_PATH")
+    if env_path:
+        return env_path
+    from ..db import get_db_path
+    return os.path.join(os.path.dirname(get_db_path()) or ".", "provider_cache.db")
+
+
+def _dump(df: pd.DataFrame) -> str:
+    return df.to_json(orient="split", index=False)
+
+
+def _load(payload: str) -> pd.DataFrame:
+    return pd.read_json(io.StringIO(payload), orient="split", dtype=False, convert_dates=False)
+
+
+class ResponseCache:
+    """Thread-safe persistent cache; one SQLite connection guarded by a lock."""
+
+    def __init__(self, path: str | None = None):
+        self.path = path or _default_cache_path()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode = WAL;")
+        self._conn.executescript(DDL)
+        self._stats: dict[str, dict[str, int]] = {}
+        self.purge_expired()
+
+    # -------- policy --------
+    @staticmethod
+    def expires_at(endpoint: str, last_date: str | None, now: float | None = None,
+                   empty: bool = False) -> float | None:
+        """None = never expires (closed historical data with rows)."""
+        now = time.time() if now is None else now
+        lag = CLOSED_LAG_DAYS.get(endpoint)
+        if lag is not None and last_date and not empty:
+            cutoff = (datetime.now() - timedelta(days=lag)).strftime("%Y%m%d")
+            if str(last_date) <= cutoff:
+                return None
+        return now + ENDPOINT_TTL.get(endpoint, DEFAULT_TTL)
+
+    # -------- stats --------
+    def _count(self, endpoint: str, field: str):
+        s = self._stats.setdefault(endpoint, {"hits": 0, "misses": 0, "window_hits": 0, "stores": 0})
+        s[field] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            per_endpoint = {k: dict(v) for k, v in self._stats.items()}
+            rows = self._conn.execute(
+                "SELECT endpoint, COUNT(1) AS n FROM response_cache GROUP BY endpoint"
+            ).fetchall()
+        entries = {r["endpoint"]: int(r["n"]) for r in rows}
+        hits = sum(v["hits"] + v["window_hits"] for v in per_endpoint.values())
+        misses = sum(v["misses"] for v in per_endpoint.values())
+        return {
+            "path": self.path,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": (hits / (hits + misses)) if (hits + misses) else None,
+            "entries": entries,
+            "endpoints": per_endpoint,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    # -------- keyed entries --------
+    def get(self, endpoint: str, params: dict) -> pd.DataFrame | None:
+        key = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM response_cache WHERE endpoint=? AND params=? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (endpoint, key, now),
+            ).fetchone()
+            self._count(endpoint, "hits" if row else "misses")
+        return _load(row["payload"]) if row else None
+
+    def put(self, endpoint: str, params: dict, df: pd.DataFrame, last_date: str | None = None,
+            ts_code: str | None = None, start: str | None = None, end: str | None = None):
+        if df is None:
+            return
+        key = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        now = time.time()
+        exp = self.expires_at(endpoint, last_date, now, empty=df.empty)
+        payload = _dump(df)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache(endpoint, params, ts_code, start, end, fetched_at, expires_at, payload) "
+                "VALUES(?,?,?,?,?,?,?,?)",
+                (endpoint, key, ts_code, start, end, now, exp, payload),
+            )
+            self._count(endpoint, "stores")
+
+    # -------- interval-aware window entries --------
+    def get_window(self, endpoint: str, ts_code: str, start: str, end: str, date_col: str) -> pd.DataFrame | None:
+        """Answer [start, end] from cached windows of the same code when their union covers it."""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT start, end, payload FROM response_cache "
+                "WHERE endpoint=? AND ts_code=? AND start IS NOT NULL "
+                "AND start<=? AND end>=? AND (expires_at IS NULL OR expires_at > ?) "
+                "ORDER BY start",
+                (endpoint, ts_code, end, start, now),
+            ).fetchall()
+            covered = _covers([(r["start"], r["end"]) for r in rows], start, end)
+            self._count(endpoint, "window_hits" if covered else "misses")
+        if not covered:
+            return None
+        frames = [_load(r["payload"]) for r in rows]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame([])
+        df = pd.concat(frames, ignore_index=True)
+        if date_col in df.columns:
+            d = df[date_col].astype(str)
+            df = df[(d >= start) & (d <= end)]
+            df = df.drop_duplicates(subset=[c for c in ("ts_code", date_col) if c in df.columns], keep="last")
+            df = df.sort_values(date_col, ascending=False).reset_index(drop=True)
+        return df
+
+    def put_window(self, endpoint: str, ts_code: str, start: str, end: str, df: pd.DataFrame):
+        self.put(endpoint, {"ts_code": ts_code, "start_date": start, "end_date": end}, df,
+                 last_date=end, ts_code=ts_code, start=start, end=end)
+
+    # -------- maintenance --------
+    def purge_expired(self) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM response_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            )
+        return cur.rowcount
+
+    def clear(self, endpoint: str | None = None) -> int:
+        with self._lock:
+            if endpoint:
+                cur = self._conn.execute("DELETE FROM response_cache WHERE endpoint=?", (endpoint,))
+            else:
+                cur = self._conn.execute("DELETE FROM response_cache")
+        return cur.rowcount
+
+
+def _covers(intervals: list[tuple[str, str]], start: str, end: str) -> bool:
+    """Whether the union of inclusive YYYYMMDD intervals covers [start, end] (adjacent days merge)."""
+    cursor = start
+    for s, e in sorted(intervals):
+        if s > cursor:
+            return False
+        if e >= cursor:
+            if e >= end:
+                return True
+            cursor = (datetime.strptime(e, "%Y%m%d") + timedelta(days=1)).strftime("%Y%m%d")
+    return False
+
+
+_shared: ResponseCache | None = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide cache shared by every TuShareProvider instance."""
+    global _shared
+    path = _default_cache_path()
+    with _shared_lock:
+        if _shared is None or _shared.path != path:
+            _shared = ResponseCache(path)
+        return _shared
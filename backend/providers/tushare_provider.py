@@ -1,38 +1,38 @@
 from __future__ import annotations
 from typing import Any
 
+from ..metrics import span
+from .rate_limit import TokenBucket
+from .response_cache import ResponseCache, get_response_cache
+
+
+def _endpoint_name(fn) -> str:
+    """pro_api 的接口是 partial(query, "daily") 形式，取接口名作为指标标签"""
+    args = getattr(fn, "args", None)
+    if args and isinstance(args[0], str):
+        return args[0]
+    return getattr(fn, "__name__", None) or type(fn).__name__
+
 
 class TuShareProvider:
-    """Thin wrapper around tushare pro api with simple normalization + optional rate limit for fund endpoints."""
+    """Thin wrapper around tushare pro api with simple normalization + optional rate limit for fund endpoints.
+
+    Responses go through two cache levels: per-instance dicts, then the process-wide
+    persistent ResponseCache (pass cache=False to bypass it).
+    """
 
-    def __init__(self, token: str, fund_rate_per_min: int | None = None):
+    def __init__(self, token: str, fund_rate_per_min: int | None = None, cache: ResponseCache | bool | None = None,
+                 hk_rate_per_min: int | None = None):
         import tushare as ts
         self.pro = ts.pro_api(token)
         import time, random
-        
-        class _RateLimiter:
-            def __init__(self, max_per_min: int | None):
-                self.max = max_per_min if (max_per_min and max_per_min > 0) else None
-                self.window_start = time.time()
-                self.count = 0
-
-            def tick(self):
-                if not self.max:
-                    return
-                now = time.time()
-                elapsed = now - self.window_start
-                if elapsed >= 60.0:
-                    self.window_start = now
-                    self.count = 0
-                if self.count >= self.max:
-                    sleep_for = max(0.01, 60.0 - elapsed + 0.05)
-                    print(f"[tushare_provider] rate-limit: sleeping {sleep_for:.2f}s")
-                    time.sleep(sleep_for)
-                    self.window_start = time.time()
-                    self.count = 0
-                self.count += 1
-
-        self._rate = _RateLimiter(fund_rate_per_min)
+
+        # one token bucket per endpoint family, shared by all threads using this provider
+        self._buckets: dict[str, TokenBucket] = {
+            "stock": TokenBucket(None),
+            "hk": TokenBucket(hk_rate_per_min),
+            "fund": TokenBucket(fund_rate_per_min),
+        }
         # simple in-memory caches
         self._cache_daily: dict[str, Any] = {}
         self._cache_hk_daily: dict[str, Any] = {}
@@ -46,9 +46,11 @@ class TuShareProvider:
 
         def _retry_call(fn, *args, tries=3, base_sleep=0.5, **kwargs):
             last_err = None
+            endpoint = _endpoint_name(fn)
             for i in range(tries):
                 try:
-                    return fn(*args, **kwargs)
+                    with span("provider", endpoint):
+                        return fn(*args, **kwargs)
                 except Exception as e:
                     last_err = e
                     delay = base_sleep * (2 ** i) * (1.0 + random.random() * 0.1)
@@ -59,12 +61,69 @@ class TuShareProvider:
 
         self._retry_call = _retry_call
 
+        if cache is False:
+            self._store = None
+        elif isinstance(cache, ResponseCache):
+            self._store = cache
+        else:
+            try:
+                self._store = get_response_cache()
+            except Exception as e:
+                print(f"[tushare_provider] persistent cache unavailable: {e}")
+                self._store = None
+
+    def _rate_limited(self, fn, family: str = "fund", **kwargs):
+        """Remote call through the family's token bucket: only consumes a token when we actually hit the network."""
+        self._buckets[family].acquire()
+        return self._retry_call(fn, **kwargs)
+
+    def rate_stats(self) -> dict:
+        """Remote calls and time spent waiting for tokens, per endpoint family."""
+        return {k: b.stats() for k, b in self._buckets.items()}
+
+    # -------- persistent cache helpers --------
+    def _cached(self, endpoint: str, params: dict, fetch, last_date: str | None = None):
+        """Keyed lookup in the persistent cache; on miss call fetch() and store a non-None result."""
+        if self._store is not None:
+            try:
+                df = self._store.get(endpoint, params)
+                if df is not None:
+                    return df
+            except Exception as e:
+                print(f"[tushare_provider] cache read error: {e}")
+        df = fetch()
+        if df is not None and self._store is not None:
+            try:
+                self._store.put(endpoint, params, df, last_date=last_date)
+            except Exception as e:
+                print(f"[tushare_provider] cache write error: {e}")
+        return df
+
+    def _cached_window(self, endpoint: str, ts_code: str, start: str, end: str, date_col: str, fetch):
+        """Interval-aware lookup: served locally when cached windows of this code cover [start, end]."""
+        if self._store is not None:
+            try:
+                df = self._store.get_window(endpoint, ts_code, start, end, date_col)
+                if df is not None:
+                    return df
+            except Exception as e:
+                print(f"[tushare_provider] cache read error: {e}")
+        df = fetch()
+        if df is not None and self._store is not None:
+            try:
+                self._store.put_window(endpoint, ts_code, start, end, df)
+            except Exception as e:
+                print(f"[tushare_provider] cache write error: {e}")
+        return df
+
     # -------- STOCK --------
     def daily_for_date(self, date_yyyymmdd: str):
         if date_yyyymmdd in self._cache_daily:
             return self._cache_daily[date_yyyymmdd]
         try:
-            df = self._retry_call(self.pro.daily, trade_date=date_yyyymmdd)
+            df = self._cached("daily", {"trade_date": date_yyyymmdd},
+                              lambda: self._rate_limited(self.pro.daily, family="stock", trade_date=date_yyyymmdd),
+                              last_date=date_yyyymmdd)
             self._cache_daily[date_yyyymmdd] = df
             return df
         except Exception as e:
@@ -72,13 +131,26 @@ class TuShareProvider:
             self._cache_daily[date_yyyymmdd] = None
             return None
 
+    def daily_window(self, ts_code: str, start_yyyymmdd: str, end_yyyymmdd: str):
+        """Fetch a date window of daily bars for a single A-share code (range sync)."""
+        try:
+            return self._cached_window(
+                "daily", ts_code, start_yyyymmdd, end_yyyymmdd, "trade_date",
+                lambda: self._rate_limited(self.pro.daily, family="stock", ts_code=ts_code, start_date=start_yyyymmdd, end_date=end_yyyymmdd),
+            )
+        except Exception as e:
+            print(f"[tushare_provider] daily window error: {e}")
+            return None
+
     # -------- HK STOCK --------
     def hk_daily_for_date(self, date_yyyymmdd: str):
         """Fetch Hong Kong stock daily bars for a trade date using hk_daily(trade_date=...)."""
         if date_yyyymmdd in self._cache_hk_daily:
             return self._cache_hk_daily[date_yyyymmdd]
         try:
-            df = self._retry_call(self.pro.hk_daily, trade_date=date_yyyymmdd)
+            df = self._cached("hk_daily", {"trade_date": date_yyyymmdd},
+                              lambda: self._rate_limited(self.pro.hk_daily, family="hk", trade_date=date_yyyymmdd),
+                              last_date=date_yyyymmdd)
             self._cache_hk_daily[date_yyyymmdd] = df
             return df
         except Exception as e:
@@ -89,8 +161,10 @@ class TuShareProvider:
     def hk_daily_window(self, ts_code: str, start_yyyymmdd: str, end_yyyymmdd: str):
         """Fetch a window for a single HK code and return DataFrame (may be empty)."""
         try:
-            df = self._retry_call(self.pro.hk_daily, ts_code=ts_code, start_date=start_yyyymmdd, end_date=end_yyyymmdd)
-            return df
+            return self._cached_window(
+                "hk_daily", ts_code, start_yyyymmdd, end_yyyymmdd, "trade_date",
+                lambda: self._rate_limited(self.pro.hk_daily, family="hk", ts_code=ts_code, start_date=start_yyyymmdd, end_date=end_yyyymmdd),
+            )
         except Exception as e:
             print(f"[tushare_provider] hk_daily window error: {e}")
             return None
@@ -99,7 +173,11 @@ class TuShareProvider:
         if date_yyyymmdd in self._cache_trade_is_open:
             return self._cache_trade_is_open[date_yyyymmdd]
         try:
-            cal = self._retry_call(self.pro.trade_cal, start_date=date_yyyymmdd, end_date=date_yyyymmdd)
+            cal = self._cached(
+                "trade_cal", {"start_date": date_yyyymmdd, "end_date": date_yyyymmdd},
+                lambda: self._retry_call(self.pro.trade_cal, start_date=date_yyyymmdd, end_date=date_yyyymmdd),
+                last_date=date_yyyymmdd,
+            )
             if cal is None or cal.empty:
                 self._cache_trade_is_open[date_yyyymmdd] = None
                 return None
@@ -119,7 +197,12 @@ class TuShareProvider:
         try:
             end = datetime.strptime(end_yyyymmdd, "%Y%m%d")
             start = end - timedelta(days=lookback_days)
-            cal2 = self._retry_call(self.pro.trade_cal, start_date=start.strftime("%Y%m%d"), end_date=end_yyyymmdd)
+            start_str = start.strftime("%Y%m%d")
+            cal2 = self._cached(
+                "trade_cal", {"start_date": start_str, "end_date": end_yyyymmdd},
+                lambda: self._retry_call(self.pro.trade_cal, start_date=start_str, end_date=end_yyyymmdd),
+                last_date=end_yyyymmdd,
+            )
             if cal2 is None or cal2.empty:
                 self._cache_trade_backfill[key] = None
                 return None
@@ -135,14 +218,36 @@ class TuShareProvider:
             self._cache_trade_backfill[key] = None
             return None
 
+    def trade_cal_frame(self, start_yyyymmdd: str, end_yyyymmdd: str):
+        """Raw trade_cal rows (cal_date, is_open) within [start, end]; None on failure."""
+        try:
+            return self._cached(
+                "trade_cal", {"start_date": start_yyyymmdd, "end_date": end_yyyymmdd},
+                lambda: self._retry_call(self.pro.trade_cal, start_date=start_yyyymmdd, end_date=end_yyyymmdd),
+                last_date=end_yyyymmdd,
+            )
+        except Exception as e:
+            print(f"[tushare_provider] trade_cal range error: {e}")
+            return None
+
+    def trade_cal_open_dates(self, start_yyyymmdd: str, end_yyyymmdd: str) -> list[str] | None:
+        """Return open trading days (YYYYMMDD, ascending) within [start, end]; None on failure."""
+        cal = self.trade_cal_frame(start_yyyymmdd, end_yyyymmdd)
+        if cal is None or cal.empty:
+            return None
+        opened = cal[cal["is_open"].astype(int) == 1]
+        return sorted(str(d) for d in opened["cal_date"])
+
     # -------- ETF (fund_daily) --------
     def fund_daily_window(self, ts_code: str, start_yyyymmdd: str, end_yyyymmdd: str):
         k = (ts_code, start_yyyymmdd, end_yyyymmdd)
         if k in self._cache_fund_daily:
             return self._cache_fund_daily[k]
-        self._rate.tick()
         try:
-            df = self._retry_call(self.pro.fund_daily, ts_code=ts_code, start_date=start_yyyymmdd, end_date=end_yyyymmdd)
+            df = self._cached_window(
+                "fund_daily", ts_code, start_yyyymmdd, end_yyyymmdd, "trade_date",
+                lambda: self._rate_limited(self.pro.fund_daily, ts_code=ts_code, start_date=start_yyyymmdd, end_date=end_yyyymmdd),
+            )
             self._cache_fund_daily[k] = df
             return df
         except Exception as e:
@@ -150,14 +255,26 @@ class TuShareProvider:
             self._cache_fund_daily[k] = None
             return None
 
+    def fund_daily_for_date(self, date_yyyymmdd: str):
+        """Fetch exchange-traded fund bars for all codes on one trade date (market-wide)."""
+        try:
+            return self._cached("fund_daily", {"trade_date": date_yyyymmdd},
+                                lambda: self._rate_limited(self.pro.fund_daily, trade_date=date_yyyymmdd),
+                                last_date=date_yyyymmdd)
+        except Exception as e:
+            print(f"[tushare_provider] fund_daily(trade_date) error: {e}")
+            return None
+
     # -------- FUND (fund_nav) --------
     def fund_nav_window(self, ts_code: str, start_yyyymmdd: str, end_yyyymmdd: str):
         k = (ts_code, start_yyyymmdd, end_yyyymmdd)
         if k in self._cache_fund_nav:
             return self._cache_fund_nav[k]
-        self._rate.tick()
         try:
-            df = self._retry_call(self.pro.fund_nav, ts_code=ts_code, start_date=start_yyyymmdd, end_date=end_yyyymmdd)
+            df = self._cached_window(
+                "fund_nav", ts_code, start_yyyymmdd, end_yyyymmdd, "nav_date",
+                lambda: self._rate_limited(self.pro.fund_nav, ts_code=ts_code, start_date=start_yyyymmdd, end_date=end_yyyymmdd),
+            )
             self._cache_fund_nav[k] = df
             return df
         except Exception as e:
@@ -168,7 +285,8 @@ class TuShareProvider:
     # -------- Basics --------
     def stock_basic_one(self, ts_code: str):
         try:
-            df = self._retry_call(self.pro.stock_basic, ts_code=ts_code)
+            df = self._cached("stock_basic", {"ts_code": ts_code},
+                              lambda: self._retry_call(self.pro.stock_basic, ts_code=ts_code))
             if df is None or df.empty:
                 return None
             r = df.iloc[0]
@@ -179,7 +297,8 @@ class TuShareProvider:
 
     def fund_basic_one(self, ts_code: str):
         try:
-            df = self._retry_call(self.pro.fund_basic, ts_code=ts_code)
+            df = self._cached("fund_basic", {"ts_code": ts_code},
+                              lambda: self._retry_call(self.pro.fund_basic, ts_code=ts_code))
             if df is None or df.empty:
                 return None
             r = df.iloc[0]
@@ -194,9 +313,11 @@ class TuShareProvider:
         k = (ts_code, start_yyyymmdd, end_yyyymmdd)
         if k in self._cache_fund_portfolio:
             return self._cache_fund_portfolio[k]
-        self._rate.tick()
         try:
-            df = self._retry_call(self.pro.fund_portfolio, ts_code=ts_code, start_date=start_yyyymmdd, end_date=end_yyyymmdd)
+            df = self._cached(
+                "fund_portfolio", {"ts_code": ts_code, "start_date": start_yyyymmdd, "end_date": end_yyyymmdd},
+                lambda: self._rate_limited(self.pro.fund_portfolio, ts_code=ts_code, start_date=start_yyyymmdd, end_date=end_yyyymmdd),
+            )
             self._cache_fund_portfolio[k] = df
             return df
         except Exception as e:
@@ -209,9 +330,11 @@ class TuShareProvider:
         k = (ts_code, start_yyyymmdd, end_yyyymmdd)
         if k in self._cache_fund_share:
             return self._cache_fund_share[k]
-        self._rate.tick()
         try:
-            df = self._retry_call(self.pro.fund_share, ts_code=ts_code, start_date=start_yyyymmdd, end_date=end_yyyymmdd)
+            df = self._cached(
+                "fund_share", {"ts_code": ts_code, "start_date": start_yyyymmdd, "end_date": end_yyyymmdd},
+                lambda: self._rate_limited(self.pro.fund_share, ts_code=ts_code, start_date=start_yyyymmdd, end_date=end_yyyymmdd),
+            )
             self._cache_fund_share[k] = df
             return df
         except Exception as e:
@@ -223,9 +346,9 @@ class TuShareProvider:
         """Fetch fund manager information."""
         if ts_code in self._cache_fund_manager:
             return self._cache_fund_manager[ts_code]
-        self._rate.tick()
         try:
-            df = self._retry_call(self.pro.fund_manager, ts_code=ts_code)
+            df = self._cached("fund_manager", {"ts_code": ts_code},
+                              lambda: self._rate_limited(self.pro.fund_manager, ts_code=ts_code))
             self._cache_fund_manager[ts_code] = df
             return df
         except Exception as e:
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from sqlite3 import Connection
+
+
+def upsert_days(conn: Connection, rows: list[tuple[str, int]]) -> int:
+    """批量写入 (cal_date YYYY-MM-DD, is_open)，单事务 executemany"""
+    if not rows:
+        return 0
+    own_txn = not conn.in_transaction
+    if own_txn:
+        conn.execute("BEGIN")
+    try:
+        conn.executemany(
+            "INSERT INTO trade_cal(cal_date, is_open) VALUES(?, ?) "
+            "ON CONFLICT(cal_date) DO UPDATE SET is_open=excluded.is_open",
+            rows,
+        )
+        if own_txn:
+            conn.commit()
+    except Exception:
+        if own_txn:
+            conn.rollback()
+        raise
+    return len(rows)
+
+
+def list_days(conn: Connection):
+    return conn.execute("SELECT cal_date, is_open FROM trade_cal ORDER BY cal_date").fetchall()
+
+
+def loaded_years(conn: Connection) -> set[int]:
+    """已完整加载的年份（至少覆盖 365 个日历日）"""
+    rows = conn.execute(
+        "SELECT substr(cal_date, 1, 4) AS y, COUNT(1) AS n FROM trade_cal GROUP BY y"
+    ).fetchall()
+    return {int(r["y"]) for r in rows if int(r["n"]) >= 365}
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import sqlite3
+from sqlite3 import Connection
+
+
+def bump(conn: Connection, *tables: str):
+    """递增表的数据版本（由调用方控制事务）；尚未执行 m0007 迁移的库上忽略"""
+    if not tables:
+        return
+    placeholders = ",".join(["?"] * len(tables))
+    try:
+        conn.execute(
+            f"UPDATE data_version SET version = version + 1 WHERE table_name IN ({placeholders})", tables
+        )
+    except sqlite3.OperationalError as e:
+        if "no such table" not in str(e):
+            raise
+
+
+def get_versions(conn: Connection) -> dict[str, int] | None:
+    """{表名: 版本号}；库中还没有 data_version 时返回 None（调用方应视为无法判断是否变化）"""
+    try:
+        rows = conn.execute("SELECT table_name, version FROM data_version").fetchall()
+    except sqlite3.OperationalError as e:
+        if "no such table" not in str(e):
+            raise
+        return None
+    return {r[0]: int(r[1]) for r in rows}
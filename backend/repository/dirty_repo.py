@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+"""
+变更集 dirty_set 的读写（表结构见 migrations/m0009_dirty_set.py）
+- record：写入路径登记 {标的: (最早日, 最晚日)}，由调用方控制事务
+- take：消费者按游标取出并清除自己尚未处理的变更（只处理到 until 的部分，之后的保留）
+- high_water / earliest_change_since：只读的缓存校验（不推进游标，多进程下也安全）
+"""
+
+import sqlite3
+from datetime import date, timedelta
+from sqlite3 import Connection
+
+ALL_CODES = "*"          # 登记为全部标的（如整库恢复）
+PRUNE_KEEP_ROWS = 10000  # 所有消费者都已越过的行，再保留这么多供只读校验使用
+_PRUNED = "_pruned"      # dirty_cursor 中记录清理水位的伪消费者
+
+
+def _missing_table(e: sqlite3.OperationalError) -> bool:
+    return "no such table" in str(e)
+
+
+def record(conn: Connection, table: str, changes: dict[str, tuple[str, str]]):
+    """登记 {ts_code: (min_date, max_date)}；尚未执行 m0009 迁移的库上忽略"""
+    if not changes:
+        return
+    try:
+        conn.executemany(
+            "INSERT INTO dirty_set(table_name, ts_code, min_date, max_date) VALUES(?, ?, ?, ?)",
+            [(table, code, lo or "", hi or "") for code, (lo, hi) in changes.items()],
+        )
+    except sqlite3.OperationalError as e:
+        if not _missing_table(e):
+            raise
+
+
+def high_water(conn: Connection) -> int | None:
+    """当前最大 seq（AUTOINCREMENT 单调，不因清理回退）；未迁移的库返回 None"""
+    try:
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name='dirty_set'").fetchone()
+    except sqlite3.OperationalError as e:
+        if not _missing_table(e):
+            raise
+        return None
+    if row is None:
+        # 从未写入过：sqlite_sequence 里还没有这一行；确认表本身存在
+        try:
+            conn.execute("SELECT 1 FROM dirty_set LIMIT 1")
+        except sqlite3.OperationalError as e:
+            if not _missing_table(e):
+                raise
+            return None
+        return 0
+    return int(row[0])
+
+
+def earliest_change_since(conn: Connection, seq: int, tables: tuple[str, ...]) -> str | None:
+    """
+    seq 之后 tables 的最早变动日：'' 表示影响全部日期（或 seq 之后的行已被清理，无法判断），
+    None 表示没有变化
+    """
+    floor = conn.execute("SELECT seq FROM dirty_cursor WHERE consumer=?", (_PRUNED,)).fetchone()
+    if floor is not None and seq < floor[0]:
+        return ""
+    placeholders = ",".join(["?"] * len(tables))
+    row = conn.execute(
+        f"SELECT MIN(min_date) FROM dirty_set WHERE seq > ? AND consumer IS NULL AND table_name IN ({placeholders})",
+        (seq, *tables),
+    ).fetchone()
+    return row[0]
+
+
+def _day_after(date_dash: str) -> str:
+    return (date.fromisoformat(date_dash) + timedelta(days=1)).isoformat()
+
+
+def take(conn: Connection, consumer: str, tables: tuple[str, ...], until: str | None = None) -> dict[str, str] | None:
+    """
+    取出并清除 consumer 尚未处理的变更：{ts_code: 最早变动日}（'' 表示全部日期；
+    登记为 ALL_CODES 的变更展开为全部活跃标的）
+    - until 给定时只取最早变动日不晚于 until 的部分；晚于 until 的变更以本消费者私有的行重新登记，留待之后处理
+    - 返回 None 时调用方应做一次全量处理：consumer 首次使用（尚无游标，此时登记游标）、库未迁移，
+      或 until 早于上次处理到的日期（回算历史，不消费变更）
+    自带写事务（BEGIN IMMEDIATE），多进程下同一变更只会被同一消费者取走一次
+    """
+    own_txn = not conn.in_transaction
+    try:
+        if own_txn:
+            conn.execute("BEGIN IMMEDIATE")
+        cur = conn.execute("SELECT seq, as_of FROM dirty_cursor WHERE consumer=?", (consumer,)).fetchone()
+        hw = high_water(conn) or 0
+        if cur is None or (until is not None and cur[1] is not None and until < cur[1]):
+            if cur is None:
+                conn.execute("INSERT INTO dirty_cursor(consumer, seq, as_of) VALUES(?, ?, ?)", (consumer, hw, until))
+            if own_txn:
+                conn.commit()
+            return None
+        placeholders = ",".join(["?"] * len(tables))
+        rows = conn.execute(
+            f"SELECT table_name, ts_code, min_date, max_date FROM dirty_set "
+            f"WHERE seq > ? AND seq <= ? AND (consumer IS NULL OR consumer = ?) AND table_name IN ({placeholders})",
+            (cur[0], hw, consumer, *tables),
+        ).fetchall()
+        out: dict[str, str] = {}
+        later: dict[tuple[str, str], tuple[str, str]] = {}
+        for table, code, lo, hi in rows:
+            if until is not None and lo > until:
+                rest = (lo, hi)
+            else:
+                if code not in out or lo < out[code]:
+                    out[code] = lo
+                rest = (_day_after(until), hi) if until is not None and hi > until else None
+            if rest is not None:
+                prev = later.get((table, code))
+                later[(table, code)] = rest if prev is None else (min(prev[0], rest[0]), max(prev[1], rest[1]))
+        conn.execute(
+            "UPDATE dirty_cursor SET seq=?, as_of=NULLIF(MAX(COALESCE(as_of, ''), COALESCE(?, '')), '') WHERE consumer=?",
+            (hw, until, consumer),
+        )
+        if later:
+            conn.executemany(
+                "INSERT INTO dirty_set(table_name, ts_code, min_date, max_date, consumer) VALUES(?, ?, ?, ?, ?)",
+                [(table, code, lo, hi, consumer) for (table, code), (lo, hi) in later.items()],
+            )
+        if ALL_CODES in out:
+            everything = out.pop(ALL_CODES)
+            for (code,) in conn.execute("SELECT ts_code FROM instrument WHERE active = 1").fetchall():
+                out[code] = min(out.get(code, everything), everything)
+        _prune(conn, hw)
+        if own_txn:
+            conn.commit()
+    except sqlite3.OperationalError as e:
+        if own_txn and conn.in_transaction:
+            conn.rollback()
+        if _missing_table(e):
+            return None
+        raise
+    except Exception:
+        if own_txn and conn.in_transaction:
+            conn.rollback()
+        raise
+    return out
+
+
+def _prune(conn: Connection, hw: int):
+    """清理所有消费者都已越过、且超出保留行数的旧行，并记录清理水位"""
+    row = conn.execute("SELECT MIN(seq) FROM dirty_cursor WHERE consumer <> ?", (_PRUNED,)).fetchone()
+    upto = min(row[0] if row[0] is not None else hw, hw - PRUNE_KEEP_ROWS)
+    if upto <= 0:
+        return
+    floor = conn.execute("SELECT seq FROM dirty_cursor WHERE consumer=?", (_PRUNED,)).fetchone()
+    if floor is not None and floor[0] >= upto:
+        return
+    conn.execute("DELETE FROM dirty_set WHERE seq <= ?", (upto,))
+    conn.execute(
+        "INSERT INTO dirty_cursor(consumer, seq) VALUES(?, ?) ON CONFLICT(consumer) DO UPDATE SET seq=excluded.seq",
+        (_PRUNED, upto),
+    )
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from sqlite3 import Connection
+
+
+def last_point(conn: Connection, ts_code: str):
+    """该标的最新一段（valid_to 为空）"""
+    return conn.execute(
+        "SELECT valid_from, shares, avg_cost, source FROM position_ledger "
+        "WHERE ts_code=? ORDER BY valid_from DESC LIMIT 1",
+        (ts_code,),
+    ).fetchone()
+
+
+def upsert_point(conn: Connection, ts_code: str, date_dash: str, shares: float, avg_cost: float, source: str):
+    """
+    在末尾追加 / 覆盖一段持仓（date_dash 不早于最新一段的起始日），由调用方控制事务。
+    同一天已有 MANUAL 段时保留其来源：该段记录的是当天收盘后的持仓。
+    """
+    conn.execute(
+        "UPDATE position_ledger SET valid_to=? WHERE ts_code=? AND valid_to IS NULL AND valid_from < ?",
+        (date_dash, ts_code, date_dash),
+    )
+    conn.execute(
+        "INSERT INTO position_ledger(ts_code, valid_from, valid_to, shares, avg_cost, source) "
+        "VALUES(?, ?, NULL, ?, ?, ?) "
+        "ON CONFLICT(ts_code, valid_from) DO UPDATE SET shares=excluded.shares, avg_cost=excluded.avg_cost, "
+        "source=CASE WHEN position_ledger.source='MANUAL' THEN 'MANUAL' ELSE excluded.source END",
+        (ts_code, date_dash, float(shares), float(avg_cost), source),
+    )
+
+
+def replace_code(conn: Connection, ts_code: str, points: list[tuple[str, float, float, str]]) -> int:
+    """用重放结果整体替换该标的的全部分段：points 为 [(date, shares, avg_cost, source)] 升序"""
+    conn.execute("DELETE FROM position_ledger WHERE ts_code=?", (ts_code,))
+    rows = [
+        (ts_code, d, points[k + 1][0] if k + 1 < len(points) else None, float(s), float(c), src)
+        for k, (d, s, c, src) in enumerate(points)
+    ]
+    conn.executemany(
+        "INSERT INTO position_ledger(ts_code, valid_from, valid_to, shares, avg_cost, source) VALUES(?,?,?,?,?,?)",
+        rows,
+    )
+    return len(rows)
+
+
+def manual_points(conn: Connection, ts_code: str) -> dict[str, tuple[float, float]]:
+    rows = conn.execute(
+        "SELECT valid_from, shares, avg_cost FROM position_ledger WHERE ts_code=? AND source='MANUAL'",
+        (ts_code,),
+    ).fetchall()
+    return {r["valid_from"]: (float(r["shares"]), float(r["avg_cost"])) for r in rows}
+
+
+def is_empty(conn: Connection) -> bool:
+    return conn.execute("SELECT 1 FROM position_ledger LIMIT 1").fetchone() is None
+
+
+def points_between_as_of(conn: Connection, ts_codes: list[str], start_date: str, end_date: str):
+    """
+    区间内开始的分段，另附每个标的在 start_date 当日生效的那一段
+
+    Returns:
+        rows: [(ts_code, valid_from, shares, avg_cost), ...]
+    """
+    if not ts_codes:
+        return []
+    placeholders = ",".join(["?"] * len(ts_codes))
+    values = ",".join(["(?)"] * len(ts_codes))
+    return conn.execute(
+        f"""
+        WITH c(ts_code) AS (VALUES {values})
+        SELECT l.ts_code, l.valid_from, l.shares, l.avg_cost
+        FROM c JOIN position_ledger l ON l.ts_code = c.ts_code
+         AND l.valid_from = (SELECT MAX(m.valid_from) FROM position_ledger m
+                              WHERE m.ts_code = c.ts_code AND m.valid_from <= ?)
+        UNION ALL
+        SELECT ts_code, valid_from, shares, avg_cost FROM position_ledger
+        WHERE ts_code IN ({placeholders}) AND valid_from > ? AND valid_from <= ?
+        """,
+        (*ts_codes, start_date, *ts_codes, start_date, end_date),
+    ).fetchall()
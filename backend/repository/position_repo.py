@@ -16,6 +16,14 @@ def upsert_position(conn: Connection, ts_code: str, shares: float, avg_cost: flo
     )
 
 
+def upsert_positions_many(conn: Connection, rows: list[tuple[str, float, float, str]]):
+    """rows: (ts_code, shares, avg_cost, last_update)，语义同 upsert_position"""
+    conn.executemany(
+        "INSERT OR REPLACE INTO position(ts_code, shares, avg_cost, last_update) VALUES(?,?,?,?)",
+        [(c, float(s), float(a), d) for c, s, a, d in rows],
+    )
+
+
 def upsert_position_with_opening(conn: Connection, ts_code: str, shares: float, avg_cost: float, last_update: str, opening_date: str):
     conn.execute(
         "INSERT OR REPLACE INTO position(ts_code, shares, avg_cost, last_update, opening_date) VALUES(?,?,?,?,?)",
@@ -30,6 +38,16 @@ def get_position_full(conn: Connection, ts_code: str):
     ).fetchone()
 
 
+def get_positions_full(conn: Connection, ts_codes: list[str]):
+    if not ts_codes:
+        return []
+    placeholders = ",".join(["?"] * len(ts_codes))
+    return conn.execute(
+        f"SELECT ts_code, shares, avg_cost, last_update, opening_date FROM position WHERE ts_code IN ({placeholders})",
+        ts_codes,
+    ).fetchall()
+
+
 def upsert_opening_position(
     conn: Connection,
     ts_code: str,
@@ -45,7 +63,7 @@ def upsert_opening_position(
 
 
 def list_positions_raw(conn: Connection, include_zero: bool = False, with_price: bool = True, on_date_yyyymmdd: str | None = None):
-    from .price_repo import get_last_close_on_or_before, get_price_change_percentage
+    from .price_repo import get_latest_prices
     from ..services.utils import yyyyMMdd_to_dash
     from datetime import datetime
     
@@ -66,30 +84,22 @@ def list_positions_raw(conn: Connection, include_zero: bool = False, with_price:
     if not with_price:
         return rows
     
-    # Add price data
-    last_date_dash = None
-    if with_price:
-        d = on_date_yyyymmdd or datetime.now().strftime("%Y%m%d")
-        last_date_dash = yyyyMMdd_to_dash(d)
+    # Add price data: one lookup for all positions (price_latest, as-of fallback for past dates)
+    d = on_date_yyyymmdd or datetime.now().strftime("%Y%m%d")
+    latest = get_latest_prices(conn, [r["ts_code"] for r in rows], yyyyMMdd_to_dash(d))
     
     enhanced_rows = []
     for row in rows:
         row_dict = dict(row)
-        
-        if with_price and last_date_dash:
-            # Get latest price
-            last_price_data = get_last_close_on_or_before(conn, row["ts_code"], last_date_dash)
-            if last_price_data:
-                row_dict["last_price"] = float(last_price_data[1])
-                row_dict["last_price_date"] = last_price_data[0]
-                
-                # Calculate price change
-                price_change = get_price_change_percentage(conn, row["ts_code"], last_price_data[0])
-                row_dict["price_change"] = price_change
-            else:
-                row_dict["last_price"] = None
-                row_dict["last_price_date"] = None
-                row_dict["price_change"] = None
+        lp = latest.get(row["ts_code"])
+        if lp:
+            row_dict["last_price"] = float(lp["close"])
+            row_dict["last_price_date"] = lp["trade_date"]
+            row_dict["price_change"] = lp["pct_chg"]
+        else:
+            row_dict["last_price"] = None
+            row_dict["last_price_date"] = None
+            row_dict["price_change"] = None
         
         enhanced_rows.append(row_dict)
     
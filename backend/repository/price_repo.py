@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from sqlite3 import Connection
 
+from . import data_version_repo, dirty_repo
+
 
 def get_last_close_on_or_before(conn: Connection, ts_code: str, date_dash: str) -> tuple[str, float | None]:
     row = conn.execute(
@@ -15,7 +17,43 @@ def get_last_close_on_or_before(conn: Connection, ts_code: str, date_dash: str)
     return row["trade_date"], float(row["close"])  # (YYYY-MM-DD, close)
 
 
-def upsert_price_eod_many(conn: Connection, bars: list[dict]):
+PRICE_EOD_COLUMNS = ("ts_code", "trade_date", "close", "pre_close", "open", "high", "low", "vol", "amount")
+
+
+_CODE_CHUNK = 500
+
+
+def _existing_eod(conn: Connection, rows: list[tuple]) -> dict[tuple[str, str], tuple]:
+    """读出本批键已有的行（按标的分块、日期范围过滤），用于跳过内容未变的写入"""
+    lo, hi = min(r[1] for r in rows), max(r[1] for r in rows)
+    # 全新日期（日常同步、首次回补）区间内没有任何行：走日期索引确认后直接返回
+    if conn.execute("SELECT 1 FROM price_eod WHERE trade_date BETWEEN ? AND ? LIMIT 1", (lo, hi)).fetchone() is None:
+        return {}
+    codes = sorted({r[0] for r in rows})
+    cols = ", ".join(PRICE_EOD_COLUMNS)
+    out: dict[tuple[str, str], tuple] = {}
+    for i in range(0, len(codes), _CODE_CHUNK):
+        chunk = codes[i:i + _CODE_CHUNK]
+        placeholders = ",".join(["?"] * len(chunk))
+        for r in conn.execute(
+            f"SELECT {cols} FROM price_eod WHERE ts_code IN ({placeholders}) AND trade_date BETWEEN ? AND ?",
+            (*chunk, lo, hi),
+        ):
+            out[(r[0], r[1])] = tuple(r)
+    return out
+
+
+def upsert_price_eod_many(conn: Connection, bars: list[dict]) -> int:
+    """
+    批量写入日线数据：一次 executemany，整批在同一个事务内提交；
+    price_latest 在同一事务内随之刷新。
+
+    连接为 autocommit 模式（isolation_level=None），逐条 execute 会让每一行都单独落盘；
+    这里显式开启事务，若调用方已处于事务中则沿用外层事务，由调用方负责提交。
+    与库中现有行逐列比较，只写入新增或有变化的行（重复同步同一区间不产生写入）；
+    price_eod 不挂插入/更新触发器，数据版本递增与变更集登记（每个标的一行）都在这里按批完成，
+    整批没有变化时两者都不发生。返回实际写入的行数。
+    """
     if not bars:
         return 0
     sql = (
@@ -25,30 +63,173 @@ def upsert_price_eod_many(conn: Connection, bars: list[dict]):
         "close=excluded.close, pre_close=excluded.pre_close, open=excluded.open, high=excluded.high, "
         "low=excluded.low, vol=excluded.vol, amount=excluded.amount"
     )
-    n = 0
+    # 同一批内重复的键以最后一条为准（与逐条 upsert 的结果一致）
+    by_key = {}
     for b in bars:
-        conn.execute(
-            sql,
-            (
-                b.get("ts_code"),
-                b.get("trade_date"),
-                b.get("close"),
-                b.get("pre_close"),
-                b.get("open"),
-                b.get("high"),
-                b.get("low"),
-                b.get("vol"),
-                b.get("amount"),
-            ),
+        row = tuple(b.get(c) for c in PRICE_EOD_COLUMNS)
+        by_key[(row[0], row[1])] = row
+    own_txn = not conn.in_transaction
+    if own_txn:
+        conn.execute("BEGIN")
+    try:
+        existing = _existing_eod(conn, list(by_key.values()))
+        rows = [r for k, r in by_key.items() if existing.get(k) != r]
+        if rows:
+            conn.executemany(sql, rows)
+            refresh_price_latest(conn, [dict(zip(PRICE_EOD_COLUMNS, r)) for r in rows])
+            data_version_repo.bump(conn, "price_eod")
+            changed: dict[str, tuple[str, str]] = {}
+            for code, d, *_ in rows:
+                lo, hi = changed.get(code, (d, d))
+                changed[code] = (min(lo, d), max(hi, d))
+            dirty_repo.record(conn, "price_eod", changed)
+        if own_txn:
+            conn.commit()
+    except Exception:
+        if own_txn:
+            conn.rollback()
+        raise
+    return len(rows)
+
+
+# ---------------- price_latest：每个标的最近一根 K 线 ----------------
+
+def _latest_entry(ts_code: str, trade_date: str, close, pre_close, prev_row_close) -> tuple:
+    """涨跌幅口径与 get_price_change_percentage 一致：优先 pre_close，否则取上一根 K 线收盘价"""
+    if pre_close is not None and pre_close > 0:
+        prev = float(pre_close)
+    elif prev_row_close is not None and prev_row_close > 0:
+        prev = float(prev_row_close)
+    else:
+        prev = None
+    pct = ((float(close) - prev) / prev) * 100 if (close is not None and prev) else None
+    return ts_code, trade_date, close, prev, pct
+
+
+_UPSERT_LATEST_SQL = (
+    "INSERT INTO price_latest(ts_code, trade_date, close, prev_close, pct_chg) VALUES(?, ?, ?, ?, ?) "
+    "ON CONFLICT(ts_code) DO UPDATE SET trade_date=excluded.trade_date, close=excluded.close, "
+    "prev_close=excluded.prev_close, pct_chg=excluded.pct_chg"
+)
+
+
+def refresh_price_latest(conn: Connection, bars: list[dict]) -> int:
+    """
+    写入 price_eod 后刷新受影响标的的 price_latest（由调用方控制事务）。
+    每个写入过的标的都重取最近两根 K 线（主键索引倒序，代价很小）：回补最新日之前的缺口同样会改变
+    无 pre_close 标的（如基金）的上一根收盘价与涨跌幅；结果与现有行相同时不写入。
+    """
+    codes = sorted({b.get("ts_code") for b in bars if b.get("ts_code") and b.get("trade_date")})
+    if not codes:
+        return 0
+    placeholders = ",".join(["?"] * len(codes))
+    current = {
+        r[0]: tuple(r) for r in conn.execute(
+            f"SELECT ts_code, trade_date, close, prev_close, pct_chg FROM price_latest WHERE ts_code IN ({placeholders})",
+            codes,
+        ).fetchall()
+    }
+    entries = []
+    for code in codes:
+        top = conn.execute(
+            "SELECT trade_date, close, pre_close FROM price_eod WHERE ts_code=? ORDER BY trade_date DESC LIMIT 2",
+            (code,),
+        ).fetchall()
+        if top:
+            prev_row_close = top[1]["close"] if len(top) > 1 else None
+            entry = _latest_entry(code, top[0]["trade_date"], top[0]["close"], top[0]["pre_close"], prev_row_close)
+            if current.get(code) != entry:
+                entries.append(entry)
+    if entries:
+        conn.executemany(_UPSERT_LATEST_SQL, entries)
+    return len(entries)
+
+
+def rebuild_price_latest(conn: Connection) -> int:
+    """按 price_eod 全量重建 price_latest（回填 / 数据恢复后使用，由调用方控制事务）"""
+    rows = conn.execute(
+        """
+        SELECT ts_code, trade_date, close, pre_close, prev_row_close FROM (
+            SELECT ts_code, trade_date, close, pre_close,
+                   LAG(close) OVER (PARTITION BY ts_code ORDER BY trade_date) AS prev_row_close,
+                   ROW_NUMBER() OVER (PARTITION BY ts_code ORDER BY trade_date DESC) AS rn
+            FROM price_eod
         )
-        n += 1
-    conn.commit()
-    return n
+        WHERE rn = 1
+        """
+    ).fetchall()
+    conn.execute("DELETE FROM price_latest")
+    conn.executemany(_UPSERT_LATEST_SQL, [_latest_entry(*tuple(r)) for r in rows])
+    return len(rows)
+
+
+def get_latest_prices(conn: Connection, ts_codes: list[str], date_dash: str) -> dict[str, dict]:
+    """
+    多个标的在 date_dash 当日或之前的最近价格及涨跌幅
+
+    - price_latest 的最新日不晚于 date_dash（查询“今天”）：直接取用
+    - 其余标的（查询历史日期，或 price_latest 尚无记录）：走 as-of 查询，
+      每个标的一次索引定位 MAX(trade_date)，不再逐行 ORDER BY ... LIMIT 1
+
+    Returns:
+        {ts_code: {"trade_date", "close", "prev_close", "pct_chg"}}；无价格的标的不出现
+    """
+    codes = list(dict.fromkeys(ts_codes))
+    if not codes:
+        return {}
+    placeholders = ",".join(["?"] * len(codes))
+    out: dict[str, dict] = {}
+    for r in conn.execute(
+        f"SELECT ts_code, trade_date, close, prev_close, pct_chg FROM price_latest "
+        f"WHERE trade_date <= ? AND ts_code IN ({placeholders})",
+        (date_dash, *codes),
+    ).fetchall():
+        out[r["ts_code"]] = {k: r[k] for k in ("trade_date", "close", "prev_close", "pct_chg")}
+
+    rest = [c for c in codes if c not in out]
+    if rest:
+        values = ",".join(["(?)"] * len(rest))
+        rows = conn.execute(
+            f"""
+            WITH c(ts_code) AS (VALUES {values}),
+            asof AS (
+                SELECT c.ts_code,
+                       (SELECT MAX(m.trade_date) FROM price_eod m
+                         WHERE m.ts_code = c.ts_code AND m.trade_date <= ?) AS d
+                FROM c
+            )
+            SELECT pe.ts_code, pe.trade_date, pe.close, pe.pre_close,
+                   (SELECT q.close FROM price_eod q
+                     WHERE q.ts_code = pe.ts_code AND q.trade_date < pe.trade_date
+                     ORDER BY q.trade_date DESC LIMIT 1) AS prev_row_close
+            FROM asof JOIN price_eod pe ON pe.ts_code = asof.ts_code AND pe.trade_date = asof.d
+            """,
+            (*rest, date_dash),
+        ).fetchall()
+        for r in rows:
+            code, d, close, prev, pct = _latest_entry(*tuple(r))
+            out[code] = {"trade_date": d, "close": close, "prev_close": prev, "pct_chg": pct}
+    return out
+
+
+def existing_price_keys(conn: Connection, ts_codes: list[str], start_dash: str, end_dash: str) -> set[tuple[str, str]]:
+    """返回区间内已存在的 (ts_code, trade_date) 集合，一次查询覆盖全部标的"""
+    if not ts_codes:
+        return set()
+    placeholders = ",".join(["?"] * len(ts_codes))
+    rows = conn.execute(
+        f"SELECT ts_code, trade_date FROM price_eod "
+        f"WHERE trade_date BETWEEN ? AND ? AND ts_code IN ({placeholders})",
+        (start_dash, end_dash, *ts_codes),
+    ).fetchall()
+    return {(r["ts_code"], r["trade_date"]) for r in rows}
+
 
 def find_missing_price_dates(
     conn,
     lookback_days: int = 7,
-    ts_codes: list[str] = None
+    ts_codes: list[str] = None,
+    dates: list[str] | None = None,
 ) -> dict[str, list[str]]:
     """
     查找过去N天中缺失价格数据的日期
@@ -57,6 +238,7 @@ def find_missing_price_dates(
         conn: 数据库连接
         lookback_days: 向前查找的天数，默认7天
         ts_codes: 可选，指定要检查的标的代码列表。为空时检查所有活跃标的
+        dates: 可选，待检查的日期列表（YYYYMMDD，通常已剔除休市日）；提供时忽略 lookback_days
         
     Returns:
         dict: {date_yyyymmdd: [missing_ts_codes]}
@@ -77,27 +259,27 @@ def find_missing_price_dates(
         return {}
     
     # 生成过去N天的日期列表
-    today = datetime.now()
-    date_list = []
-    for i in range(lookback_days):
-        date_dt = today - timedelta(days=i + 1)  # 从昨天开始
-        date_list.append(date_dt.strftime("%Y%m%d"))
+    if dates is not None:
+        date_list = list(dates)
+    else:
+        today = datetime.now()
+        date_list = []
+        for i in range(lookback_days):
+            date_dt = today - timedelta(days=i + 1)  # 从昨天开始
+            date_list.append(date_dt.strftime("%Y%m%d"))
+    if not date_list:
+        return {}
     
-    missing_by_date = {}
+    # 一次查询取回整个窗口内已有的 (ts_code, trade_date)
+    have = existing_price_keys(
+        conn, all_codes, yyyyMMdd_to_dash(min(date_list)), yyyyMMdd_to_dash(max(date_list))
+    )
     
+    missing_by_date = {}
     for date_yyyymmdd in date_list:
         date_dash = yyyyMMdd_to_dash(date_yyyymmdd)
-        
-        # 检查这一天已有价格数据的标的
-        placeholders = ",".join(["?"] * len(all_codes))
-        have_rows = conn.execute(
-            f"SELECT DISTINCT ts_code FROM price_eod WHERE trade_date=? AND ts_code IN ({placeholders})",
-            (date_dash, *all_codes),
-        ).fetchall()
-        have_codes = {r["ts_code"] for r in have_rows}
-        
         # 找出缺失的标的
-        missing_codes = [code for code in all_codes if code not in have_codes]
+        missing_codes = [code for code in all_codes if (code, date_dash) not in have]
         if missing_codes:
             missing_by_date[date_yyyymmdd] = sorted(missing_codes)
     
@@ -195,6 +377,92 @@ def get_ohlcv_for_signal(
         LIMIT ?
     """, (ts_code, end_date, days)).fetchall()
 
+def get_close_series_many(conn: Connection, ts_codes: list[str], end_date: str) -> dict[str, tuple[list[str], list[float | None]]]:
+    """
+    一次查询取回多个标的截至 end_date 的全部收盘价（按日期正序）
+
+    Returns:
+        dict: {ts_code: ([trade_date, ...], [close, ...])}
+    """
+    out: dict[str, tuple[list[str], list[float | None]]] = {c: ([], []) for c in ts_codes}
+    if not ts_codes:
+        return out
+    placeholders = ",".join(["?"] * len(ts_codes))
+    rows = conn.execute(
+        f"SELECT ts_code, trade_date, close FROM price_eod "
+        f"WHERE trade_date <= ? AND ts_code IN ({placeholders}) ORDER BY ts_code, trade_date",
+        (end_date, *ts_codes),
+    ).fetchall()
+    for r in rows:
+        dates, closes = out[r["ts_code"]]
+        dates.append(r["trade_date"])
+        closes.append(r["close"])
+    return out
+
+
+def get_trailing_closes_many(conn: Connection, end_date: str, n: int, ts_codes: list[str] | None = None):
+    """
+    一次窗口查询取回每个标的截至 end_date 的最近 n 根收盘价
+
+    Args:
+        conn: 数据库连接
+        end_date: 结束日期 (YYYY-MM-DD)
+        n: 每个标的的 K 线根数
+        ts_codes: 可选，指定标的；为空时取全部活跃标的
+
+    Returns:
+        rows: [(ts_code, trade_date, close), ...] 按 ts_code、trade_date 正序
+    """
+    if ts_codes is not None:
+        if not ts_codes:
+            return []
+        placeholders = ",".join(["?"] * len(ts_codes))
+        scope = f"p.ts_code IN ({placeholders})"
+        params: list = [end_date, *ts_codes, n]
+    else:
+        scope = "p.ts_code IN (SELECT ts_code FROM instrument WHERE active = 1)"
+        params = [end_date, n]
+    return conn.execute(
+        f"""
+        SELECT ts_code, trade_date, close FROM (
+            SELECT p.ts_code, p.trade_date, p.close,
+                   ROW_NUMBER() OVER (PARTITION BY p.ts_code ORDER BY p.trade_date DESC) AS rn
+            FROM price_eod p
+            WHERE p.trade_date <= ? AND {scope}
+        )
+        WHERE rn <= ?
+        ORDER BY ts_code, trade_date
+        """,
+        params,
+    ).fetchall()
+
+
+def get_closes_between_as_of(conn: Connection, ts_codes: list[str], start_date: str, end_date: str):
+    """
+    区间内的收盘价，另附每个标的在 start_date 当日或之前的最近一根（作为区间首日的起点）
+
+    Returns:
+        rows: [(ts_code, trade_date, close), ...]
+    """
+    if not ts_codes:
+        return []
+    placeholders = ",".join(["?"] * len(ts_codes))
+    values = ",".join(["(?)"] * len(ts_codes))
+    return conn.execute(
+        f"""
+        WITH c(ts_code) AS (VALUES {values})
+        SELECT pe.ts_code, pe.trade_date, pe.close
+        FROM c JOIN price_eod pe ON pe.ts_code = c.ts_code
+         AND pe.trade_date = (SELECT MAX(m.trade_date) FROM price_eod m
+                               WHERE m.ts_code = c.ts_code AND m.trade_date <= ?)
+        UNION ALL
+        SELECT ts_code, trade_date, close FROM price_eod
+        WHERE ts_code IN ({placeholders}) AND trade_date > ? AND trade_date <= ?
+        """,
+        (*ts_codes, start_date, *ts_codes, start_date, end_date),
+    ).fetchall()
+
+
 def get_price_change_percentage(conn: Connection, ts_code: str, date_dash: str) -> float | None:
     """
     计算指定日期的涨跌幅
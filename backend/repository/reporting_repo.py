@@ -2,24 +2,74 @@ from __future__ import annotations
 
 from sqlite3 import Connection
 
+# 指定日的持仓：需要 `LEFT JOIN position p ON p.ts_code=i.ts_code` 与 HOLDINGS_JOIN（占用一个日期参数）；
+# 台账中没有任何记录的标的回退到 position 当前值
+HOLDINGS_JOIN = """
+        LEFT JOIN position_ledger l ON l.ts_code=i.ts_code
+         AND l.valid_from = (SELECT MAX(m.valid_from) FROM position_ledger m
+                              WHERE m.ts_code=i.ts_code AND m.valid_from<=?)"""
+_IN_LEDGER = "EXISTS (SELECT 1 FROM position_ledger x WHERE x.ts_code=i.ts_code)"
+HOLDING_SHARES_EXPR = f"CASE WHEN {_IN_LEDGER} THEN l.shares ELSE p.shares END"
+HOLDING_AVG_COST_EXPR = f"CASE WHEN {_IN_LEDGER} THEN l.avg_cost ELSE p.avg_cost END"
+
+# 最近收盘价（≤ 指定日）：需要 `LEFT JOIN price_latest pl ON pl.ts_code=i.ts_code`，占用两个日期参数
+LATEST_CLOSE_EXPR = """
+    CASE WHEN pl.trade_date <= ? THEN pl.close
+         ELSE (SELECT pe.close FROM price_eod pe
+                WHERE pe.ts_code=i.ts_code AND pe.trade_date<=?
+                ORDER BY pe.trade_date DESC LIMIT 1)
+    END"""
+
 
 def active_instruments_with_pos_and_price(conn: Connection, date_dash: str):
     """
-    Return rows of active instruments joined with current position and last close on/before date.
-    Columns: ts_code, category_id, shares, avg_cost, eod_close
+    Return rows of active instruments joined with holdings on date and last close on/before date.
+    Columns: ts_code, category_id, name, cat_name, cat_sub, shares, avg_cost, eod_close, has_holding
+    (shares/avg_cost default to 0; has_holding is 0 when the instrument has no holding row at all,
+    cat_name is NULL when the category is missing)
+
+    Holdings come from the position_ledger interval valid on date_dash (instruments without
+    any ledger rows fall back to the current position row). The latest close comes from
+    price_latest via a plain join; only instruments whose latest bar is after date_dash
+    (historical queries) fall back to an as-of lookup on price_eod.
     """
     return conn.execute(
-        """
-        SELECT i.ts_code, i.category_id,
-               IFNULL(p.shares,0) AS shares,
-               IFNULL(p.avg_cost,0) AS avg_cost,
-               (SELECT close FROM price_eod pe
-                  WHERE pe.ts_code=i.ts_code AND pe.trade_date<=?
-                  ORDER BY pe.trade_date DESC LIMIT 1) AS eod_close
+        f"""
+        SELECT i.ts_code, i.category_id, i.name, c.name AS cat_name, c.sub_name AS cat_sub,
+               IFNULL({HOLDING_SHARES_EXPR},0) AS shares,
+               IFNULL({HOLDING_AVG_COST_EXPR},0) AS avg_cost,
+               {LATEST_CLOSE_EXPR} AS eod_close,
+               ({HOLDING_SHARES_EXPR}) IS NOT NULL AS has_holding
         FROM instrument i
+        LEFT JOIN category c ON c.id=i.category_id
         LEFT JOIN position p ON p.ts_code=i.ts_code
+        {HOLDINGS_JOIN}
+        LEFT JOIN price_latest pl ON pl.ts_code=i.ts_code
         WHERE i.active=1
         """,
-        (date_dash,),
+        (date_dash, date_dash, date_dash),
+    ).fetchall()
+
+
+def active_untracked_holdings(conn: Connection):
+    """
+    Active instruments with a positive position row but no position_ledger rows
+    (their current position applies to every date). Columns: ts_code, shares, avg_cost
+    """
+    return conn.execute(
+        """
+        SELECT i.ts_code, p.shares, IFNULL(p.avg_cost,0) AS avg_cost
+        FROM instrument i
+        JOIN position p ON p.ts_code=i.ts_code
+        WHERE i.active=1 AND p.shares > 0
+          AND NOT EXISTS (SELECT 1 FROM position_ledger x WHERE x.ts_code=i.ts_code)
+        ORDER BY i.ts_code
+        """
     ).fetchall()
 
+
+def active_ledger_codes(conn: Connection) -> list[str]:
+    return [r[0] for r in conn.execute(
+        "SELECT DISTINCT l.ts_code FROM position_ledger l JOIN instrument i ON i.ts_code=l.ts_code "
+        "WHERE i.active=1 ORDER BY l.ts_code"
+    ).fetchall()]
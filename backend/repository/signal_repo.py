@@ -9,6 +9,8 @@ import json
 from typing import Any
 from sqlite3 import Connection
 
+from ..domain.trade_calendar import follows_exchange_calendar
+
 def get_signals_by_date(conn: Connection, trade_date: str, signal_type: str | None = None, 
                        ts_code: str | None = None) -> list[dict[str, Any]]:
     """
@@ -246,6 +248,62 @@ def insert_signal(conn: Connection, trade_date: str, ts_code: str | None = None,
     return cursor.lastrowid
 
 
+def insert_instrument_signals_many(conn: Connection, rows: list[tuple[str, str, str, str, str]]) -> int:
+    """
+    批量插入单标的信号（scope_type=INSTRUMENT），一次 executemany 在同一事务内完成
+
+    Args:
+        conn: 数据库连接
+        rows: [(trade_date, ts_code, level, signal_type, message), ...]
+
+    Returns:
+        插入条数
+    """
+    if not rows:
+        return 0
+    sql = """
+    INSERT INTO signal (trade_date, ts_code, category_id, scope_type, scope_data, level, type, message)
+    VALUES (?, ?, NULL, 'INSTRUMENT', ?, ?, ?, ?)
+    """
+    params = [(d, code, json.dumps([code]), level, typ, msg) for d, code, level, typ, msg in rows]
+    own_txn = not conn.in_transaction
+    if own_txn:
+        conn.execute("BEGIN")
+    try:
+        conn.executemany(sql, params)
+        if own_txn:
+            conn.commit()
+    except Exception:
+        if own_txn:
+            conn.rollback()
+        raise
+    return len(params)
+
+
+def last_structure_signal_dates_before(conn: Connection, before_date: str) -> dict[str, str]:
+    """各标的在 before_date 之前最近一次九转买入/卖出信号的日期"""
+    rows = conn.execute(
+        """
+        SELECT ts_code, MAX(trade_date) AS last_date FROM signal
+        WHERE type IN ('BUY_STRUCTURE', 'SELL_STRUCTURE') AND ts_code IS NOT NULL AND trade_date < ?
+        GROUP BY ts_code
+        """,
+        (before_date,),
+    ).fetchall()
+    return {r["ts_code"]: r["last_date"] for r in rows}
+
+
+def delete_structure_signals_since(conn: Connection, since_by_code: dict[str, str]) -> int:
+    """删除各标的自 since_by_code[ts_code]（含）起的九转买入/卖出信号，返回删除条数"""
+    if not since_by_code:
+        return 0
+    cur = conn.executemany(
+        "DELETE FROM signal WHERE ts_code=? AND trade_date>=? AND type IN ('BUY_STRUCTURE', 'SELL_STRUCTURE')",
+        list(since_by_code.items()),
+    )
+    return cur.rowcount
+
+
 def insert_signal_if_not_exists(conn: Connection, trade_date: str, ts_code: str,
                                level: str, signal_type: str, message: str) -> int | None:
     """
@@ -318,20 +376,26 @@ def has_recent_structure_signal(conn: Connection, ts_code: str, check_date: str,
     """
     # 以交易日为基准，取从check_date往前数days_back个交易日的最早日期作为窗口起点
     # 如果过去days_back个交易日内已有结构信号，则返回True
-    # 查出该标的最近days_back个交易日（含当天）
-    trade_days = conn.execute(
-        """
-        SELECT trade_date FROM price_eod
-        WHERE ts_code=? AND trade_date <= ?
-        ORDER BY trade_date DESC
-        LIMIT ?
-        """,
-        (ts_code, check_date, days_back),
-    ).fetchall()
-    if not trade_days:
-        return False
-    # 窗口起点为这些交易日中的最早一个
-    start_date = trade_days[-1][0]
+    # A 股标的且本地交易日历覆盖时直接在内存中定位窗口起点；港股、场外基金等休市日不同，
+    # 与日历未覆盖时一样查出该标的最近days_back个交易日（含当天）
+    start_date = None
+    if days_back > 0 and follows_exchange_calendar(ts_code):
+        from ..services.calendar_svc import get_calendar
+        start_date = get_calendar().n_trading_days_back(check_date, days_back - 1)
+    if start_date is None:
+        trade_days = conn.execute(
+            """
+            SELECT trade_date FROM price_eod
+            WHERE ts_code=? AND trade_date <= ?
+            ORDER BY trade_date DESC
+            LIMIT ?
+            """,
+            (ts_code, check_date, days_back),
+        ).fetchall()
+        if not trade_days:
+            return False
+        # 窗口起点为这些交易日中的最早一个
+        start_date = trade_days[-1][0]
     existing = conn.execute(
         """
         SELECT id FROM signal 
@@ -28,6 +28,42 @@ def update_group_id(conn: Connection, rowid: int, group_id: int) -> None:
     conn.execute("UPDATE txn SET group_id=? WHERE rowid=?", (group_id, rowid))
 
 
+def next_txn_id(conn: Connection) -> int:
+    """下一个可用的 txn.id（AUTOINCREMENT：不复用已删除的 id；须在写事务内调用）"""
+    row = conn.execute(
+        "SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name='txn'), 0), "
+        "COALESCE((SELECT MAX(id) FROM txn), 0)) + 1"
+    ).fetchone()
+    return int(row[0])
+
+
+def insert_txns_many(conn: Connection, rows: list[tuple]) -> None:
+    """rows: (id, ts_code, trade_date, action, shares, price, amount, fee, notes, group_id, realized_pnl)"""
+    conn.executemany(
+        "INSERT INTO txn(id, ts_code, trade_date, action, shares, price, amount, fee, notes, group_id, realized_pnl) "
+        "VALUES(?,?,?,?,?,?,?,?,?,?,?)",
+        rows,
+    )
+
+
+def update_group_ids_many(conn: Connection, pairs: list[tuple[int, int]]) -> None:
+    """pairs: (group_id, id)"""
+    conn.executemany("UPDATE txn SET group_id=? WHERE id=?", pairs)
+
+
+def list_t_candidates(conn: Connection, ts_codes: list[str], start_date: str, end_date: str):
+    """可参与 T+0 配对的 BUY/SELL（未被分组或自成一组），按 id 升序"""
+    if not ts_codes:
+        return []
+    placeholders = ",".join(["?"] * len(ts_codes))
+    return conn.execute(
+        f"SELECT id, ts_code, trade_date, action, shares, group_id FROM txn "
+        f"WHERE ts_code IN ({placeholders}) AND trade_date BETWEEN ? AND ? "
+        "AND action IN ('BUY','SELL') AND (group_id IS NULL OR group_id = id) ORDER BY id ASC",
+        (*ts_codes, start_date, end_date),
+    ).fetchall()
+
+
 def count_all(conn: Connection) -> int:
     return int(conn.execute("SELECT COUNT(1) AS c FROM txn").fetchone()["c"])
 
@@ -57,6 +93,27 @@ def list_txns_for_code_upto(conn: Connection, ts_code: str, date_dash: str):
     ).fetchall()
 
 
+def list_txns_for_codes_upto(conn: Connection, ts_codes: list[str], date_dash: str):
+    """多个标的截至 date_dash 的交易，按 (ts_code, trade_date, rowid) 排序（批量 XIRR 用）"""
+    if not ts_codes:
+        return []
+    placeholders = ",".join(["?"] * len(ts_codes))
+    return conn.execute(
+        "SELECT ts_code, rowid AS id, trade_date, action, shares, price, fee, amount FROM txn "
+        f"WHERE ts_code IN ({placeholders}) AND trade_date<=? ORDER BY ts_code ASC, trade_date ASC, rowid ASC",
+        (*ts_codes, date_dash),
+    ).fetchall()
+
+
+def list_txns_for_code_replay(conn: Connection, ts_code: str):
+    """按时间顺序返回该标的全部交易（持仓台账重放用）"""
+    return conn.execute(
+        "SELECT rowid AS id, trade_date, action, shares, price, fee, amount, notes FROM txn "
+        "WHERE ts_code=? ORDER BY trade_date ASC, rowid ASC",
+        (ts_code,),
+    ).fetchall()
+
+
 def list_txn_codes_distinct(conn: Connection) -> list[str]:
     return [r["ts_code"] for r in conn.execute("SELECT DISTINCT ts_code FROM txn").fetchall()]
 
@@ -3,18 +3,6 @@ from __future__ import annotations
 from sqlite3 import Connection
 
 
-def ensure_schema(conn: Connection):
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS watchlist (
-            ts_code TEXT PRIMARY KEY,
-            note TEXT,
-            created_at TEXT DEFAULT (datetime('now'))
-        )
-        """
-    )
-
-
 def add(conn: Connection, ts_code: str, note: str | None = None):
     conn.execute(
         "INSERT OR IGNORE INTO watchlist(ts_code, note) VALUES(?, ?)",
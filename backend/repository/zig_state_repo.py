@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import json
+from sqlite3 import Connection
+
+
+def get_states(conn: Connection, ts_codes: list[str]) -> dict[str, tuple[dict, dict | None]]:
+    """{ts_code: (state, 上一根 K 线时的 state)}"""
+    if not ts_codes:
+        return {}
+    placeholders = ",".join(["?"] * len(ts_codes))
+    rows = conn.execute(
+        f"SELECT ts_code, state, prev_state FROM zig_state WHERE ts_code IN ({placeholders})",
+        tuple(ts_codes),
+    ).fetchall()
+    return {
+        r["ts_code"]: (json.loads(r["state"]), json.loads(r["prev_state"]) if r["prev_state"] else None)
+        for r in rows
+    }
+
+
+def upsert_states(conn: Connection, rows: list[tuple[str, dict, dict | None]]) -> int:
+    """批量写入 (ts_code, state, prev_state)；由调用方控制事务"""
+    if not rows:
+        return 0
+    conn.executemany(
+        "INSERT INTO zig_state(ts_code, last_date, n, state, prev_state, updated_at) "
+        "VALUES(?, ?, ?, ?, ?, datetime('now')) "
+        "ON CONFLICT(ts_code) DO UPDATE SET last_date=excluded.last_date, n=excluded.n, "
+        "state=excluded.state, prev_state=excluded.prev_state, updated_at=excluded.updated_at",
+        [
+            (code, st["last_date"], st["n"], json.dumps(st, ensure_ascii=False),
+             json.dumps(prev, ensure_ascii=False) if prev else None)
+            for code, st, prev in rows
+        ],
+    )
+    return len(rows)
+
+
+def delete_states(conn: Connection, ts_codes: list[str] | None = None) -> int:
+    if ts_codes is None:
+        return conn.execute("DELETE FROM zig_state").rowcount
+    if not ts_codes:
+        return 0
+    placeholders = ",".join(["?"] * len(ts_codes))
+    return conn.execute(f"DELETE FROM zig_state WHERE ts_code IN ({placeholders})", tuple(ts_codes)).rowcount
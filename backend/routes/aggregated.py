@@ -5,9 +5,10 @@
 from __future__ import annotations
 
 from typing import Optional, List
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel
 
+from ..http_cache import cached_json
 from ..services.aggregator_svc import aggregator_service, DataRequest
 
 router = APIRouter()
@@ -41,27 +42,29 @@ class FlexibleDataRequest(BaseModel):
 
 
 @router.get("/api/aggregated/dashboard")
-def api_dashboard_full(date: str = Query(None, pattern=r"^\d{8}$")):
+def api_dashboard_full(request: Request, date: str = Query(None, pattern=r"^\d{8}$")):
     """
     Dashboard页面完整数据聚合
     包含: dashboard, categories, positions, signals
+    按数据版本缓存，支持 If-None-Match / 304
     """
     try:
-        result = aggregator_service.fetch_dashboard_full(date)
-        return result
+        return cached_json(request, "aggregated/dashboard", {"date": date},
+                           lambda: aggregator_service.fetch_dashboard_full(date))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/api/aggregated/watchlist")
-def api_watchlist_full(date: str = Query(None, pattern=r"^\d{8}$")):
+def api_watchlist_full(request: Request, date: str = Query(None, pattern=r"^\d{8}$")):
     """
     Watchlist页面完整数据聚合
     包含: watchlist, instruments, categories_list, signals_batch
+    按数据版本缓存，支持 If-None-Match / 304
     """
     try:
-        result = aggregator_service.fetch_watchlist_full(date)
-        return result
+        return cached_json(request, "aggregated/watchlist", {"date": date},
+                           lambda: aggregator_service.fetch_watchlist_full(date))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -144,6 +147,7 @@ def api_flexible_data(request: FlexibleDataRequest):
 
 @router.get("/api/aggregated/review")
 def api_review_page(
+    request: Request,
     start: str = Query(..., pattern=r"^\d{8}$"),
     end: str = Query(..., pattern=r"^\d{8}$"),
     ts_codes: Optional[str] = Query(None, description="逗号分隔的标的代码")
@@ -151,108 +155,118 @@ def api_review_page(
     """
     Review页面数据聚合
     包含: dashboard_aggregate, signals, position_series, txn_range等
+    按数据版本缓存，支持 If-None-Match / 304
     """
     try:
-        from ..services.dashboard_svc import aggregate_kpi, get_position_series
-        from ..routes.transactions import api_txn_range
-        from datetime import datetime
-
-        # 格式化日期
-        start_date = f"{start[:4]}-{start[4:6]}-{start[6:8]}"
-        end_date = f"{end[:4]}-{end[4:6]}-{end[6:8]}"
-
-        result = {
-            "_meta": {
-                "start": start,
-                "end": end,
-                "start_date": start_date,
-                "end_date": end_date
-            }
-        }
+        return cached_json(request, "aggregated/review", {"start": start, "end": end, "ts_codes": ts_codes},
+                           lambda: _review_page(start, end, ts_codes))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _review_page(start: str, end: str, ts_codes: Optional[str]) -> dict:
+    """Review 页面数据（不含缓存）；交易范围查询失败时记入 _meta.errors，该结果不进缓存"""
+    from ..services.dashboard_svc import aggregate_kpi, get_position_series
+    from ..routes.transactions import api_txn_range
+    from datetime import datetime
+
+    aggregator_service.sync_data_versions()
 
-        # Dashboard聚合数据
-        result["dashboard_aggregate"] = {
-            "period": "week",
+    # 格式化日期
+    start_date = f"{start[:4]}-{start[4:6]}-{start[6:8]}"
+    end_date = f"{end[:4]}-{end[4:6]}-{end[6:8]}"
+
+    result = {
+        "_meta": {
             "start": start,
             "end": end,
-            "items": aggregate_kpi(start, end, "week")
-        }
-
-        # 信号数据
-        signal_params = {
             "start_date": start_date,
-            "end_date": end_date,
-            "limit": 1000
+            "end_date": end_date
         }
-        if ts_codes:
-            codes_list = [c.strip() for c in ts_codes.split(",") if c.strip()]
-            if codes_list:
-                # 如果指定了标的，获取每个标的的信号
-                result["signals"] = {}
-                for code in codes_list:
-                    params = signal_params.copy()
-                    params["ts_code"] = code
-                    result["signals"][code] = aggregator_service.fetcher.get_signals_data(params)
-        else:
-            result["signals"] = aggregator_service.fetcher.get_signals_data(signal_params)
-
-        # 原始持仓数据
-        result["positions_raw"] = aggregator_service.fetcher.get_positions_raw_data(
-            include_zero=False
-        )
-
-        # 如果指定了标的，获取持仓序列和交易数据
-        if ts_codes:
-            codes = [c.strip() for c in ts_codes.split(",") if c.strip()]
-            if codes:
-                # 持仓序列数据
-                result["position_series"] = {
-                    "items": get_position_series(start, end, codes)
-                }
-
-                # 交易范围数据
-                from ..routes.transactions import api_txn_range
-                import sqlite3
-                from ..db import get_conn
-
-                # 直接查询交易数据而不调用API路由
-                try:
-                    sd = f"{start[0:4]}-{start[4:6]}-{start[6:8]}"
-                    ed = f"{end[0:4]}-{end[4:6]}-{end[6:8]}"
-
-                    base_sql = (
-                        "SELECT t.trade_date AS date, t.ts_code, i.name AS name, t.action, t.shares, t.price, t.amount, t.fee "
-                        "FROM txn t LEFT JOIN instrument i ON i.ts_code = t.ts_code "
-                        "WHERE t.trade_date >= ? AND t.trade_date <= ?"
-                    )
-                    params = [sd, ed]
-
-                    if codes:
-                        placeholders = ",".join(["?"] * len(codes))
-                        base_sql += f" AND t.ts_code IN ({placeholders})"
-                        params.extend(codes)
-                    base_sql += " ORDER BY t.trade_date ASC, t.id ASC"
-
-                    with get_conn() as conn:
-                        rows = conn.execute(base_sql, params).fetchall()
-                        from ..domain.txn_engine import round_price, round_quantity, round_shares, round_amount
-                        items = [
-                            {
-                                "date": r["date"],
-                                "ts_code": r["ts_code"],
-                                "name": r["name"],
-                                "action": r["action"],
-                                "shares": round_shares(float(r["shares"] or 0.0)),
-                                "price": (round_price(float(r["price"])) if r["price"] is not None else None),
-                                "amount": (round_amount(float(r["amount"])) if r["amount"] is not None else None),
-                                "fee": (round_amount(float(r["fee"])) if r["fee"] is not None else None),
-                            }
-                            for r in rows
-                        ]
-                    result["transactions_range"] = {"items": items}
-                except Exception as e:
-                    result["transactions_range"] = {"items": [], "error": str(e)}
+    }
+
+    # Dashboard聚合数据
+    result["dashboard_aggregate"] = {
+        "period": "week",
+        "start": start,
+        "end": end,
+        "items": aggregate_kpi(start, end, "week")
+    }
+
+    # 信号数据
+    signal_params = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "limit": 1000
+    }
+    if ts_codes:
+        codes_list = [c.strip() for c in ts_codes.split(",") if c.strip()]
+        if codes_list:
+            # 如果指定了标的，获取每个标的的信号
+            result["signals"] = {}
+            for code in codes_list:
+                params = signal_params.copy()
+                params["ts_code"] = code
+                result["signals"][code] = aggregator_service.fetcher.get_signals_data(params)
+    else:
+        result["signals"] = aggregator_service.fetcher.get_signals_data(signal_params)
+
+    # 原始持仓数据
+    result["positions_raw"] = aggregator_service.fetcher.get_positions_raw_data(
+        include_zero=False
+    )
+
+    # 如果指定了标的，获取持仓序列和交易数据
+    if ts_codes:
+        codes = [c.strip() for c in ts_codes.split(",") if c.strip()]
+        if codes:
+            # 持仓序列数据
+            result["position_series"] = {
+                "items": get_position_series(start, end, codes)
+            }
 
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+            # 交易范围数据
+            from ..routes.transactions import api_txn_range
+            import sqlite3
+            from ..db import get_conn
+
+            # 直接查询交易数据而不调用API路由
+            try:
+                sd = f"{start[0:4]}-{start[4:6]}-{start[6:8]}"
+                ed = f"{end[0:4]}-{end[4:6]}-{end[6:8]}"
+
+                base_sql = (
+                    "SELECT t.trade_date AS date, t.ts_code, i.name AS name, t.action, t.shares, t.price, t.amount, t.fee "
+                    "FROM txn t LEFT JOIN instrument i ON i.ts_code = t.ts_code "
+                    "WHERE t.trade_date >= ? AND t.trade_date <= ?"
+                )
+                params = [sd, ed]
+
+                if codes:
+                    placeholders = ",".join(["?"] * len(codes))
+                    base_sql += f" AND t.ts_code IN ({placeholders})"
+                    params.extend(codes)
+                base_sql += " ORDER BY t.trade_date ASC, t.id ASC"
+
+                with get_conn() as conn:
+                    rows = conn.execute(base_sql, params).fetchall()
+                    from ..domain.txn_engine import round_price, round_quantity, round_shares, round_amount
+                    items = [
+                        {
+                            "date": r["date"],
+                            "ts_code": r["ts_code"],
+                            "name": r["name"],
+                            "action": r["action"],
+                            "shares": round_shares(float(r["shares"] or 0.0)),
+                            "price": (round_price(float(r["price"])) if r["price"] is not None else None),
+                            "amount": (round_amount(float(r["amount"])) if r["amount"] is not None else None),
+                            "fee": (round_amount(float(r["fee"])) if r["fee"] is not None else None),
+                        }
+                        for r in rows
+                    ]
+                result["transactions_range"] = {"items": items}
+            except Exception as e:
+                result["transactions_range"] = {"items": [], "error": str(e)}
+                result["_meta"]["errors"] = {"transactions_range": str(e)}
+
+    return result
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from fastapi import APIRouter
+from fastapi.responses import Response
 
 router = APIRouter()
 
@@ -12,3 +13,16 @@ def health():
 def version():
     return {"app": "portfolio-ui-api", "version": "0.1.0"}
 
+
+@router.get("/metrics")
+def metrics_endpoint():
+    """Prometheus 文本格式：各路由耗时直方图、SQL 次数/耗时、行情源调用、信号计算、连接池与日志队列"""
+    from .. import metrics
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@router.get("/api/db/pool-stats")
+def db_pool_stats():
+    """进程级 SQLite 连接池统计：新建/复用/归还次数、当前打开与空闲连接数、连接 PRAGMA"""
+    from ..db import pool_stats
+    return pool_stats()
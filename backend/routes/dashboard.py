@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 from typing import Literal
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 import warnings
 
+from ..http_cache import cached_json
 from ..services.dashboard_svc import (
     get_dashboard,
     list_category,
@@ -30,13 +31,16 @@ def api_dashboard(date: str = Query(..., pattern=r"^\d{8}$")):
 
 @router.get("/api/dashboard/aggregate")
 def api_dashboard_aggregate(
+    request: Request,
     start: str = Query(..., pattern=r"^\d{8}$"),
     end: str = Query(..., pattern=r"^\d{8}$"),
     period: Literal["day", "week", "month"] = Query("day"),
 ):
     try:
-        items = aggregate_kpi(start, end, period)
-        return {"period": period, "start": start, "end": end, "items": items}
+        return cached_json(
+            request, "dashboard/aggregate", {"start": start, "end": end, "period": period},
+            lambda: {"period": period, "start": start, "end": end, "items": aggregate_kpi(start, end, period)},
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse
+
+from .. import jobs
+
+router = APIRouter()
+
+
+def run_job(kind: str, params: dict, wait: bool = False, error_prefix: str = ""):
+    """
+    长耗时接口的统一入口：任务入队（相同参数的排队/运行中任务直接复用）
+    - 默认立即返回 202 与任务 id，进度与结果经 GET /api/jobs/{id} 查询，不占用请求线程
+    - wait=True（显式 ?wait=true，兼容旧调用方）：等待任务结束后按原接口返回结果；
+      失败时 500，detail 为 error_prefix + 错误信息
+    """
+    job_id, deduplicated = jobs.submit(kind, params)
+    if not wait:
+        job = jobs.get_job(job_id)
+        return JSONResponse(status_code=202, content={
+            "job_id": job_id,
+            "status": job["status"] if job else "queued",
+            "deduplicated": deduplicated,
+            "status_url": f"/api/jobs/{job_id}",
+        })
+    job = jobs.wait(job_id)
+    if job is None or job["status"] != "succeeded":
+        error = job["error"] if job else "job disappeared"
+        raise HTTPException(status_code=500, detail=f"{error_prefix}{error}")
+    return job["result"]
+
+
+@router.get("/api/jobs")
+def api_jobs(
+    status: str | None = Query(None, pattern="^(queued|running|succeeded|failed)$"),
+    kind: str | None = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+):
+    return {"items": jobs.list_jobs(status=status, kind=kind, limit=limit)}
+
+
+@router.get("/api/jobs/{job_id}")
+def api_job(job_id: int):
+    job = jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 
-from ..logs import search_operation_logs
+from ..logs import get_log_writer, search_operation_logs
 
 router = APIRouter()
 
@@ -15,7 +15,16 @@ def api_logs_search(
     query: str | None = None,
     ts_from: str | None = None,
     ts_to: str | None = None,
+    cursor: str | None = None,
 ):
-    total, items = search_operation_logs(query, action, ts_from, ts_to, page, size)
-    return {"total": total, "items": items}
+    """翻页优先传上一页返回的 next_cursor；total 为近似值"""
+    try:
+        return search_operation_logs(query, action, ts_from, ts_to, page, size, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+
+@router.get("/api/logs/writer-stats")
+def api_logs_writer_stats():
+    """操作日志后台写入器统计：入队/写入/丢弃条数、批次数、队列积压"""
+    return get_log_writer().stats()
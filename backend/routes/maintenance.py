@@ -4,6 +4,7 @@ from fastapi import APIRouter, HTTPException, UploadFile, File
 from fastapi.responses import Response
 
 from ..db import get_conn
+from ..logs import flush_operation_logs
 
 router = APIRouter()
 
@@ -22,6 +23,7 @@ def api_backup():
             "price_eod",
             "ma_cache",
             "position",
+            "position_ledger",
             "signal",
             "watchlist",
             "operation_log",
@@ -35,6 +37,7 @@ def api_backup():
         backup_data["tables"] = {}
         backup_data["summary"] = {}
 
+        flush_operation_logs()  # 备份包含已入队未落库的操作日志
         with get_conn() as conn:
             conn.row_factory = lambda cursor, row: dict(
                 zip([col[0] for col in cursor.description], row)
@@ -84,6 +87,7 @@ async def api_restore(file: UploadFile = File(...)):
             "operation_log",  # Independent table, no foreign keys
             "signal",         # Independent table
             "position",       # Independent table
+            "position_ledger",  # Independent table (rebuilt from txn after restore)
             "ma_cache",       # Independent table
             "price_eod",      # Independent table
             "txn",           # Independent table
@@ -94,6 +98,7 @@ async def api_restore(file: UploadFile = File(...)):
             # portfolio_daily and category_daily removed - no longer maintained
         ]
 
+        flush_operation_logs()  # 先写完队列中的旧日志，避免恢复后再混入
         with get_conn() as conn:
             conn.execute("BEGIN TRANSACTION")
             try:
@@ -128,6 +133,18 @@ async def api_restore(file: UploadFile = File(...)):
                         print(f"Warning: Could not restore table {table_name}: {e}")
                         skipped_tables.append(table_name)
 
+                if {"txn", "position"} & set(restored_tables):
+                    from ..services.position_ledger_svc import rebuild_all as rebuild_ledger
+                    rebuild_ledger(conn)
+
+                if "price_eod" in restored_tables and "price_eod" not in skipped_tables:
+                    from ..repository import data_version_repo, dirty_repo
+                    from ..repository.price_repo import rebuild_price_latest
+                    rebuild_price_latest(conn)
+                    data_version_repo.bump(conn, "price_eod")
+                    # 原始 INSERT 不经过 price_repo：全部标的登记为全量变动，增量重算据此全部重做
+                    dirty_repo.record(conn, "price_eod", {dirty_repo.ALL_CODES: ("", "")})
+
                 conn.commit()
                 
                 # Prepare result message
@@ -2,13 +2,17 @@ from __future__ import annotations
 
 from fastapi import APIRouter, HTTPException, Query, Body
 
+from .. import jobs
+from ..jobs import report_progress
 from ..logs import OperationLogContext
 from ..db import get_conn
-from ..services.pricing_svc import sync_prices_tushare
+from ..services.pricing_svc import sync_prices_tushare, sync_prices_tushare_range
 from ..services.calc_svc import calc
+from ..services.signal_refresh_svc import deferred_signal_refresh
 from ..domain.txn_engine import round_price, round_quantity
 from ..services.config_svc import get_config
 from ..providers.tushare_provider import TuShareProvider
+from .jobs import run_job
 
 router = APIRouter()
 
@@ -20,16 +24,15 @@ class SyncBody:
     days: int | None = None
 
 
-@router.post("/api/sync-prices")
-def api_sync_prices(body: dict = Body(default={})):  # use raw dict for compatibility
+@jobs.register("sync_prices")
+def _sync_prices_job(params: dict) -> dict:
     from datetime import datetime, timedelta
 
-    date = body.get("date")
-    recalc_flag = bool(body.get("recalc", False))
-    ts_codes = body.get("ts_codes")
-    days = body.get("days")
+    end_date = params["date"]
+    recalc_flag = bool(params.get("recalc", False))
+    ts_codes = params.get("ts_codes")
+    days = params.get("days")
 
-    end_date = date or datetime.now().strftime("%Y%m%d")
     dates_to_sync = [end_date]
     if days and days > 1:
         end_dt = datetime.strptime(end_date, "%Y%m%d")
@@ -42,19 +45,31 @@ def api_sync_prices(body: dict = Body(default={})):  # use raw dict for compatib
     all_used_dates = set()
 
     try:
-        for d in dates_to_sync:
-            if ts_codes:
-                res = sync_prices_tushare(d, OperationLogContext(f"SYNC_{d}"), ts_codes)
+        # ZIG / 结构信号在整批同步结束后按标的最早变动日合并刷新一次
+        with deferred_signal_refresh(log, structure=recalc_flag) as refresh:
+            if len(dates_to_sync) > 1:
+                # 多日回补走区间模式：每个标的/交易日只向数据源请求一次
+                start_d, end_d = min(dates_to_sync), max(dates_to_sync)
+                res = sync_prices_tushare_range(start_d, end_d, OperationLogContext(f"SYNC_{start_d}_{end_d}"), ts_codes or None)
+                all_results.append(res)
+                all_used_dates.update(res.get("used_dates_uniq") or [])
             else:
-                res = sync_prices_tushare(d, OperationLogContext(f"SYNC_{d}"))
-            all_results.append(res)
-            used_dates = res.get("used_dates_uniq") or [d]
-            all_used_dates.update(used_dates)
+                for d in dates_to_sync:
+                    if ts_codes:
+                        res = sync_prices_tushare(d, OperationLogContext(f"SYNC_{d}"), ts_codes)
+                    else:
+                        res = sync_prices_tushare(d, OperationLogContext(f"SYNC_{d}"))
+                    all_results.append(res)
+                    used_dates = res.get("used_dates_uniq") or [d]
+                    all_used_dates.update(used_dates)
 
         log.write("OK")
 
-        if recalc_flag:
-            for d in sorted(all_used_dates):
+        if recalc_flag and not refresh.since:
+            # 没有写入任何行情：按原口径对涉及日期逐日重算
+            recalc_dates = sorted(all_used_dates)
+            for i, d in enumerate(recalc_dates):
+                report_progress(i, len(recalc_dates), unit="dates", stage="recalc")
                 calc(d, OperationLogContext("CALC_AFTER_SYNC"))
 
         total_found = sum(r.get("found", 0) for r in all_results)
@@ -78,14 +93,50 @@ def api_sync_prices(body: dict = Body(default={})):  # use raw dict for compatib
         }
         if summary_reason:
             response["reason"] = summary_reason
+        if refresh.since:
+            response["signal_refresh"] = refresh.result
         return response
     except Exception as e:
         log.write("ERROR", str(e))
-        raise HTTPException(status_code=500, detail=f"sync failed: {str(e)}")
+        raise
+
+
+@router.post("/api/sync-prices")
+def api_sync_prices(
+    body: dict = Body(default={}),  # use raw dict for compatibility
+    wait: bool = Query(False, description="true 时等待任务结束并返回结果（默认立即返回任务 id）"),
+):
+    """
+    同步行情：date（默认今天）、days（向前回补天数）、ts_codes、recalc；
+    默认立即返回 202 与任务 id，进度与结果经 GET /api/jobs/{id} 查询；wait=true 时等待并返回同步结果
+    """
+    from datetime import datetime
+
+    params = {
+        "date": body.get("date") or datetime.now().strftime("%Y%m%d"),
+        "recalc": bool(body.get("recalc", False)),
+        "ts_codes": body.get("ts_codes"),
+        "days": body.get("days"),
+    }
+    return run_job("sync_prices", params, wait, error_prefix="sync failed: ")
+
+
+@jobs.register("sync_prices_enhanced")
+def _sync_prices_enhanced_job(params: dict) -> dict:
+    from ..services.pricing_svc import sync_prices_enhanced
+
+    return sync_prices_enhanced(
+        lookback_days=params["lookback_days"],
+        ts_codes=params.get("ts_codes"),
+        recalc=params["recalc"],
+    )
 
 
 @router.post("/api/sync-prices-enhanced")
-def api_sync_prices_enhanced(body: dict = Body(default={})):
+def api_sync_prices_enhanced(
+    body: dict = Body(default={}),
+    wait: bool = Query(False, description="true 时等待任务结束并返回结果（默认立即返回任务 id）"),
+):
     """
     增强的价格同步接口：自动检测并补齐过去几天缺失的价格数据
     
@@ -93,6 +144,9 @@ def api_sync_prices_enhanced(body: dict = Body(default={})):
     - lookback_days: int, 向前检查的天数，默认7天
     - ts_codes: list[str], 可选，指定要同步的标的代码列表
     - recalc: bool, 是否在同步完成后自动重算，默认true
+
+    Query:
+    - wait: true 时等待任务结束并返回下述结果；默认立即返回 202 与 job_id
     
     Response:
     - message: 操作结果描述
@@ -102,41 +156,25 @@ def api_sync_prices_enhanced(body: dict = Body(default={})):
     - details: 详细的同步结果
     - recalc_performed: 是否执行了重算
     """
-    from ..services.pricing_svc import sync_prices_enhanced
-    
     lookback_days = body.get("lookback_days", 7)
     ts_codes = body.get("ts_codes")
     recalc = body.get("recalc", True)
     
-    try:
-        # 验证参数
-        if not isinstance(lookback_days, int) or lookback_days < 1 or lookback_days > 30:
-            raise HTTPException(
-                status_code=400, 
-                detail="lookback_days must be between 1 and 30"
-            )
-        
-        if ts_codes is not None and not isinstance(ts_codes, list):
-            raise HTTPException(
-                status_code=400,
-                detail="ts_codes must be a list of strings"
-            )
-        
-        result = sync_prices_enhanced(
-            lookback_days=lookback_days,
-            ts_codes=ts_codes,
-            recalc=bool(recalc)
+    # 验证参数
+    if not isinstance(lookback_days, int) or lookback_days < 1 or lookback_days > 30:
+        raise HTTPException(
+            status_code=400, 
+            detail="lookback_days must be between 1 and 30"
         )
-        
-        return result
-        
-    except HTTPException:
-        raise
-    except Exception as e:
+    
+    if ts_codes is not None and not isinstance(ts_codes, list):
         raise HTTPException(
-            status_code=500, 
-            detail=f"Enhanced price sync failed: {str(e)}"
+            status_code=400,
+            detail="ts_codes must be a list of strings"
         )
+    
+    params = {"lookback_days": lookback_days, "ts_codes": ts_codes, "recalc": bool(recalc)}
+    return run_job("sync_prices_enhanced", params, wait, error_prefix="Enhanced price sync failed: ")
 
 
 @router.get("/api/missing-prices")
@@ -318,3 +356,30 @@ def api_latest_trading_date():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+
+@router.get("/api/provider/cache-stats")
+def api_provider_cache_stats():
+    """持久化行情缓存的命中/未命中统计（进程内计数）与各接口缓存条目数"""
+    from ..providers.response_cache import get_response_cache
+    try:
+        return get_response_cache().stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/provider/cache-clear")
+def api_provider_cache_clear(body: dict = Body(default={})):
+    """清空持久化行情缓存；可选 endpoint 仅清理指定接口"""
+    from ..providers.response_cache import get_response_cache
+    endpoint = body.get("endpoint")
+    log = OperationLogContext("PROVIDER_CACHE_CLEAR")
+    log.set_payload({"endpoint": endpoint})
+    try:
+        deleted = get_response_cache().clear(endpoint)
+        log.set_after({"deleted": deleted})
+        log.write("OK")
+        return {"message": "ok", "deleted": deleted}
+    except Exception as e:
+        log.write("ERROR", str(e))
+        raise HTTPException(status_code=500, detail=str(e))
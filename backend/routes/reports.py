@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Body, HTTPException
+from fastapi import APIRouter, Body, Query
 from pydantic import BaseModel
+from .. import jobs
 from ..logs import OperationLogContext
 from ..services.calc_svc import calc
+from .jobs import run_job
 
 router = APIRouter()
 
@@ -12,17 +14,22 @@ class DateBody(BaseModel):
     date: str | None = None
 
 
-@router.post("/api/calc")
-def api_calc(body: DateBody):
+@jobs.register("calc")
+def _calc_job(params: dict) -> dict:
     log = OperationLogContext("CALC")
-    log.set_payload(body.model_dump())
+    log.set_payload(params)
     try:
-        calc(body.date, log)
+        calc(params.get("date"), log)
         log.write("OK")
         return {"message": "ok"}
     except Exception as e:
         log.write("ERROR", str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+        raise
+
+
+@router.post("/api/calc")
+def api_calc(body: DateBody, wait: bool = Query(False, description="true 时等待任务结束并返回结果（默认立即返回任务 id）")):
+    return run_job("calc", body.model_dump(), wait)
 
 
 @router.post("/api/report/export")
@@ -3,7 +3,9 @@ from __future__ import annotations
 from fastapi import APIRouter, HTTPException, Query, Body
 from pydantic import BaseModel, Field
 
+from .. import jobs
 from ..services.utils import yyyyMMdd_to_dash
+from .jobs import run_job
 
 router = APIRouter()
 
@@ -132,31 +134,48 @@ def api_zig_signal_validate():
     }
 
 
-@router.post("/api/signal/rebuild-historical")
-def api_rebuild_historical_signals():
+@jobs.register("signal_rebuild_historical")
+def _rebuild_historical_job(params: dict) -> dict:
     from ..services.signal_svc import rebuild_historical_signals
 
-    result = rebuild_historical_signals()
+    result = rebuild_historical_signals(workers=params.get("workers"))
     return {
         "message": "历史信号重建完成",
         "generated_signals": result.get("generated_signals", 0),
         "processed_dates": result.get("processed_dates", 0),
         "date_range": result.get("date_range"),
         "structure": result.get("structure", {}),
+        "per_worker": result.get("structure", {}).get("per_worker"),
     }
 
 
-@router.post("/api/signal/rebuild-zig")
-def api_rebuild_zig_signals():
+@router.post("/api/signal/rebuild-historical")
+def api_rebuild_historical_signals(
+    workers: int | None = Query(None, ge=1, le=32, description="工作进程数，>1 时多进程重建"),
+    wait: bool = Query(False, description="true 时等待任务结束并返回结果（默认立即返回任务 id）"),
+):
+    return run_job("signal_rebuild_historical", {"workers": workers}, wait)
+
+
+@jobs.register("signal_rebuild_zig")
+def _rebuild_zig_job(params: dict) -> dict:
     from ..services.signal_svc import rebuild_zig_signals
 
-    result = rebuild_zig_signals()
+    result = rebuild_zig_signals(workers=params.get("workers"))
     return {
         "message": "ZIG信号重建完成",
         **result,
     }
 
 
+@router.post("/api/signal/rebuild-zig")
+def api_rebuild_zig_signals(
+    workers: int | None = Query(None, ge=1, le=32, description="工作进程数，>1 时多进程重建"),
+    wait: bool = Query(False, description="true 时等待任务结束并返回结果（默认立即返回任务 id）"),
+):
+    return run_job("signal_rebuild_zig", {"workers": workers}, wait)
+
+
 @router.post("/api/signal/create")
 def api_signal_create(signal: SignalCreate):
     from ..services.signal_svc import create_manual_signal_extended
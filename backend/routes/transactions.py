@@ -6,7 +6,7 @@ import warnings
 
 from ..logs import OperationLogContext
 from ..db import get_conn
-from ..services.txn_svc import create_txn, list_txn, get_monthly_pnl_stats
+from ..services.txn_svc import create_txn, bulk_txn, list_txn, get_monthly_pnl_stats
 from ..services.calc_svc import calc
 from ..domain.txn_engine import round_price, round_quantity, round_shares, round_amount
 
@@ -105,23 +105,28 @@ def api_txn_create(body: TxnCreate):
 class BulkTxnReq(BaseModel):
     items: list[TxnCreate]
     recalc: str = "latest"  # none/latest/all
+    mode: str = "per_row"  # per_row: 跳过出错行；atomic: 任一行出错整批不写入
 
 
 @router.post("/api/txn/bulk")
 def api_txn_bulk(body: BulkTxnReq):
     log = OperationLogContext("BULK_TXN")
-    log.set_payload({"count": len(body.items), "recalc": body.recalc})
+    log.set_payload({"count": len(body.items), "recalc": body.recalc, "mode": body.mode})
     try:
-        ok, fail, errs = 0, 0, []
-        date_set = set()
-        for i, t in enumerate(body.items):
-            try:
-                create_txn(t.dict(), log)
-                ok += 1
-                date_set.add(t.date.replace("-", ""))
-            except Exception as e:
-                fail += 1
-                errs.append({"index": i, "ts_code": t.ts_code, "error": str(e)})
+        res = bulk_txn([t.dict() for t in body.items], log, mode=body.mode)
+    except ValueError as e:
+        log.write("ERROR", str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log.write("ERROR", str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+    ok, fail, errs = res["ok"], res["fail"], res["errors"]
+    if body.mode == "atomic" and fail:
+        log.write("ERROR", f"atomic bulk rejected: {fail} invalid rows")
+        raise HTTPException(status_code=400, detail={"message": "rejected", "ok": 0, "fail": fail, "errors": errs})
+    try:
+        failed = {e["index"] for e in errs}
+        date_set = {t.date.replace("-", "") for i, t in enumerate(body.items) if i not in failed}
 
         if body.recalc != "none" and date_set:
             if body.recalc == "latest":
@@ -134,7 +139,6 @@ def api_txn_bulk(body: BulkTxnReq):
                     for d in dates:
                         calc(d, OperationLogContext("CALC_AFTER_TXN_BULK_ALL"))
 
-        log.set_after({"ok": ok, "fail": fail})
         log.write("OK")
         return {"message": "ok", "ok": ok, "fail": fail, "errors": errs}
     except Exception as e:
@@ -22,7 +22,7 @@ from backend.logs import OperationLogContext
 from backend.services.utils import yyyyMMdd_to_dash
 from backend.services.calc_svc import calc
 from backend.services.pricing_svc import sync_prices_tushare
-from backend.services.pricing_orchestrator import sync_prices as orch_sync
+from backend.services.pricing_orchestrator import sync_prices as orch_sync, sync_prices_range as orch_sync_range
 from backend.providers.tushare_provider import TuShareProvider
 from backend.services.config_svc import get_config
 # 如果你的定价/计算服务路径不同，请对应调整 import
@@ -88,6 +88,8 @@ def main():
     parser.add_argument("--sync", help="是否每日先同步 TuShare 价格", action="store_true")
     parser.add_argument("--no-sync", dest="sync", help="不做价格同步（仅用现有 price_eod）", action="store_false")
     parser.set_defaults(sync=True)
+    parser.add_argument("--sync-mode", choices=["range", "daily"], default="range",
+                        help="range=整段区间一次回补（每个标的/交易日只取一次）；daily=逐日同步（旧行为）")
     parser.add_argument("--dry-run", help="只打印计划，不实际执行", action="store_true")
     parser.add_argument("--sleep-ms", type=int, default=100, help="每日日志之间的间隔毫秒（可用于限速）")
     parser.add_argument("--fund-rate-per-min", type=int, default=80, help="TuShare 基金相关接口限流（每分钟最大调用数，0=不限制）")
@@ -103,7 +105,7 @@ def main():
         print(f"[backfill] invalid range: start {start} > end {end}")
         return
 
-    print(f"[backfill] plan: {start} -> {end} (sync={'ON' if args.sync else 'OFF'}, dry_run={args.dry_run})")
+    print(f"[backfill] plan: {start} -> {end} (sync={'ON' if args.sync else 'OFF'}, mode={args.sync_mode}, dry_run={args.dry_run})")
 
     if args.dry_run:
         total_days = sum(1 for _ in yyyymmdd_iter(start, end))
@@ -111,6 +113,10 @@ def main():
         return
 
     from time import sleep
+    from backend.migrations import apply_migrations
+
+    # 与 API 启动时一致：执行未执行的表结构迁移（含派生表 price_latest / position_ledger 回填）
+    apply_migrations()
 
     # 构建可复用 Provider（若配置中有 token 且需要同步）
     provider = None
@@ -182,12 +188,23 @@ def main():
             missing = [c for c in base if c not in have]
             return sorted(set(missing))
 
+    range_synced = False
+    if args.sync and provider is not None and args.sync_mode == "range":
+        try:
+            log_sync = OperationLogContext("BACKFILL_SYNC")
+            res = orch_sync_range(start, end, provider, log_sync, ts_codes=filtered_codes)
+            print(f"[backfill] sync(range) result: found={res.get('found')} updated={res.get('updated')} "
+                  f"skipped={res.get('skipped')} calls={res.get('calls')} plan={res.get('plan')}")
+            range_synced = True
+        except Exception as e:
+            print(f"[backfill] range sync failed, falling back to daily sync: {e}")
+
     total = 0
     for ymd in yyyymmdd_iter(start, end):
         dash_date = yyyyMMdd_to_dash(ymd)
         print(f"[backfill] === {ymd} ({dash_date}) ===")
         try:
-            if args.sync and provider is not None:
+            if args.sync and provider is not None and not range_synced:
                 # Only sync codes that don't already have a row for this date
                 target_codes = codes_need_sync(ymd, base_codes=(filtered_codes or None))
                 if not target_codes:
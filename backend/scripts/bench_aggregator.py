@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+聚合服务板块并行基准：fetch_dashboard_full / fetch_watchlist_full / fetch_transaction_page
+（直接调用服务层，不含 HTTP 序列化）
+- before: 板块逐个执行（线程池只有 1 个工作线程，等价于改造前的串行）
+- after : 默认 SECTION_WORKERS 个工作线程并行
+同时打印各板块耗时（_meta.sections），整页耗时应接近最慢的板块。
+
+只在临时数据库上运行，绝不触碰生产库。
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 允许脚本直接运行
+if __name__ == "__main__" and __package__ is None:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))  # project root
+
+
+def _time(fetch, repeat: int) -> tuple[list[float], dict]:
+    from backend.services.aggregator_svc import aggregator_service
+
+    out, meta = [], {}
+    for _ in range(repeat):
+        aggregator_service.fetcher._cache.clear()  # 聚合器进程内缓存会掩盖板块耗时
+        t0 = time.perf_counter()
+        res = fetch()
+        out.append((time.perf_counter() - t0) * 1000)
+        assert "errors" not in res["_meta"], res["_meta"]
+        meta = res["_meta"]
+    return out, meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="聚合接口：板块串行 vs 并行")
+    parser.add_argument("--instruments", type=int, default=500, help="持仓标的数")
+    parser.add_argument("--days", type=int, default=300, help="每个标的的历史 K 线根数")
+    parser.add_argument("--repeat", type=int, default=10, help="每种场景请求次数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        os.environ["PORT_DB_PATH"] = db_path  # 强制指向临时库
+        from backend.db import get_conn
+        from backend.scripts.bench_dashboard import _seed
+        from backend.services import aggregator_svc
+        from backend.services.aggregator_svc import aggregator_service as svc
+
+        dates = _seed(db_path, args.instruments, args.days)
+        with get_conn() as conn:
+            conn.executemany("INSERT INTO watchlist(ts_code) VALUES(?)",
+                             [(r[0],) for r in conn.execute("SELECT ts_code FROM instrument LIMIT 50").fetchall()])
+        date = dates[-1].replace("-", "")
+        print(f"[bench] === instruments={args.instruments} days={args.days} ===")
+        pages = [("fetch_dashboard_full", lambda: svc.fetch_dashboard_full(date)),
+                 ("fetch_watchlist_full", lambda: svc.fetch_watchlist_full(date)),
+                 ("fetch_transaction_page", lambda: svc.fetch_transaction_page(1, 20))]
+        parallel_pool = aggregator_svc._section_pool
+        for label, fetch in pages:
+            _time(fetch, 1)  # 预热
+            aggregator_svc._section_pool = ThreadPoolExecutor(max_workers=1)
+            before, _ = _time(fetch, args.repeat)
+            aggregator_svc._section_pool = parallel_pool
+            after, meta = _time(fetch, args.repeat)
+            sections = ", ".join(f"{k}={v['ms']:.1f}" for k, v in meta["sections"].items())
+            print(f"[bench] {label}")
+            print(f"[bench]   sections(ms): {sections}")
+            print(f"[bench]   before p50={statistics.median(before):8.1f}ms  after p50={statistics.median(after):8.1f}ms  "
+                  f"x{statistics.median(before) / statistics.median(after):.2f}")
+
+
+if __name__ == "__main__":
+    main()
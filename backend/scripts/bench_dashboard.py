@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/api/aggregated/dashboard 延迟基准（默认 500 个持仓标的）
+- before: price_latest 清空，所有标的都走逐标的 “≤ 日期最近收盘价” 查询（等同改造前的相关子查询）
+- after : price_latest 由 upsert_price_eod_many 维护，查询当日直接 JOIN
+- 另测一次历史日期（as-of 路径）
+
+只在临时数据库上运行，绝不触碰生产库。
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+# 允许脚本直接运行
+if __name__ == "__main__" and __package__ is None:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))  # project root
+
+import numpy as np
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def _seed(db_path: str, instruments: int, days: int, seed: int = 7) -> list[str]:
+    from backend.db import get_conn
+    from backend.repository import price_repo
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript((_PROJECT_ROOT / "schema.sql").read_text(encoding="utf-8"))
+        conn.commit()
+    finally:
+        conn.close()
+
+    rng = np.random.default_rng(seed)
+    dates = []
+    d = np.datetime64("2022-01-03")
+    while len(dates) < days:
+        if np.is_busday(d):
+            dates.append(str(d))
+        d += 1
+    codes = [f"{i:06d}.SZ" for i in range(instruments)]
+    with get_conn() as conn:
+        for k in range(5):
+            conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES(?,?,?)", (f"cat{k}", "", 10))
+        cat_ids = [r[0] for r in conn.execute("SELECT id FROM category").fetchall()]
+        conn.executemany(
+            "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,?,?,1)",
+            [(c, c, "STOCK", cat_ids[i % len(cat_ids)]) for i, c in enumerate(codes)],
+        )
+        conn.executemany(
+            "INSERT INTO position(ts_code, shares, avg_cost, last_update, opening_date) VALUES(?,?,?,?,?)",
+            [(c, 100.0, 10.0, dates[-1], dates[0]) for c in codes],
+        )
+        conn.commit()
+        closes = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (days, instruments)), axis=0))
+        for t, day in enumerate(dates):
+            price_repo.upsert_price_eod_many(conn, [
+                {"ts_code": c, "trade_date": day, "close": round(float(closes[t, i]), 3),
+                 "pre_close": round(float(closes[t - 1, i]), 3) if t else None}
+                for i, c in enumerate(codes)
+            ])
+    return dates
+
+
+def _time_dashboard(client, date_yyyymmdd: str, repeat: int) -> list[float]:
+    from backend.services.aggregator_svc import aggregator_service
+
+    out = []
+    for _ in range(repeat):
+        aggregator_service.fetcher._cache.clear()  # 聚合器进程内缓存会掩盖查询耗时
+        t0 = time.perf_counter()
+        resp = client.get("/api/aggregated/dashboard", params={"date": date_yyyymmdd})
+        out.append((time.perf_counter() - t0) * 1000)
+        assert resp.status_code == 200, resp.text
+    return out
+
+
+def _report(label: str, ms: list[float]):
+    print(f"[bench] {label:<22} p50={statistics.median(ms):8.1f}ms  min={min(ms):8.1f}ms  max={max(ms):8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/aggregated/dashboard 延迟：相关子查询 vs price_latest")
+    parser.add_argument("--instruments", type=int, default=500, help="持仓标的数")
+    parser.add_argument("--days", type=int, default=500, help="每个标的的历史 K 线根数")
+    parser.add_argument("--repeat", type=int, default=10, help="每种场景请求次数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench_dashboard.db")
+        os.environ["PORT_DB_PATH"] = db_path  # 强制指向临时库
+        dates = _seed(db_path, args.instruments, args.days)
+        today = dates[-1].replace("-", "")
+        past = dates[len(dates) // 2].replace("-", "")
+        print(f"[bench] === instruments={args.instruments} bars/instrument={args.days} ===")
+
+        from fastapi.testclient import TestClient
+        from backend.api import app
+        from backend.db import get_conn
+        from backend.repository import price_repo
+
+        with TestClient(app) as client:
+            _time_dashboard(client, today, 1)  # 预热
+
+            with get_conn() as conn:
+                conn.execute("DELETE FROM price_latest")
+            before = _time_dashboard(client, today, args.repeat)
+
+            with get_conn() as conn:
+                conn.execute("BEGIN")
+                price_repo.rebuild_price_latest(conn)
+                conn.commit()
+            after = _time_dashboard(client, today, args.repeat)
+            history = _time_dashboard(client, past, args.repeat)
+
+        _report("before (per-code)", before)
+        _report("after (price_latest)", after)
+        _report("history (as-of)", history)
+        print(f"[bench] speedup x{statistics.median(before) / statistics.median(after):.1f}")
+
+
+if __name__ == "__main__":
+    main()
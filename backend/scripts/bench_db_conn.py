@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库连接开销基准
+- micro: 单次 get_conn() + SELECT 1 的耗时：改造前的 get_conn / 关闭连接池（每次新建连接并执行全部 PRAGMA）/ 连接池
+- request: 一次 /api/aggregated/dashboard 请求借出的连接次数与请求延迟
+
+legacy 模式通过把连接池的空闲上限设为 0、并在每次归还后清空路径缓存来模拟改造前的 get_conn。
+只在临时数据库上运行，绝不触碰生产库。
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+# 允许脚本直接运行
+if __name__ == "__main__" and __package__ is None:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))  # project root
+
+@contextmanager
+def _legacy_mode():
+    from backend import db
+
+    pool = db.get_pool()
+    orig_idle, orig_release = pool.max_idle_per_thread, pool.release
+
+    def release(path, conn):
+        orig_release(path, conn)
+        db.reset_db_path_cache()
+
+    pool.close_all()
+    pool.max_idle_per_thread = 0
+    pool.release = release
+    try:
+        yield
+    finally:
+        pool.max_idle_per_thread = orig_idle
+        pool.release = orig_release
+        pool.close_all()
+
+
+def _micro(n: int) -> float:
+    from backend.db import get_conn
+
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with get_conn() as conn:
+            conn.execute("SELECT 1").fetchone()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def _micro_baseline(n: int) -> float:
+    """改造前的 get_conn：每次重新解析路径 + 新建连接（仅 foreign_keys）+ 关闭"""
+    import sqlite3
+    from backend import db
+
+    t0 = time.perf_counter()
+    for _ in range(n):
+        db.reset_db_path_cache()
+        conn = sqlite3.connect(db.get_db_path(), detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+                               check_same_thread=False, isolation_level=None)
+        try:
+            conn.execute("PRAGMA foreign_keys = ON;")
+            conn.row_factory = sqlite3.Row
+            conn.execute("SELECT 1").fetchone()
+        finally:
+            conn.close()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def _requests(client, date: str, repeat: int) -> tuple[list[float], float]:
+    from backend.db import get_pool
+    from backend.services.aggregator_svc import aggregator_service
+
+    pool = get_pool()
+    ms, checkouts = [], []
+    for _ in range(repeat):
+        aggregator_service.fetcher._cache.clear()  # 聚合器进程内缓存会掩盖查询耗时
+        pool.reset_stats()
+        t0 = time.perf_counter()
+        resp = client.get("/api/aggregated/dashboard", params={"date": date})
+        ms.append((time.perf_counter() - t0) * 1000)
+        assert resp.status_code == 200, resp.text
+        checkouts.append(pool.stats()["checkouts"])
+    return ms, statistics.median(checkouts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="get_conn 连接开销：连接池 vs 每次新建")
+    parser.add_argument("--n", type=int, default=5000, help="micro 基准的 get_conn 次数")
+    parser.add_argument("--repeat", type=int, default=20, help="dashboard 请求次数")
+    parser.add_argument("--instruments", type=int, default=50, help="持仓标的数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench_conn.db")
+        os.environ["PORT_DB_PATH"] = db_path  # 强制指向临时库
+        from backend.scripts.bench_dashboard import _seed
+
+        dates = _seed(db_path, args.instruments, 60)
+
+        from fastapi.testclient import TestClient
+        from backend.api import app
+
+        with TestClient(app) as client:
+            date = dates[-1].replace("-", "")
+            client.get("/api/aggregated/dashboard", params={"date": date})  # 预热
+
+            with _legacy_mode():
+                legacy_us = _micro(args.n)
+                legacy_ms, legacy_checkouts = _requests(client, date, args.repeat)
+            baseline_us = _micro_baseline(args.n)
+            pooled_us = _micro(args.n)
+            pooled_ms, pooled_checkouts = _requests(client, date, args.repeat)
+
+        print(f"[bench] micro   old get_conn={baseline_us:8.1f}us  no-pool+pragmas={legacy_us:8.1f}us  "
+              f"pooled={pooled_us:8.1f}us  x{baseline_us / pooled_us:.1f}")
+        print(f"[bench] request get_conn checkouts per /api/aggregated/dashboard: {legacy_checkouts:.0f}")
+        print(f"[bench] request legacy p50={statistics.median(legacy_ms):7.1f}ms  pooled p50={statistics.median(pooled_ms):7.1f}ms")
+        print(f"[bench] connection overhead per request: legacy≈{legacy_us * legacy_checkouts / 1000:.1f}ms  "
+              f"pooled≈{pooled_us * pooled_checkouts / 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+操作日志搜索基准（默认 20 万条日志）
+- before: LIKE '%q%' 全表扫描 + 同条件 COUNT(1) + OFFSET 翻页（改造前的 search_operation_logs）
+- after : operation_log_fts 全文索引 + (ts, id) keyset 翻页 + 近似/缓存总数
+并校验两种方式返回的首页与深翻页结果一致。
+
+只在临时数据库上运行，绝不触碰生产库。
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import tempfile
+import time
+
+# 允许脚本直接运行
+if __name__ == "__main__" and __package__ is None:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))  # project root
+
+import numpy as np
+
+
+def _seed(db_path: str, n: int):
+    from backend.db import get_conn
+    from backend.logs import _INSERT_SQL
+    from backend.migrations import apply_migrations
+
+    apply_migrations(db_path)
+    rng = np.random.default_rng(11)
+    actions = ["TXN_CREATE", "SYNC_PRICES", "CALC", "POSITION_UPDATE"]
+    recs = []
+    for i in range(n):
+        code = f"{int(rng.integers(0, 3000)):06d}.SZ"
+        recs.append({
+            "ts": f"2024-{1 + i * 12 // n:02d}-01T00:00:{i % 60:02d}.{i:07d}+08:00",
+            "user": "owner", "action": actions[i % len(actions)], "entity_type": None, "entity_id": None,
+            "request_id": str(i), "before_json": None,
+            "after_json": json.dumps({"ts_code": code, "shares": int(rng.integers(1, 1000))}),
+            "payload_json": json.dumps({"ts_code": code, "note": "批量同步"}, ensure_ascii=False),
+            "result": "OK", "err_msg": None, "latency_ms": 1,
+        })
+    with get_conn(db_path) as conn:
+        conn.execute("BEGIN")
+        conn.executemany(_INSERT_SQL, recs)
+        conn.commit()
+
+
+def _legacy(conn, q: str, page: int, size: int):
+    where = " WHERE (payload_json LIKE :q OR before_json LIKE :q OR after_json LIKE :q)"
+    params = {"q": f"%{q}%"}
+    total = conn.execute(f"SELECT COUNT(1) AS cnt FROM operation_log{where}", params).fetchone()["cnt"]
+    rows = conn.execute(f"SELECT * FROM operation_log{where} ORDER BY ts DESC LIMIT :limit OFFSET :offset",
+                        {**params, "limit": size, "offset": (page - 1) * size}).fetchall()
+    return total, [r["id"] for r in rows]
+
+
+def _timed(fn, repeat: int):
+    best, out = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None or dt < best else best
+    return best * 1000, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="操作日志搜索：LIKE+COUNT+OFFSET vs FTS+keyset")
+    parser.add_argument("--n", type=int, default=200_000, help="日志条数")
+    parser.add_argument("--query", default="00123", help="搜索关键字")
+    parser.add_argument("--pages", type=int, default=20, help="深翻页的页数")
+    parser.add_argument("--size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from backend.db import get_conn
+    from backend.logs import search_operation_logs
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        os.environ["PORT_DB_PATH"] = db_path  # 强制指向临时库
+        t0 = time.perf_counter()
+        _seed(db_path, args.n)
+        print(f"[bench] === n={args.n} query={args.query!r} (seed {time.perf_counter() - t0:.1f}s) ===")
+
+        with get_conn(db_path) as conn:
+            ms_before, (total_before, first_before) = _timed(lambda: _legacy(conn, args.query, 1, args.size), args.repeat)
+            ms_deep_before, (_, deep_before) = _timed(
+                lambda: _legacy(conn, args.query, args.pages, args.size), args.repeat)
+
+        ms_after, res = _timed(lambda: search_operation_logs(args.query, None, None, None, 1, args.size), args.repeat)
+
+        def walk():
+            r = search_operation_logs(args.query, None, None, None, 1, args.size)
+            for _ in range(args.pages - 1):
+                if not r["next_cursor"]:
+                    break
+                r = search_operation_logs(args.query, None, None, None, 1, args.size, r["next_cursor"])
+            return r
+
+        ms_walk, deep = _timed(walk, args.repeat)
+        print(f"[bench] first page   before {ms_before:8.2f}ms  after {ms_after:8.2f}ms  (total {total_before} vs {res['total']})")
+        print(f"[bench] page {args.pages:<3}     before {ms_deep_before:8.2f}ms  "
+              f"after {ms_walk / args.pages:8.2f}ms/page (keyset walk of {args.pages} pages)")
+        print(f"[bench] identical first page: {[it['id'] for it in res['items']] == first_before}  "
+              f"identical page {args.pages}: {[it['id'] for it in deep['items']] == deep_before}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+操作日志写入基准：OperationLogContext.write() 在调用方（请求路径）上的耗时
+- before: 逐条借连接、INSERT、COMMIT（改造前的同步写入）
+- after : 入队后立即返回，后台线程攒批单事务写入；另计 flush 到全部落库的总耗时
+
+只在临时数据库上运行，绝不触碰生产库。
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+# 允许脚本直接运行
+if __name__ == "__main__" and __package__ is None:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))  # project root
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def _init_db(db_path: str):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript((_PROJECT_ROOT / "schema.sql").read_text(encoding="utf-8"))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _payload(i: int) -> dict:
+    return {"trade_date": "20240102", "ts_codes": [f"{j:06d}.SZ" for j in range(20)], "i": i}
+
+
+def _sync_write(log, db_path: str):
+    """改造前的 write()：每条日志在请求线程内借连接、INSERT、提交"""
+    from backend import logs
+    from backend.db import get_conn
+
+    rec = {
+        "ts": "2024-01-02T00:00:00+08:00", "user": log.user, "action": log.action, "entity_type": None,
+        "entity_id": None, "request_id": log.request_id, "before_json": None, "after_json": None,
+        "payload_json": logs.json.dumps(log.payload, ensure_ascii=False), "result": "OK", "err_msg": None,
+        "latency_ms": 0,
+    }
+    with get_conn(db_path) as conn:
+        conn.execute(logs._INSERT_SQL, rec)
+        conn.commit()
+
+
+def _p99(xs: list[float]) -> float:
+    return sorted(xs)[int(len(xs) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="操作日志：同步逐条写入 vs 后台批量写入")
+    parser.add_argument("--n", type=int, default=2000, help="日志条数")
+    args = parser.parse_args()
+
+    from backend.logs import OperationLogContext, flush_operation_logs, get_log_writer
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        _init_db(db_path)
+        os.environ["PORT_DB_PATH"] = db_path  # 强制指向临时库
+
+        lat_before = []
+        for i in range(args.n):
+            log = OperationLogContext("BENCH")
+            log.set_payload(_payload(i))
+            t0 = time.perf_counter()
+            _sync_write(log, db_path)
+            lat_before.append((time.perf_counter() - t0) * 1e6)
+
+        lat_after = []
+        t_all = time.perf_counter()
+        for i in range(args.n):
+            log = OperationLogContext("BENCH")
+            log.set_payload(_payload(i))
+            t0 = time.perf_counter()
+            log.write()
+            lat_after.append((time.perf_counter() - t0) * 1e6)
+        flush_operation_logs(timeout=60)
+        total_after = time.perf_counter() - t_all
+
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute("SELECT COUNT(1) FROM operation_log").fetchone()[0]
+        conn.close()
+        stats = get_log_writer().stats()
+        print(f"[bench] === n={args.n} ===")
+        print(f"[bench] before (sync insert+commit)  p50 {statistics.median(lat_before):8.1f}us  p99 {_p99(lat_before):8.1f}us  "
+              f"total {sum(lat_before) / 1000:8.1f}ms")
+        print(f"[bench] after  (enqueue)             p50 {statistics.median(lat_after):8.1f}us  p99 {_p99(lat_after):8.1f}us  "
+              f"total incl. flush {total_after * 1000:8.1f}ms")
+        print(f"[bench] rows={rows} (expected {2 * args.n})  batches={stats['batches']} dropped={stats['dropped']}")
+        get_log_writer().close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+价格入库基准测试（bars/second）
+- before: df.iterrows() 逐行构造 + 每行一次 conn.execute（autocommit，每行一次落盘）
+- after : frame_to_bars 按列转换 + upsert_price_eod_many 单事务 executemany
+- 场景：1 天 / 250 天回补，每天一张全市场 daily 帧（默认 5000 行）
+
+只在临时数据库上运行，绝不触碰生产库。
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+# 允许脚本直接运行
+if __name__ == "__main__" and __package__ is None:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))  # project root
+
+import numpy as np
+import pandas as pd
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def _make_frames(days: int, rows: int, seed: int = 7) -> list[tuple[str, pd.DataFrame]]:
+    rng = np.random.default_rng(seed)
+    codes = [f"{i:06d}.SZ" for i in range(rows)]
+    start = pd.Timestamp("2024-01-02")
+    out = []
+    for k in range(days):
+        ymd = (start + pd.Timedelta(days=k)).strftime("%Y%m%d")
+        close = rng.uniform(2, 200, rows).round(2)
+        df = pd.DataFrame({
+            "ts_code": codes,
+            "trade_date": ymd,
+            "open": close * 0.99,
+            "high": close * 1.01,
+            "low": close * 0.98,
+            "close": close,
+            "pre_close": close * 0.995,
+            "vol": rng.uniform(1e3, 1e6, rows),
+            "amount": rng.uniform(1e4, 1e8, rows),
+        })
+        # 少量缺失值，覆盖 NaN -> NULL 路径
+        df.loc[df.sample(frac=0.01, random_state=k).index, "vol"] = np.nan
+        out.append((ymd, df))
+    return out
+
+
+def _fresh_db(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript((_PROJECT_ROOT / "schema.sql").read_text(encoding="utf-8"))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _legacy_ingest(frames, codes: list[str]) -> int:
+    """复刻改造前的写法，作为对照组。"""
+    from backend.db import get_conn
+    from backend.services.utils import yyyyMMdd_to_dash
+
+    sql = (
+        "INSERT INTO price_eod (ts_code, trade_date, close, pre_close, open, high, low, vol, amount) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(ts_code, trade_date) DO UPDATE SET "
+        "close=excluded.close, pre_close=excluded.pre_close, open=excluded.open, high=excluded.high, "
+        "low=excluded.low, vol=excluded.vol, amount=excluded.amount"
+    )
+    n = 0
+    for ymd, df in frames:
+        df = df[df["ts_code"].isin(codes)]
+        bars = []
+        for _, r in df.iterrows():
+            bars.append({
+                "ts_code": r["ts_code"],
+                "trade_date": yyyyMMdd_to_dash(ymd),
+                "close": float(r["close"]) if r["close"] is not None else None,
+                "pre_close": float(r.get("pre_close")) if "pre_close" in r and r["pre_close"] is not None else None,
+                "open": float(r["open"]) if r["open"] is not None else None,
+                "high": float(r["high"]) if r["high"] is not None else None,
+                "low": float(r["low"]) if r["low"] is not None else None,
+                "vol": float(r["vol"]) if r["vol"] is not None else None,
+                "amount": float(r["amount"]) if r["amount"] is not None else None,
+            })
+        with get_conn() as conn:
+            for b in bars:
+                conn.execute(sql, (b["ts_code"], b["trade_date"], b["close"], b["pre_close"], b["open"],
+                                   b["high"], b["low"], b["vol"], b["amount"]))
+            conn.commit()
+        n += len(bars)
+    return n
+
+
+def _columnar_ingest(frames, codes: list[str]) -> int:
+    from backend.db import get_conn
+    from backend.repository import price_repo
+    from backend.services.pricing_orchestrator import frame_to_bars
+
+    n = 0
+    for ymd, df in frames:
+        bars = frame_to_bars(df, codes=codes, trade_date=ymd)
+        with get_conn() as conn:
+            n += price_repo.upsert_price_eod_many(conn, bars)
+    return n
+
+
+def _run(label: str, fn, frames, codes, db_path: str) -> float:
+    _fresh_db(db_path)
+    t0 = time.perf_counter()
+    n = fn(frames, codes)
+    dt = time.perf_counter() - t0
+    rate = n / dt if dt > 0 else float("inf")
+    print(f"[bench] {label:<10} bars={n:>8}  {dt:8.3f}s  {rate:12.0f} bars/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="price_eod 入库基准：iterrows 逐行 vs 按列 executemany")
+    parser.add_argument("--rows", type=int, default=5000, help="每日全市场行数")
+    parser.add_argument("--codes", type=int, default=0, help="我方关注标的数（0=全部入库）")
+    parser.add_argument("--days", type=int, action="append", help="回补天数，可多次；默认 1 与 250")
+    parser.add_argument("--skip-legacy-over", type=int, default=50,
+                        help="天数超过该值时对照组只跑前 N 天并按比例估算（逐行写入过慢）")
+    args = parser.parse_args()
+
+    day_sets = args.days or [1, 250]
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench_price_ingest.db")
+        os.environ["PORT_DB_PATH"] = db_path  # 强制指向临时库
+
+        for days in day_sets:
+            frames = _make_frames(days, args.rows)
+            codes = list(frames[0][1]["ts_code"])
+            if args.codes and args.codes < len(codes):
+                codes = codes[: args.codes]
+            print(f"[bench] === days={days} rows/day={args.rows} codes={len(codes)} ===")
+            legacy_frames = frames
+            if args.skip_legacy_over and days > args.skip_legacy_over:
+                legacy_frames = frames[: args.skip_legacy_over]
+                print(f"[bench] before: sampled first {len(legacy_frames)} days")
+            before = _run("before", _legacy_ingest, legacy_frames, codes, db_path)
+            after = _run("after", _columnar_ingest, frames, codes, db_path)
+            print(f"[bench] speedup x{after / before:.1f}")
+
+
+if __name__ == "__main__":
+    main()
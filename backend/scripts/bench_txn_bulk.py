@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/api/txn/bulk 导入基准（默认 5000 笔历史交易）
+- before: 逐笔 create_txn（每笔独立连接、PRAGMA、配置读取、T+0 查询、提交）
+- after : bulk_txn（内存重放 + 单事务 executemany）
+并校验两条路径写出的 txn 行与非现金持仓一致。
+
+只在临时数据库上运行，绝不触碰生产库。
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+# 允许脚本直接运行
+if __name__ == "__main__" and __package__ is None:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))  # project root
+
+import numpy as np
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def _init_db(db_path: str, codes: list[str]):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript((_PROJECT_ROOT / "schema.sql").read_text(encoding="utf-8"))
+        cat_id = conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES('bench','',10)").lastrowid
+        conn.executemany(
+            "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,?,?,1)",
+            [(c, c, "STOCK", cat_id) for c in codes] + [("CASH.CNY", "现金", "CASH", cat_id)],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _rows(codes: list[str], n: int, seed: int = 5) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2018-01-02")
+    out = []
+    per_code = max(1, n // len(codes))
+    for c in codes:
+        days = np.sort(rng.integers(0, 2000, per_code))
+        held = 0
+        for d in days:
+            if held >= 200 and rng.random() < 0.4:
+                action, qty = "SELL", 100
+                held -= 100
+            else:
+                action, qty = "BUY", 100
+                held += 100
+            out.append({"ts_code": c, "date": str(start + int(d)), "action": action, "shares": qty,
+                        "price": round(float(rng.uniform(5, 15)), 3), "fee": 1.0})
+    return out[:n]
+
+
+def _dump(db_path: str):
+    conn = sqlite3.connect(db_path)
+    try:
+        txns = conn.execute(
+            "SELECT id, ts_code, trade_date, action, shares, price, group_id, realized_pnl FROM txn ORDER BY id"
+        ).fetchall()
+        pos = conn.execute("SELECT ts_code, shares, avg_cost FROM position WHERE ts_code<>'CASH.CNY' ORDER BY ts_code").fetchall()
+        return txns, pos
+    finally:
+        conn.close()
+
+
+def _run_bulk(db_path: str, codes: list[str], rows: list[dict]) -> tuple[float, dict]:
+    from backend.logs import OperationLogContext
+    from backend.services.txn_svc import bulk_txn
+
+    _init_db(db_path, codes)
+    os.environ["PORT_DB_PATH"] = db_path  # 强制指向临时库
+    t0 = time.perf_counter()
+    res = bulk_txn(rows, OperationLogContext("BENCH"), mode="atomic")
+    return time.perf_counter() - t0, res
+
+
+def main():
+    parser = argparse.ArgumentParser(description="交易批量导入：逐笔 create_txn vs bulk_txn")
+    parser.add_argument("--rows", type=int, default=5000, help="导入交易笔数")
+    parser.add_argument("--codes", type=int, default=50, help="标的数")
+    parser.add_argument("--baseline-rows", type=int, default=500,
+                        help="逐笔路径只跑前 N 笔（逐笔导入历史交易太慢），用于对比速率与结果一致性")
+    args = parser.parse_args()
+
+    from backend.logs import OperationLogContext
+    from backend.services.txn_svc import create_txn
+
+    codes = [f"{i:06d}.SZ" for i in range(args.codes)]
+    rows = sorted(_rows(codes, args.rows), key=lambda r: (r["ts_code"], r["date"]))
+    sample = rows[:args.baseline_rows]
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"[bench] === rows={len(rows)} codes={len(codes)} baseline_rows={len(sample)} ===")
+        db_before = os.path.join(tmp, "before.db")
+        _init_db(db_before, codes)
+        os.environ["PORT_DB_PATH"] = db_before  # 强制指向临时库
+        t0 = time.perf_counter()
+        for r in sample:
+            create_txn(r, OperationLogContext("BENCH"))
+        before = time.perf_counter() - t0
+
+        db_sample = os.path.join(tmp, "sample.db")
+        _run_bulk(db_sample, codes, sample)
+        same = _dump(db_before) == _dump(db_sample)
+
+        after, res = _run_bulk(os.path.join(tmp, "after.db"), codes, rows)
+        before_rate, after_rate = len(sample) / before, len(rows) / after
+        print(f"[bench] before (create_txn x {len(sample)}) {before * 1000:10.1f}ms  ({before_rate:8.0f} rows/s)")
+        print(f"[bench] after  (bulk_txn x {len(rows)})   {after * 1000:10.1f}ms  ({after_rate:8.0f} rows/s)  "
+              f"ok={res['ok']} fail={res['fail']}")
+        print(f"[bench] identical txn/position rows on baseline sample: {same}")
+        print(f"[bench] throughput x{after_rate / before_rate:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+compute_position_xirr_batch 基准（默认 300 个持仓 × 每个 200 笔交易）
+- before: 逐标的 compute_position_xirr（每个标的各自开连接查询 + 纯 Python 牛顿迭代）
+- after : 批量路径（三次查询 + NumPy 并行求解）
+并校验两条路径结果一致。
+
+只在临时数据库上运行，绝不触碰生产库。
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+# 允许脚本直接运行
+if __name__ == "__main__" and __package__ is None:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))  # project root
+
+import numpy as np
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def _seed(db_path: str, positions: int, txns: int, seed: int = 11) -> list[str]:
+    from backend.db import get_conn
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript((_PROJECT_ROOT / "schema.sql").read_text(encoding="utf-8"))
+        conn.commit()
+    finally:
+        conn.close()
+
+    rng = np.random.default_rng(seed)
+    codes = [f"{i:06d}.SZ" for i in range(positions)]
+    start = np.datetime64("2019-01-02")
+    with get_conn() as conn:
+        conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES('bench','',10)")
+        cat_id = conn.execute("SELECT id FROM category").fetchone()[0]
+        conn.executemany(
+            "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,?,?,1)",
+            [(c, c, "STOCK", cat_id) for c in codes],
+        )
+        rows = []
+        for c in codes:
+            days = np.sort(rng.integers(0, 1800, txns))
+            prices = 10 * np.exp(np.cumsum(rng.normal(0, 0.03, txns)))
+            for k in range(txns):
+                action = "SELL" if k % 4 == 3 else ("DIV" if k % 25 == 24 else "BUY")
+                rows.append((c, str(start + int(days[k])), action, 100.0, round(float(prices[k]), 3), 1.0,
+                             5.0 if action == "DIV" else None))
+        conn.executemany(
+            "INSERT INTO txn(ts_code, trade_date, action, shares, price, fee, amount) VALUES(?,?,?,?,?,?,?)",
+            rows,
+        )
+        conn.executemany(
+            "INSERT INTO position(ts_code, shares, avg_cost, last_update) VALUES(?,?,?,?)",
+            [(c, 100.0 * txns / 2, 10.0, str(start + 1800)) for c in codes],
+        )
+        conn.executemany(
+            "INSERT INTO price_eod(ts_code, trade_date, close) VALUES(?,?,?)",
+            [(c, str(start + 1800), round(float(10 * rng.uniform(0.5, 2.0)), 3)) for c in codes],
+        )
+        conn.commit()
+    return codes
+
+
+def _report(label: str, ms: list[float]):
+    print(f"[bench] {label:<22} p50={statistics.median(ms):9.1f}ms  min={min(ms):9.1f}ms  max={max(ms):9.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="持仓 XIRR：逐标的 vs 批量向量化")
+    parser.add_argument("--positions", type=int, default=300, help="持仓标的数")
+    parser.add_argument("--txns", type=int, default=200, help="每个标的的交易笔数")
+    parser.add_argument("--repeat", type=int, default=3, help="每种路径运行次数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench_xirr.db")
+        os.environ["PORT_DB_PATH"] = db_path  # 强制指向临时库
+        codes = _seed(db_path, args.positions, args.txns)
+        date = "20240101"
+        print(f"[bench] === positions={args.positions} txns/position={args.txns} ===")
+
+        from backend.services.analytics_svc import compute_position_xirr, compute_position_xirr_batch
+
+        before, after = [], []
+        single = batch = None
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            single = [compute_position_xirr(c, date) for c in codes]
+            before.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            batch = compute_position_xirr_batch(date)
+            after.append((time.perf_counter() - t0) * 1000)
+
+        mismatch = 0
+        for a, b in zip(single, batch):
+            ra, rb = a["annualized_mwr"], b["annualized_mwr"]
+            if (ra is None) != (rb is None) or (ra is not None and abs(ra - rb) > 1e-9 * max(1.0, abs(ra))):
+                mismatch += 1
+        solved = sum(1 for r in batch if r["annualized_mwr"] is not None)
+
+        _report("before (per-code)", before)
+        _report("after (batched)", after)
+        print(f"[bench] solved={solved}/{len(batch)} mismatches={mismatch}")
+        print(f"[bench] speedup x{statistics.median(before) / statistics.median(after):.1f}")
+
+
+if __name__ == "__main__":
+    main()
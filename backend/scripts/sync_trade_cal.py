@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+加载交易日历到 trade_cal 表（每年一次）
+- 默认加载 去年/今年/明年
+- 优先 TuShare trade_cal，失败或无 token 时回退 --csv（默认 seeds/trade_cal.csv）
+- --export 可将当前 trade_cal 表导出为离线 CSV
+"""
+
+from __future__ import annotations
+import argparse
+from datetime import datetime
+
+# 允许脚本直接运行
+if __name__ == "__main__" and __package__ is None:
+    import os, sys
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # add backend/ to path
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))  # project root
+
+from backend.providers.tushare_provider import TuShareProvider
+from backend.services.calendar_svc import ensure_years, export_csv
+from backend.services.config_svc import get_config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="加载交易日历（trade_cal）")
+    parser.add_argument("--years", type=int, nargs="*", help="要加载的年份，默认 去年/今年/明年")
+    parser.add_argument("--csv", default=None, help="离线日历 CSV（cal_date,is_open）")
+    parser.add_argument("--offline", action="store_true", help="不请求 TuShare，仅使用 CSV")
+    parser.add_argument("--export", default=None, help="导出 trade_cal 表到指定 CSV 路径")
+    args = parser.parse_args()
+
+    y = datetime.now().year
+    years = args.years or [y - 1, y, y + 1]
+
+    provider = None
+    if not args.offline:
+        token = get_config().get("tushare_token")
+        if token:
+            provider = TuShareProvider(token)
+        else:
+            print("[trade_cal] no tushare_token in config; using CSV only")
+
+    loaded = ensure_years(years, provider, csv_path=args.csv)
+    for year in years:
+        info = loaded.get(year)
+        print(f"[trade_cal] {year}: " + (f"loaded {info['days']} days from {info['source']}" if info else "already loaded or unavailable"))
+
+    if args.export:
+        n = export_csv(args.export)
+        print(f"[trade_cal] exported {n} days -> {args.export}")
+
+
+if __name__ == "__main__":
+    main()
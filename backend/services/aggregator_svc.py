@@ -4,10 +4,12 @@
 """
 from __future__ import annotations
 
-from typing import Dict, Any, List, Optional, Set
+from typing import Dict, Any, Callable, List, Optional, Set
 from dataclasses import dataclass
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+import contextvars
 import logging
+import time
 
 from .dashboard_svc import get_dashboard, list_category, list_position, list_signal_all
 from .watchlist_svc import list_watchlist
@@ -16,9 +18,17 @@ from .position_svc import list_positions_raw
 from .instrument_svc import list_instruments
 from .category_svc import list_categories
 from ..db import get_conn
+from ..metrics import span
+from ..repository import data_version_repo
+from .request_context import request_context
 
 logger = logging.getLogger(__name__)
 
+# 板块并行：进程内共享的有界线程池；整页截止时间（秒），超时的板块不进入结果
+SECTION_WORKERS = 6
+SECTION_TIMEOUT = 20.0
+_section_pool = ThreadPoolExecutor(max_workers=SECTION_WORKERS, thread_name_prefix="aggregator")
+
 
 @dataclass
 class DataRequest:
@@ -45,6 +55,13 @@ class DataFetcher:
 
     def __init__(self):
         self._cache: Dict[str, Any] = {}
+        self._versions: Optional[Dict[str, int]] = None
+
+    def sync(self, versions: Optional[Dict[str, int]]):
+        """数据版本与上次不同（或无法判断）时清空缓存"""
+        if versions is None or versions != self._versions:
+            self._cache.clear()
+            self._versions = versions
 
     def get_dashboard_data(self, date: str) -> Dict[str, Any]:
         """获取Dashboard数据"""
@@ -149,56 +166,130 @@ class AggregatorService:
     def __init__(self):
         self.fetcher = DataFetcher()
 
-    def fetch_data(self, request: DataRequest) -> Dict[str, Any]:
-        """根据请求配置获取数据"""
-        result = {}
-
-        # 确保有日期
-        if not request.date:
-            request.date = self.fetcher.get_latest_trading_date().replace("-", "")
-
-        # 根据配置获取数据
+    def sync_data_versions(self):
+        """按 data_version 使 fetcher 的进程内缓存失效；各入口在取数前调用"""
+        with get_conn() as conn:
+            versions = data_version_repo.get_versions(conn)
+        self.fetcher.sync(versions)
+
+    def _sections(self, request: DataRequest) -> Dict[str, Callable[[], Any]]:
+        """按请求配置列出要获取的板块（顺序即结果中的键顺序），彼此独立，可并行"""
+        f = self.fetcher
+        date = request.date
+        sections: Dict[str, Callable[[], Any]] = {}
         if request.include_dashboard:
-            result["dashboard"] = self.fetcher.get_dashboard_data(request.date)
-
+            sections["dashboard"] = lambda: f.get_dashboard_data(date)
         if request.include_categories:
-            result["categories"] = self.fetcher.get_categories_data(request.date)
-
+            sections["categories"] = lambda: f.get_categories_data(date)
         if request.include_positions:
             if request.position_params:
-                result["positions"] = self.fetcher.get_positions_raw_data(**request.position_params)
+                sections["positions"] = lambda: f.get_positions_raw_data(**request.position_params)
             else:
-                result["positions"] = self.fetcher.get_positions_data(request.date)
-
+                sections["positions"] = lambda: f.get_positions_data(date)
         if request.include_signals:
-            params = request.signal_params or {}
-            result["signals"] = self.fetcher.get_signals_data(params)
-
+            sections["signals"] = lambda: f.get_signals_data(request.signal_params or {})
         if request.include_watchlist:
-            result["watchlist"] = self.fetcher.get_watchlist_data(request.date)
-
+            sections["watchlist"] = lambda: f.get_watchlist_data(date)
         if request.include_transactions:
-            params = request.txn_params or {"page": 1, "size": 20}
-            result["transactions"] = self.fetcher.get_transactions_data(**params)
-
+            sections["transactions"] = lambda: f.get_transactions_data(**(request.txn_params or {"page": 1, "size": 20}))
         if request.include_instruments:
-            result["instruments"] = self.fetcher.get_instruments_data()
-
+            sections["instruments"] = f.get_instruments_data
         if request.include_settings:
             # 这里可以后续添加设置相关的数据获取
             from .config_svc import get_config
-            result["settings"] = get_config()
-
+            sections["settings"] = get_config
         if request.include_monthly_stats:
-            result["monthly_stats"] = self.fetcher.get_monthly_stats_data()
+            sections["monthly_stats"] = f.get_monthly_stats_data
+        return sections
+
+    def _run_sections(self, sections: Dict[str, Callable[[], Any]], timeout: float):
+        """
+        并行执行各板块（共享的有界线程池），整页共用 timeout 秒的截止时间
+
+        Returns:
+            (results, timings, errors)：results 只含成功的板块；timings 为 {name: {"ms", "status"}}，
+            status 为 ok / error / timeout；errors 为 {name: 错误信息}
+        """
+        results: Dict[str, Any] = {}
+        timings: Dict[str, Dict[str, Any]] = {}
+        errors: Dict[str, str] = {}
+
+        def run(name: str, fn: Callable[[], Any]):
+            t0 = time.perf_counter()
+            try:
+                with span("aggregator", name):
+                    return True, fn(), time.perf_counter() - t0
+            except Exception as e:
+                return False, str(e), time.perf_counter() - t0
+
+        if len(sections) <= 1:
+            # 单个板块直接在当前线程执行
+            outcomes = {name: run(name, fn) for name, fn in sections.items()}
+        else:
+            # 每个任务复制一份 contextvars（请求级指标等随之进入工作线程）
+            futures = {
+                name: _section_pool.submit(contextvars.copy_context().run, run, name, fn)
+                for name, fn in sections.items()
+            }
+            deadline = time.perf_counter() + timeout
+            outcomes = {}
+            for name, fut in futures.items():
+                try:
+                    outcomes[name] = fut.result(timeout=max(0.0, deadline - time.perf_counter()))
+                except FuturesTimeout:
+                    # 已开始的线程无法中断，结果丢弃；尚未开始的直接取消
+                    fut.cancel()
+                    errors[name] = f"timeout after {timeout:g}s"
+                    timings[name] = {"ms": round(timeout * 1000, 2), "status": "timeout"}
+
+        for name, (ok, value, seconds) in outcomes.items():
+            timings[name] = {"ms": round(seconds * 1000, 2), "status": "ok" if ok else "error"}
+            if ok:
+                results[name] = value
+            else:
+                errors[name] = value
+        for name, msg in errors.items():
+            logger.warning(f"aggregator section {name} failed: {msg}")
+        return results, timings, errors
+
+    def fetch_data(self, request: DataRequest, extra_sections: Optional[Dict[str, Callable[[], Any]]] = None,
+                   timeout: float | None = None) -> Dict[str, Any]:
+        """
+        根据请求配置获取数据：各板块在有界线程池上并行，整页耗时接近最慢的板块而非各板块之和
+
+        Args:
+            request: 数据请求配置
+            extra_sections: 额外板块 {结果键: 无参函数}，与请求中的板块一起并行
+            timeout: 整页截止时间（秒），默认 SECTION_TIMEOUT；超时的板块记为 timeout
+
+        某个板块失败或超时不影响其它板块：结果中不含该键，原因见 _meta.errors，
+        各板块耗时见 _meta.sections
+        """
+        t0 = time.perf_counter()
+        self.sync_data_versions()
+        # 确保有日期
+        if not request.date:
+            request.date = self.fetcher.get_latest_trading_date().replace("-", "")
+
+        sections = self._sections(request)
+        sections.update(extra_sections or {})
+        # 各板块共用一个请求级上下文：持仓 × 最近价、配置、信号计数只算一次，且来自同一读快照
+        with request_context():
+            results, timings, errors = self._run_sections(
+                sections, SECTION_TIMEOUT if timeout is None else timeout
+            )
+        result = {name: results[name] for name in sections if name in results}
 
         # 添加元数据
         result["_meta"] = {
             "date": request.date,
             "latest_trading_date": self.fetcher.get_latest_trading_date(),
-            "data_keys": list(result.keys())
+            "data_keys": list(result.keys()),
+            "sections": timings,
+            "total_ms": round((time.perf_counter() - t0) * 1000, 2),
         }
-
+        if errors:
+            result["_meta"]["errors"] = errors
         return result
 
     def fetch_dashboard_full(self, date: str = None) -> Dict[str, Any]:
@@ -219,24 +310,19 @@ class AggregatorService:
 
     def fetch_watchlist_full(self, date: str = None) -> Dict[str, Any]:
         """获取Watchlist页面完整数据"""
-        # 首先获取监控列表
+        self.sync_data_versions()
+        # 首先获取监控列表（各标的的信号依赖它）
         watchlist_data = self.fetcher.get_watchlist_data(date)
 
-        # 批量获取每个标的的信号数据
-        signals_batch = self._fetch_signals_batch(
-            watchlist_data.get("items", []),
-            date
-        )
-
         request = DataRequest(
             include_watchlist=True,
             include_instruments=True,
             date=date
         )
-        result = self.fetch_data(request)
-        result["signals_batch"] = signals_batch
-
-        return result
+        # 批量获取每个标的的信号数据，与其它板块并行
+        return self.fetch_data(request, extra_sections={
+            "signals_batch": lambda: self._fetch_signals_batch(watchlist_data.get("items", []), date),
+        })
 
     def fetch_transaction_page(self, page: int = 1, size: int = 20) -> Dict[str, Any]:
         """获取Transaction页面完整数据"""
@@ -248,11 +334,10 @@ class AggregatorService:
             txn_params={"page": page, "size": size},
             position_params={"include_zero": True, "with_price": True}
         )
-        result = self.fetch_data(request)
-        result["categories_list"] = self.fetcher.get_categories_list_data()
-        result["positions_raw"] = self.fetcher.get_positions_raw_data(include_zero=True, with_price=True)
-
-        return result
+        return self.fetch_data(request, extra_sections={
+            "categories_list": self.fetcher.get_categories_list_data,
+            "positions_raw": lambda: self.fetcher.get_positions_raw_data(include_zero=True, with_price=True),
+        })
 
     def _get_signal_start_date(self, end_date: str = None) -> str:
         """获取信号查询的开始日期（一个月前）"""
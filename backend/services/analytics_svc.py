@@ -4,6 +4,7 @@ from datetime import datetime, date as dt_date
 from math import isfinite
 
 from ..db import get_conn
+from ..domain.xirr import xirr_many
 from ..repository import txn_repo, position_repo, price_repo
 from .utils import yyyyMMdd_to_dash
 
@@ -15,99 +16,99 @@ def _alog(msg: str):
     # Debug logging disabled for production
     pass
 
-def _xirr(cashflows: list[tuple[str, float]]) -> float | None:
+def _normalize_flows(cashflows: list[tuple[str, float]]) -> list[tuple[str, float]]:
     # 规范日期并过滤非法记录（容错：YYYY-MM-DD / YYYYMMDD）
-    def _to_dash_date(s: str | None) -> str | None:
-        if not s: return None
-        s = str(s).strip()
-        if len(s) == 10 and s[4] == "-" and s[7] == "-": return s
-        if len(s) == 8 and s.isdigit(): return f"{s[0:4]}-{s[4:6]}-{s[6:8]}"
-        try:
-            dt = datetime.fromisoformat(s); return dt.strftime("%Y-%m-%d")
-        except Exception:
-            return None
-
-    if not cashflows:
-        return None
-
     norm: list[tuple[str, float]] = []
-    for d, a in cashflows:
+    for d, a in cashflows or []:
         dd = _to_dash_date(d)
         if dd is not None:
             norm.append((dd, float(a)))
+    return norm
 
-    if len(norm) < 2:
-        return None
 
+def _xirr_many(series: list[list[tuple[str, float]]]) -> list[float | None]:
+    """一次求解多组现金流的 XIRR（NumPy 并行牛顿迭代，不收敛的行用二分兜底）"""
+    norm = [_normalize_flows(cfs) for cfs in series]
     try:
-        dates = [datetime.strptime(d, "%Y-%m-%d").date() for d, _ in norm]
-    except Exception:
-        return None
+        return xirr_many(norm)
+    except ValueError:
+        # 个别非法日期（如 2024-13-01）只让该组返回 None
+        out: list[float | None] = []
+        for cfs in norm:
+            try:
+                out.append(xirr_many([cfs])[0])
+            except ValueError:
+                out.append(None)
+        return out
 
-    t_end: dt_date = max(dates)
-    days = [(t_end - d).days / 365.0 for d in dates]
-    amounts = [a for _, a in norm]
 
-    r = 0.10
-    for _ in range(100):
-        try:
-            f = sum(a * (1 + r) ** t for a, t in zip(amounts, days))
-            df = sum(a * t * (1 + r) ** (t - 1) for a, t in zip(amounts, days))
-        except Exception:
-            return None
-        if abs(df) < 1e-12:
-            break
-        r_new = r - f / df
-        if not isfinite(r_new):
-            return None
-        if r_new < -0.999999:
-            r_new = -0.999999
-        if abs(r_new - r) < 1e-8:
-            return r_new
-        r = r_new
-    # Algorithm did not converge
-    return None
+def _xirr(cashflows: list[tuple[str, float]]) -> float | None:
+    return _xirr_many([cashflows])[0]
 
-def _build_cashflows_for_ts(ts_code: str, date_dash: str) -> tuple[list[tuple[str, float]], str | None, float | None]:
+
+def _assemble_cashflows(txns, pos, last, date_dash: str) -> tuple[list[tuple[str, float]], str | None, float | None]:
+    """
+    由交易流水 + 当前持仓 + 估值日最近收盘价组装现金流（纯函数，单标的/批量共用）
+
+    Args:
+        txns: 按 (trade_date, rowid) 升序的交易行
+        pos: position 行（shares）或 None
+        last: get_latest_prices 的结果项 {trade_date, close} 或 None
+    """
     cfs: list[tuple[str, float]] = []
     used_price_date: str | None = None
     terminal_value: float | None = None
 
+    for t in txns:
+        action = (t["action"] or "").upper()
+        shares = float(t["shares"] or 0.0)
+        price  = None if t["price"] is None else float(t["price"])
+        amount = None if t["amount"] is None else float(t["amount"])
+        fee    = float(t["fee"] or 0.0)
+        d      = t["trade_date"]  # YYYY-MM-DD
+
+        if action == "BUY":
+            gross = amount if amount is not None else (shares * (price or 0.0))
+            cfs.append((d, -(gross + fee)))
+        elif action == "SELL":
+            gross = amount if amount is not None else (shares * (price or 0.0))
+            cfs.append((d, +(gross - fee)))
+        elif action == "DIV":
+            cfs.append((d, +(amount or 0.0)))
+        elif action == "FEE":
+            cfs.append((d, -(fee if fee else (amount or 0.0))))
+        elif action == "ADJ":
+            if amount:
+                cfs.append((d, float(amount)))
+
+    shares_now = float(pos["shares"] or 0.0) if pos else 0.0
+    if shares_now > 0 and last is not None:
+        used_price_date, price = last["trade_date"], last["close"]
+        terminal_value = shares_now * float(price)
+        cfs.append((date_dash, terminal_value))
+    return cfs, used_price_date, terminal_value
+
+
+def _build_cashflows_for_ts(ts_code: str, date_dash: str) -> tuple[list[tuple[str, float]], str | None, float | None]:
     with get_conn() as conn:
         txns = txn_repo.list_txns_for_code_upto(conn, ts_code, date_dash)
+        pos = position_repo.get_position(conn, ts_code)
+        last = None
+        if pos and float(pos["shares"] or 0.0) > 0:
+            last = price_repo.get_latest_prices(conn, [ts_code], date_dash).get(ts_code)
+    return _assemble_cashflows(txns, pos, last, date_dash)
 
-        for t in txns:
-            action = (t["action"] or "").upper()
-            shares = float(t["shares"] or 0.0)
-            price  = None if t["price"] is None else float(t["price"])
-            amount = None if t["amount"] is None else float(t["amount"])
-            fee    = float(t["fee"] or 0.0)
-            d      = t["trade_date"]  # YYYY-MM-DD
-
-            if action == "BUY":
-                gross = amount if amount is not None else (shares * (price or 0.0))
-                cfs.append((d, -(gross + fee)))
-            elif action == "SELL":
-                gross = amount if amount is not None else (shares * (price or 0.0))
-                cfs.append((d, +(gross - fee)))
-            elif action == "DIV":
-                cfs.append((d, +(amount or 0.0)))
-            elif action == "FEE":
-                cfs.append((d, -(fee if fee else (amount or 0.0))))
-            elif action == "ADJ":
-                if amount:
-                    cfs.append((d, float(amount)))
 
-        pos = position_repo.get_position(conn, ts_code)
-        shares_now = float(pos["shares"] or 0.0) if pos else 0.0
-        if shares_now > 0:
-            last = price_repo.get_last_close_on_or_before(conn, ts_code, date_dash)
-            if last is not None:
-                used_price_date, price = last[0], last[1]
-                terminal_value = shares_now * float(price)
-                cfs.append((date_dash, terminal_value))
-        # Build cashflows completed
-    return cfs, used_price_date, terminal_value
+def _irr_result(ts_code: str, d: str, cfs, used_price_date, terminal_value, r: float | None) -> Dict:
+    return {
+        "ts_code": ts_code,
+        "date": d,
+        "annualized_mwr": (float(r) if r is not None else None),
+        "flows": len(cfs),
+        "used_price_date": used_price_date,
+        "terminal_value": terminal_value,
+        "irr_reason": "ok" if r is not None else "no_solution"
+    }
 
 
 def compute_position_xirr(ts_code: str, date_yyyymmdd: str) -> Dict:
@@ -120,125 +121,118 @@ def compute_position_xirr(ts_code: str, date_yyyymmdd: str) -> Dict:
 
     # --- 正常路径：有≥2笔现金流，走 XIRR ---
     if len(cfs) >= 2:
-        try:
-            r = _xirr(cfs)
-            # XIRR computation completed
-            return {
-                "ts_code": ts_code,
-                "date": d,
-                "annualized_mwr": (float(r) if r is not None else None),
-                "flows": len(cfs),
-                "used_price_date": used_price_date,
-                "terminal_value": terminal_value,
-                "irr_reason": "ok" if r is not None else "no_solution"
-            }
-        except Exception:
-            # XIRR computation failed
-            raise
+        return _irr_result(ts_code, d, cfs, used_price_date, terminal_value, _xirr(cfs))
 
     # --- Fallback 路径：无流水/不足两笔，用 建仓→估值 推算年化 ---
     try:
-        from datetime import datetime as _dt
         with get_conn() as conn:
-            # 取 position 的建仓信息
-            prow = conn.execute(
-                "SELECT opening_date, shares, avg_cost, last_update FROM position WHERE ts_code=?",
-                (ts_code,)
-            ).fetchone()
-            if not prow:
-                # No position data for fallback calculation
-                return {
-                    "ts_code": ts_code, "date": d,
-                    "annualized_mwr": None, "flows": len(cfs),
-                    "used_price_date": used_price_date, "terminal_value": terminal_value,
-                    "irr_reason": "no_position"
-                }
+            # 取 position 的建仓信息与最近可用价（≤ 估值日）
+            prow = position_repo.get_position_full(conn, ts_code)
+            pe = price_repo.get_latest_prices(conn, [ts_code], d).get(ts_code) if prow else None
+    except Exception:
+        return {
+            "ts_code": ts_code, "date": d,
+            "annualized_mwr": None, "flows": len(cfs),
+            "used_price_date": used_price_date, "terminal_value": terminal_value,
+            "irr_reason": "fallback_error"
+        }
+    return _fallback_result(ts_code, d, cfs, used_price_date, terminal_value, prow, pe)
 
-            opening_date_raw = prow["opening_date"]
-            opening_date = _to_dash_date(opening_date_raw) if opening_date_raw else None
-            shares_now = float(prow["shares"] or 0.0)
-            avg_cost = float(prow["avg_cost"] or 0.0)
-
-            # 如果没有建仓日期，但有持仓数据，尝试用 last_update 作为近似建仓日期
-            if not opening_date and shares_now > 0 and avg_cost > 0:
-                # 使用 last_update 作为近似建仓日期，但标记为估算
-                last_update_raw = prow["last_update"] if "last_update" in prow.keys() else None
-                if last_update_raw:
-                    # 直接设置，因为我们从DB得到的应该已经是YYYY-MM-DD格式
-                    opening_date = str(last_update_raw).strip() if last_update_raw else None
-                    # 验证格式
-                    if opening_date and len(opening_date) == 10 and opening_date[4] == "-" and opening_date[7] == "-":
-                        fallback_reason = "fallback_last_update"
-                    else:
-                        opening_date = None
-                        fallback_reason = "insufficient_base"
+
+def _fallback_result(ts_code: str, d: str, cfs, used_price_date, terminal_value, prow, pe) -> Dict:
+    """无流水/不足两笔现金流：用 建仓→估值 推算年化（prow: position 行，pe: 估值日最近收盘价）"""
+    try:
+        from datetime import datetime as _dt
+        if not prow:
+            # No position data for fallback calculation
+            return {
+                "ts_code": ts_code, "date": d,
+                "annualized_mwr": None, "flows": len(cfs),
+                "used_price_date": used_price_date, "terminal_value": terminal_value,
+                "irr_reason": "no_position"
+            }
+
+        opening_date_raw = prow["opening_date"]
+        opening_date = _to_dash_date(opening_date_raw) if opening_date_raw else None
+        shares_now = float(prow["shares"] or 0.0)
+        avg_cost = float(prow["avg_cost"] or 0.0)
+
+        # 如果没有建仓日期，但有持仓数据，尝试用 last_update 作为近似建仓日期
+        if not opening_date and shares_now > 0 and avg_cost > 0:
+            # 使用 last_update 作为近似建仓日期，但标记为估算
+            last_update_raw = prow["last_update"] if "last_update" in prow.keys() else None
+            if last_update_raw:
+                # 直接设置，因为我们从DB得到的应该已经是YYYY-MM-DD格式
+                opening_date = str(last_update_raw).strip() if last_update_raw else None
+                # 验证格式
+                if opening_date and len(opening_date) == 10 and opening_date[4] == "-" and opening_date[7] == "-":
+                    fallback_reason = "fallback_last_update"
                 else:
+                    opening_date = None
                     fallback_reason = "insufficient_base"
-            elif opening_date:
-                fallback_reason = "fallback_opening_date"
             else:
                 fallback_reason = "insufficient_base"
-            
-            if not opening_date or shares_now <= 0 or avg_cost <= 0:
-                # Fallback calculation blocked - insufficient data
-                return {
-                    "ts_code": ts_code, "date": d,
-                    "annualized_mwr": None, "flows": len(cfs),
-                    "used_price_date": used_price_date, "terminal_value": terminal_value,
-                    "irr_reason": "insufficient_base"
-                }
+        elif opening_date:
+            fallback_reason = "fallback_opening_date"
+        else:
+            fallback_reason = "insufficient_base"
+        
+        if not opening_date or shares_now <= 0 or avg_cost <= 0:
+            # Fallback calculation blocked - insufficient data
+            return {
+                "ts_code": ts_code, "date": d,
+                "annualized_mwr": None, "flows": len(cfs),
+                "used_price_date": used_price_date, "terminal_value": terminal_value,
+                "irr_reason": "insufficient_base"
+            }
 
-            # 最近可用价（≤ 估值日）
-            pe = conn.execute(
-                "SELECT close, trade_date FROM price_eod WHERE ts_code=? AND trade_date<=? ORDER BY trade_date DESC LIMIT 1",
-                (ts_code, d)
-            ).fetchone()
-            if not pe or pe["close"] is None:
-                # No price data available for fallback calculation
+        # 最近可用价（≤ 估值日）
+        if not pe or pe["close"] is None:
+            # No price data available for fallback calculation
+            return {
+                "ts_code": ts_code, "date": d,
+                "annualized_mwr": None, "flows": len(cfs),
+                "used_price_date": used_price_date, "terminal_value": terminal_value,
+                "irr_reason": "no_price"
+            }
+
+        price = float(pe["close"])
+        used_price_date = pe["trade_date"]  # YYYY-MM-DD
+        terminal_value = shares_now * price
+
+        # 计算年化
+        od = _dt.strptime(opening_date, "%Y-%m-%d").date()
+        vd = _dt.strptime(d, "%Y-%m-%d").date()
+        holding_days = (vd - od).days
+        
+        # 如果持有天数无效，尝试使用最少30天作为基准
+        if holding_days <= 0:
+            if fallback_reason == "fallback_last_update":
+                # 对于使用 last_update 的情况，如果日期无效，使用30天作为最小基准
+                holding_days = 30
+                fallback_reason = "fallback_minimum_period"
+            else:
+                # Invalid holding period for fallback calculation
                 return {
                     "ts_code": ts_code, "date": d,
                     "annualized_mwr": None, "flows": len(cfs),
                     "used_price_date": used_price_date, "terminal_value": terminal_value,
-                    "irr_reason": "no_price"
+                    "irr_reason": "invalid_holding_days"
                 }
 
-            price = float(pe["close"])
-            used_price_date = pe["trade_date"]  # YYYY-MM-DD
-            terminal_value = shares_now * price
-
-            # 计算年化
-            od = _dt.strptime(opening_date, "%Y-%m-%d").date()
-            vd = _dt.strptime(d, "%Y-%m-%d").date()
-            holding_days = (vd - od).days
-            
-            # 如果持有天数无效，尝试使用最少30天作为基准
-            if holding_days <= 0:
-                if fallback_reason == "fallback_last_update":
-                    # 对于使用 last_update 的情况，如果日期无效，使用30天作为最小基准
-                    holding_days = 30
-                    fallback_reason = "fallback_minimum_period"
-                else:
-                    # Invalid holding period for fallback calculation
-                    return {
-                        "ts_code": ts_code, "date": d,
-                        "annualized_mwr": None, "flows": len(cfs),
-                        "used_price_date": used_price_date, "terminal_value": terminal_value,
-                        "irr_reason": "invalid_holding_days"
-                    }
-
-            total_return = (price / avg_cost) - 1.0
-            annualized = (1.0 + total_return) ** (365.0 / holding_days) - 1.0
-
-            # Fallback calculation completed successfully
-            return {
-                "ts_code": ts_code,
-                "date": d,
-                "annualized_mwr": float(annualized),
-                "flows": len(cfs),  # 这里一般为 0 或 1（只有期末市值）
-                "used_price_date": used_price_date,
-                "terminal_value": terminal_value,
-                "irr_reason": fallback_reason
-            }
+        total_return = (price / avg_cost) - 1.0
+        annualized = (1.0 + total_return) ** (365.0 / holding_days) - 1.0
+
+        # Fallback calculation completed successfully
+        return {
+            "ts_code": ts_code,
+            "date": d,
+            "annualized_mwr": float(annualized),
+            "flows": len(cfs),  # 这里一般为 0 或 1（只有期末市值）
+            "used_price_date": used_price_date,
+            "terminal_value": terminal_value,
+            "irr_reason": fallback_reason
+        }
 
     except Exception as e:
         # Fallback calculation failed
@@ -277,7 +271,33 @@ def compute_position_xirr_batch(date_yyyymmdd: str, ts_codes: list[str | None] =
                 if t == "CASH" or r["ts_code"].upper() == cash_code_cfg:
                     cash_set.add(r["ts_code"])
 
-    # Batch XIRR computation starting
+    # 三次查询取齐全部交易、持仓与估值价，再一次性求解所有 IRR
+    targets = [c for c in codes if c not in cash_set]
+    with get_conn() as conn:
+        txns_by_code: dict[str, list] = {}
+        for r in txn_repo.list_txns_for_codes_upto(conn, targets, d):
+            txns_by_code.setdefault(r["ts_code"], []).append(r)
+        positions = {r["ts_code"]: r for r in position_repo.get_positions_full(conn, targets)}
+        prices = price_repo.get_latest_prices(conn, targets, d)
+
+    results: dict[str, Dict] = {}
+    to_solve: list[tuple[str, list, str | None, float | None]] = []
+    for code in targets:
+        try:
+            pos, pe = positions.get(code), prices.get(code)
+            cfs, used_price_date, terminal_value = _assemble_cashflows(txns_by_code.get(code, []), pos, pe, d)
+            if len(cfs) >= 2:
+                to_solve.append((code, cfs, used_price_date, terminal_value))
+            else:
+                results[code] = _fallback_result(code, d, cfs, used_price_date, terminal_value, pos, pe)
+        except Exception as e:
+            # 不中断：保留一条错误占位，前端不会用到 annualized_mwr 的 null 以外字段
+            results[code] = {"ts_code": code, "date": d, "annualized_mwr": None, "flows": 0, "error": str(e)}
+
+    irrs = _xirr_many([cfs for _, cfs, _, _ in to_solve])
+    for (code, cfs, used_price_date, terminal_value), r in zip(to_solve, irrs):
+        results[code] = _irr_result(code, d, cfs, used_price_date, terminal_value, r)
+
     out: list[Dict] = []
     for code in codes:
         if code in cash_set:
@@ -288,14 +308,8 @@ def compute_position_xirr_batch(date_yyyymmdd: str, ts_codes: list[str | None] =
                 "flows": 0,
                 "irr_reason": "skip_cash"
             })
-            continue
-        try:
-            out.append(compute_position_xirr(code, date_yyyymmdd))
-        except Exception as e:
-            # Individual position computation failed
-            # 不中断：保留一条错误占位，前端不会用到 annualized_mwr 的 null 以外字段
-            out.append({"ts_code": code, "date": d, "annualized_mwr": None, "flows": 0, "error": str(e)})
-    # Batch computation completed
+        else:
+            out.append(results[code])
     return out
 
 def _to_dash_date(s: str | None) -> str | None:
@@ -6,7 +6,10 @@ from ..db import get_conn
 from ..logs import OperationLogContext
 from .utils import yyyyMMdd_to_dash
 from .config_svc import get_config
-from ..repository import reporting_repo
+from ..repository import dirty_repo, reporting_repo
+
+# 影响结构信号的变更：价格与标的启用状态
+CALC_DIRTY_TABLES = ("price_eod", "instrument")
 
 def calc(date_yyyymmdd: str, log: OperationLogContext):
     """
@@ -18,6 +21,8 @@ def calc(date_yyyymmdd: str, log: OperationLogContext):
     
     注意：不再维护portfolio_daily和category_daily表，
     所有实时数据通过position表和price_eod表动态计算获得
+
+    结构信号只为变更集（dirty_set）中截至该日有变动的标的生成；首次运行或回算更早的日期时全量生成
     
     Args:
         date_yyyymmdd: 计算日期，格式 YYYYMMDD
@@ -26,6 +31,9 @@ def calc(date_yyyymmdd: str, log: OperationLogContext):
     d = yyyyMMdd_to_dash(date_yyyymmdd)
 
     with get_conn() as conn:
+        dirty = dirty_repo.take(conn, "calc", CALC_DIRTY_TABLES, until=d)
+        ts_codes = None if dirty is None else sorted(dirty)
+
         # 获取活跃标的的持仓和价格数据用于信号生成
         rows = reporting_repo.active_instruments_with_pos_and_price(conn, d)
         df = pd.DataFrame([dict(r) for r in rows])
@@ -49,6 +57,6 @@ def calc(date_yyyymmdd: str, log: OperationLogContext):
 
         # 生成交易信号
         from .signal_svc import SignalGenerationService
-        SignalGenerationService.generate_current_signals(df, d)
+        SignalGenerationService.generate_current_signals(df, d, ts_codes=ts_codes)
         
-    log.set_payload({"date": date_yyyymmdd})
+    log.set_payload({"date": date_yyyymmdd, "codes": "all" if ts_codes is None else len(ts_codes)})
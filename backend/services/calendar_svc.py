@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+# backend/services/calendar_svc.py
+import csv
+import os
+import sqlite3
+import threading
+import time
+
+from ..db import get_conn, get_db_path
+from ..domain.trade_calendar import TradingCalendar
+from ..repository import calendar_repo
+
+# 离线日历：可由 backend/scripts/sync_trade_cal.py --export 从 trade_cal 表导出
+DEFAULT_CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "seeds", "trade_cal.csv")
+
+_lock = threading.Lock()
+_calendar: TradingCalendar | None = None
+_calendar_db: str | None = None
+# 加载失败的年份（如尚未配置 token、离线 CSV 也没有）：{(库路径, 年份): 可重试的 monotonic 时间}
+CALENDAR_RETRY_SECONDS = 600
+_retry_after: dict[tuple[str, int], float] = {}
+
+
+def get_calendar() -> TradingCalendar:
+    """进程内日历索引（首次使用时从 trade_cal 表构建，加载新年份后自动重建）"""
+    global _calendar, _calendar_db
+    path = get_db_path()
+    with _lock:
+        if _calendar is None or _calendar_db != path:
+            try:
+                with get_conn() as conn:
+                    rows = calendar_repo.list_days(conn)
+            except sqlite3.OperationalError:
+                rows = []  # 旧库尚未建表
+            _calendar = TradingCalendar((r["cal_date"], r["is_open"]) for r in rows)
+            _calendar_db = path
+        return _calendar
+
+
+def invalidate_calendar():
+    global _calendar
+    with _lock:
+        _calendar = None
+
+
+def _dash(d: str) -> str:
+    d = str(d).strip().replace("-", "")
+    return f"{d[0:4]}-{d[4:6]}-{d[6:8]}"
+
+
+def _rows_from_frame(df) -> list[tuple[str, int]]:
+    if df is None or df.empty or "cal_date" not in df.columns:
+        return []
+    # trade_cal 按交易所返回，若含多个交易所仅取上交所
+    if "exchange" in df.columns and (df["exchange"] == "SSE").any():
+        df = df[df["exchange"] == "SSE"]
+    return [(_dash(d), int(o)) for d, o in zip(df["cal_date"], df["is_open"])]
+
+
+def _rows_from_csv(path: str, year: int) -> list[tuple[str, int]]:
+    if not path or not os.path.exists(path):
+        return []
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for r in csv.DictReader(f):
+            d = _dash(r["cal_date"])
+            if d.startswith(f"{year}-"):
+                out.append((d, int(r["is_open"])))
+    return out
+
+
+def ensure_years(years, provider=None, csv_path: str | None = None) -> dict[int, dict]:
+    """
+    确保指定年份的交易日历已加载到 trade_cal 表（每年只需加载一次）
+
+    优先从数据源按整年拉取，失败或无数据源时回退到离线 CSV。
+
+    Args:
+        years: 年份集合
+        provider: 可选，提供 trade_cal_frame(start, end) 的行情源
+        csv_path: 可选，离线 CSV 路径，默认 seeds/trade_cal.csv
+
+    Returns:
+        dict: {year: {"days": 加载天数, "source": "provider"|"csv"}}，仅包含本次新加载的年份
+    """
+    db = get_db_path()
+    with get_conn() as conn:
+        have = calendar_repo.loaded_years(conn)
+
+    loaded: dict[int, dict] = {}
+    for y in sorted(set(int(v) for v in years) - have):
+        rows: list[tuple[str, int]] = []
+        source = None
+        fetch = getattr(provider, "trade_cal_frame", None) if provider is not None else None
+        if fetch is not None:
+            try:
+                rows = _rows_from_frame(fetch(f"{y}0101", f"{y}1231"))
+                source = "provider"
+            except Exception as e:
+                print(f"[calendar] provider trade_cal {y} failed: {e}")
+                rows = []
+        if not rows:
+            rows = _rows_from_csv(csv_path or DEFAULT_CSV_PATH, y)
+            source = "csv"
+        if rows:
+            with get_conn() as conn:
+                calendar_repo.upsert_days(conn, rows)
+            loaded[y] = {"days": len(rows), "source": source}
+            _retry_after.pop((db, y), None)
+        else:
+            _retry_after[(db, y)] = time.monotonic() + CALENDAR_RETRY_SECONDS
+
+    if loaded:
+        invalidate_calendar()
+    return loaded
+
+
+def ensure_calendar_for(date_yyyymmdd: str, provider=None) -> TradingCalendar:
+    """
+    返回覆盖该日期（1 月时同时覆盖上一年）的日历索引；
+    已覆盖时为纯内存查询，否则按年加载一次；加载失败的年份在 CALENDAR_RETRY_SECONDS 内不再重复请求
+    """
+    y = int(date_yyyymmdd[0:4])
+    years = {y}
+    if date_yyyymmdd.replace("-", "")[4:6] == "01":
+        years.add(y - 1)
+    cal = get_calendar()
+    if cal.covers(date_yyyymmdd) and all(cal.covers(f"{v}1231") for v in years if v != y):
+        return cal
+    db = get_db_path()
+    now = time.monotonic()
+    pending = {v for v in years if _retry_after.get((db, v), 0.0) <= now}
+    if pending:
+        ensure_years(pending, provider)
+    return get_calendar()
+
+
+def export_csv(path: str) -> int:
+    """将 trade_cal 表导出为离线 CSV（cal_date YYYYMMDD, is_open）"""
+    with get_conn() as conn:
+        rows = calendar_repo.list_days(conn)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["cal_date", "is_open"])
+        for r in rows:
+            w.writerow([r["cal_date"].replace("-", ""), int(r["is_open"])])
+    return len(rows)
@@ -4,6 +4,7 @@ from __future__ import annotations
 from ..db import get_conn
 from ..logs import OperationLogContext
 from .utils import to_float_safe
+from . import request_context
 
 DEFAULTS = {
     "unit_amount": "3000",
@@ -32,10 +33,12 @@ def ensure_default_config():
             )
         conn.commit()
 
+def _read_config(conn) -> dict:
+    return {r["key"]: r["value"] for r in conn.execute("SELECT key, value FROM config").fetchall()}
+
 def get_config() -> dict:
-    with get_conn() as conn:
-        rows = conn.execute("SELECT key, value FROM config").fetchall()
-    cfg = {r["key"]: r["value"] for r in rows}
+    # 请求级上下文内同一请求只读一次
+    cfg = request_context.shared(("config",), _read_config)
 
     # 转换为正确类型 & 默认兜底
     out = {
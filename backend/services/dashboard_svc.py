@@ -1,46 +1,50 @@
 from __future__ import annotations
 
 # backend/services/dashboard_svc.py
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
-from ..db import get_conn
-from ..repository import reporting_repo
+from ..db import get_conn, get_db_path
+from ..domain import kpi_series
+from ..repository import dirty_repo, position_ledger_repo, price_repo, reporting_repo
 from ..domain.txn_engine import round_price, round_quantity, round_shares, round_amount
 from .utils import yyyyMMdd_to_dash
 from .config_svc import get_config
-from datetime import datetime, timedelta
+from . import request_context
 # get_dashboard, list_category, list_position, list_signal 放这里（你已有的“动态口径”实现）
 
 def get_dashboard(date_yyyymmdd: str) -> dict:
     """
     Dashboard KPI 动态口径：
-    - 用 position（当前底仓） × price_eod 中 ≤ 指定日的最近可用价 计算市值
+    - 用指定日的持仓（position_ledger 台账；无台账记录的标的用 position 当前底仓） × price_eod 中 ≤ 指定日的最近可用价 计算市值
     - 成本 = shares × avg_cost
     - ret/pnl 动态计算；signal 仍来自快照（如未calc则可能为0）
     - price_fallback_used: 若某标的在 ≤ 指定日没有任何价格（新标的未同步），视为使用均价回退
     """
     d = yyyyMMdd_to_dash(date_yyyymmdd)
-    with get_conn() as conn:
-        # 动态聚合：每个标的取 ≤ d 最近价
-        rows = reporting_repo.active_instruments_with_pos_and_price(conn, d)
-
-        mv = 0.0; cost = 0.0; used_fallback = False
-        for r in rows:
-            shares = float(r["shares"] or 0.0)
-            if shares <= 0: 
-                continue
-            avg_cost = float(r["avg_cost"] or 0.0)
-            eod_close = r["eod_close"]
-            if eod_close is None:
-                # 没有任何 ≤ d 的价格（新标的/未同步），用均价回退并标记
-                used_fallback = True
-                price = avg_cost
-            else:
-                price = float(eod_close)
-            mv += shares * price
-            cost += shares * avg_cost
-
-        pnl = mv - cost
-        ret = (pnl / cost) if cost > 0 else None
+    # 动态聚合：每个标的取 ≤ d 最近价（请求级上下文内与类别/持仓状态共用一次查询）
+    rows = request_context.holdings(d)
+
+    mv = 0.0; cost = 0.0; used_fallback = False
+    for r in rows:
+        shares = float(r["shares"] or 0.0)
+        if shares <= 0: 
+            continue
+        avg_cost = float(r["avg_cost"] or 0.0)
+        eod_close = r["eod_close"]
+        if eod_close is None:
+            # 没有任何 ≤ d 的价格（新标的/未同步），用均价回退并标记
+            used_fallback = True
+            price = avg_cost
+        else:
+            price = float(eod_close)
+        mv += shares * price
+        cost += shares * avg_cost
+
+    pnl = mv - cost
+    ret = (pnl / cost) if cost > 0 else None
 
     # 当日信号数量来自快照（如果未calc，可能为0）
     from .signal_svc import SignalService
@@ -61,7 +65,7 @@ def get_dashboard(date_yyyymmdd: str) -> dict:
 def list_category(date_yyyymmdd: str) -> list[dict]:
     """
     类别分布动态口径（不依赖 portfolio_daily）：
-    - 用 position × (≤ 指定日最近价) 动态聚合市值
+    - 用指定日持仓 × (≤ 指定日最近价) 动态聚合市值
     - 结合 category.target_units 计算 actual_units / gap_units / overweight
     """
     d = yyyyMMdd_to_dash(date_yyyymmdd)
@@ -69,37 +73,37 @@ def list_category(date_yyyymmdd: str) -> list[dict]:
     unit_amount = float(cfg.get("unit_amount", 3000.0))
     band = float(cfg.get("overweight_band", 0.20))
 
-    with get_conn() as conn:
-        # 拉所有类别目标
-        cats = pd.read_sql_query("SELECT id AS category_id, name, sub_name, target_units FROM category", conn)
-
-        # 拉标的 + 底仓 + 最近价
-        rows = reporting_repo.active_instruments_with_pos_and_price(conn, d)
-        df = pd.DataFrame([dict(r) for r in rows])
-        # 价格回退：无价则用均价（仅用于展示口径）
-        df["price"] = df["eod_close"].fillna(df["avg_cost"])
-        df["market_value"] = df["shares"] * df["price"]
-        df["cost"] = df["shares"] * df["avg_cost"]
-
-        # 按类别聚合
-        agg = df.groupby("category_id", as_index=False).agg(
-            market_value=("market_value", "sum"),
-            cost=("cost", "sum")
-        )
-        agg["pnl"] = agg["market_value"] - agg["cost"]
-        agg["ret"] = agg.apply(lambda r: (r["pnl"]/r["cost"]) if r["cost"]>0 else None, axis=1)
-        agg = cats.merge(agg, on="category_id", how="left").fillna({"market_value":0.0, "cost":0.0, "pnl":0.0})
-
-        # 份数/越带
-        agg["actual_units"] = agg["cost"] / unit_amount
-        agg["gap_units"] = agg["target_units"] - agg["actual_units"]
-
-        def out_of_band(r):
-            lower = r["target_units"] * (1 - band); upper = r["target_units"] * (1 + band)
-            act = r["actual_units"]
-            return 1 if (act < lower or act > upper) else 0
-
-        agg["overweight"] = agg.apply(out_of_band, axis=1)
+    # 拉所有类别目标
+    cats = request_context.shared(("categories",), lambda conn: pd.read_sql_query(
+        "SELECT id AS category_id, name, sub_name, target_units FROM category", conn))
+
+    # 拉标的 + 底仓 + 最近价
+    rows = request_context.holdings(d)
+    df = pd.DataFrame([dict(r) for r in rows])
+    # 价格回退：无价则用均价（仅用于展示口径）
+    df["price"] = df["eod_close"].fillna(df["avg_cost"])
+    df["market_value"] = df["shares"] * df["price"]
+    df["cost"] = df["shares"] * df["avg_cost"]
+
+    # 按类别聚合
+    agg = df.groupby("category_id", as_index=False).agg(
+        market_value=("market_value", "sum"),
+        cost=("cost", "sum")
+    )
+    agg["pnl"] = agg["market_value"] - agg["cost"]
+    agg["ret"] = agg.apply(lambda r: (r["pnl"]/r["cost"]) if r["cost"]>0 else None, axis=1)
+    agg = cats.merge(agg, on="category_id", how="left").fillna({"market_value":0.0, "cost":0.0, "pnl":0.0})
+
+    # 份数/越带
+    agg["actual_units"] = agg["cost"] / unit_amount
+    agg["gap_units"] = agg["target_units"] - agg["actual_units"]
+
+    def out_of_band(r):
+        lower = r["target_units"] * (1 - band); upper = r["target_units"] * (1 + band)
+        act = r["actual_units"]
+        return 1 if (act < lower or act > upper) else 0
+
+    agg["overweight"] = agg.apply(out_of_band, axis=1)
 
     # 输出
     out = []
@@ -120,27 +124,18 @@ def list_category(date_yyyymmdd: str) -> list[dict]:
 
 def list_position(date_yyyymmdd: str) -> list[dict]:
     """
-    标的持仓动态口径（完全基于position + price_eod动态计算）：
+    标的持仓动态口径（指定日的台账持仓 + price_eod 动态计算）：
     - 现价优先用 ≤ 指定日最近价（eod_close）；无则回退到均价
     - 所有数据实时计算，不依赖portfolio_daily快照表
     """
     d = yyyyMMdd_to_dash(date_yyyymmdd)
     cfg = get_config(); stop_gain = float(cfg.get("stop_gain_pct", 0.30))
     
-    with get_conn() as conn:
-        # 直接从position表和相关表获取数据，不依赖portfolio_daily
-        rows = conn.execute("""
-        SELECT i.ts_code, i.name, i.category_id, c.name as cat_name, c.sub_name as cat_sub,
-               p.shares, p.avg_cost,
-               (SELECT close FROM price_eod pe 
-                 WHERE pe.ts_code=i.ts_code AND pe.trade_date<=? 
-                 ORDER BY pe.trade_date DESC LIMIT 1) as eod_close
-        FROM instrument i
-        JOIN category c ON i.category_id=c.id
-        LEFT JOIN position p ON p.ts_code=i.ts_code
-        WHERE i.active=1 AND (p.shares > 0 OR p.shares IS NOT NULL)
-        ORDER BY c.name, c.sub_name, i.ts_code
-        """, (d,)).fetchall()
+    # 与 Dashboard / 类别分布共用同一份持仓 × 最近价；只列有持仓记录且类别存在的标的
+    rows = sorted(
+        (r for r in request_context.holdings(d) if r["has_holding"] and r["cat_name"] is not None),
+        key=lambda r: (r["cat_name"], r["cat_sub"], r["ts_code"]),
+    )
 
     out = []
     for r in rows:
@@ -190,61 +185,88 @@ def list_signal_all(typ: str | None = None, ts_code: str | None = None, start_da
     return SignalService.get_signals_history(typ, ts_code, start_date, end_date, limit)
 
 
-def _iter_dates(start_dash: str, end_dash: str) -> list[str]:
-    d0 = datetime.fromisoformat(start_dash)
-    d1 = datetime.fromisoformat(end_dash)
-    out = []
-    cur = d0
-    while cur <= d1:
-        out.append(cur.strftime("%Y-%m-%d"))
-        cur += timedelta(days=1)
-    return out
-
-
 def aggregate_kpi(start_yyyymmdd: str, end_yyyymmdd: str, period: str = "day") -> list[dict]:
     """
     聚合区间内的 Dashboard KPI：
       - period=day：逐日
       - period=week：每周（ISO 周）末一个点（区间内该周的最后一天）
       - period=month：每月末一个点（区间内该月的最后一天）
-    复用动态口径 get_dashboard，避免依赖 snapshot 完整性。
+    口径与 get_dashboard 一致（当日持仓 × ≤ 当日最近价，无价回退均价），
+    但整段区间只读一次台账与价格：按日 as-of 前向填充成矩阵后相乘，一次得到全部序列。
     """
     sd = yyyyMMdd_to_dash(start_yyyymmdd)
     ed = yyyyMMdd_to_dash(end_yyyymmdd)
-    days = _iter_dates(sd, ed)
-
-    p = (period or "day").lower()
-    if p == "day":
-        targets = days
-    elif p == "week":
-        # 分组到 (ISO 年, ISO 周)，取每组最后一天
-        buckets = {}
-        for d in days:
-            dt = datetime.fromisoformat(d)
-            iso = dt.isocalendar()
-            key = (iso[0], iso[1])  # (year, week)
-            buckets.setdefault(key, []).append(d)
-        targets = [v[-1] for _, v in sorted(buckets.items())]
-    else:  # month
-        buckets = {}
-        for d in days:
-            dt = datetime.fromisoformat(d)
-            key = (dt.year, dt.month)
-            buckets.setdefault(key, []).append(d)
-        targets = [v[-1] for _, v in sorted(buckets.items())]
+    days = kpi_series.day_range(sd, ed)
+    if len(days) == 0:
+        return []
 
-    out = []
-    for dash_date in targets:
-        ymd = dash_date.replace("-", "")
-        k = get_dashboard(ymd)
-        out.append({
-            "date": dash_date,
-            "market_value": k["kpi"]["market_value"],
-            "cost": k["kpi"]["cost"],
-            "unrealized_pnl": k["kpi"]["unrealized_pnl"],
-            "ret": k["kpi"]["ret"],
-        })
-    return out
+    key = (get_db_path(), sd, ed, period)
+    with get_conn() as conn:
+        # 先取变更集水位再读数据：读数期间的写入只会让条目提前失效
+        seq = dirty_repo.high_water(conn)
+        cached = _kpi_cache_get(conn, key, seq, ed)
+        if cached is not None:
+            return cached
+        ledger_codes = reporting_repo.active_ledger_codes(conn)
+        points = position_ledger_repo.points_between_as_of(conn, ledger_codes, sd, ed)
+        untracked = reporting_repo.active_untracked_holdings(conn)
+        codes = ledger_codes + [r["ts_code"] for r in untracked]
+        rows = price_repo.get_closes_between_as_of(conn, codes, sd, ed)
+
+    # 台账标的按日 as-of 取持仓；无台账记录的标的沿用当前持仓
+    shares = np.hstack([
+        kpi_series.asof_matrix(days, ledger_codes, [(r[0], r[1], r[2]) for r in points]),
+        np.tile([float(r["shares"] or 0.0) for r in untracked], (len(days), 1)),
+    ])
+    avg_cost = np.hstack([
+        kpi_series.asof_matrix(days, ledger_codes, [(r[0], r[1], r[3]) for r in points]),
+        np.tile([float(r["avg_cost"] or 0.0) for r in untracked], (len(days), 1)),
+    ])
+    closes = kpi_series.asof_matrix(days, codes, rows)
+    series = kpi_series.KpiSeries.compute(days, shares, avg_cost, closes)
+    records = series.resample(period).to_records()
+    if seq is not None:
+        with _kpi_lock:
+            _kpi_cache[key] = (seq, records)
+            _kpi_cache.move_to_end(key)
+            while len(_kpi_cache) > KPI_CACHE_SIZE:
+                _kpi_cache.popitem(last=False)
+    return records
+
+
+# ---------------- KPI 序列缓存 ----------------
+# 键 (库路径, 起, 止, 周期)，值 (计算时的变更集水位, 结果)。变更集中该水位之后没有早于等于区间末日的变动时
+# 结果仍然有效（晚于区间的新行情、新交易不影响历史序列）；只读变更集不推进游标，多进程下也安全
+KPI_CACHE_SIZE = 64
+KPI_DIRTY_TABLES = ("price_eod", "position_ledger", "position", "instrument", "txn")
+_kpi_cache: OrderedDict[tuple, tuple[int, list[dict]]] = OrderedDict()
+_kpi_lock = threading.Lock()
+
+
+def _kpi_cache_get(conn, key: tuple, seq: int | None, end_dash: str) -> list[dict] | None:
+    if seq is None:
+        return None
+    with _kpi_lock:
+        entry = _kpi_cache.get(key)
+    if entry is None:
+        return None
+    cached_seq, records = entry
+    if cached_seq != seq:
+        changed = dirty_repo.earliest_change_since(conn, cached_seq, KPI_DIRTY_TABLES)
+        if changed is not None and changed <= end_dash:
+            with _kpi_lock:
+                _kpi_cache.pop(key, None)
+            return None
+    with _kpi_lock:
+        if key in _kpi_cache:
+            _kpi_cache[key] = (seq, records)
+            _kpi_cache.move_to_end(key)
+    return records
+
+
+def clear_kpi_cache():
+    with _kpi_lock:
+        _kpi_cache.clear()
 
 
 def create_manual_signal(trade_date: str, ts_code: str | None, category_id: int | None, level: str, type: str, message: str) -> int:
@@ -287,12 +309,10 @@ def create_manual_signal_extended(
 def get_position_series(start_yyyymmdd: str, end_yyyymmdd: str, ts_codes: list[str]) -> list[dict]:
     """
     获取指定标的在时间范围内的持仓市值历史序列
-    基于当前持仓数据和历史价格重建历史市值
+    每个价格日使用当日的台账持仓（无台账记录的标的沿用当前持仓），只输出持有的日期
     """
-    from ..db import get_conn
-    from .utils import yyyyMMdd_to_dash
-    import pandas as pd
-    
+    from bisect import bisect_right
+
     if not ts_codes:
         return []
     
@@ -301,18 +321,24 @@ def get_position_series(start_yyyymmdd: str, end_yyyymmdd: str, ts_codes: list[s
     end_date = yyyyMMdd_to_dash(end_yyyymmdd)
     
     with get_conn() as conn:
-        # 获取当前持仓和标的信息
         placeholders = ",".join("?" * len(ts_codes))
-        positions = conn.execute(f"""
-            SELECT p.ts_code, p.shares, p.avg_cost, i.name
-            FROM position p
-            JOIN instrument i ON i.ts_code = p.ts_code
-            WHERE p.ts_code IN ({placeholders}) AND p.shares > 0
-        """, ts_codes).fetchall()
-        
-        if not positions:
-            return []
-        
+        names = {r["ts_code"]: r["name"] for r in conn.execute(
+            f"SELECT ts_code, name FROM instrument WHERE ts_code IN ({placeholders})", ts_codes
+        ).fetchall()}
+
+        # 台账分段：{ts_code: [(valid_from, shares), ...]} 按日期升序
+        points: dict[str, list[tuple[str, float]]] = {}
+        for code, valid_from, shares, _ in position_ledger_repo.points_between_as_of(conn, ts_codes, start_date, end_date):
+            points.setdefault(code, []).append((valid_from, float(shares)))
+        for seq in points.values():
+            seq.sort()
+        ledger_codes = {r[0] for r in conn.execute(
+            f"SELECT DISTINCT ts_code FROM position_ledger WHERE ts_code IN ({placeholders})", ts_codes
+        ).fetchall()}
+        current = {r["ts_code"]: float(r["shares"] or 0.0) for r in conn.execute(
+            f"SELECT ts_code, shares FROM position WHERE ts_code IN ({placeholders}) AND shares > 0", ts_codes
+        ).fetchall()}
+
         # 获取历史价格数据
         price_data = conn.execute(f"""
             SELECT ts_code, trade_date, close
@@ -321,28 +347,23 @@ def get_position_series(start_yyyymmdd: str, end_yyyymmdd: str, ts_codes: list[s
             AND trade_date >= ? AND trade_date <= ?
             ORDER BY ts_code, trade_date
         """, ts_codes + [start_date, end_date]).fetchall()
-    
-    # 转换为DataFrame便于处理
-    pos_df = pd.DataFrame([dict(r) for r in positions])
-    price_df = pd.DataFrame([dict(r) for r in price_data])
-    
+
     result = []
-    
-    for _, pos in pos_df.iterrows():
-        ts_code = pos['ts_code']
-        shares = pos['shares']
-        name = pos['name']
-        
-        # 获取该标的的价格历史
-        code_prices = price_df[price_df['ts_code'] == ts_code]
-        
-        for _, price_row in code_prices.iterrows():
-            market_value = shares * price_row['close']
-            result.append({
-                "date": price_row['trade_date'],
-                "ts_code": ts_code,
-                "name": name,
-                "market_value": round(market_value, 2)
-            })
+    for r in price_data:
+        ts_code = r["ts_code"]
+        if ts_code in ledger_codes:
+            seq = points.get(ts_code, [])
+            k = bisect_right(seq, (r["trade_date"], float("inf"))) - 1
+            shares = seq[k][1] if k >= 0 else 0.0
+        else:
+            shares = current.get(ts_code, 0.0)
+        if shares <= 0:
+            continue
+        result.append({
+            "date": r["trade_date"],
+            "ts_code": ts_code,
+            "name": names.get(ts_code),
+            "market_value": round(shares * float(r["close"]), 2)
+        })
     
     return sorted(result, key=lambda x: (x['ts_code'], x['date']))
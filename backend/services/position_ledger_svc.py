@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+# backend/services/position_ledger_svc.py
+"""
+历史持仓台账 position_ledger：每个标的按日期分段记录 (shares, avg_cost)
+- 由 txn 按 txn_engine 规则重放得到；手工建仓/修改持仓记为 MANUAL 段
+- 新增交易 / 手工修改时增量维护：日期不早于最新一段时只追加或覆盖末段（O(1)），
+  倒签日期才重放该标的
+- 最新一段始终与 position 表一致（不一致时以 position 为准补一段 MANUAL）
+"""
+from datetime import datetime
+
+from ..domain import holdings_ledger
+from ..repository import position_ledger_repo, position_repo, instrument_repo
+
+# 无日期的存量持仓：视为一直持有
+EPOCH = "0001-01-01"
+
+
+def _is_cash(conn, ts_code: str) -> bool:
+    """现金标的代码从 conn 所在库的 config 读取（迁移时 conn 不一定是默认库）"""
+    from .config_svc import DEFAULTS
+
+    row = conn.execute("SELECT value FROM config WHERE key='cash_ts_code'").fetchone()
+    cash_code = str((row[0] if row else None) or DEFAULTS["cash_ts_code"])
+    return ts_code == cash_code or (instrument_repo.get_type(conn, ts_code) or "").upper() == "CASH"
+
+
+def _dash(d) -> str | None:
+    s = str(d or "").strip()[:10]
+    if len(s) == 8 and s.isdigit():
+        return f"{s[0:4]}-{s[4:6]}-{s[6:8]}"
+    return s or None
+
+
+def _reconcile(conn, ts_code: str, floor_date: str | None = None):
+    """最新一段与 position 表不一致时，以 position 为准追加一段 MANUAL"""
+    pos = position_repo.get_position_full(conn, ts_code)
+    want = (float(pos["shares"] or 0.0), float(pos["avg_cost"] or 0.0)) if pos else (0.0, 0.0)
+    last = position_ledger_repo.last_point(conn, ts_code)
+    have = (float(last["shares"]), float(last["avg_cost"])) if last else (0.0, 0.0)
+    if holdings_ledger.same_holding(want, have):
+        return
+    if last is None:
+        # 没有任何交易的存量持仓：自建仓日起持有
+        date = _dash(pos["opening_date"]) or _dash(pos["last_update"]) or EPOCH
+    else:
+        date = max(d for d in (last["valid_from"], floor_date, _dash(pos["last_update"]) if pos else None) if d)
+    position_ledger_repo.upsert_point(conn, ts_code, date, want[0], want[1], "MANUAL")
+
+
+def rebuild_code(conn, ts_code: str, floor_date: str | None = None) -> int:
+    """按交易 + 手工段重放该标的的全部分段（由调用方控制事务）"""
+    from ..repository import txn_repo
+
+    txns = [dict(r) for r in txn_repo.list_txns_for_code_replay(conn, ts_code)]
+    points = holdings_ledger.replay(txns, position_ledger_repo.manual_points(conn, ts_code), _is_cash(conn, ts_code))
+    n = position_ledger_repo.replace_code(conn, ts_code, points)
+    _reconcile(conn, ts_code, floor_date)
+    return n
+
+
+def rebuild_all(conn) -> int:
+    codes = {r[0] for r in conn.execute("SELECT DISTINCT ts_code FROM txn").fetchall()}
+    codes |= {r[0] for r in conn.execute("SELECT ts_code FROM position").fetchall()}
+    return sum(rebuild_code(conn, c) for c in sorted(codes))
+
+
+def on_position_change(conn, ts_code: str, date_dash: str, source: str = "TXN"):
+    """
+    position 行刚被改写后调用（同一事务内）：把当前 position 记为 date_dash 收盘后的持仓。
+    date_dash 早于最新一段时（倒签交易/手工修改）重放该标的。
+    """
+    pos = position_repo.get_position(conn, ts_code)
+    shares, avg_cost = (float(pos["shares"] or 0.0), float(pos["avg_cost"] or 0.0)) if pos else (0.0, 0.0)
+    last = position_ledger_repo.last_point(conn, ts_code)
+    if last is None or date_dash >= last["valid_from"]:
+        position_ledger_repo.upsert_point(conn, ts_code, date_dash, shares, avg_cost, source)
+        return
+    if source == "MANUAL":
+        # 倒签的手工段作为重放时的重置点
+        position_ledger_repo.upsert_point(conn, ts_code, date_dash, shares, avg_cost, source)
+    rebuild_code(conn, ts_code, floor_date=date_dash)
+
+
+def on_bulk_change(conn, ts_code: str, points: list[tuple[str, float, float]]):
+    """
+    批量导入后调用（同一事务内，position 已写入）：points 为该标的按日期升序的收盘后持仓。
+    全部不早于最新一段时逐段追加，否则重放该标的。
+    """
+    if not points:
+        return
+    last = position_ledger_repo.last_point(conn, ts_code)
+    if last is None or points[0][0] >= last["valid_from"]:
+        for d, shares, avg_cost in points:
+            position_ledger_repo.upsert_point(conn, ts_code, d, shares, avg_cost, "TXN")
+        return
+    rebuild_code(conn, ts_code, floor_date=points[0][0])
+
+
+def record_manual(conn, ts_code: str, date_dash: str | None = None):
+    """手工建仓 / 修改 / 删除持仓后调用（同一事务内）"""
+    on_position_change(conn, ts_code, _dash(date_dash) or datetime.now().strftime("%Y-%m-%d"), source="MANUAL")
@@ -8,7 +8,7 @@ from typing import Any
 from datetime import datetime
 from ..repository import reporting_repo
 from ..db import get_conn
-from . import config_svc
+from . import config_svc, request_context
 
 
 class PositionStatusService:
@@ -53,56 +53,59 @@ class PositionStatusService:
         stop_gain_pct = _norm_pct(config.get('stop_gain_pct', 0.20), 0.20)
         stop_loss_pct = _norm_pct(config.get('stop_loss_pct', 0.10), 0.10)
         
-        with get_conn() as conn:
-            # 获取持仓和价格数据
-            position_data = reporting_repo.active_instruments_with_pos_and_price(conn, date_dash)
+        # 获取持仓和价格数据（请求级上下文内与 Dashboard 共用）
+        if request_context.current() is not None:
+            position_data = request_context.holdings(date_dash)
+        else:
+            with get_conn() as conn:
+                position_data = reporting_repo.active_instruments_with_pos_and_price(conn, date_dash)
+        
+        results = []
+        for row in position_data:
+            shares = float(row["shares"] or 0)
+            avg_cost = float(row["avg_cost"] or 0)
+            current_price = row["eod_close"]
+            ts_code_row = row["ts_code"]
             
-            results = []
-            for row in position_data:
-                shares = float(row["shares"] or 0)
-                avg_cost = float(row["avg_cost"] or 0)
-                current_price = row["eod_close"]
-                ts_code_row = row["ts_code"]
-                
-                # 跳过无持仓或无效数据
-                if shares <= 0 or avg_cost <= 0 or not ts_code_row:
-                    continue
-                    
-                # 如果指定了ts_code，只返回匹配的
-                if ts_code and ts_code_row != ts_code:
-                    continue
-                
-                # 处理价格缺失情况（使用平均成本作为fallback）
-                if current_price is None:
-                    current_price = avg_cost
-                    price_fallback_used = True
-                else:
-                    current_price = float(current_price)
-                    price_fallback_used = False
-                
-                # 计算收益率
-                return_rate = (current_price - avg_cost) / avg_cost
-                
-                # 判断状态
-                status, message = PositionStatusService._determine_status(
-                    ts_code_row, return_rate, stop_gain_pct, stop_loss_pct
-                )
+            # 跳过无持仓或无效数据
+            if shares <= 0 or avg_cost <= 0 or not ts_code_row:
+                continue
                 
-                results.append({
-                    "ts_code": ts_code_row,
-                    "category_id": row["category_id"],
-                    "shares": shares,
-                    "avg_cost": avg_cost,
-                    "current_price": current_price,
-                    "return_rate": return_rate,
-                    "status": status,
-                    "stop_gain_threshold": stop_gain_pct,
-                    "stop_loss_threshold": stop_loss_pct,
-                    "message": message,
-                    "price_fallback_used": price_fallback_used
-                })
+            # 如果指定了ts_code，只返回匹配的
+            if ts_code and ts_code_row != ts_code:
+                continue
             
-            return results
+            # 处理价格缺失情况（使用平均成本作为fallback）
+            if current_price is None:
+                current_price = avg_cost
+                price_fallback_used = True
+            else:
+                current_price = float(current_price)
+                price_fallback_used = False
+            
+            # 计算收益率
+            return_rate = (current_price - avg_cost) / avg_cost
+            
+            # 判断状态
+            status, message = PositionStatusService._determine_status(
+                ts_code_row, return_rate, stop_gain_pct, stop_loss_pct
+            )
+            
+            results.append({
+                "ts_code": ts_code_row,
+                "category_id": row["category_id"],
+                "shares": shares,
+                "avg_cost": avg_cost,
+                "current_price": current_price,
+                "return_rate": return_rate,
+                "status": status,
+                "stop_gain_threshold": stop_gain_pct,
+                "stop_loss_threshold": stop_loss_pct,
+                "message": message,
+                "price_fallback_used": price_fallback_used
+            })
+        
+        return results
     
     @staticmethod
     def _determine_status(ts_code: str, return_rate: float, stop_gain_pct: float, stop_loss_pct: float) -> tuple[str, str]:
@@ -5,6 +5,7 @@ from typing import Any
 from ..db import get_conn
 from ..logs import OperationLogContext
 from ..repository import position_repo
+from . import position_ledger_svc
 
 # ===== Position Raw CRUD =====
 def list_positions_raw(include_zero: bool = True, with_price: bool = True, on_date_yyyymmdd: str | None = None) -> list[dict]:
@@ -18,6 +19,7 @@ def set_opening_position(ts_code: str, shares: float, avg_cost: float, date: str
         before = position_repo.get_position_full(conn, ts_code)
         if before: before = dict(before)
         position_repo.upsert_opening_position(conn, ts_code, float(shares), float(avg_cost), date, od)
+        position_ledger_svc.record_manual(conn, ts_code, od)
         conn.commit()
         after = position_repo.get_position_full(conn, ts_code)
         after = dict(after) if after else None
@@ -42,6 +44,7 @@ def update_position_one(ts_code: str, shares: float | None, avg_cost: float | No
             new_cost = float(avg_cost if avg_cost is not None else before["avg_cost"])
             od = opening_date if opening_date is not None else before.get("opening_date") or date
             position_repo.upsert_position_with_opening(conn, ts_code, new_shares, new_cost, date, od)
+        position_ledger_svc.record_manual(conn, ts_code, od if before is None else date)
         conn.commit()
         after = conn.execute("SELECT ts_code, shares, avg_cost, last_update, opening_date FROM position WHERE ts_code=?", (ts_code,)).fetchone()
         after = dict(after) if after else None
@@ -51,6 +54,7 @@ def update_position_one(ts_code: str, shares: float | None, avg_cost: float | No
 def delete_position(ts_code: str) -> int:
     with get_conn() as conn:
         cur = position_repo.delete_position(conn, ts_code)
+        position_ledger_svc.record_manual(conn, ts_code)
         conn.commit()
         return cur
 
@@ -1,7 +1,15 @@
 from __future__ import annotations
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import pandas as pd
 from ..db import get_conn
+from ..jobs import report_progress
 from ..logs import OperationLogContext
 from ..repository import instrument_repo, price_repo
+from . import signal_refresh_svc
+from .calendar_svc import ensure_calendar_for, ensure_years, get_calendar
 from .utils import yyyyMMdd_to_dash
 
 
@@ -11,60 +19,269 @@ class PriceProviderPort:
     def trade_cal_backfill_recent_open(self, end_yyyymmdd: str, lookback_days: int = 30) -> str | None: ...
     def fund_daily_window(self, ts_code: str, start_yyyymmdd: str, end_yyyymmdd: str): ...
     def fund_nav_window(self, ts_code: str, start_yyyymmdd: str, end_yyyymmdd: str): ...
+    # range mode
+    def trade_cal_open_dates(self, start_yyyymmdd: str, end_yyyymmdd: str) -> list[str] | None: ...
+    def daily_window(self, ts_code: str, start_yyyymmdd: str, end_yyyymmdd: str): ...
+    def fund_daily_for_date(self, date_yyyymmdd: str): ...
 
 
-def sync_prices(date_yyyymmdd: str, provider: PriceProviderPort, log: OperationLogContext, ts_codes: list[str | None] = None) -> dict:
-    trade_date = date_yyyymmdd
-    used_dates: dict[str, str] = {}
-    total_found = total_updated = total_skipped = 0
+_BAR_VALUE_COLUMNS = ("close", "pre_close", "open", "high", "low", "vol", "amount")
+
 
-    # Resolve targets + types
+def frame_to_bars(df, codes: list[str] | None = None, trade_date: str | None = None) -> list[dict]:
+    """
+    将行情 DataFrame 按列整体转换为 price_eod 行（不逐行 iterrows）
+
+    Args:
+        df: 行情数据，至少包含 ts_code / close 列
+        codes: 可选，仅保留这些标的
+        trade_date: 可选，YYYYMMDD；提供时整批使用该日期，否则取 df 的 trade_date 列
+
+    Returns:
+        list[dict]: 与 upsert_price_eod_many 对应的行；NaN 统一转为 None，缺少收盘价的行被丢弃
+    """
+    if df is None or df.empty:
+        return []
+    if "ts_code" not in df.columns and "code" in df.columns:
+        df = df.rename(columns={"code": "ts_code"})
+    if codes is not None:
+        df = df[df["ts_code"].isin(codes)]
+        if df.empty:
+            return []
+
+    out = pd.DataFrame({"ts_code": df["ts_code"].astype(str)})
+    if trade_date:
+        out["trade_date"] = yyyyMMdd_to_dash(trade_date)
+    else:
+        d = df["trade_date"].astype(str)
+        out["trade_date"] = d.str[0:4] + "-" + d.str[4:6] + "-" + d.str[6:8]
+    for col in _BAR_VALUE_COLUMNS:
+        if col in df.columns:
+            out[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        else:
+            out[col] = float("nan")
+
+    out = out[out["close"].notna()]
+    if out.empty:
+        return []
+    return out.astype(object).where(out.notna(), None).to_dict("records")
+
+
+def _resolve_targets(ts_codes: list[str] | None = None) -> list[tuple[str, str]]:
+    """解析同步目标：显式列表，或活跃标的 + 自选标的（去重），返回 [(ts_code, TYPE)]"""
     with get_conn() as conn:
         if ts_codes:
             tmap = instrument_repo.type_map_for(conn, ts_codes)
-            all_targets = [(code, (tmap.get(code, "") or "").upper()) for code in ts_codes]
-        else:
-            # 获取活跃的instrument标的
-            rows = conn.execute("SELECT ts_code, COALESCE(type,'') AS t FROM instrument WHERE active=1").fetchall()
-            active_targets = [(r["ts_code"], (r["t"] or "").upper()) for r in rows]
-            
-            # 获取自选标的（需要连接instrument表获取type信息）
-            watchlist_rows = conn.execute("""
-                SELECT w.ts_code, COALESCE(i.type,'') AS t 
-                FROM watchlist w 
-                LEFT JOIN instrument i ON i.ts_code = w.ts_code 
-                WHERE i.active = 1
-            """).fetchall()
-            watchlist_targets = [(r["ts_code"], (r["t"] or "").upper()) for r in watchlist_rows]
-            
-            # 合并并去重
-            all_codes = set()
-            all_targets = []
-            for code, t in active_targets + watchlist_targets:
-                if code not in all_codes:
-                    all_codes.add(code)
-                    all_targets.append((code, t))
+            return [(code, (tmap.get(code, "") or "").upper()) for code in ts_codes]
+
+        # 获取活跃的instrument标的
+        rows = conn.execute("SELECT ts_code, COALESCE(type,'') AS t FROM instrument WHERE active=1").fetchall()
+        active_targets = [(r["ts_code"], (r["t"] or "").upper()) for r in rows]
+
+        # 获取自选标的（需要连接instrument表获取type信息）
+        watchlist_rows = conn.execute("""
+            SELECT w.ts_code, COALESCE(i.type,'') AS t 
+            FROM watchlist w 
+            LEFT JOIN instrument i ON i.ts_code = w.ts_code 
+            WHERE i.active = 1
+        """).fetchall()
+        watchlist_targets = [(r["ts_code"], (r["t"] or "").upper()) for r in watchlist_rows]
+
+    # 合并并去重
+    all_codes = set()
+    all_targets = []
+    for code, t in active_targets + watchlist_targets:
+        if code not in all_codes:
+            all_codes.add(code)
+            all_targets.append((code, t))
+    return all_targets
 
-    if not all_targets:
-        info = {"date": trade_date, "found": 0, "updated": 0, "skipped": 0, "reason": "no_active_codes"}
-        log.set_after(info)
-        return info
 
-    stock_like: list[str] = []
-    hk_like: list[str] = []
-    etf_like: list[str] = []
-    fund_like: list[str] = []
-    for code, t in all_targets:
+def _bucket_codes(targets: list[tuple[str, str]]) -> dict[str, list[str]]:
+    """按数据源分桶：STOCK(daily) / HK(hk_daily) / ETF(fund_daily) / FUND(fund_nav)，跳过 CASH"""
+    buckets: dict[str, list[str]] = {"STOCK": [], "HK": [], "ETF": [], "FUND": []}
+    for code, t in targets:
         if t == "CASH":
             continue
         if t == "ETF" or "ETF" in t:
-            etf_like.append(code)
+            buckets["ETF"].append(code)
         elif t in ("FUND", "FUND_OPEN", "MUTUAL"):
-            fund_like.append(code)
+            buckets["FUND"].append(code)
         elif t in ("HK", "HK_STOCK", "HONGKONG"):
-            hk_like.append(code)
+            buckets["HK"].append(code)
         else:
-            stock_like.append(code)
+            buckets["STOCK"].append(code)
+    return buckets
+
+
+def _refresh_zig_signals(date_dash: str, updated_codes: list[str], log: OperationLogContext,
+                         written_from: dict[str, str] | None = None) -> dict | None:
+    """
+    价格更新后增量维护相关标的的ZIG信号；失败只记日志不中断同步
+
+    written_from: {ts_code: 本次写入的最早日期 YYYY-MM-DD}，写入早于 ZIG 状态末日时该标的全量重算
+    处于延迟信号刷新批次（signal_refresh_svc.deferred_signal_refresh）中时只登记，批次结束时合并刷新
+    实际刷新的标的以 ZIG 的变更集为准：内容未变的标的跳过，其它写入路径的变更一并处理
+    """
+    import logging
+
+    if signal_refresh_svc.defer(date_dash, updated_codes, written_from):
+        return None
+
+    logger = logging.getLogger(__name__)
+    try:
+        from .signal_svc import TdxZigSignalGenerator
+
+        since = {c: (written_from or {}).get(c) or date_dash for c in updated_codes}
+        since = signal_refresh_svc.dirty_targets("zig", signal_refresh_svc.ZIG_DIRTY_TABLES, since)
+        if not since:
+            return None
+        logger.info(f"价格同步完成，开始清理ZIG信号: {len(since)}个标的")
+
+        # 基于持久化 ZIG 状态增量推进，仅改动发生变化的信号
+        zig_cleanup_result = TdxZigSignalGenerator.update_zig_signals_incremental(
+            date_dash, sorted(since), written_from=since
+        )
+
+        if zig_cleanup_result and zig_cleanup_result.get("processed_instruments", 0) > 0:
+            logger.info(f"ZIG信号清理完成: 处理{zig_cleanup_result['processed_instruments']}个标的，"
+                        f"删除{zig_cleanup_result['deleted_signals']}个过时信号，"
+                        f"生成{zig_cleanup_result['generated_signals']}个新信号")
+
+            # 将ZIG信号处理结果添加到日志
+            log.set_payload({
+                "zig_signals_processed": zig_cleanup_result["processed_instruments"],
+                "zig_signals_deleted": zig_cleanup_result["deleted_signals"],
+                "zig_signals_generated": zig_cleanup_result["generated_signals"]
+            })
+        return zig_cleanup_result
+    except Exception as e:
+        logger.error(f"ZIG信号清理时发生错误: {str(e)}")
+        log.write("ERROR", f"ZIG信号清理失败: {str(e)}")
+        return None
+
+
+# 逐代码请求（ETF / 基金 / 港股回退）的默认并发数；限流由数据源的令牌桶统一控制
+FETCH_WORKERS = 8
+# 写入器攒批大小
+WRITE_BATCH_SIZE = 200
+
+
+def _workers(max_workers: int | None) -> int:
+    return max(1, int(max_workers if max_workers is not None else FETCH_WORKERS))
+
+
+def _window_start(end_yyyymmdd: str, days: int = 30) -> str:
+    end_dt = datetime.strptime(end_yyyymmdd, "%Y%m%d")
+    return (end_dt - timedelta(days=days)).strftime("%Y%m%d")
+
+
+def _last_bar_on_or_before(df, ts_code: str, end_yyyymmdd: str) -> dict | None:
+    """日线窗口 -> end 当天或之前最后一根 bar"""
+    if df is None or df.empty or "trade_date" not in df.columns:
+        return None
+    df = df[df["trade_date"].astype(str) <= end_yyyymmdd].sort_values("trade_date")
+    if df.empty:
+        return None
+    last = df.iloc[[-1]].assign(ts_code=ts_code)
+    bars = frame_to_bars(last)
+    return bars[0] if bars else None
+
+
+def _last_nav_bar_on_or_before(df, ts_code: str, end_yyyymmdd: str) -> dict | None:
+    """fund_nav 窗口 -> end 当天或之前最后一个净值"""
+    end_dash = yyyyMMdd_to_dash(end_yyyymmdd)
+    bars = [b for b in _nav_frame_to_bars(df, ts_code) if b["trade_date"] <= end_dash]
+    return max(bars, key=lambda b: b["trade_date"]) if bars else None
+
+
+class _BarWriter:
+    """单一写入器：各抓取线程的结果在调用线程汇总，攒够一批再写一次 price_eod"""
+
+    def __init__(self, batch_size: int = WRITE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.pending: list[dict] = []
+        self.written = 0
+        self.batches = 0
+
+    def add(self, bars: list[dict]):
+        self.pending.extend(bars)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        with get_conn() as conn:
+            self.written += price_repo.upsert_price_eod_many(conn, self.pending)
+        self.batches += 1
+        self.pending = []
+
+
+def _fetch_per_code(codes: list[str], fetch, to_bar, writer: _BarWriter, max_workers: int | None) -> dict:
+    """
+    有界线程池并发执行逐代码请求，完成一个即转换并交给写入器（写库只发生在调用线程）
+
+    Returns:
+        dict: {"calls": 请求数, "bars": 入库行数, "used": {ts_code: 实际使用的日期 YYYYMMDD}}
+    """
+    used: dict[str, str] = {}
+    n_bars = 0
+
+    def _one(code):
+        try:
+            return code, fetch(code)
+        except Exception as e:
+            print(f"[pricing_orchestrator] fetch {code} failed: {e}")
+            return code, None
+
+    workers = min(_workers(max_workers), len(codes))
+    if workers <= 1:
+        results = map(_one, codes)
+        pool = None
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="price-fetch")
+        results = (f.result() for f in as_completed([pool.submit(_one, c) for c in codes]))
+    try:
+        for done, (code, df) in enumerate(results, 1):
+            report_progress(done, len(codes), unit="codes", stage="fetch")
+            bar = to_bar(code, df)
+            if bar is None:
+                continue
+            writer.add([bar])
+            used[code] = bar["trade_date"].replace("-", "")
+            n_bars += 1
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+    return {"calls": len(codes), "bars": n_bars, "used": used}
+
+
+def sync_prices(date_yyyymmdd: str, provider: PriceProviderPort, log: OperationLogContext, ts_codes: list[str | None] = None,
+                max_workers: int | None = None) -> dict:
+    """
+    同步单日价格
+
+    Args:
+        max_workers: ETF/基金/港股回退的逐代码请求并发数，默认 FETCH_WORKERS；1 为串行
+    """
+    t0 = time.perf_counter()
+    trade_date = date_yyyymmdd
+    fetch_calls = 0
+    used_dates: dict[str, str] = {}
+    total_found = total_updated = total_skipped = 0
+
+    all_targets = _resolve_targets(ts_codes)
+    if not all_targets:
+        info = {"date": trade_date, "found": 0, "updated": 0, "skipped": 0, "reason": "no_active_codes"}
+        log.set_after(info)
+        return info
+
+    buckets = _bucket_codes(all_targets)
+    stock_like = buckets["STOCK"]
+    hk_like = buckets["HK"]
+    etf_like = buckets["ETF"]
+    fund_like = buckets["FUND"]
 
     # Pre-filter: if we already have a price row for this exact date, skip fetching for that code
     # This reduces network calls significantly when re-running backfills.
@@ -96,12 +313,19 @@ def sync_prices(date_yyyymmdd: str, provider: PriceProviderPort, log: OperationL
 
     # Store updated codes for ZIG signal processing
     updated_codes = []
+    writer = _BarWriter()
 
     # STOCK: use daily with trade_cal fallback
     if stock_like:
         used_date_stock = trade_date
-        df = provider.daily_for_date(trade_date)
-        if df is None or df.empty:
+        # 本地交易日历：休市日直接回退到上一开市日，不再请求休市日行情和远端日历
+        cal = ensure_calendar_for(trade_date, provider)
+        known_open = cal.is_open(trade_date)
+        if known_open is False:
+            used_date_stock = cal.prev_open(trade_date) or trade_date
+        df = provider.daily_for_date(used_date_stock)
+        fetch_calls += 1
+        if (df is None or df.empty) and known_open is None:
             is_open = provider.trade_cal_is_open(trade_date)
             need_backfill = (is_open is None) or (is_open is False)
             if need_backfill:
@@ -109,28 +333,17 @@ def sync_prices(date_yyyymmdd: str, provider: PriceProviderPort, log: OperationL
                 if back:
                     used_date_stock = back
                     tmp = provider.daily_for_date(used_date_stock)
+                    fetch_calls += 1
                     if tmp is not None and not tmp.empty:
                         df = tmp
         if df is not None and not df.empty:
             df = df[df["ts_code"].isin(stock_like)]
             total_found += len(df)
-            bars = []
-            for _, r in df.iterrows():
-                bars.append({
-                    "ts_code": r["ts_code"],
-                    "trade_date": yyyyMMdd_to_dash(used_date_stock),
-                    "close": float(r["close"]) if r["close"] is not None else None,
-                    "pre_close": float(r.get("pre_close")) if "pre_close" in r and r["pre_close"] is not None else None,
-                    "open": float(r["open"]) if r["open"] is not None else None,
-                    "high": float(r["high"]) if r["high"] is not None else None,
-                    "low": float(r["low"]) if r["low"] is not None else None,
-                    "vol": float(r["vol"]) if r["vol"] is not None else None,
-                    "amount": float(r["amount"]) if r["amount"] is not None else None,
-                })
-                used_dates[r["ts_code"]] = used_date_stock
-                updated_codes.append(r["ts_code"])  # 记录更新的股票代码
-            with get_conn() as conn:
-                price_repo.upsert_price_eod_many(conn, bars)
+            bars = frame_to_bars(df, trade_date=used_date_stock)
+            for b in bars:
+                used_dates[b["ts_code"]] = used_date_stock
+                updated_codes.append(b["ts_code"])  # 记录更新的股票代码
+            writer.add(bars)
             total_updated += len(bars)
 
     # HK STOCK: hk_daily with simple window backfill
@@ -140,195 +353,83 @@ def sync_prices(date_yyyymmdd: str, provider: PriceProviderPort, log: OperationL
         try:
             # Try direct trade_date fetch for all HK
             dfhk = provider.hk_daily_for_date(trade_date)
+            fetch_calls += 1
         except Exception:
             dfhk = None
         bars: list[dict] = []
         if dfhk is not None and not dfhk.empty:
-            # Filter by our codes
-            try:
-                dfhk2 = dfhk[dfhk["ts_code"].isin(hk_like)]
-            except Exception:
-                dfhk2 = dfhk
-            total_found += len(dfhk2)
-            for _, r in dfhk2.iterrows():
-                bars.append({
-                    "ts_code": r.get("ts_code") or r.get("code"),
-                    "trade_date": yyyyMMdd_to_dash(str(r.get("trade_date"))),
-                    "close": float(r.get("close")) if r.get("close") is not None else None,
-                    "pre_close": float(r.get("pre_close")) if r.get("pre_close") is not None else None,
-                    "open": float(r.get("open")) if r.get("open") is not None else None,
-                    "high": float(r.get("high")) if r.get("high") is not None else None,
-                    "low": float(r.get("low")) if r.get("low") is not None else None,
-                    "vol": float(r.get("vol")) if r.get("vol") is not None else None,
-                    "amount": float(r.get("amount")) if r.get("amount") is not None else None,
-                })
-                used_dates[bars[-1]["ts_code"]] = trade_date
-                updated_codes.append(bars[-1]["ts_code"])  # 用于ZIG信号刷新
+            # Filter by our codes (columnar conversion)
+            bars = frame_to_bars(dfhk, codes=hk_like)
+            total_found += len(bars)
+            for b in bars:
+                used_dates[b["ts_code"]] = trade_date
+                updated_codes.append(b["ts_code"])  # 用于ZIG信号刷新
+            writer.add(bars)
+            total_found += len(bars)
+            total_updated += len(bars)
         else:
-            # Fallback: fetch per-code window and take last <= end
-            from datetime import datetime, timedelta
-            end_dt = datetime.strptime(trade_date, "%Y%m%d")
-            start_dt = end_dt - timedelta(days=30)
-            start_str = start_dt.strftime("%Y%m%d")
-            end_str = trade_date
-            for code in hk_like:
-                hk_df = None
-                try:
-                    hk_df = provider.hk_daily_window(code, start_str, end_str)
-                except Exception:
-                    hk_df = None
-                if hk_df is None or hk_df.empty:
-                    continue
-                try:
-                    hk_df = hk_df.sort_values("trade_date")
-                    hk_df = hk_df[hk_df["trade_date"] <= end_str]
-                except Exception:
-                    pass
-                if hk_df is None or hk_df.empty:
-                    continue
-                last = hk_df.iloc[-1]
-                used = str(last.get("trade_date"))
-                close = last.get("close")
-                if close is None:
-                    continue
-                bars.append({
-                    "ts_code": code,
-                    "trade_date": yyyyMMdd_to_dash(used),
-                    "close": float(close),
-                    "pre_close": float(last.get("pre_close")) if last.get("pre_close") is not None else None,
-                    "open": float(last.get("open")) if last.get("open") is not None else None,
-                    "high": float(last.get("high")) if last.get("high") is not None else None,
-                    "low": float(last.get("low")) if last.get("low") is not None else None,
-                    "vol": float(last.get("vol")) if last.get("vol") is not None else None,
-                    "amount": float(last.get("amount")) if last.get("amount") is not None else None,
-                })
+            # Fallback: fetch per-code window concurrently and take last <= end
+            start_str, end_str = _window_start(trade_date), trade_date
+            stats = _fetch_per_code(
+                hk_like, lambda code: provider.hk_daily_window(code, start_str, end_str),
+                lambda code, df: _last_bar_on_or_before(df, code, end_str), writer, max_workers,
+            )
+            fetch_calls += stats["calls"]
+            for code, used in stats["used"].items():
                 used_dates[code] = used
                 updated_codes.append(code)
-        if bars:
-            with get_conn() as conn:
-                price_repo.upsert_price_eod_many(conn, bars)
-            total_found += len(bars)
-            total_updated += len(bars)
+            total_found += stats["bars"]
+            total_updated += stats["bars"]
 
     # ETF: fund_daily window, pick last <= end
-    if etf_like:
-        from datetime import datetime, timedelta
-        end_dt = datetime.strptime(trade_date, "%Y%m%d")
-        start_dt = end_dt - timedelta(days=30)
-        start_str = start_dt.strftime("%Y%m%d")
-        end_str = trade_date
-        bars = []
-        for code in etf_like:
-            etf_df = provider.fund_daily_window(code, start_str, end_str)
-            if etf_df is None or etf_df.empty:
-                continue
-            etf_df = etf_df.sort_values("trade_date")
-            etf_df = etf_df[etf_df["trade_date"] <= end_str]
-            if etf_df.empty:
-                continue
-            last = etf_df.iloc[-1]
-            used_date = str(last["trade_date"])
-            close = last.get("close")
-            if close is None:
-                continue
-            bars.append({
-                "ts_code": code,
-                "trade_date": yyyyMMdd_to_dash(used_date),
-                "close": float(close),
-                "pre_close": float(last.get("pre_close")) if last.get("pre_close") is not None else None,
-                "open": float(last.get("open")) if last.get("open") is not None else None,
-                "high": float(last.get("high")) if last.get("high") is not None else None,
-                "low": float(last.get("low")) if last.get("low") is not None else None,
-                "vol": float(last.get("vol")) if last.get("vol") is not None else None,
-                "amount": float(last.get("amount")) if last.get("amount") is not None else None,
-            })
-            used_dates[code] = used_date
-            updated_codes.append(code)  # 记录更新的ETF代码
-        if bars:
-            with get_conn() as conn:
-                price_repo.upsert_price_eod_many(conn, bars)
-            total_found += len(bars)
-            total_updated += len(bars)
-
     # FUND: fund_nav window, pick last <= end
-    if fund_like:
-        from datetime import datetime, timedelta
-        end_dt = datetime.strptime(trade_date, "%Y%m%d")
-        start_dt = end_dt - timedelta(days=30)
-        start_str = start_dt.strftime("%Y%m%d")
-        end_str = trade_date
-        bars = []
-        for code in fund_like:
-            nav_df = provider.fund_nav_window(code, start_str, end_str)
-            if nav_df is None or nav_df.empty:
-                continue
-            nav_df = nav_df.sort_values("nav_date")
-            nav_df = nav_df[nav_df["nav_date"] <= end_str]
-            if nav_df.empty:
+    # 逐代码请求并发执行（同一令牌桶限流），结果流入单一写入器批量入库
+    if etf_like or fund_like:
+        start_str, end_str = _window_start(trade_date), trade_date
+        for codes, fetch, to_bar in (
+            (etf_like, lambda code: provider.fund_daily_window(code, start_str, end_str),
+             lambda code, df: _last_bar_on_or_before(df, code, end_str)),
+            (fund_like, lambda code: provider.fund_nav_window(code, start_str, end_str),
+             lambda code, df: _last_nav_bar_on_or_before(df, code, end_str)),
+        ):
+            if not codes:
                 continue
-            last = nav_df.iloc[-1]
-            nav = last.get("unit_nav") or last.get("acc_nav")
-            used_date = str(last["nav_date"])
-            if nav is None:
-                continue
-            bars.append({
-                "ts_code": code,
-                "trade_date": yyyyMMdd_to_dash(used_date),
-                "close": float(nav),
-                "pre_close": None,
-                "open": None,
-                "high": None,
-                "low": None,
-                "vol": None,
-                "amount": None,
-            })
-            used_dates[code] = used_date
-            updated_codes.append(code)  # 记录更新的基金代码
-        if bars:
-            with get_conn() as conn:
-                price_repo.upsert_price_eod_many(conn, bars)
-            total_found += len(bars)
-            total_updated += len(bars)
+            stats = _fetch_per_code(codes, fetch, to_bar, writer, max_workers)
+            fetch_calls += stats["calls"]
+            for code, used in stats["used"].items():
+                used_dates[code] = used
+                updated_codes.append(code)
+            total_found += stats["bars"]
+            total_updated += stats["bars"]
+
+    writer.flush()
+    elapsed = time.perf_counter() - t0
 
     # 如果有价格数据更新，则清理并重新生成ZIG信号
     zig_cleanup_result = None
     if updated_codes and total_updated > 0:
-        try:
-            from .signal_svc import TdxZigSignalGenerator
-            import logging
-            
-            logger = logging.getLogger(__name__)
-            logger.info(f"价格同步完成，开始清理ZIG信号: {len(updated_codes)}个标的")
-            
-            # 调用ZIG信号清理和重新生成
-            zig_cleanup_result = TdxZigSignalGenerator.cleanup_and_regenerate_zig_signals(
-                yyyyMMdd_to_dash(trade_date), 
-                updated_codes
-            )
-            
-            if zig_cleanup_result and zig_cleanup_result.get("processed_instruments", 0) > 0:
-                logger.info(f"ZIG信号清理完成: 处理{zig_cleanup_result['processed_instruments']}个标的，"
-                          f"删除{zig_cleanup_result['deleted_signals']}个过时信号，"
-                          f"生成{zig_cleanup_result['generated_signals']}个新信号")
-                          
-                # 将ZIG信号处理结果添加到日志
-                log.set_payload({
-                    "zig_signals_processed": zig_cleanup_result["processed_instruments"],
-                    "zig_signals_deleted": zig_cleanup_result["deleted_signals"], 
-                    "zig_signals_generated": zig_cleanup_result["generated_signals"]
-                })
-            
-        except Exception as e:
-            logger.error(f"ZIG信号清理时发生错误: {str(e)}")
-            log.write("ERROR", f"ZIG信号清理失败: {str(e)}")
+        zig_cleanup_result = _refresh_zig_signals(
+            yyyyMMdd_to_dash(trade_date), updated_codes, log,
+            written_from={c: yyyyMMdd_to_dash(d) for c, d in used_dates.items()},
+        )
 
     result = {
         "date": trade_date,
         "found": int(total_found),
         "updated": int(total_updated),
         "skipped": int(total_skipped),
-        "used_dates_uniq": sorted(list(set(used_dates.values()))) if used_dates else []
+        "used_dates_uniq": sorted(list(set(used_dates.values()))) if used_dates else [],
+        "fetch": {
+            "calls": fetch_calls,
+            "workers": _workers(max_workers),
+            "write_batches": writer.batches,
+            "elapsed_sec": round(elapsed, 3),
+            "calls_per_min": round(fetch_calls * 60.0 / elapsed, 1) if elapsed > 0 else None,
+        },
     }
+    rate_stats = getattr(provider, "rate_stats", None)
+    if callable(rate_stats):
+        result["fetch"]["rate_limit"] = rate_stats()
     
     # 如果有ZIG信号处理结果，添加到返回结果中
     if zig_cleanup_result:
@@ -341,6 +442,168 @@ def sync_prices(date_yyyymmdd: str, provider: PriceProviderPort, log: OperationL
     log.set_after(result)
     return result
 
+def _nav_frame_to_bars(df, ts_code: str) -> list[dict]:
+    """fund_nav 窗口 -> price_eod 行：close 取 unit_nav，缺失时回退 acc_nav"""
+    if df is None or df.empty or "nav_date" not in df.columns:
+        return []
+    nav = pd.to_numeric(df["unit_nav"], errors="coerce") if "unit_nav" in df.columns else None
+    if "acc_nav" in df.columns:
+        acc = pd.to_numeric(df["acc_nav"], errors="coerce")
+        nav = acc if nav is None else nav.fillna(acc)
+    if nav is None:
+        return []
+    frame = pd.DataFrame({"ts_code": ts_code, "trade_date": df["nav_date"].astype(str), "close": nav})
+    # fund_nav 同一净值日可能因多次公告重复出现，保留最后一条
+    frame = frame.drop_duplicates(subset=["trade_date"], keep="last")
+    return frame_to_bars(frame)
+
+
+def _weekdays_between(start_yyyymmdd: str, end_yyyymmdd: str) -> list[str]:
+    """交易日历不可用时的兜底：区间内的周一至周五"""
+    days = pd.bdate_range(pd.Timestamp(start_yyyymmdd), pd.Timestamp(end_yyyymmdd))
+    return [d.strftime("%Y%m%d") for d in days]
+
+
+def sync_prices_range(start_yyyymmdd: str, end_yyyymmdd: str, provider: PriceProviderPort,
+                      log: OperationLogContext, ts_codes: list[str] | None = None) -> dict:
+    """
+    区间模式同步：对 [start, end] 一次性回补，替代逐日调用 sync_prices
+
+    每个数据源分桶独立选择取数方式，取调用次数更少者：
+    - per_code：每个标的一次窗口调用覆盖整个区间（daily/hk_daily/fund_daily/fund_nav 窗口）
+    - per_day ：每个交易日一次全市场调用（daily/hk_daily/fund_daily 的 trade_date 模式）
+    FUND(fund_nav) 没有可靠的全市场按日接口，始终按标的取窗口。
+    已完整覆盖区间的标的、已齐全的交易日会被跳过；所有行情最后一次性批量写入。
+
+    Args:
+        start_yyyymmdd: 开始日期 YYYYMMDD
+        end_yyyymmdd: 结束日期 YYYYMMDD
+        provider: 行情源
+        log: 日志上下文
+        ts_codes: 可选，指定标的；为空时为活跃标的 + 自选
+
+    Returns:
+        dict: start/end/found/updated/skipped/calls/plan/used_dates_uniq（YYYYMMDD）
+    """
+    start, end = start_yyyymmdd, end_yyyymmdd
+    all_targets = _resolve_targets(ts_codes)
+    if not all_targets:
+        info = {"start": start, "end": end, "found": 0, "updated": 0, "skipped": 0, "reason": "no_active_codes"}
+        log.set_after(info)
+        return info
+
+    buckets = _bucket_codes(all_targets)
+    cal = ensure_calendar_for(end, provider)
+    if not cal.covers(start):
+        ensure_years(range(int(start[0:4]), int(end[0:4]) + 1), provider)
+        cal = get_calendar()
+    open_days = cal.open_days_between(start, end)
+    if open_days is None:
+        cal = getattr(provider, "trade_cal_open_dates", None)
+        open_days = (cal(start, end) if cal else None) or _weekdays_between(start, end)
+    open_dash = [yyyyMMdd_to_dash(d) for d in open_days]
+
+    pool = [c for codes in buckets.values() for c in codes]
+    with get_conn() as conn:
+        have = price_repo.existing_price_keys(conn, pool, yyyyMMdd_to_dash(start), yyyyMMdd_to_dash(end))
+
+    per_day_fetchers = {
+        "STOCK": provider.daily_for_date,
+        "HK": getattr(provider, "hk_daily_for_date", None),
+        "ETF": getattr(provider, "fund_daily_for_date", None),
+    }
+    per_code_fetchers = {
+        "STOCK": getattr(provider, "daily_window", None),
+        "HK": getattr(provider, "hk_daily_window", None),
+        "ETF": provider.fund_daily_window,
+        "FUND": provider.fund_nav_window,
+    }
+
+    total_found = total_skipped = calls = 0
+    bars: list[dict] = []
+    plan: dict[str, dict] = {}
+    for bucket, codes in buckets.items():
+        # 区间内每个交易日都已有行情的标的无需再取
+        todo = [c for c in codes if any((c, d) not in have for d in open_dash)]
+        total_skipped += len(codes) - len(todo)
+        if not todo:
+            continue
+        days_todo = [d for d, dd in zip(open_days, open_dash) if any((c, dd) not in have for c in todo)]
+
+        per_day = per_day_fetchers.get(bucket)
+        per_code = per_code_fetchers.get(bucket)
+        use_per_day = per_day is not None and (per_code is None or len(days_todo) < len(todo))
+        fetched: list[dict] = []
+        if use_per_day:
+            for d in days_todo:
+                calls += 1
+                report_progress(calls, unit="calls", stage="fetch", bucket=bucket)
+                df = per_day(d)
+                fetched.extend(frame_to_bars(df, codes=todo, trade_date=d))
+        elif per_code is not None:
+            for code in todo:
+                calls += 1
+                report_progress(calls, unit="calls", stage="fetch", bucket=bucket)
+                df = per_code(code, start, end)
+                if bucket == "FUND":
+                    fetched.extend(_nav_frame_to_bars(df, code))
+                else:
+                    fetched.extend(frame_to_bars(df, codes=[code]))
+        else:
+            continue
+
+        lo, hi = yyyyMMdd_to_dash(start), yyyyMMdd_to_dash(end)
+        fetched = [b for b in fetched if lo <= b["trade_date"] <= hi]
+        plan[bucket] = {
+            "mode": "per_day" if use_per_day else "per_code",
+            "codes": len(todo),
+            "days": len(days_todo),
+            "calls": len(days_todo) if use_per_day else len(todo),
+            "bars": len(fetched),
+        }
+        total_found += len(fetched)
+        bars.extend(fetched)
+
+    total_updated = 0
+    if bars:
+        with get_conn() as conn:
+            total_updated = price_repo.upsert_price_eod_many(conn, bars)
+
+    updated_codes = sorted({b["ts_code"] for b in bars})
+    used_dates = sorted({b["trade_date"].replace("-", "") for b in bars})
+
+    zig_cleanup_result = None
+    if updated_codes:
+        # 刷新覆盖整个同步区间（不只是 end 当天）：每个标的从本次写入的最早日期起重算
+        written_from: dict[str, str] = {}
+        for b in bars:
+            c, d = b["ts_code"], b["trade_date"]
+            if c not in written_from or d < written_from[c]:
+                written_from[c] = d
+        zig_cleanup_result = _refresh_zig_signals(yyyyMMdd_to_dash(end), updated_codes, log, written_from=written_from)
+
+    result = {
+        "start": start,
+        "end": end,
+        "mode": "range",
+        "open_days": len(open_days),
+        "found": int(total_found),
+        "updated": int(total_updated),
+        "skipped": int(total_skipped),
+        "calls": int(calls),
+        "plan": plan,
+        "used_dates_uniq": used_dates,
+    }
+    if zig_cleanup_result:
+        result["zig_signals"] = {
+            "processed": zig_cleanup_result["processed_instruments"],
+            "deleted": zig_cleanup_result["deleted_signals"],
+            "generated": zig_cleanup_result["generated_signals"]
+        }
+    log.set_after(result)
+    return result
+
+
 def _save_price_bars(bars: list[dict], updated_codes: list[str]) -> tuple[int, int]:
     """
     保存价格数据并更新计数
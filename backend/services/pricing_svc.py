@@ -1,9 +1,27 @@
 from __future__ import annotations
 
+from ..jobs import report_progress
 from ..logs import OperationLogContext
 from .config_svc import get_config
 from ..providers.tushare_provider import TuShareProvider
-from .pricing_orchestrator import sync_prices as orchestrate
+from .pricing_orchestrator import sync_prices as orchestrate, sync_prices_range as orchestrate_range
+
+
+def _provider_from_config(cfg: dict, fund_rate_per_min: int | None = None) -> TuShareProvider | None:
+    """根据配置构造 TuShareProvider；未配置 token 时返回 None"""
+    token = cfg.get("tushare_token")
+    if not token:
+        return None
+
+    # 从配置读取默认速率限制
+    if fund_rate_per_min is None:
+        try:
+            v = int(cfg.get("tushare_fund_rate_per_min", 0) or 0)
+            fund_rate_per_min = v if v > 0 else None
+        except Exception:
+            fund_rate_per_min = None
+
+    return TuShareProvider(token, fund_rate_per_min=fund_rate_per_min)
 
 def sync_prices_tushare(
     trade_date: str,
@@ -27,34 +45,60 @@ def sync_prices_tushare(
         - updated: 更新的价格数据条数
         - skipped: 跳过的数据条数
         - reason: 跳过原因（如 no_token）
+        - fetch: 请求数、并发数、耗时与实际 calls/min
         
     说明：
         - 如果未配置 TuShare Token，将返回 reason='no_token' 并跳过同步
-        - 使用速率限制避免 API 调用过于频繁
+        - 使用速率限制避免 API 调用过于频繁（同类接口共享令牌桶，并发请求同样受限）
+        - 逐代码请求的并发数可由配置 tushare_fetch_workers 指定
         - 实际同步逻辑委托给 pricing_orchestrator 模块
     """
-    cfg = get_config()
-    token = cfg.get("tushare_token")
-    
-    if not token:
+    provider = _provider_from_config(get_config(), fund_rate_per_min)
+    if provider is None:
         info = {"date": trade_date, "found": 0, "updated": 0, "skipped": 0, "reason": "no_token"}
         log.set_after(info); log.write("DEBUG", "[sync_prices] no_token")
         return info
-    
-    # 从配置读取默认速率限制
-    if fund_rate_per_min is None:
-        try:
-            v = int(cfg.get("tushare_fund_rate_per_min", 0) or 0)
-            fund_rate_per_min = v if v > 0 else None
-        except Exception:
-            fund_rate_per_min = None
-    
-    provider = TuShareProvider(token, fund_rate_per_min=fund_rate_per_min)
-    return orchestrate(trade_date, provider, log, ts_codes)
+
+    try:
+        v = int(get_config().get("tushare_fetch_workers", 0) or 0)
+        max_workers = v if v > 0 else None
+    except Exception:
+        max_workers = None
+    return orchestrate(trade_date, provider, log, ts_codes, max_workers=max_workers)
+
+
+def sync_prices_tushare_range(
+    start_yyyymmdd: str,
+    end_yyyymmdd: str,
+    log: OperationLogContext,
+    ts_codes: list[str | None] = None,
+    fund_rate_per_min: int | None = None,
+) -> dict:
+    """
+    通过 TuShare API 区间同步 [start, end] 的价格数据（每个标的/交易日只取一次）
+
+    Args:
+        start_yyyymmdd: 开始日期，格式 YYYYMMDD
+        end_yyyymmdd: 结束日期，格式 YYYYMMDD
+        log: 日志上下文
+        ts_codes: 可选，指定要同步的标的代码列表
+        fund_rate_per_min: 可选，基金数据每分钟请求频率限制
+
+    Returns:
+        dict: 同步结果统计，见 pricing_orchestrator.sync_prices_range
+    """
+    provider = _provider_from_config(get_config(), fund_rate_per_min)
+    if provider is None:
+        info = {"start": start_yyyymmdd, "end": end_yyyymmdd, "found": 0, "updated": 0, "skipped": 0, "reason": "no_token"}
+        log.set_after(info); log.write("DEBUG", "[sync_prices_range] no_token")
+        return info
+
+    return orchestrate_range(start_yyyymmdd, end_yyyymmdd, provider, log, ts_codes)
 
 def find_missing_price_dates(
     lookback_days: int = 7,
-    ts_codes: list[str] = None
+    ts_codes: list[str] = None,
+    provider=None,
 ) -> dict[str, list[str]]:
     """
     查找过去N天中缺失价格数据的日期
@@ -62,15 +106,31 @@ def find_missing_price_dates(
     Args:
         lookback_days: 向前查找的天数，默认7天
         ts_codes: 可选，指定要检查的标的代码列表。为空时检查所有活跃标的
+        provider: 可选，行情源；给出时按需加载未覆盖年份的交易日历，
+            否则只用已缓存的日历（只读接口不应触发网络请求）
         
     Returns:
         dict: {date_yyyymmdd: [missing_ts_codes]}
     """
+    from datetime import datetime, timedelta
     from ..db import get_conn
     from ..repository import price_repo
-    
+    from .calendar_svc import ensure_calendar_for, get_calendar
+
+    # 候选日期：从昨天起往前 N 个日历日，剔除本地交易日历已知的休市日（未覆盖的日期保留）
+    today = datetime.now()
+    candidates = [(today - timedelta(days=i + 1)).strftime("%Y%m%d") for i in range(lookback_days)]
+    cal = None
+    if candidates and provider is None:
+        cal = get_calendar()
+    elif candidates:
+        cal = ensure_calendar_for(candidates[-1], provider)
+        if not cal.covers(candidates[0]):
+            cal = ensure_calendar_for(candidates[0], provider)
+    dates = [d for d in candidates if cal is None or cal.is_open(d) is not False]
+
     with get_conn() as conn:
-        return price_repo.find_missing_price_dates(conn, lookback_days, ts_codes)
+        return price_repo.find_missing_price_dates(conn, lookback_days, ts_codes, dates=dates)
 
 
 def sync_prices_enhanced(
@@ -92,6 +152,7 @@ def sync_prices_enhanced(
     from datetime import datetime
     from ..logs import OperationLogContext
     from .calc_svc import calc
+    from .signal_refresh_svc import deferred_signal_refresh
     
     log = OperationLogContext("SYNC_PRICES_ENHANCED")
     log.set_payload({
@@ -102,7 +163,7 @@ def sync_prices_enhanced(
     
     try:
         # 1. 查找缺失的价格数据
-        missing_by_date = find_missing_price_dates(lookback_days, ts_codes)
+        missing_by_date = find_missing_price_dates(lookback_days, ts_codes, _provider_from_config(get_config()))
         
         if not missing_by_date:
             result = {
@@ -121,26 +182,31 @@ def sync_prices_enhanced(
         all_results = []
         all_used_dates = set()
         
-        for date_yyyymmdd in sorted(missing_by_date.keys(), reverse=True):  # 从最近的日期开始
-            missing_codes = missing_by_date[date_yyyymmdd]
-            date_log = OperationLogContext(f"SYNC_ENHANCED_{date_yyyymmdd}")
-            
-            # 只同步缺失的标的
-            sync_result = sync_prices_tushare(date_yyyymmdd, date_log, missing_codes)
-            all_results.append({
-                "date": date_yyyymmdd,
-                "missing_codes_count": len(missing_codes),
-                **sync_result
-            })
-            
-            # 收集实际使用的日期
-            used_dates = sync_result.get("used_dates_uniq") or [date_yyyymmdd]
-            all_used_dates.update(used_dates)
+        # ZIG / 结构信号不再逐日刷新：全部日期同步完后按标的最早变动日合并刷新一次
+        with deferred_signal_refresh(log, structure=recalc) as refresh:
+            sync_dates = sorted(missing_by_date.keys(), reverse=True)  # 从最近的日期开始
+            for i, date_yyyymmdd in enumerate(sync_dates, 1):
+                missing_codes = missing_by_date[date_yyyymmdd]
+                date_log = OperationLogContext(f"SYNC_ENHANCED_{date_yyyymmdd}")
+                
+                # 只同步缺失的标的
+                sync_result = sync_prices_tushare(date_yyyymmdd, date_log, missing_codes)
+                all_results.append({
+                    "date": date_yyyymmdd,
+                    "missing_codes_count": len(missing_codes),
+                    **sync_result
+                })
+                
+                # 收集实际使用的日期
+                used_dates = sync_result.get("used_dates_uniq") or [date_yyyymmdd]
+                all_used_dates.update(used_dates)
+                report_progress(i, len(sync_dates), unit="dates", stage="sync")
         
-        # 3. 如果需要重算，对所有涉及的日期进行重算
-        if recalc:
+        # 3. 没有写入任何行情但要求重算时，按原口径对涉及日期逐日重算
+        if recalc and not refresh.since:
             recalc_dates = sorted(all_used_dates)
-            for date_dash in recalc_dates:
+            for i, date_dash in enumerate(recalc_dates, 1):
+                report_progress(i - 1, len(recalc_dates), unit="dates", stage="recalc")
                 try:
                     # 转换为YYYYMMDD格式进行重算
                     date_yyyymmdd = date_dash.replace("-", "")
@@ -164,6 +230,8 @@ def sync_prices_enhanced(
             "details": all_results,
             "recalc_performed": recalc
         }
+        if refresh.since:
+            result["signal_refresh"] = refresh.result
         
         log.set_after(result)
         log.write("OK")
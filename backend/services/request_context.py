@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+# backend/services/request_context.py
+"""
+请求级计算上下文：一次聚合请求内各板块共用的中间结果（持仓 × 最近价、配置、信号计数等）
+- 上下文持有一条连接并在其上开启读事务：所有共享结果来自同一个 WAL 快照
+- shared(key, fn) 在上下文内按 key 记忆 fn(conn) 的结果，同一请求只算一次；
+  不在上下文内时等价于借一条连接直接计算
+- 上下文经 contextvar 传递，aggregator 的板块线程通过 copy_context 继承
+- 共享结果会被多个板块读取，调用方不得修改返回值
+"""
+
+import contextvars
+import threading
+from contextlib import contextmanager
+from sqlite3 import Connection
+from typing import Any, Callable, Hashable, Iterator, TypeVar
+
+from ..db import get_conn
+
+T = TypeVar("T")
+
+
+class RequestContext:
+    """
+    一个请求内的共享读快照与记忆表
+    - 连接在第一次 shared() 时才借出；同一时刻只有一个线程使用它（RLock，嵌套 shared() 可重入）
+    - close() 时若仍有板块在计算（超时的板块线程），由该线程算完后归还连接
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._state = threading.Lock()    # 保护 _depth / _closed：归还连接只发生一次
+        self._memo: dict[Hashable, Any] = {}
+        self._conn_cm = None
+        self._conn: Connection | None = None
+        self._depth = 0
+        self._closed = False
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _connection(self) -> Connection:
+        if self._conn is None:
+            self._conn_cm = get_conn()
+            self._conn = self._conn_cm.__enter__()
+            self._conn.execute("BEGIN")
+        return self._conn
+
+    def _release(self):
+        if self._conn_cm is not None:
+            cm, self._conn_cm, self._conn = self._conn_cm, None, None
+            cm.__exit__(None, None, None)   # 归还连接池，读事务随之回滚
+
+    def get(self, key: Hashable, fn: Callable[[Connection], T]) -> T:
+        with self._lock:
+            if key in self._memo:
+                self.stats["hits"] += 1
+                return self._memo[key]
+            with self._state:
+                closed = self._closed
+                if not closed:
+                    self._depth += 1
+            if closed:
+                # 上下文已结束：不再记忆，也不再借用它的连接
+                with get_conn() as conn:
+                    return fn(conn)
+            self.stats["misses"] += 1
+            try:
+                value = fn(self._connection())
+            finally:
+                with self._state:
+                    self._depth -= 1
+                    release = self._closed and self._depth == 0
+                if release:
+                    self._release()
+            self._memo[key] = value
+            return value
+
+    def close(self):
+        with self._state:
+            self._closed = True
+            release = self._depth == 0
+        if release:
+            self._release()
+
+
+_current: contextvars.ContextVar[RequestContext | None] = contextvars.ContextVar("request_context", default=None)
+
+
+def current() -> RequestContext | None:
+    return _current.get()
+
+
+@contextmanager
+def request_context() -> Iterator[RequestContext]:
+    """进入请求级上下文；已在上下文中时沿用外层的（嵌套的聚合调用共享同一快照）"""
+    ctx = _current.get()
+    if ctx is not None:
+        yield ctx
+        return
+    ctx = RequestContext()
+    token = _current.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current.reset(token)
+        ctx.close()
+
+
+def shared(key: Hashable, fn: Callable[[Connection], T]) -> T:
+    """在请求级上下文内按 key 记忆 fn(conn)；无上下文时直接用一条新借出的连接计算"""
+    ctx = _current.get()
+    if ctx is None:
+        with get_conn() as conn:
+            return fn(conn)
+    return ctx.get(key, fn)
+
+
+def holdings(date_dash: str) -> list:
+    """指定日的活跃标的 × 持仓 × 最近收盘价（reporting_repo.active_instruments_with_pos_and_price）"""
+    from ..repository import reporting_repo
+
+    return shared(("holdings", date_dash),
+                  lambda conn: reporting_repo.active_instruments_with_pos_and_price(conn, date_dash))
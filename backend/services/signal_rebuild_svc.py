@@ -0,0 +1,255 @@
+"""
+多进程信号重建
+按标的分片交给 ProcessPoolExecutor 计算（工作进程只读连接、不写库），
+结果流回调用进程，由它作为唯一写入方按大事务批量删除/写入
+"""
+from __future__ import annotations
+
+import math
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from typing import Any
+
+from ..db import get_conn, get_db_path
+from ..jobs import report_progress
+from ..metrics import traced
+from ..repository import signal_repo, zig_state_repo
+
+# 写入方攒够这么多行再提交一次事务
+WRITE_BATCH_ROWS = 5000
+# 每个工作进程平均分到的分片数（分片越小结果回流越平滑）
+CHUNKS_PER_WORKER = 4
+
+_ACTIVE_CODES_SQL = """
+    SELECT DISTINCT p.ts_code
+    FROM price_eod p
+    JOIN instrument i ON p.ts_code = i.ts_code
+    WHERE i.active = 1 AND p.trade_date <= ?
+"""
+
+_worker_calendars: dict[str, Any] = {}
+
+
+def _ro_conn(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _worker_calendar(conn: sqlite3.Connection, db_path: str):
+    """工作进程内按库路径缓存交易日历索引"""
+    from ..domain.trade_calendar import TradingCalendar
+    from ..repository import calendar_repo
+
+    if db_path not in _worker_calendars:
+        try:
+            rows = calendar_repo.list_days(conn)
+        except sqlite3.OperationalError:
+            rows = []
+        _worker_calendars[db_path] = TradingCalendar((r["cal_date"], r["is_open"]) for r in rows)
+    return _worker_calendars[db_path]
+
+
+def _structure_chunk(db_path: str, codes: list[str], trade_dates: list[str], start_date: str) -> dict:
+    """工作进程：计算一个分片内各标的的结构信号（只读）"""
+    import numpy as np
+    from ..repository import price_repo
+    from .signal_svc import TdxStructureSignalGenerator
+
+    t0 = time.perf_counter()
+    conn = _ro_conn(db_path)
+    try:
+        series = price_repo.get_close_series_many(conn, codes, trade_dates[-1])
+        last_signal = signal_repo.last_structure_signal_dates_before(conn, start_date)
+        cal = _worker_calendar(conn, db_path)
+    finally:
+        conn.close()
+    day_arr = np.array(trade_dates)
+    rows = []
+    for ts_code in codes:
+        dates, closes = series[ts_code]
+        rows.extend(TdxStructureSignalGenerator.structure_rows_for_code(
+            ts_code, dates, closes, trade_dates, last_signal.get(ts_code), cal, day_arr
+        ))
+    return {"pid": os.getpid(), "codes": len(codes), "rows": rows, "states": [], "sec": time.perf_counter() - t0}
+
+
+def _zig_chunk(db_path: str, codes: list[str], start_date: str, end_date: str) -> dict:
+    """工作进程：整段历史重放一个分片内各标的的 ZIG 状态机（只读）"""
+    from ..repository import price_repo
+    from .signal_svc import TdxZigSignalGenerator
+
+    t0 = time.perf_counter()
+    conn = _ro_conn(db_path)
+    try:
+        series = price_repo.get_close_series_many(conn, codes, "9999-12-31")
+    finally:
+        conn.close()
+    rows, states = [], []
+    for ts_code in codes:
+        dates, closes = series[ts_code]
+        st, prev, signals = TdxZigSignalGenerator.zig_replay_code(dates, closes)
+        for d, typ in signals:
+            if start_date <= d <= end_date:
+                rows.append((d, ts_code, "HIGH", typ, TdxZigSignalGenerator._zig_message(ts_code, typ)))
+        if st["n"]:
+            states.append((ts_code, st, prev))
+    return {"pid": os.getpid(), "codes": len(codes), "rows": rows, "states": states, "sec": time.perf_counter() - t0}
+
+
+def _chunks(codes: list[str], workers: int) -> list[list[str]]:
+    size = max(1, math.ceil(len(codes) / (workers * CHUNKS_PER_WORKER)))
+    return [codes[i:i + size] for i in range(0, len(codes), size)]
+
+
+def _run_pool(fn, chunks: list[list[str]], args: tuple, workers: int, write) -> dict:
+    """
+    分片并行计算，结果在调用进程中依次交给 write(rows, states)
+
+    Returns:
+        {"per_worker": [每个工作进程的分片数/标的数/信号数/耗时/吞吐], "elapsed_sec": 总耗时}
+    """
+    t0 = time.perf_counter()
+    per_worker: dict[int, dict] = {}
+    pending_rows: list = []
+    pending_states: list = []
+    total_codes = sum(len(c) for c in chunks)
+    done_codes = 0
+
+    def _flush():
+        nonlocal pending_rows, pending_states
+        if pending_rows or pending_states:
+            write(pending_rows, pending_states)
+            pending_rows, pending_states = [], []
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+        futures = [pool.submit(fn, get_db_path(), chunk, *args) for chunk in chunks]
+        for fut in as_completed(futures):
+            res = fut.result()
+            w = per_worker.setdefault(res["pid"], {"chunks": 0, "codes": 0, "signals": 0, "busy_sec": 0.0})
+            w["chunks"] += 1
+            w["codes"] += res["codes"]
+            w["signals"] += len(res["rows"])
+            w["busy_sec"] += res["sec"]
+            done_codes += res["codes"]
+            report_progress(done_codes, total_codes, unit="codes")
+            pending_rows.extend(res["rows"])
+            pending_states.extend(res["states"])
+            if len(pending_rows) + len(pending_states) >= WRITE_BATCH_ROWS:
+                _flush()
+    _flush()
+
+    workers_out = []
+    for pid, w in sorted(per_worker.items()):
+        workers_out.append({
+            "pid": pid,
+            **w,
+            "busy_sec": round(w["busy_sec"], 3),
+            "codes_per_sec": round(w["codes"] / w["busy_sec"], 1) if w["busy_sec"] > 0 else None,
+        })
+    return {"per_worker": workers_out, "elapsed_sec": round(time.perf_counter() - t0, 3)}
+
+
+@traced("signal")
+def rebuild_structure_signals_parallel(start_date: str, end_date: str, workers: int) -> dict[str, Any]:
+    """
+    多进程重建区间内的结构信号，结果与单进程 rebuild_structure_signals_for_period 一致
+
+    Args:
+        start_date: 开始日期 YYYY-MM-DD
+        end_date: 结束日期 YYYY-MM-DD
+        workers: 工作进程数
+    """
+    with get_conn() as conn:
+        conn.execute("""
+            DELETE FROM signal
+            WHERE type IN ('BUY_STRUCTURE', 'SELL_STRUCTURE')
+            AND trade_date BETWEEN ? AND ?
+        """, (start_date, end_date))
+        trade_dates = [r[0] for r in conn.execute("""
+            SELECT DISTINCT trade_date FROM price_eod
+            WHERE trade_date BETWEEN ? AND ?
+            ORDER BY trade_date
+        """, (start_date, end_date)).fetchall()]
+        codes = [r[0] for r in conn.execute(_ACTIVE_CODES_SQL, (end_date,)).fetchall()] if trade_dates else []
+
+    total = 0
+
+    def _write(rows, _states):
+        nonlocal total
+        rows.sort(key=lambda r: (r[0], r[1]))
+        with get_conn() as conn:
+            total += signal_repo.insert_instrument_signals_many(conn, rows)
+
+    stats = {"per_worker": [], "elapsed_sec": 0.0}
+    if codes:
+        stats = _run_pool(_structure_chunk, _chunks(codes, workers), (trade_dates, start_date), workers, _write)
+
+    return {
+        "processed_dates": len(trade_dates),
+        "total_signals": total,
+        "date_range": f"{start_date} ~ {end_date}",
+        "engine": "parallel",
+        "workers": workers,
+        "instruments": len(codes),
+        **stats,
+    }
+
+
+@traced("signal")
+def rebuild_zig_signals_parallel(start_date: str, end_date: str, ts_codes: list[str] | None, workers: int) -> dict[str, Any]:
+    """
+    多进程重建区间内的 ZIG 信号并刷新 ZIG 状态，结果与 rebuild_zig_signals_for_period 一致
+
+    Args:
+        start_date: YYYY-MM-DD
+        end_date: YYYY-MM-DD
+        ts_codes: 可选，仅重建这些 ts_code
+        workers: 工作进程数
+    """
+    with get_conn() as conn:
+        params: list[Any] = [start_date, end_date]
+        where = "trade_date BETWEEN ? AND ? AND type IN ('ZIG_BUY','ZIG_SELL')"
+        if ts_codes:
+            placeholders = ",".join(["?"] * len(ts_codes))
+            where += f" AND ts_code IN ({placeholders})"
+            params.extend(ts_codes)
+        deleted = conn.execute(f"DELETE FROM signal WHERE {where}", params).rowcount
+        processed_dates = conn.execute(
+            "SELECT COUNT(DISTINCT trade_date) FROM price_eod WHERE trade_date BETWEEN ? AND ?",
+            (start_date, end_date),
+        ).fetchone()[0]
+        codes = list(ts_codes) if ts_codes else [r[0] for r in conn.execute(_ACTIVE_CODES_SQL, (end_date,)).fetchall()]
+
+    total = 0
+
+    def _write(rows, states):
+        nonlocal total
+        rows.sort(key=lambda r: (r[0], r[1]))
+        with get_conn() as conn:
+            conn.execute("BEGIN")
+            try:
+                total += signal_repo.insert_instrument_signals_many(conn, rows)
+                zig_state_repo.upsert_states(conn, states)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    stats = {"per_worker": [], "elapsed_sec": 0.0}
+    if codes:
+        stats = _run_pool(_zig_chunk, _chunks(codes, workers), (start_date, end_date), workers, _write)
+
+    return {
+        "deleted_signals": deleted,
+        "generated_signals": total,
+        "processed_dates": processed_dates,
+        "date_range": f"{start_date} ~ {end_date}",
+        "ts_codes": ts_codes or "ALL",
+        "engine": "parallel",
+        "workers": workers,
+        **stats,
+    }
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+# backend/services/signal_refresh_svc.py
+"""
+价格同步后的延迟信号刷新：一个同步批次（多日回补、缺失补齐）结束时合并刷新一次
+- 批次内各次写入只登记 {标的: 最早变动日}，不再逐日刷新 ZIG、逐日全市场 calc
+- 批次结束时：ZIG 按合并后的最早变动日对每个标的增量推进 / 全量重算一次；
+  需要重算（recalc）时结构信号按标的从最早变动日起单次遍历重建
+- 批次经 contextvar 传递；嵌套的批次沿用外层的，只在最外层结束时刷新
+- 刷新的标的以变更集（dirty_set）为准：内容未变的重复同步不触发刷新，其它写入路径的变更一并处理
+"""
+
+import contextvars
+import logging
+from contextlib import contextmanager
+from typing import Iterator
+
+from ..db import get_conn
+from ..jobs import report_progress
+from ..logs import OperationLogContext
+from ..repository import dirty_repo
+
+logger = logging.getLogger(__name__)
+
+ZIG_DIRTY_TABLES = ("price_eod", "instrument")
+STRUCTURE_DIRTY_TABLES = ("price_eod", "instrument")
+
+
+def dirty_targets(consumer: str, tables: tuple[str, ...], since: dict[str, str]) -> dict[str, str]:
+    """
+    取出 consumer 的变更集作为待刷新的 {标的: 最早变动日}；
+    consumer 首次使用（尚无游标）时沿用调用方登记的 since
+    """
+    with get_conn() as conn:
+        dirty = dirty_repo.take(conn, consumer, tables)
+    return dict(since) if dirty is None else dirty
+
+
+class SignalRefreshBatch:
+    """一个同步批次内累积的待刷新标的"""
+
+    def __init__(self, structure: bool = False):
+        self.structure = structure
+        self.since: dict[str, str] = {}     # ts_code -> 最早变动日 YYYY-MM-DD
+        self.as_of: str | None = None       # 批次内最晚的同步日 YYYY-MM-DD
+        self.result: dict | None = None
+
+    def add(self, date_dash: str, codes: list[str], written_from: dict[str, str] | None = None):
+        written_from = written_from or {}
+        for code in codes:
+            d = written_from.get(code) or date_dash
+            if code not in self.since or d < self.since[code]:
+                self.since[code] = d
+        if self.as_of is None or date_dash > self.as_of:
+            self.as_of = date_dash
+
+    def flush(self, log: OperationLogContext) -> dict:
+        """刷新累积的标的；失败只记日志（价格已入库，可再次同步或手动重建）"""
+        from .signal_svc import TdxStructureSignalGenerator, TdxZigSignalGenerator
+
+        out: dict = {"codes": len(self.since)}
+        if not self.since:
+            return out
+        steps = 2 if self.structure else 1
+        report_progress(0, steps, unit="steps", stage="signals")
+        zig_since = self.since
+        try:
+            zig_since = dirty_targets("zig", ZIG_DIRTY_TABLES, self.since)
+            if zig_since:
+                res = TdxZigSignalGenerator.update_zig_signals_incremental(self.as_of, sorted(zig_since), written_from=zig_since)
+                out["zig_signals"] = {
+                    "processed": res["processed_instruments"],
+                    "deleted": res["deleted_signals"],
+                    "generated": res["generated_signals"],
+                    "incremental": res.get("incremental"),
+                    "full_recompute": res.get("full_recompute"),
+                }
+        except Exception as e:
+            logger.error(f"ZIG信号刷新时发生错误: {e}")
+            log.write("ERROR", f"ZIG信号刷新失败: {e}")
+            out["zig_error"] = str(e)
+        report_progress(1, steps, unit="steps", stage="signals")
+        if self.structure:
+            # 结构信号替代逐日 calc，同时消费 calc 的变更集
+            try:
+                structure_since = dirty_targets("calc", STRUCTURE_DIRTY_TABLES, self.since)
+                if structure_since:
+                    out["structure_signals"] = TdxStructureSignalGenerator.rebuild_structure_signals_for_codes(structure_since)
+            except Exception as e:
+                logger.error(f"结构信号重建时发生错误: {e}")
+                log.write("ERROR", f"结构信号重建失败: {e}")
+                out["structure_error"] = str(e)
+            report_progress(2, 2, unit="steps", stage="signals")
+        out["codes"] = len(zig_since)
+        if zig_since:
+            out["since"] = min(zig_since.values())
+        return out
+
+
+_current: contextvars.ContextVar[SignalRefreshBatch | None] = contextvars.ContextVar("signal_refresh", default=None)
+
+
+def defer(date_dash: str, codes: list[str], written_from: dict[str, str] | None = None) -> bool:
+    """在批次内时登记待刷新的标的并返回 True；不在批次内返回 False（调用方立即刷新）"""
+    batch = _current.get()
+    if batch is None:
+        return False
+    batch.add(date_dash, codes, written_from)
+    return True
+
+
+@contextmanager
+def deferred_signal_refresh(log: OperationLogContext | None = None, structure: bool = False) -> Iterator[SignalRefreshBatch]:
+    """
+    进入延迟信号刷新批次；退出时合并刷新，结果见 batch.result
+
+    Args:
+        log: 刷新失败时写入的日志上下文，默认新建 SIGNAL_REFRESH
+        structure: 是否同时重建结构信号（替代批次后逐日 calc）
+    """
+    outer = _current.get()
+    if outer is not None:
+        outer.structure = outer.structure or structure
+        yield outer
+        return
+    batch = SignalRefreshBatch(structure)
+    token = _current.set(batch)
+    try:
+        yield batch
+    finally:
+        # 同步中途失败时已入库的价格同样需要刷新信号
+        _current.reset(token)
+        batch.result = batch.flush(log or OperationLogContext("SIGNAL_REFRESH"))
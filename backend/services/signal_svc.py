@@ -7,10 +7,26 @@ from __future__ import annotations
 
 from typing import Any
 from ..db import get_conn
+from ..jobs import report_progress
+from ..metrics import traced
 from ..repository import signal_repo
+from . import request_context
 from .utils import yyyyMMdd_to_dash
 
 
+def load_close_window(conn, trade_date: str, n: int, ts_codes: list[str] | None = None):
+    """
+    一次窗口查询加载全部活跃标的（或指定标的）截至 trade_date 的最近 n 根收盘价
+
+    Returns:
+        CloseWindow: codes / closes 矩阵（右对齐，左侧 NaN 填充）/ counts
+    """
+    from ..domain.price_window import CloseWindow
+    from ..repository import price_repo
+
+    return CloseWindow.from_rows(price_repo.get_trailing_closes_many(conn, trade_date, n, ts_codes), n)
+
+
 class SignalService:
     """信号业务服务"""
 
@@ -165,15 +181,16 @@ class SignalService:
         Returns:
             各信号类型的数量字典
         """
-        with get_conn() as conn:
-            return signal_repo.get_signal_counts_by_date(conn, trade_date)
+        return request_context.shared(("signal_counts", trade_date),
+                                      lambda conn: signal_repo.get_signal_counts_by_date(conn, trade_date))
 
 
 class SignalGenerationService:
     """信号生成业务服务"""
 
     @staticmethod
-    def generate_current_signals(positions_df, trade_date: str = None):
+    @traced("signal")
+    def generate_current_signals(positions_df, trade_date: str = None, ts_codes: list[str] | None = None):
         """
         为当前持仓生成信号（用于日常计算）
         
@@ -182,6 +199,7 @@ class SignalGenerationService:
         Args:
             positions_df: 持仓数据DataFrame
             trade_date: 交易日期 (YYYY-MM-DD格式)，如果不提供则使用当前日期
+            ts_codes: 可选，只为这些标的生成（变更集中的标的）；为空时处理所有活跃标的
         """
         # 如果没有提供交易日期，使用当前日期
         if trade_date is None:
@@ -190,20 +208,23 @@ class SignalGenerationService:
         
         # 生成结构信号（九转买入/九转卖出）
         try:
-            signal_count, signal_instruments = TdxStructureSignalGenerator.generate_structure_signals_for_date(trade_date)
+            signal_count, signal_instruments = TdxStructureSignalGenerator.generate_structure_signals_for_date(trade_date, ts_codes)
             if signal_count > 0:
                 print(f"生成了 {signal_count} 个结构信号: {', '.join(signal_instruments)}")
         except Exception as e:
             print(f"生成结构信号时发生错误: {str(e)}")
     
     @staticmethod
-    def rebuild_structure_signals_for_period(start_date: str, end_date: str) -> dict[str, Any]:
+    @traced("signal")
+    def rebuild_structure_signals_for_period(start_date: str, end_date: str, engine: str = "vector") -> dict[str, Any]:
         """
         重建指定时间段内的结构信号
         
         Args:
             start_date: 开始日期 YYYY-MM-DD
             end_date: 结束日期 YYYY-MM-DD
+            engine: "vector" 单次加载全部收盘价、NumPy 计算后批量写入（默认）；
+                    "per_day" 逐日逐标的调用 generate_structure_signals_for_date（旧路径，用于对照）
             
         Returns:
             重建结果统计
@@ -227,19 +248,32 @@ class SignalGenerationService:
             
             total_signals = 0
             processed_dates = 0
+
+            if engine == "vector":
+                total_signals = TdxStructureSignalGenerator.rebuild_structure_signals_single_pass(
+                    conn, [d for (d,) in trade_dates], start_date, end_date
+                )
+                return {
+                    "processed_dates": len(trade_dates),
+                    "total_signals": total_signals,
+                    "date_range": f"{start_date} ~ {end_date}",
+                    "engine": engine,
+                }
             
-            for (trade_date,) in trade_dates:
+            for i, (trade_date,) in enumerate(trade_dates, 1):
                 try:
                     signal_count, _ = TdxStructureSignalGenerator.generate_structure_signals_for_date(trade_date)
                     total_signals += signal_count
                     processed_dates += 1
                 except Exception as e:
                     print(f"处理日期 {trade_date} 时发生错误: {str(e)}")
+                report_progress(i, len(trade_dates), unit="dates", stage="structure")
             
             return {
                 "processed_dates": processed_dates,
                 "total_signals": total_signals,
-                "date_range": f"{start_date} ~ {end_date}"
+                "date_range": f"{start_date} ~ {end_date}",
+                "engine": engine,
             }
 
 
@@ -402,32 +436,38 @@ class TdxStructureSignalGenerator:
         return False
 
     @staticmethod
-    def generate_structure_signals_for_date(trade_date: str) -> tuple[int, list[str]]:
+    @traced("signal")
+    def generate_structure_signals_for_date(trade_date: str, ts_codes: list[str] | None = None) -> tuple[int, list[str]]:
         """
-        为指定日期生成所有标的的结构信号
+        为指定日期生成所有标的（或指定标的）的结构信号
         
         Args:
             trade_date: 交易日期 YYYY-MM-DD
+            ts_codes: 可选，指定标的（只处理其中的活跃标的）；为空时处理所有活跃标的
             
         Returns:
             (信号数量, 信号标的列表)
         """
+        from ..domain.structure_signals import structure_flags
+
         with get_conn() as conn:
-            # 获取所有有价格数据的活跃标的
-            instruments = conn.execute("""
-                SELECT DISTINCT p.ts_code 
-                FROM price_eod p
-                JOIN instrument i ON p.ts_code = i.ts_code 
-                WHERE i.active = 1 AND p.trade_date <= ?
-            """, (trade_date,)).fetchall()
+            if ts_codes is not None:
+                active = {r[0] for r in conn.execute("SELECT ts_code FROM instrument WHERE active = 1").fetchall()}
+                ts_codes = [c for c in ts_codes if c in active]
+                if not ts_codes:
+                    return 0, []
+            # 一次窗口查询取回所有活跃标的（或指定标的）最近30根收盘价
+            window = load_close_window(conn, trade_date, 30, ts_codes)
             
             signal_count = 0
             signal_instruments = []
             
-            for (ts_code,) in instruments:
-                buy_signal, sell_signal = TdxStructureSignalGenerator.calculate_structure_signals(
-                    ts_code, trade_date
-                )
+            for i, ts_code in enumerate(window.codes):
+                closes = window.series(i)
+                if len(closes) < 15:  # 至少需要15天数据
+                    continue
+                buy_flags, sell_flags = structure_flags(closes)
+                buy_signal, sell_signal = bool(buy_flags[-1]), bool(sell_flags[-1])
                 
                 if buy_signal:
                     sid = signal_repo.insert_signal_if_no_recent_structure(
@@ -461,6 +501,161 @@ class TdxStructureSignalGenerator:
             return signal_count, signal_instruments
 
 
+    @staticmethod
+    def structure_rows_for_code(ts_code: str, dates: list[str], closes: list, trade_dates: list[str],
+                                prev: str | None, cal, day_arr=None) -> list[tuple[str, str, str, str, str]]:
+        """
+        单个标的在各重建日的结构信号（含 9 个交易日抑制规则），纯计算不读写数据库
+
+        Args:
+            ts_code: 标的代码
+            dates / closes: 该标的截至区间末日的全部 K 线（正序）
+            trade_dates: 重建日 YYYY-MM-DD（升序）
+            prev: 区间开始前最近一次结构信号日期
+            cal: 交易日历索引
+
+        Returns:
+            [(trade_date, ts_code, level, type, message), ...]
+        """
+        import numpy as np
+        from ..domain.structure_signals import structure_flags
+
+        days_back = 9
+        if len(dates) < 15 or not trade_dates:
+            return []
+        if day_arr is None:
+            day_arr = np.array(trade_dates)
+        buy, sell = structure_flags([np.nan if c is None else float(c) for c in closes])
+        # 每个重建日对应该标的当日或之前最近一根 K 线（与逐日路径 trade_date <= ? 的取数一致）
+        pos = np.searchsorted(np.array(dates), day_arr, side="right") - 1
+        hit = (pos >= 0) & (buy[pos.clip(0)] | sell[pos.clip(0)])
+        rows = []
+        for k in np.flatnonzero(hit):
+            d, t = trade_dates[k], int(pos[k])
+            window_start = cal.n_trading_days_back(d, days_back - 1) or dates[max(0, t - (days_back - 1))]
+            if prev is not None and prev >= window_start:
+                continue
+            if buy[t]:
+                rows.append((d, ts_code, "HIGH", "BUY_STRUCTURE", f"{ts_code} 九转买入信号触发"))
+            else:
+                rows.append((d, ts_code, "HIGH", "SELL_STRUCTURE", f"{ts_code} 九转卖出信号触发"))
+            prev = d
+        return rows
+
+    @staticmethod
+    def rebuild_structure_signals_single_pass(conn, trade_dates: list[str], start_date: str, end_date: str) -> int:
+        """
+        单次遍历重建结构信号，结果与逐日调用 generate_structure_signals_for_date 一致
+
+        - 每个标的的收盘价序列只读取一次，NumPy 一次算出所有日期的九转买入/卖出
+        - 9 个交易日内不重复的抑制规则在内存中按日期顺序判定
+        - 全部信号一次批量写入
+
+        Args:
+            conn: 数据库连接（调用方已删除区间内旧的结构信号）
+            trade_dates: 需要生成信号的日期 YYYY-MM-DD（升序）
+            start_date: 区间开始日期 YYYY-MM-DD
+            end_date: 区间结束日期 YYYY-MM-DD
+
+        Returns:
+            生成的信号数量
+        """
+        import numpy as np
+        from ..repository import price_repo
+        from .calendar_svc import get_calendar
+
+        if not trade_dates:
+            return 0
+        codes = [r[0] for r in conn.execute("""
+            SELECT DISTINCT p.ts_code
+            FROM price_eod p
+            JOIN instrument i ON p.ts_code = i.ts_code
+            WHERE i.active = 1 AND p.trade_date <= ?
+        """, (trade_dates[-1],)).fetchall()]
+        series = price_repo.get_close_series_many(conn, codes, trade_dates[-1])
+        last_signal = signal_repo.last_structure_signal_dates_before(conn, start_date)
+        cal = get_calendar()
+        day_arr = np.array(trade_dates)
+
+        rows: list[tuple[str, str, str, str, str]] = []
+        for ts_code in codes:
+            dates, closes = series[ts_code]
+            rows.extend(TdxStructureSignalGenerator.structure_rows_for_code(
+                ts_code, dates, closes, trade_dates, last_signal.get(ts_code), cal, day_arr
+            ))
+
+        rows.sort(key=lambda r: (r[0], r[1]))
+        return signal_repo.insert_instrument_signals_many(conn, rows)
+
+    @staticmethod
+    @traced("signal")
+    def rebuild_structure_signals_for_codes(since_by_code: dict[str, str]) -> dict[str, Any]:
+        """
+        按标的从最早变动日起重建结构信号（价格回补后的合并重算，替代逐日 calc）
+
+        每个标的删除自变动日起的结构信号，再用单次遍历算法重算变动日至最新交易日的全部信号；
+        结果与对这些日期逐日调用 generate_structure_signals_for_date 一致
+
+        Args:
+            since_by_code: {ts_code: 最早变动日期 YYYY-MM-DD}
+
+        Returns:
+            {"codes": 重算标的数, "dates": 涉及交易日数, "deleted": 删除数, "generated": 生成数}
+        """
+        from bisect import bisect_left
+        from ..repository import price_repo
+        from .calendar_svc import get_calendar
+
+        out = {"codes": 0, "dates": 0, "deleted": 0, "generated": 0}
+        if not since_by_code:
+            return out
+        with get_conn() as conn:
+            placeholders = ",".join("?" for _ in since_by_code)
+            active = {r[0] for r in conn.execute(
+                f"SELECT ts_code FROM instrument WHERE active = 1 AND ts_code IN ({placeholders})",
+                list(since_by_code),
+            ).fetchall()}
+            dirty = {c: d for c, d in since_by_code.items() if c in active}
+            if not dirty:
+                return out
+            start = min(dirty.values())
+            trade_dates = [r[0] for r in conn.execute(
+                "SELECT DISTINCT trade_date FROM price_eod WHERE trade_date >= ? ORDER BY trade_date", (start,)
+            ).fetchall()]
+            if not trade_dates:
+                return out
+            series = price_repo.get_close_series_many(conn, sorted(dirty), trade_dates[-1])
+            # 9 个交易日抑制规则需要各标的变动日之前最近一次结构信号
+            last_signal: dict[str, str | None] = {}
+            for since in set(dirty.values()):
+                before = signal_repo.last_structure_signal_dates_before(conn, since)
+                for c, d in dirty.items():
+                    if d == since:
+                        last_signal[c] = before.get(c)
+            cal = get_calendar()
+
+            rows: list[tuple[str, str, str, str, str]] = []
+            for ts_code, since in sorted(dirty.items()):
+                days = trade_dates[bisect_left(trade_dates, since):]
+                dates, closes = series[ts_code]
+                rows.extend(TdxStructureSignalGenerator.structure_rows_for_code(
+                    ts_code, dates, closes, days, last_signal.get(ts_code), cal
+                ))
+            rows.sort(key=lambda r: (r[0], r[1]))
+
+            conn.execute("BEGIN")
+            try:
+                out["deleted"] = signal_repo.delete_structure_signals_since(conn, dirty)
+                out["generated"] = signal_repo.insert_instrument_signals_many(conn, rows)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        out["codes"] = len(dirty)
+        out["dates"] = len(trade_dates)
+        return out
+
+
 class TdxZigSignalGenerator:
     """通达信ZIG信号生成器 - 基于之字转向指标的买入/卖出信号判断"""
 
@@ -661,200 +856,25 @@ class TdxZigSignalGenerator:
             # 使用repository方法获取价格数据（前60天确保有足够数据计算）
             price_data = price_repo.get_price_closes_for_signal(conn, ts_code, trade_date, days=60)
             
-            if len(price_data) < 10:  # 至少需要10天数据
-                return False, False
-            
             # 转换为按日期正序排列，最新数据在最后
             price_data.reverse()
             closes = [float(row[1]) for row in price_data]
-            
+            if len(closes) < 10:  # 至少需要10天数据
+                return False, False
+
             # 计算ZIG指标
             zig_values = TdxZigSignalGenerator.calculate_zig_indicator(closes, turn_percent=10.0)
-            
-            # 检测信号
-            buy_signal, sell_signal = TdxZigSignalGenerator.detect_zig_signals(zig_values)
-            
-            return buy_signal, sell_signal
-
-    @staticmethod
-    def _insert_or_replace_zig_signal(
-        conn,
-        ts_code: str,
-        trade_date: str,
-        signal_type: str,
-        message: str,
-        level: str = "HIGH",
-    ) -> tuple[bool, int | None]:
-        """插入ZIG信号，若上一个信号同类型则替换掉旧记录。"""
-
-        replaced = False
-
-        # 先清理相同日期的同类信号，避免重复
-        conn.execute(
-            "DELETE FROM signal WHERE ts_code=? AND type=? AND trade_date=?",
-            (ts_code, signal_type, trade_date),
-        )
-
-        last = signal_repo.get_last_signal_of_types(
-            conn,
-            ts_code,
-            ["ZIG_BUY", "ZIG_SELL"],
-            before_date=trade_date,
-        )
-
-        if last and last.get("type") == signal_type:
-            signal_repo.delete_signal_by_id(conn, int(last["id"]))
-            replaced = True
-
-        sid = signal_repo.insert_signal_if_no_recent_structure(
-            conn,
-            trade_date,
-            ts_code=ts_code,
-            level=level,
-            signal_type=signal_type,
-            message=message,
-            days_back=5,
-        )
-
-        if sid is None:
-            # 插入失败一般意味着仍存在重复，直接强制插入覆盖
-            sid = signal_repo.insert_signal(
-                conn,
-                trade_date,
-                ts_code=ts_code,
-                level=level,
-                signal_type=signal_type,
-                message=message,
-            )
-
-        return replaced, sid
-
-    @staticmethod
-    def generate_zig_signals_for_date(trade_date: str) -> tuple[int, list[str]]:
-        """
-        为指定日期生成所有标的的ZIG信号
-        
-        Args:
-            trade_date: 交易日期 YYYY-MM-DD
-            
-        Returns:
-            (信号数量, 信号标的列表)
-        """
-        with get_conn() as conn:
-            # 获取所有有价格数据的活跃标的
-            instruments = conn.execute("""
-                SELECT DISTINCT p.ts_code 
-                FROM price_eod p
-                JOIN instrument i ON p.ts_code = i.ts_code 
-                WHERE i.active = 1 AND p.trade_date <= ?
-            """, (trade_date,)).fetchall()
-            
-            signal_count = 0
-            signal_instruments = []
-            
-            for (ts_code,) in instruments:
-                buy_signal, sell_signal = TdxZigSignalGenerator.calculate_zig_signals(
-                    ts_code, trade_date
-                )
-
-                if buy_signal:
-                    _, sid = TdxZigSignalGenerator._insert_or_replace_zig_signal(
-                        conn,
-                        ts_code,
-                        trade_date,
-                        "ZIG_BUY",
-                        message=f"{ts_code} ZIG买入信号触发",
-                    )
-                    if sid:
-                        signal_count += 1
-                        signal_instruments.append(f"{ts_code}(ZIG买入)")
-
-                if sell_signal:
-                    _, sid = TdxZigSignalGenerator._insert_or_replace_zig_signal(
-                        conn,
-                        ts_code,
-                        trade_date,
-                        "ZIG_SELL",
-                        message=f"{ts_code} ZIG卖出信号触发",
-                    )
-                    if sid:
-                        signal_count += 1
-                        signal_instruments.append(f"{ts_code}(ZIG卖出)")
-            
-            conn.commit()
-            return signal_count, signal_instruments
-
-    @staticmethod
-    def generate_zig_signals_for_date_with_guard(trade_date: str, min_delete_date: str | None = None,
-                                                 ts_codes: list[str] | None = None) -> tuple[int, list[str]]:
-        """
-        与 generate_zig_signals_for_date 类似，并在检测到重复买/卖点时强制替换旧信号。
-        min_delete_date 参数保留向后兼容，但当前替换逻辑总是生效以符合通达信行为。
-
-        Args:
-            trade_date: YYYY-MM-DD
-            min_delete_date: 允许删除的最早日期（含）。None 表示不限
-            ts_codes: 可选，仅处理这些标的
-
-        Returns:
-            (生成的数量, 标的列表说明)
-        """
-        from ..repository import signal_repo
-        from ..db import get_conn
-
-        with get_conn() as conn:
-            if ts_codes:
-                instruments = [(c,) for c in sorted(set(ts_codes))]
-            else:
-                instruments = conn.execute(
-                    """
-                    SELECT DISTINCT p.ts_code
-                    FROM price_eod p
-                    JOIN instrument i ON p.ts_code = i.ts_code
-                    WHERE i.active = 1 AND p.trade_date <= ?
-                    """,
-                    (trade_date,),
-                ).fetchall()
-
-            signal_count = 0
-            signal_instruments: list[str] = []
-
-            for (ts_code,) in instruments:
-                buy_signal, sell_signal = TdxZigSignalGenerator.calculate_zig_signals(ts_code, trade_date)
-
-                if buy_signal:
-                    _, sid = TdxZigSignalGenerator._insert_or_replace_zig_signal(
-                        conn,
-                        ts_code,
-                        trade_date,
-                        "ZIG_BUY",
-                        message=f"{ts_code} ZIG买入信号触发",
-                    )
-                    if sid:
-                        signal_count += 1
-                        signal_instruments.append(f"{ts_code}(ZIG买入)")
-
-                if sell_signal:
-                    _, sid = TdxZigSignalGenerator._insert_or_replace_zig_signal(
-                        conn,
-                        ts_code,
-                        trade_date,
-                        "ZIG_SELL",
-                        message=f"{ts_code} ZIG卖出信号触发",
-                    )
-                    if sid:
-                        signal_count += 1
-                        signal_instruments.append(f"{ts_code}(ZIG卖出)")
 
-            conn.commit()
-            return signal_count, signal_instruments
+            # 检测信号
+            return TdxZigSignalGenerator.detect_zig_signals(zig_values)
 
     @staticmethod
+    @traced("signal")
     def rebuild_zig_signals_for_period(start_date: str, end_date: str, ts_codes: list[str] | None = None) -> dict[str, Any]:
         """
         重建指定时间段内的 ZIG 信号：
         1) 删除区间内（且可选限定标的）的 ZIG_BUY / ZIG_SELL
-        2) 按交易日顺序逐日重新生成，新的买/卖点会替换旧的同类信号
+        2) 每个标的整段历史重放一次 ZIG 状态机，写回区间内的信号
 
         Args:
             start_date: YYYY-MM-DD
@@ -878,25 +898,20 @@ class TdxZigSignalGenerator:
             deleted = conn.execute(f"DELETE FROM signal WHERE {where}", params).rowcount
             conn.commit()
 
-            # 交易日序列
-            date_rows = conn.execute(
-                """
-                SELECT DISTINCT trade_date FROM price_eod
-                WHERE trade_date BETWEEN ? AND ?
-                ORDER BY trade_date ASC
-                """,
+            # 每个标的整段历史重放一次 ZIG 状态机，取区间内的信号，并刷新持久化状态
+            processed_dates = conn.execute(
+                "SELECT COUNT(DISTINCT trade_date) FROM price_eod WHERE trade_date BETWEEN ? AND ?",
                 (start_date, end_date),
-            ).fetchall()
-
-            total_gen = 0
-            processed_dates = 0
-
-            for (d,) in date_rows:
-                cnt, _ = TdxZigSignalGenerator.generate_zig_signals_for_date_with_guard(
-                    d, min_delete_date=start_date, ts_codes=ts_codes
-                )
-                total_gen += cnt
-                processed_dates += 1
+            ).fetchone()[0]
+            codes = list(ts_codes) if ts_codes else [r[0] for r in conn.execute("""
+                SELECT DISTINCT p.ts_code
+                FROM price_eod p
+                JOIN instrument i ON p.ts_code = i.ts_code
+                WHERE i.active = 1 AND p.trade_date <= ?
+            """, (end_date,)).fetchall()]
+            total_gen = TdxZigSignalGenerator._replay_zig_states(
+                conn, codes, keep_signals=lambda d: start_date <= d <= end_date
+            )["generated"]
 
             return {
                 "deleted_signals": deleted,
@@ -906,6 +921,191 @@ class TdxZigSignalGenerator:
                 "ts_codes": ts_codes or "ALL",
             }
     
+    @staticmethod
+    def _zig_message(ts_code: str, signal_type: str) -> str:
+        return f"{ts_code} ZIG买入信号触发" if signal_type == "ZIG_BUY" else f"{ts_code} ZIG卖出信号触发"
+
+    @staticmethod
+    def zig_replay_code(dates: list[str], closes: list) -> tuple[dict, dict | None, list[tuple[str, str]]]:
+        """单个标的整段历史重放 ZIG 状态机：(状态, 上一根 K 线时的状态, 全部信号)，纯计算"""
+        from ..domain import zig_state
+
+        return zig_state.replay((d, c) for d, c in zip(dates, closes) if c is not None)
+
+    @staticmethod
+    def _replay_zig_states(conn, ts_codes: list[str], keep_signals=None) -> dict:
+        """
+        全量重算：按整段历史重放 ZIG 状态机，重写这些标的的 ZIG 信号并保存状态
+
+        Args:
+            conn: 数据库连接
+            ts_codes: 标的列表
+            keep_signals: 可选，日期过滤函数；提供时只写入满足条件日期的信号（由调用方先删除该区间）
+
+        Returns:
+            {"deleted": 删除数, "generated": 写入数}
+        """
+        from ..repository import price_repo, zig_state_repo
+
+        series = price_repo.get_close_series_many(conn, ts_codes, "9999-12-31")
+        deleted = 0
+        states = []
+        rows = []
+        conn.execute("BEGIN")
+        try:
+            for i, ts_code in enumerate(ts_codes, 1):
+                dates, closes = series.get(ts_code, ([], []))
+                st, prev, signals = TdxZigSignalGenerator.zig_replay_code(dates, closes)
+                if keep_signals is None:
+                    deleted += conn.execute(
+                        "DELETE FROM signal WHERE ts_code=? AND type IN ('ZIG_BUY','ZIG_SELL')", (ts_code,)
+                    ).rowcount
+                for d, typ in signals:
+                    if keep_signals is None or keep_signals(d):
+                        rows.append((d, ts_code, "HIGH", typ, TdxZigSignalGenerator._zig_message(ts_code, typ)))
+                if st["n"]:
+                    states.append((ts_code, st, prev))
+                report_progress(i, len(ts_codes), unit="codes", stage="zig")
+            rows.sort(key=lambda r: (r[0], r[1]))
+            generated = signal_repo.insert_instrument_signals_many(conn, rows)
+            zig_state_repo.upsert_states(conn, states)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return {"deleted": deleted, "generated": generated}
+
+    @staticmethod
+    @traced("signal")
+    def update_zig_signals_incremental(trade_date: str, ts_codes: list[str] | None = None,
+                                       written_from: dict[str, str] | None = None) -> dict:
+        """
+        价格更新后增量维护 ZIG 信号：用持久化的 ZIG 状态推进新 K 线，只改动发生变化的信号
+
+        - 新 K 线：状态 O(1) 推进，按状态差异删除/新增 ZIG_BUY / ZIG_SELL
+        - 最后一根 K 线被改写（同日重复同步）：与状态中保存的末日收盘价比较，从保存的上一状态重新推进
+        - 更早的历史 K 线被改写 / 增删，或尚无状态：对该标的全量重算一次
+
+        历史是否被改写只看写入路径给出的最早写入日（written_from），不再逐标的统计整段历史：
+        price_repo 的写入与 price_eod 的删除都会登记到变更集（dirty_set），由调用方取出后传入。
+
+        Args:
+            trade_date: 交易日期 YYYY-MM-DD（未指定标的时用于确定标的范围）
+            ts_codes: 可选，指定要处理的标的代码列表。为空时处理所有活跃标的
+            written_from: 可选，{ts_code: 本次写入的最早日期 YYYY-MM-DD}，早于状态末日视为历史被改写；
+                未给出且未指定标的时取 ZIG 的变更集
+
+        Returns:
+            dict: processed_instruments / deleted_signals / generated_signals / signal_changes，
+                另含 incremental / full_recompute 数量
+        """
+        from ..domain import zig_state
+        from ..repository import dirty_repo, zig_state_repo
+        from .signal_refresh_svc import ZIG_DIRTY_TABLES
+
+        if written_from is None and not ts_codes:
+            with get_conn() as conn:
+                written_from = dirty_repo.take(conn, "zig", ZIG_DIRTY_TABLES)
+        written_from = written_from or {}
+        with get_conn() as conn:
+            if ts_codes:
+                codes = sorted(set(ts_codes))
+            else:
+                codes = [r[0] for r in conn.execute("""
+                    SELECT DISTINCT p.ts_code
+                    FROM price_eod p
+                    JOIN instrument i ON p.ts_code = i.ts_code
+                    WHERE i.active = 1 AND p.trade_date <= ?
+                """, (trade_date,)).fetchall()]
+            saved = zig_state_repo.get_states(conn, codes)
+            conn.execute("BEGIN")
+
+            full: list[str] = []
+            updates = []
+            changes = []
+            total_deleted = total_generated = 0
+            for ts_code in codes:
+                if ts_code not in saved:
+                    full.append(ts_code)
+                    continue
+                cur, prev = saved[ts_code]
+                last = cur["last_date"]
+                w = written_from.get(ts_code)
+                if w is not None and w < last:
+                    full.append(ts_code)
+                    continue
+                bars = conn.execute(
+                    "SELECT trade_date, close FROM price_eod WHERE ts_code=? AND trade_date>=? AND close IS NOT NULL "
+                    "ORDER BY trade_date",
+                    (ts_code, last),
+                ).fetchall()
+                if not bars or bars[0][0] != last:
+                    full.append(ts_code)
+                    continue
+
+                state, base = cur, cur
+                if float(bars[0][1]) != cur["last_price"]:
+                    # 最后一根 K 线被改写：从上一状态重新推进
+                    if prev is None:
+                        full.append(ts_code)
+                        continue
+                    base = prev
+                    state = zig_state.advance(prev, last, float(bars[0][1]))
+                    added, removed = zig_state.diff(cur, state, base=prev)
+                else:
+                    added, removed = set(), set()
+                for d, close in bars[1:]:
+                    nxt = zig_state.advance(state, d, float(close))
+                    a, r = zig_state.diff(state, nxt)
+                    added = (added - r) | a
+                    removed = (removed - a) | r
+                    base, state = state, nxt
+                if state is cur:
+                    continue
+
+                deleted = generated = 0
+                for d, typ in sorted(removed):
+                    deleted += conn.execute(
+                        "DELETE FROM signal WHERE ts_code=? AND trade_date=? AND type=?", (ts_code, d, typ)
+                    ).rowcount
+                for d, typ in sorted(added):
+                    conn.execute(
+                        "DELETE FROM signal WHERE ts_code=? AND trade_date=? AND type=?", (ts_code, d, typ)
+                    )
+                    signal_repo.insert_signal(
+                        conn, d, ts_code=ts_code, level="HIGH", signal_type=typ,
+                        message=TdxZigSignalGenerator._zig_message(ts_code, typ),
+                    )
+                    generated += 1
+                updates.append((ts_code, state, base if base is not state else None))
+                if deleted or generated:
+                    changes.append({
+                        "ts_code": ts_code,
+                        "deleted": deleted,
+                        "generated": generated,
+                        "deleted_signals": sorted(removed),
+                        "added_signals": sorted(added),
+                    })
+                total_deleted += deleted
+                total_generated += generated
+
+            zig_state_repo.upsert_states(conn, updates)
+            conn.commit()
+
+            if full:
+                res = TdxZigSignalGenerator._replay_zig_states(conn, full)
+                total_deleted += res["deleted"]
+                total_generated += res["generated"]
+
+            return {
+                "processed_instruments": len(updates) + len(full),
+                "deleted_signals": total_deleted,
+                "generated_signals": total_generated,
+                "signal_changes": changes,
+                "incremental": len(updates),
+                "full_recompute": len(full),
+            }
+
     @staticmethod
     def test_zig_calculation(ts_code: str, start_date: str, end_date: str) -> dict:
         """
@@ -1130,208 +1330,6 @@ class TdxZigSignalGenerator:
         
         return comparison
 
-    @staticmethod  
-    def cleanup_and_regenerate_zig_signals(trade_date: str, ts_codes: list[str] | None = None) -> dict:
-        """
-        清理并重新生成ZIG信号 - 用于价格更新后的信号维护
-        
-        当价格数据更新时，ZIG指标会重新计算，可能导致之前的信号不再有效。
-        此方法会：
-        1. 重新计算指定标的的ZIG信号
-        2. 删除不再有效的历史ZIG信号
-        3. 生成新的有效信号
-        4. 记录清理和生成的详细日志
-        
-        Args:
-            trade_date: 交易日期 YYYY-MM-DD
-            ts_codes: 可选，指定要处理的标的代码列表。为空时处理所有活跃标的
-            
-        Returns:
-            dict: 清理和重新生成结果
-            - processed_instruments: 处理的标的数量
-            - deleted_signals: 删除的信号数量  
-            - generated_signals: 新生成的信号数量
-            - signal_changes: 各标的的信号变化详情
-        """
-        from ..repository import signal_repo
-        from ..db import get_conn
-        import logging
-        
-        logger = logging.getLogger(__name__)
-        logger.info(f"开始ZIG信号清理和重新生成: {trade_date}")
-        
-        with get_conn() as conn:
-            # 获取要处理的标的列表
-            if ts_codes:
-                # 验证提供的标的代码是否有效
-                tmap = {code: code for code in ts_codes}  # 简化处理
-                instruments = [(code,) for code in ts_codes]
-            else:
-                # 获取所有有价格数据的活跃标的
-                instruments = conn.execute("""
-                    SELECT DISTINCT p.ts_code 
-                    FROM price_eod p
-                    JOIN instrument i ON p.ts_code = i.ts_code 
-                    WHERE i.active = 1 AND p.trade_date <= ?
-                """, (trade_date,)).fetchall()
-            
-            if not instruments:
-                return {
-                    "processed_instruments": 0,
-                    "deleted_signals": 0, 
-                    "generated_signals": 0,
-                    "signal_changes": []
-                }
-            
-            processed_count = 0
-            total_deleted = 0
-            total_generated = 0
-            signal_changes = []
-            
-            for (ts_code,) in instruments:
-                try:
-                    # 获取该标的历史ZIG信号（最近30天）
-                    from datetime import datetime, timedelta
-                    start_date = (datetime.strptime(trade_date, "%Y-%m-%d") - timedelta(days=30)).strftime("%Y-%m-%d")
-                    
-                    existing_signals = conn.execute("""
-                        SELECT id, trade_date, type, message
-                        FROM signal 
-                        WHERE ts_code = ? AND type IN ('ZIG_BUY', 'ZIG_SELL') 
-                        AND trade_date >= ? AND trade_date <= ?
-                        ORDER BY trade_date DESC
-                    """, (ts_code, start_date, trade_date)).fetchall()
-                    
-                    # 重新计算当前的ZIG信号状态
-                    current_signals = []
-                    
-                    # 获取该标的在指定日期范围内的所有交易日
-                    price_data = conn.execute("""
-                        SELECT trade_date, close
-                        FROM price_eod 
-                        WHERE ts_code = ? AND trade_date >= ? AND trade_date <= ?
-                        ORDER BY trade_date ASC
-                    """, (ts_code, start_date, trade_date)).fetchall()
-                    
-                    if len(price_data) < 10:  # 数据不足，跳过
-                        continue
-                    
-                    # 逐日计算ZIG信号
-                    closes = [float(row[1]) for row in price_data]
-                    dates = [row[0] for row in price_data]
-                    
-                    # 计算完整的ZIG指标序列
-                    zig_values = TdxZigSignalGenerator.calculate_zig_indicator(closes, turn_percent=10.0)
-                    
-                    # 检测每个日期的信号（并保证买卖交替：同类连发则用新的替换旧的）
-                    for i in range(2, len(zig_values)):  # 从第3个数据点开始（需要前2个数据点）
-                        current_zig = zig_values[i]
-                        prev1_zig = zig_values[i-1]
-                        prev2_zig = zig_values[i-2]
-
-                        if None not in [current_zig, prev1_zig, prev2_zig]:
-                            buy_signal = current_zig > prev1_zig and prev1_zig < prev2_zig
-                            sell_signal = current_zig < prev1_zig and prev1_zig > prev2_zig
-
-                            if buy_signal:
-                                if current_signals and current_signals[-1]["type"] == "ZIG_BUY":
-                                    current_signals[-1] = {
-                                        "date": dates[i],
-                                        "type": "ZIG_BUY",
-                                        "message": f"{ts_code} ZIG买入信号触发"
-                                    }
-                                else:
-                                    current_signals.append({
-                                        "date": dates[i],
-                                        "type": "ZIG_BUY",
-                                        "message": f"{ts_code} ZIG买入信号触发"
-                                    })
-                            elif sell_signal:
-                                if current_signals and current_signals[-1]["type"] == "ZIG_SELL":
-                                    current_signals[-1] = {
-                                        "date": dates[i],
-                                        "type": "ZIG_SELL",
-                                        "message": f"{ts_code} ZIG卖出信号触发"
-                                    }
-                                else:
-                                    current_signals.append({
-                                        "date": dates[i],
-                                        "type": "ZIG_SELL",
-                                        "message": f"{ts_code} ZIG卖出信号触发"
-                                    })
-                    
-                    # 比较现有信号和重新计算的信号
-                    existing_set = {(sig[1], sig[2]) for sig in existing_signals}  # (date, type)
-                    current_set = {(sig["date"], sig["type"]) for sig in current_signals}
-                    
-                    # 找出需要删除的信号（存在于历史但不在当前计算结果中）
-                    to_delete = existing_set - current_set
-                    # 找出需要新增的信号（存在于当前计算但不在历史中）
-                    to_add = current_set - existing_set
-                    
-                    deleted_count = 0
-                    generated_count = 0
-                    
-                    # 删除过时的信号
-                    if to_delete:
-                        for date, signal_type in to_delete:
-                            result = conn.execute("""
-                                DELETE FROM signal 
-                                WHERE ts_code = ? AND trade_date = ? AND type = ?
-                            """, (ts_code, date, signal_type))
-                            deleted_count += result.rowcount
-                    
-                    # 添加新的信号
-                    if to_add:
-                        for date, signal_type in to_add:
-                            # 查找对应的信号详情
-                            signal_detail = next((s for s in current_signals if s["date"] == date and s["type"] == signal_type), None)
-                            if signal_detail:
-                                sid = signal_repo.insert_signal_if_no_recent_structure(
-                                    conn,
-                                    date,
-                                    ts_code=ts_code,
-                                    level="HIGH", 
-                                    signal_type=signal_type,
-                                    message=signal_detail["message"],
-                                    days_back=1,  # 减少重复检查天数，因为我们已经做了清理
-                                )
-                                if sid:
-                                    generated_count += 1
-                    
-                    # 记录变化
-                    if deleted_count > 0 or generated_count > 0:
-                        signal_changes.append({
-                            "ts_code": ts_code,
-                            "deleted": deleted_count,
-                            "generated": generated_count,
-                            "deleted_signals": list(to_delete),
-                            "added_signals": list(to_add)
-                        })
-                    
-                    total_deleted += deleted_count
-                    total_generated += generated_count
-                    processed_count += 1
-                    
-                    logger.debug(f"{ts_code}: 删除{deleted_count}个过时信号，生成{generated_count}个新信号")
-                    
-                except Exception as e:
-                    logger.error(f"处理{ts_code}的ZIG信号时出错: {str(e)}")
-                    continue
-            
-            # 提交所有更改
-            conn.commit()
-            
-            result = {
-                "processed_instruments": processed_count,
-                "deleted_signals": total_deleted,
-                "generated_signals": total_generated, 
-                "signal_changes": signal_changes
-            }
-            
-            logger.info(f"ZIG信号清理完成: 处理{processed_count}个标的，删除{total_deleted}个过时信号，生成{total_generated}个新信号")
-            return result
-
 
 # 向后兼容的函数别名
 def list_signal(date_yyyymmdd: str, typ: str | None = None, ts_code: str | None = None) -> list[dict[str, Any]]:
@@ -1359,8 +1357,9 @@ def rebuild_historical_signals(
     start_date: str | None = None,
     end_date: str | None = None,
     window_days: int = 90,
+    workers: int | None = None,
 ) -> dict[str, Any]:
-    """重建历史信号，当前聚焦于结构类信号。"""
+    """重建历史信号，当前聚焦于结构类信号。workers > 1 时按标的分片多进程计算。"""
 
     from datetime import datetime, timedelta
 
@@ -1377,7 +1376,12 @@ def rebuild_historical_signals(
     start = start_dt.strftime("%Y-%m-%d")
     end = end_dt.strftime("%Y-%m-%d")
 
-    structure_stats = SignalGenerationService.rebuild_structure_signals_for_period(start, end)
+    if workers and workers > 1:
+        from .signal_rebuild_svc import rebuild_structure_signals_parallel
+
+        structure_stats = rebuild_structure_signals_parallel(start, end, workers)
+    else:
+        structure_stats = SignalGenerationService.rebuild_structure_signals_for_period(start, end)
 
     return {
         "structure": structure_stats,
@@ -1392,8 +1396,9 @@ def rebuild_zig_signals(
     end_date: str | None = None,
     ts_codes: list[str] | None = None,
     window_days: int = 90,
+    workers: int | None = None,
 ) -> dict[str, Any]:
-    """重建指定时间窗口内的 ZIG 信号。"""
+    """重建指定时间窗口内的 ZIG 信号。workers > 1 时按标的分片多进程计算。"""
 
     from datetime import datetime, timedelta
 
@@ -1410,7 +1415,12 @@ def rebuild_zig_signals(
     start = start_dt.strftime("%Y-%m-%d")
     end = end_dt.strftime("%Y-%m-%d")
 
-    result = TdxZigSignalGenerator.rebuild_zig_signals_for_period(start, end, ts_codes)
+    if workers and workers > 1:
+        from .signal_rebuild_svc import rebuild_zig_signals_parallel
+
+        result = rebuild_zig_signals_parallel(start, end, ts_codes, workers)
+    else:
+        result = TdxZigSignalGenerator.rebuild_zig_signals_for_period(start, end, ts_codes)
     if "date_range" not in result:
         result["date_range"] = f"{start} ~ {end}"
     return result
@@ -5,20 +5,8 @@ from ..logs import OperationLogContext
 from .config_svc import get_config
 from ..domain.txn_engine import compute_position_after_trade, compute_cash_mirror, compute_position_with_corporate_actions, round_price, round_quantity, round_shares, round_amount
 from ..repository import txn_repo, position_repo, instrument_repo
-
-def _ensure_txn_group_id():
-    """确保 txn 表存在 group_id 列（用于将原始与现金镜像交易分组）。"""
-    try:
-        with get_conn() as conn:
-            cols = conn.execute("PRAGMA table_info(txn)").fetchall()
-            names = {c[1] for c in cols}
-            if "group_id" not in names:
-                conn.execute("ALTER TABLE txn ADD COLUMN group_id INTEGER")
-                conn.commit()
-    except Exception:
-        # 容错：不因迁移失败而阻断主流程（第一次运行可能并发等），
-        # 下次调用会再次尝试。
-        pass
+from ..domain import txn_batch
+from . import position_ledger_svc
 
 def detect_t_trades(conn, ts_code: str, trade_date: str, action: str, shares: float, tolerance: float = 0.001) -> int | None:
     """
@@ -86,7 +74,6 @@ def list_txn(page:int, size:int) -> tuple[int, list[dict]]:
     - realized_pnl: 仅 SELL 行计算 = qty * (price - avg_cost_at_that_time) - fee
       通过对该 ts_code 的全历史交易按时间顺序重放来获得 SELL 当时的成本。
     """
-    _ensure_txn_group_id()
     with get_conn() as conn:
         total = txn_repo.count_all(conn)
         cur_rows = txn_repo.list_txn_page(conn, page, size)
@@ -124,7 +111,6 @@ def list_txn(page:int, size:int) -> tuple[int, list[dict]]:
         return total, items
 
 def create_txn(data: dict, log: OperationLogContext) -> dict:
-    _ensure_txn_group_id()
     action = data["action"].upper()
     shares = float(data["shares"])
     fee = float(data.get("fee") or 0)
@@ -179,6 +165,7 @@ def create_txn(data: dict, log: OperationLogContext) -> dict:
                 conn.rollback()
                 raise ValueError("Sell exceeds current shares")
             position_repo.upsert_position(conn, ts_code, new_shares, new_cost, date)
+            position_ledger_svc.on_position_change(conn, ts_code, date)
             
             # 如果卖出后持仓变为0，自动加入自选关注
             if action == "SELL" and abs(new_shares) <= 1e-6 and old_shares > 0:
@@ -212,6 +199,7 @@ def create_txn(data: dict, log: OperationLogContext) -> dict:
                     cash_old_shares, cash_old_cost, cash_action, abs(amt), 1.0, 0.0
                 )
                 position_repo.upsert_position(conn, cash_code, c_new_shares, c_new_cost, date)
+                position_ledger_svc.on_position_change(conn, cash_code, date)
         elif not is_cash_inst:
             # 现金镜像（由 domain engine 决策）
             mirror_action, mirror_abs_shares = compute_cash_mirror(action, data["shares"], price, fee, data.get("amount"))
@@ -229,6 +217,7 @@ def create_txn(data: dict, log: OperationLogContext) -> dict:
                     cash_old_shares, cash_old_cost, mirror_action, mirror_abs_shares, 1.0, 0.0
                 )
                 position_repo.upsert_position(conn, cash_code, c_new_shares, c_new_cost, date)
+                position_ledger_svc.on_position_change(conn, cash_code, date)
         conn.commit()
         pos = position_repo.get_position(conn, ts_code)
     
@@ -243,20 +232,79 @@ def create_txn(data: dict, log: OperationLogContext) -> dict:
     log.set_after({"position": result})
     return result
 
-def bulk_txn(rows: list[dict], log: OperationLogContext) -> dict:
-    """批量写入交易（通常用于把历史BUY一次性导入作为建仓记录）"""
-    ok, fail = 0, 0
-    errs = []
+BULK_MODES = ("per_row", "atomic")
+
+
+def bulk_txn(rows: list[dict], log: OperationLogContext, mode: str = "per_row") -> dict:
+    """
+    批量写入交易（通常用于一次性导入历史交易）
+    - 先整体校验，再按 (ts_code, trade_date) 排序，在内存中按 txn_engine 逐标的重放持仓、
+      识别 T+0 分组、生成现金镜像（domain/txn_batch），最后在一个事务内 executemany 写入
+      txn 与最终 position
+    - mode=per_row：出错的行跳过并在 errors 中返回，其余照常写入
+    - mode=atomic ：任一行出错则整批不写入
+    """
+    if mode not in BULK_MODES:
+        raise ValueError(f"Unsupported mode: {mode}")
+
+    errors: list[dict] = []
+    valid: list[dict] = []
     for i, r in enumerate(rows):
         try:
-            # 复用已有 create_txn 逻辑（含均价法/卖出校验）
-            create_txn(r, log)
-            ok += 1
-        except Exception as e:
-            fail += 1
-            errs.append({"index": i, "ts_code": r.get("ts_code"), "error": str(e)})
-    log.set_after({"ok": ok, "fail": fail})
-    return {"ok": ok, "fail": fail, "errors": errs}
+            valid.append(txn_batch.normalize_row(i, r))
+        except ValueError as e:
+            errors.append({"index": i, "ts_code": r.get("ts_code"), "error": str(e)})
+    if errors and mode == "atomic":
+        log.set_after({"ok": 0, "fail": len(errors), "mode": mode})
+        return {"ok": 0, "fail": len(errors), "errors": errors}
+
+    cfg = get_config()
+    cash_code = str(cfg.get("cash_ts_code") or "CASH.CNY")
+    codes = sorted({r["ts_code"] for r in valid} | {cash_code})
+
+    plan = None
+    with get_conn() as conn:
+        types = instrument_repo.type_map_for(conn, codes)
+        cash_codes = {c for c in codes if c == cash_code or (types.get(c) or "").upper() == "CASH"}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            positions = {r["ts_code"]: (r["shares"], r["avg_cost"]) for r in position_repo.get_positions_full(conn, codes)}
+            candidates: dict[tuple[str, str], list[dict]] = {}
+            if valid:
+                dates = [r["date"] for r in valid]
+                for c in txn_repo.list_t_candidates(conn, codes, min(dates), max(dates)):
+                    candidates.setdefault((c["ts_code"], c["trade_date"]), []).append(dict(c))
+            plan = txn_batch.plan_bulk(valid, positions, candidates, cash_codes, cash_code,
+                                       txn_repo.next_txn_id(conn))
+            errors.extend(plan.errors)
+            if errors and mode == "atomic":
+                conn.rollback()
+            else:
+                txn_repo.insert_txns_many(conn, plan.txns)
+                txn_repo.update_group_ids_many(conn, plan.group_updates)
+                position_repo.upsert_positions_many(
+                    conn, [(c, s, a, d) for c, (s, a, d) in sorted(plan.positions.items())]
+                )
+                for code, points in sorted(plan.points.items()):
+                    position_ledger_svc.on_bulk_change(conn, code, points)
+                if plan.emptied:
+                    # 卖出后持仓变为0，自动加入自选关注
+                    from ..repository import watchlist_repo
+                    for code in sorted(plan.emptied):
+                        if not watchlist_repo.exists(conn, code):
+                            try:
+                                watchlist_repo.add(conn, code, "自动从零持仓移入")
+                            except Exception:
+                                pass
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    errors.sort(key=lambda e: e["index"])
+    ok = 0 if (errors and mode == "atomic") else len(plan.ok_indexes)
+    log.set_after({"ok": ok, "fail": len(errors), "mode": mode})
+    return {"ok": ok, "fail": len(errors), "errors": errors}
 
 def get_monthly_pnl_stats() -> list[dict]:
     """按月统计交易收益情况，直接使用txn表中的realized_pnl数据，仅统计SELL操作
@@ -274,7 +322,6 @@ def get_monthly_pnl_stats() -> list[dict]:
         ...
     ]
     """
-    _ensure_txn_group_id()
     with get_conn() as conn:
         # 通过repository层获取数据
         transactions = txn_repo.get_monthly_realized_pnl(conn)
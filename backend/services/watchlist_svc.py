@@ -6,12 +6,6 @@ from ..db import get_conn
 from ..repository import watchlist_repo, price_repo, instrument_repo
 
 
-def ensure_watchlist_schema():
-    with get_conn() as conn:
-        watchlist_repo.ensure_schema(conn)
-        conn.commit()
-
-
 def add_to_watchlist(ts_code: str, note: str | None = None):
     with get_conn() as conn:
         # 确保 instrument 中存在该代码
@@ -44,6 +38,10 @@ def list_watchlist(with_last_price: bool = True, on_date_yyyymmdd: str | None =
         for pos_row in cursor.fetchall():
             position_codes.add(pos_row[0])
         
+        latest = {}
+        if with_last_price and last_date_dash:
+            latest = price_repo.get_latest_prices(conn, [r["ts_code"] for r in rows], last_date_dash)
+
         for r in rows:
             it = {
                 "ts_code": r["ts_code"],
@@ -56,16 +54,10 @@ def list_watchlist(with_last_price: bool = True, on_date_yyyymmdd: str | None =
                 "has_position": r["ts_code"] in position_codes,  # 是否已持仓
             }
             if with_last_price and last_date_dash:
-                last = price_repo.get_last_close_on_or_before(conn, r["ts_code"], last_date_dash)
-                it["last_price"] = None if not last else float(last[1])
-                it["last_price_date"] = None if not last else last[0]
-                
-                # 计算涨跌幅
-                if last and last[0]:  # 如果有最新价格数据
-                    price_change = price_repo.get_price_change_percentage(conn, r["ts_code"], last[0])
-                    it["price_change"] = price_change
-                else:
-                    it["price_change"] = None
+                lp = latest.get(r["ts_code"])
+                it["last_price"] = None if not lp else float(lp["close"])
+                it["last_price_date"] = None if not lp else lp["trade_date"]
+                it["price_change"] = None if not lp else lp["pct_chg"]
             items.append(it)
         return items
 
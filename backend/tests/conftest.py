@@ -51,11 +51,17 @@ def _clean_db(tmp_db_path):
     tables = [
         "txn",
         "position",
+        "position_ledger",
         "instrument",
         "category",
         "price_eod",
+        "price_latest",
         "signal",
         "config",
+        "trade_cal",
+        "zig_state",
+        "dirty_set",
+        "dirty_cursor",
         # portfolio_daily and category_daily tables removed
     ]
     conn = sqlite3.connect(tmp_db_path)
@@ -68,4 +74,10 @@ def _clean_db(tmp_db_path):
         conn.commit()
     finally:
         conn.close()
+    # 上面的原始 DELETE 不经过 price_repo，price_eod 版本不一定变化：清空响应缓存
+    from backend.http_cache import get_response_cache
+    get_response_cache().clear()
+    # 同理，清空变更集后 KPI 缓存无从判断失效
+    from backend.services.dashboard_svc import clear_kpi_cache
+    clear_kpi_cache()
     yield
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from backend.services.aggregator_svc import AggregatorService, DataRequest
+
+
+def test_sections_run_concurrently_with_partial_results():
+    svc = AggregatorService()
+    f = svc.fetcher
+    threads = set()
+    release = threading.Event()
+
+    def slow(value):
+        def fn(*_, **__):
+            threads.add(threading.get_ident())
+            time.sleep(0.2)
+            return value
+        return fn
+
+    def broken(*_, **__):
+        raise RuntimeError("no prices")
+
+    f.get_latest_trading_date = lambda: "2024-01-05"
+    f.get_dashboard_data = slow({"kpi": 1})
+    f.get_categories_data = broken
+    f.get_positions_data = slow([{"ts_code": "A"}])
+    f.get_signals_data = slow([])
+    f.get_watchlist_data = lambda *_: release.wait(5) or {"items": []}
+
+    req = DataRequest(include_dashboard=True, include_categories=True, include_positions=True,
+                      include_signals=True, include_watchlist=True)
+    t0 = time.perf_counter()
+    res = svc.fetch_data(req, timeout=0.6)
+    elapsed = time.perf_counter() - t0
+    release.set()
+
+    assert elapsed < 0.8                                   # 三个 0.2s 板块并行，watchlist 超时截断
+    assert len(threads) == 3
+    assert res["dashboard"] == {"kpi": 1} and res["positions"] == [{"ts_code": "A"}] and res["signals"] == []
+    assert "categories" not in res and "watchlist" not in res
+    meta = res["_meta"]
+    assert meta["date"] == "20240105"
+    assert meta["data_keys"] == ["dashboard", "positions", "signals"]
+    assert meta["errors"]["categories"] == "no prices"
+    assert meta["errors"]["watchlist"].startswith("timeout")
+    assert {k: v["status"] for k, v in meta["sections"].items()} == {
+        "dashboard": "ok", "categories": "error", "positions": "ok", "signals": "ok", "watchlist": "timeout",
+    }
+    assert meta["sections"]["dashboard"]["ms"] >= 190
+
+
+def test_transaction_page_meta(tmp_db_path, client):
+    r = client.get("/api/aggregated/transactions", params={"page": 1, "size": 5})
+    assert r.status_code == 200
+    body = r.json()
+    meta = body["_meta"]
+    assert meta["data_keys"] == ["transactions", "instruments", "settings", "monthly_stats",
+                                 "categories_list", "positions_raw"]
+    assert set(meta["sections"]) == set(meta["data_keys"]) and "errors" not in meta
+    assert body["transactions"]["items"] == []
@@ -80,7 +80,7 @@ def test_analytics_and_calc_end_to_end(client):
     assert cash.get("irr_reason") == "skip_cash"
 
     # Calc snapshot and check dashboard numbers
-    calc = client.post("/api/calc", json={"date": "20250830"}).json()
+    calc = client.post("/api/calc?wait=true", json={"date": "20250830"}).json()
     assert calc["message"] == "ok"
 
     dash = client.get("/api/dashboard", params={"date": "20250830"}).json()
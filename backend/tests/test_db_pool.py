@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import threading
+
+from backend.db import get_conn, get_db_path, get_pool
+
+
+def test_pool_reuses_connections_per_thread(tmp_db_path, client):
+    pool = get_pool()
+    with get_conn() as conn:
+        first = id(conn)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        # 嵌套借出的是另一条连接，内层提交不会影响外层事务
+        with get_conn() as inner:
+            assert id(inner) != first
+    with get_conn() as conn:
+        assert id(conn) == first
+
+    # 其它线程拿到自己的连接
+    seen = []
+
+    def other():
+        with get_conn() as c:
+            seen.append(id(c))
+
+    t = threading.Thread(target=other)
+    t.start()
+    t.join()
+    assert seen and seen[0] != first
+
+    stats = client.get("/api/db/pool-stats").json()
+    assert stats["db_path"] == get_db_path() == tmp_db_path
+    assert stats["reused"] >= 1 and stats["checkouts"] >= stats["reused"]
+    assert pool.stats()["open"] >= 2
+
+
+def test_release_rolls_back_and_resets_connection(tmp_db_path):
+    with get_conn() as conn:
+        conn.execute("BEGIN")
+        conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES('pool','x',0)")
+        conn.row_factory = None
+        # 忘记提交：归还时回滚
+
+    with get_conn() as conn:
+        assert not conn.in_transaction
+        row = conn.execute("SELECT COUNT(1) AS n FROM category WHERE name='pool'").fetchone()
+        assert row["n"] == 0
+
+    pool = get_pool()
+    pool.close_all()
+    with get_conn() as conn:
+        assert conn.execute("SELECT 1 AS one").fetchone()["one"] == 1
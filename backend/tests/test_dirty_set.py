@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from backend.db import get_conn
+from backend.logs import OperationLogContext
+from backend.repository import data_version_repo, dirty_repo, price_repo
+from backend.services import calc_svc
+from backend.services.dashboard_svc import aggregate_kpi
+
+
+def _bar(code: str, d: str, close: float) -> dict:
+    return {"ts_code": code, "trade_date": d, "close": close}
+
+
+def _upsert(*bars: dict) -> int:
+    with get_conn() as conn:
+        return price_repo.upsert_price_eod_many(conn, list(bars))
+
+
+def _take(consumer: str, until: str | None = None):
+    with get_conn() as conn:
+        return dirty_repo.take(conn, consumer, ("price_eod", "instrument"), until=until)
+
+
+def test_unchanged_reupsert_writes_nothing(client):
+    bars = [_bar("A.SZ", "2024-01-02", 10.0), _bar("A.SZ", "2024-01-03", 10.5)]
+    assert _upsert(*bars) == 2
+    with get_conn() as conn:
+        v0 = data_version_repo.get_versions(conn)["price_eod"]
+        hw0 = dirty_repo.high_water(conn)
+
+    # 重复同步同一区间：不写入、不递增版本、不登记变更
+    assert _upsert(*bars) == 0
+    with get_conn() as conn:
+        assert data_version_repo.get_versions(conn)["price_eod"] == v0
+        assert dirty_repo.high_water(conn) == hw0
+
+    assert _upsert(bars[0], _bar("A.SZ", "2024-01-03", 10.6)) == 1
+    with get_conn() as conn:
+        assert data_version_repo.get_versions(conn)["price_eod"] == v0 + 1
+        rows = conn.execute(
+            "SELECT table_name, ts_code, min_date, max_date FROM dirty_set WHERE seq > ?", (hw0,)
+        ).fetchall()
+    assert [tuple(r) for r in rows] == [("price_eod", "A.SZ", "2024-01-03", "2024-01-03")]
+
+
+def test_take_consumes_only_up_to_until(client):
+    assert _take("t") is None  # 首次使用：登记游标，调用方全量处理
+    _upsert(*(_bar("A.SZ", d, 1.0) for d in ("2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05")))
+    _upsert(_bar("B.SZ", "2024-01-10", 2.0))
+
+    assert _take("t", until="2024-01-03") == {"A.SZ": "2024-01-02"}
+    assert _take("t", until="2024-01-03") == {}
+    # 回算更早的日期：不消费变更，由调用方全量处理
+    assert _take("t", until="2024-01-01") is None
+    assert _take("t", until="2024-01-10") == {"A.SZ": "2024-01-04", "B.SZ": "2024-01-10"}
+    assert _take("t") == {}
+
+    # 各消费者的游标互不影响；留待之后的部分不计入只读校验
+    assert _take("other") is None
+    with get_conn() as conn:
+        assert dirty_repo.earliest_change_since(conn, dirty_repo.high_water(conn), ("price_eod",)) is None
+
+
+def test_calc_only_processes_dirty_codes(client, monkeypatch):
+    from backend.services.signal_svc import SignalGenerationService
+
+    seen = []
+    monkeypatch.setattr(SignalGenerationService, "generate_current_signals",
+                        staticmethod(lambda df, d, ts_codes=None: seen.append(ts_codes)))
+    log = OperationLogContext("CALC")
+
+    calc_svc.calc("20240105", log)
+    _upsert(_bar("A.SZ", "2024-01-08", 10.0), _bar("B.SZ", "2024-01-08", 5.0))
+    _upsert(_bar("A.SZ", "2024-01-09", 10.2))
+    calc_svc.calc("20240108", log)
+    calc_svc.calc("20240109", log)
+    calc_svc.calc("20240109", log)
+    calc_svc.calc("20240102", log)
+    assert seen == [None, ["A.SZ", "B.SZ"], ["A.SZ"], [], None]
+
+
+def _seed_holding():
+    with get_conn() as conn:
+        conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES(?,?,?)", ("c", "s", 0))
+        cat_id = conn.execute("SELECT id FROM category LIMIT 1").fetchone()["id"]
+        conn.execute(
+            "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,?,?,1)",
+            ("A.SZ", "A", "STOCK", cat_id),
+        )
+        conn.execute("INSERT INTO position(ts_code, shares, avg_cost) VALUES(?,?,?)", ("A.SZ", 100.0, 10.0))
+    _upsert(*(_bar("A.SZ", f"2024-01-{d:02d}", 10.0 + d / 10) for d in range(2, 12)))
+
+
+def test_kpi_cache_invalidated_only_by_changes_in_range(client):
+    _seed_holding()
+    first = aggregate_kpi("20240101", "20240110", "day")
+    assert aggregate_kpi("20240101", "20240110", "day") is first
+
+    # 区间之后的新行情不影响已算好的序列
+    _upsert(_bar("A.SZ", "2024-01-15", 12.0))
+    assert aggregate_kpi("20240101", "20240110", "day") is first
+
+    _upsert(_bar("A.SZ", "2024-01-05", 20.0))
+    again = aggregate_kpi("20240101", "20240110", "day")
+    assert again is not first
+    by_date = {r["date"]: r["market_value"] for r in again}
+    assert by_date["2024-01-05"] == 2000.0
+
+    # 持仓变化影响全部日期
+    with get_conn() as conn:
+        conn.execute("UPDATE position SET shares=200 WHERE ts_code='A.SZ'")
+    assert {r["date"]: r["market_value"] for r in aggregate_kpi("20240101", "20240110", "day")}["2024-01-05"] == 4000.0
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from backend import jobs
+from backend.db import get_conn
+
+_gate = threading.Event()
+_runs: list[dict] = []
+
+
+@jobs.register("test_gated")
+def _gated_job(params: dict) -> dict:
+    _runs.append(params)
+    for i in range(1, 4):
+        jobs.report_progress(i, 3, unit="codes", stage="fetch")
+    if not _gate.wait(10):
+        raise RuntimeError("gate not released")
+    if params.get("fail"):
+        raise ValueError("boom")
+    return {"n": params["n"]}
+
+
+def _poll(client, job_id: int, timeout: float = 10.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] in jobs.FINISHED or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def test_calc_enqueues_by_default_and_reports_result(client):
+    r = client.post("/api/calc", json={"date": "20240105"})
+    assert r.status_code == 202
+    body = r.json()
+    assert body["status_url"] == f"/api/jobs/{body['job_id']}"
+    job = _poll(client, body["job_id"])
+    assert job["status"] == "succeeded" and job["result"] == {"message": "ok"}
+    assert job["kind"] == "calc" and job["params"] == {"date": "20240105"}
+    assert job["elapsed_sec"] is not None
+    assert any(j["id"] == job["id"] for j in client.get("/api/jobs?kind=calc").json()["items"])
+
+    # 显式 wait=true 时同步返回原结果
+    r = client.post("/api/calc?wait=true", json={"date": "20240105"})
+    assert r.status_code == 200 and r.json() == {"message": "ok"}
+
+
+def test_identical_inflight_jobs_are_deduplicated(client):
+    _gate.clear()
+    _runs.clear()
+    a, dup_a = jobs.submit("test_gated", {"n": 1})
+    b, dup_b = jobs.submit("test_gated", {"n": 1})
+    c, _ = jobs.submit("test_gated", {"n": 2})
+    assert a == b and (dup_a, dup_b) == (False, True)
+    assert c != a
+
+    _gate.set()
+    done = jobs.wait(a, timeout=10)
+    assert done["status"] == "succeeded" and done["result"] == {"n": 1}
+    assert done["progress"]["done"] == 3 and done["progress"]["unit"] == "codes"
+    assert done["progress"]["stages"]["fetch"]["total"] == 3
+    assert jobs.wait(c, timeout=10)["status"] == "succeeded"
+    assert sorted(p["n"] for p in _runs) == [1, 2]
+
+    # 已结束的任务不再复用
+    d, dup_d = jobs.submit("test_gated", {"n": 1})
+    assert d != a and not dup_d
+    assert jobs.wait(d, timeout=10)["status"] == "succeeded"
+
+
+def test_failed_job_records_error(client):
+    _gate.set()
+    job_id, _ = jobs.submit("test_gated", {"n": 3, "fail": True})
+    job = jobs.wait(job_id, timeout=10)
+    assert job["status"] == "failed" and job["error"] == "boom" and job["result"] is None
+
+
+def test_orphaned_running_jobs_are_requeued(client):
+    _gate.set()
+    stale = time.time() - jobs.JOB_STALE_SECONDS - 1
+    with get_conn() as conn:
+        ids = []
+        for n, attempts in ((10, 1), (11, jobs.JOB_MAX_ATTEMPTS)):
+            ids.append(conn.execute(
+                "INSERT INTO job(kind, params_json, dedup_key, status, owner, attempts, created_at, started_at, heartbeat_at) "
+                "VALUES('test_gated', ?, ?, 'running', 'gone-host:1', ?, ?, ?, ?)",
+                (f'{{"n":{n}}}', f"test_gated:restart{n}", attempts, stale, stale, stale),
+            ).lastrowid)
+
+    # 模拟重启：原执行者已不在，回收后由本进程重跑（超过最多执行次数的置为失败）
+    runner = jobs.get_job_runner()
+    assert runner.recover() == 2
+    runner.start()
+    resumed, abandoned = (jobs.wait(i, timeout=10) for i in ids)
+    assert resumed["status"] == "succeeded" and resumed["result"] == {"n": 10} and resumed["attempts"] == 2
+    assert abandoned["status"] == "failed" and "abandoned" in abandoned["error"]
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/api/jobs/987654321").status_code == 404
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.db import get_conn
+from backend.domain import kpi_series
+from backend.services.dashboard_svc import aggregate_kpi, get_dashboard
+
+
+def _seed_portfolio():
+    rng = np.random.default_rng(3)
+    with get_conn() as conn:
+        conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES(?,?,?)", ("c", "s", 0))
+        cat_id = conn.execute("SELECT id FROM category LIMIT 1").fetchone()["id"]
+        specs = [
+            ("A.SZ", 1, 100.0, 10.0, "2023-12-20"),   # 区间前已有价格
+            ("B.SZ", 1, 50.0, 20.0, "2024-01-10"),    # 区间中途才有价格：之前回退均价
+            ("C.SZ", 1, 30.0, 5.0, None),             # 从无价格
+            ("D.SZ", 0, 80.0, 8.0, "2023-12-20"),     # 不活跃，不计入
+            ("E.SZ", 1, 0.0, 3.0, "2023-12-20"),      # 空仓，不计入
+        ]
+        for code, active, shares, avg_cost, first in specs:
+            conn.execute(
+                "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,?,?,?)",
+                (code, code, "STOCK", cat_id, active),
+            )
+            conn.execute("INSERT INTO position(ts_code, shares, avg_cost) VALUES(?,?,?)", (code, shares, avg_cost))
+            if first is None:
+                continue
+            days = [str(d) for d in np.arange(np.datetime64(first), np.datetime64("2024-03-10")) if np.is_busday(d)]
+            closes = avg_cost * np.exp(np.cumsum(rng.normal(0, 0.02, len(days))))
+            conn.executemany(
+                "INSERT INTO price_eod(ts_code, trade_date, close) VALUES(?,?,?)",
+                [(code, d, round(float(c), 3)) for d, c in zip(days, closes)],
+            )
+        conn.commit()
+
+
+@pytest.mark.parametrize("period", ["day", "week", "month"])
+def test_range_engine_matches_per_day_dashboard(tmp_db_path, period):
+    _seed_portfolio()
+    items = aggregate_kpi("20240101", "20240305", period)
+
+    expected_dates = {
+        "day": 65,
+        "week": 10,   # 2024-01-01 是周一；最后一组截止到 03-05
+        "month": 3,
+    }[period]
+    assert len(items) == expected_dates
+    assert items[-1]["date"] == "2024-03-05"
+    for it in items:
+        k = get_dashboard(it["date"].replace("-", ""))["kpi"]
+        assert it["market_value"] == pytest.approx(k["market_value"], rel=1e-12)
+        assert it["cost"] == pytest.approx(k["cost"], rel=1e-12)
+        assert it["unrealized_pnl"] == pytest.approx(k["unrealized_pnl"], rel=1e-9, abs=1e-9)
+        assert it["ret"] == pytest.approx(k["ret"], rel=1e-9, abs=1e-12)
+
+
+def test_period_end_index_groups_iso_weeks_and_months():
+    days = kpi_series.day_range("2024-12-28", "2025-01-14")
+    weeks = [str(days[i]) for i in kpi_series.period_end_index(days, "week")]
+    months = [str(days[i]) for i in kpi_series.period_end_index(days, "month")]
+    assert weeks == ["2024-12-29", "2025-01-05", "2025-01-12", "2025-01-14"]
+    assert months == ["2024-12-31", "2025-01-14"]
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from backend.db import get_conn
+from backend.logs import OperationLogContext, search_operation_logs
+
+
+def _write(action: str, payload, before=None):
+    log = OperationLogContext(action)
+    log.set_payload(payload)
+    if before is not None:
+        log.set_before(before)
+    log.write()
+
+
+def test_fts_search_matches_like_semantics(tmp_db_path, client):
+    _write("FTS_A", {"ts_code": "000001.SZ", "note": "建仓 平安银行"})
+    _write("FTS_A", {"ts_code": "600000.SH"}, before={"name": "浦发银行"})
+    _write("FTS_B", {"ts_code": "510300.SH", "note": "沪深300 ETF"})
+
+    with get_conn() as conn:
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name='operation_log_fts'").fetchone()
+
+    def codes(q, action=None):
+        res = search_operation_logs(q, action, None, None, 1, 50)
+        return sorted((it["action"], it["payload_json"][:24]) for it in res["items"])
+
+    assert [c[0] for c in codes("银行")] == ["FTS_A", "FTS_A"]          # 两个字：退回 LIKE
+    assert len(codes("平安银行")) == 1                                   # 中文子串
+    assert len(codes("0001.s")) == 1                                     # 代码子串，大小写不敏感
+    assert codes("etf", "FTS_A") == []
+    assert len(codes('"ts_code": "5')) == 1                              # 引号按字面匹配
+
+    # 删除日志时触发器同步全文索引
+    with get_conn() as conn:
+        conn.execute("DELETE FROM operation_log WHERE action='FTS_B'")
+    assert codes("沪深300") == []
+
+
+def test_keyset_paging_walks_all_rows(tmp_db_path, client):
+    for i in range(7):
+        _write("PAGE_TEST", {"i": i})
+    res = search_operation_logs(None, "PAGE_TEST", None, None, 1, 3)
+    assert res["total"] == 7 and res["total_approx"]
+    seen = [it["id"] for it in res["items"]]
+    while res["next_cursor"]:
+        res = client.get("/api/logs/search", params={"action": "PAGE_TEST", "size": 3,
+                                                     "cursor": res["next_cursor"]}).json()
+        seen += [it["id"] for it in res["items"]]
+    assert len(seen) == len(set(seen)) == 7
+
+    by_offset = [it["id"] for p in (1, 2, 3)
+                 for it in search_operation_logs(None, "PAGE_TEST", None, None, p, 3)["items"]]
+    assert by_offset == seen
+    assert client.get("/api/logs/search", params={"cursor": "bad"}).status_code == 400
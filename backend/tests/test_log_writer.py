@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from backend.db import get_conn, get_db_path
+from backend.logs import LogWriter, OperationLogContext, flush_operation_logs, search_operation_logs
+
+
+def _count(action: str) -> int:
+    with get_conn() as conn:
+        return conn.execute("SELECT COUNT(1) AS n FROM operation_log WHERE action=?", (action,)).fetchone()["n"]
+
+
+def test_write_is_batched_and_visible_after_flush(tmp_db_path, client):
+    for i in range(50):
+        log = OperationLogContext("WRITER_TEST")
+        log.set_payload({"i": i})
+        log.write()
+    assert flush_operation_logs()
+    assert _count("WRITER_TEST") == 50
+
+    # 查询接口自行 flush：刚写的日志立即可见
+    OperationLogContext("WRITER_TEST").write("ERROR", "boom")
+    res = search_operation_logs(None, "WRITER_TEST", None, None, 1, 5)
+    assert res["total"] == 51 and res["items"][0]["err_msg"] == "boom"
+
+    stats = client.get("/api/logs/writer-stats").json()
+    assert stats["written"] >= 51 and stats["pending"] == 0
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_db_path):
+    gate = threading.Event()
+    writer = LogWriter(maxsize=1, batch_size=1, flush_interval=0.01, put_timeout=0.01)
+    real_write = writer._write
+
+    def slow_write(batch):
+        gate.wait(5)
+        real_write(batch)
+
+    writer._write = slow_write
+    rec = {"ts": "2024-01-01T00:00:00+08:00", "user": "owner", "action": "DROP_TEST", "entity_type": None,
+           "entity_id": None, "request_id": "r", "before_json": None, "after_json": None, "payload_json": None,
+           "result": "OK", "err_msg": None, "latency_ms": 0}
+    path = get_db_path()
+    assert writer.submit(path, rec)          # 写线程取走后阻塞在写库
+    while writer.stats()["pending"]:
+        time.sleep(0.001)
+    assert writer.submit(path, rec)          # 占满队列
+    assert not writer.submit(path, rec)      # 队列已满：丢弃
+    gate.set()
+    writer.close()
+    stats = writer.stats()
+    assert (stats["enqueued"], stats["written"], stats["dropped"]) == (2, 2, 1)
+    assert not stats["running"]
+    assert _count("DROP_TEST") == 2
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import json
+
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend import metrics
+from backend.db import get_conn
+from backend.logs import search_operation_logs
+from backend.providers.tushare_provider import TuShareProvider
+
+
+def _sample(text: str, prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{prefix} not in /metrics")
+
+
+def test_metrics_endpoint_reports_routes_sql_and_spans(tmp_db_path, client):
+    metrics.reset()
+    assert client.get("/api/logs/search", params={"size": 5}).status_code == 200
+    client.get("/api/logs/search", params={"cursor": "bad"})
+
+    class FakePro:
+        def daily(self, trade_date=None, **_):
+            return pd.DataFrame([{"ts_code": "AAA.SZ", "trade_date": trade_date, "close": 10.0}])
+
+    prov = TuShareProvider("dummy-token", cache=False)
+    prov.pro = FakePro()
+    prov.daily_for_date("20240102")
+
+    @metrics.traced("signal", "boom")
+    def boom():
+        raise RuntimeError("x")
+
+    with pytest.raises(RuntimeError):
+        boom()
+
+    r = client.get("/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    text = r.text
+    route = 'route="/api/logs/search"'
+    assert _sample(text, f'portfolio_http_requests_total{{method="GET",{route},status="200"}}') == 1
+    assert _sample(text, f'portfolio_http_requests_total{{method="GET",{route},status="400"}}') == 1
+    assert _sample(text, f'portfolio_http_request_duration_seconds_count{{method="GET",{route}}}') == 2
+    assert _sample(text, f'portfolio_http_request_duration_seconds_bucket{{method="GET",{route},le="+Inf"}}') == 2
+    assert _sample(text, f"portfolio_http_db_queries_total{{{route}}}") >= 2
+    assert _sample(text, 'portfolio_span_duration_seconds_count{kind="provider",name="daily"}') == 1
+    assert _sample(text, 'portfolio_span_errors_total{kind="signal",name="boom"}') == 1
+    assert _sample(text, "portfolio_db_pool_open_connections") >= 1
+    assert "portfolio_oplog_pending" in text
+
+
+def test_slow_request_logged_with_breakdown(tmp_db_path):
+    app = FastAPI()
+
+    @app.get("/slow/{n}")
+    def slow(n: int):
+        with get_conn() as conn:
+            for _ in range(n):
+                conn.execute("SELECT 1").fetchone()
+        return {"n": n}
+
+    app.add_middleware(metrics.MetricsMiddleware, slow_ms=0.000001)
+    assert TestClient(app).get("/slow/3").json() == {"n": 3}
+
+    items = search_operation_logs(None, "SLOW_REQUEST", None, None, 1, 1)["items"]
+    assert items and items[0]["entity_id"] == "/slow/{n}"
+    payload = json.loads(items[0]["payload_json"])
+    assert payload["path"] == "/slow/3" and payload["status"] == 200
+    assert payload["db_queries"] == 3 and payload["conn_checkouts"] == 1
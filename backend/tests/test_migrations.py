@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import sqlite3
+
+from backend.db import get_conn
+from backend.migrations import LATEST_VERSION, apply_migrations, migration_status
+from backend.migrations.m0005_query_indexes import INDEXES
+
+# 早期版本的库：txn 无 group_id / realized_pnl，signal 无 scope 列，没有派生表 / 自选 / 日历等
+LEGACY_SCHEMA = """
+CREATE TABLE config (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE category (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, sub_name TEXT NOT NULL,
+                       target_units REAL NOT NULL);
+CREATE TABLE instrument (ts_code TEXT PRIMARY KEY, name TEXT NOT NULL, type TEXT, category_id INTEGER,
+                         active INTEGER NOT NULL DEFAULT 1);
+CREATE TABLE txn (id INTEGER PRIMARY KEY AUTOINCREMENT, ts_code TEXT NOT NULL, trade_date TEXT NOT NULL,
+                  action TEXT NOT NULL, shares REAL DEFAULT 0, price REAL DEFAULT 0, amount REAL,
+                  fee REAL DEFAULT 0, notes TEXT);
+CREATE TABLE price_eod (ts_code TEXT NOT NULL, trade_date TEXT NOT NULL, close REAL NOT NULL, pre_close REAL,
+                        PRIMARY KEY (ts_code, trade_date));
+CREATE TABLE position (ts_code TEXT PRIMARY KEY, shares REAL NOT NULL, avg_cost REAL NOT NULL,
+                       last_update TEXT NOT NULL, opening_date TEXT);
+CREATE TABLE signal (id INTEGER PRIMARY KEY AUTOINCREMENT, trade_date TEXT NOT NULL, ts_code TEXT,
+                     category_id INTEGER, level TEXT, type TEXT, message TEXT);
+INSERT INTO txn(ts_code, trade_date, action, shares, price, fee) VALUES('000001.SZ', '2024-01-02', 'BUY', 100, 10, 0);
+INSERT INTO position(ts_code, shares, avg_cost, last_update) VALUES('000001.SZ', 100, 10, '2024-01-02');
+INSERT INTO price_eod(ts_code, trade_date, close, pre_close) VALUES('000001.SZ', '2024-01-02', 10, 9.5),
+                                                                   ('000001.SZ', '2024-01-03', 11, 10);
+INSERT INTO signal(trade_date, ts_code, level, type, message) VALUES('2024-01-03', '000001.SZ', 'HIGH', 'BUY', 'x');
+INSERT INTO signal(trade_date, category_id, level, type, message) VALUES('2024-01-03', 7, 'HIGH', 'BUY', 'y');
+"""
+
+
+def _columns(conn, table: str) -> set[str]:
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+
+
+def test_legacy_db_upgraded_once(tmp_path, tmp_db_path):
+    db = str(tmp_path / "legacy.db")
+    raw = sqlite3.connect(db)
+    raw.executescript(LEGACY_SCHEMA)
+    raw.close()
+
+    assert migration_status(db)["current"] == 0
+    applied = apply_migrations(db)
+    assert [m["version"] for m in applied] == list(range(1, LATEST_VERSION + 1))
+    assert apply_migrations(db) == []
+    assert migration_status(db) == {"current": LATEST_VERSION, "latest": LATEST_VERSION, "pending": []}
+
+    with get_conn(db) as conn:
+        assert {"group_id", "realized_pnl"} <= _columns(conn, "txn")
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()}
+        assert {"watchlist", "trade_cal", "zig_state", "operation_log", "price_latest", "position_ledger"} <= tables
+        indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'").fetchall()}
+        assert {s.split()[5] for s in INDEXES} <= indexes
+
+        scopes = conn.execute("SELECT scope_type, scope_data FROM signal ORDER BY id").fetchall()
+        assert [tuple(r) for r in scopes] == [("INSTRUMENT", '["000001.SZ"]'), ("CATEGORY", "[7]")]
+        latest = conn.execute("SELECT trade_date, close, prev_close FROM price_latest").fetchall()
+        assert [tuple(r) for r in latest] == [("2024-01-03", 11.0, 10.0)]
+        ledger = conn.execute("SELECT ts_code, valid_from, shares FROM position_ledger").fetchall()
+        assert [tuple(r) for r in ledger] == [("000001.SZ", "2024-01-02", 100.0)]
+
+
+
+def test_ledger_backfill_reads_cash_code_from_migrated_db(tmp_path, tmp_db_path):
+    # 被迁移库的现金标的与默认库不同：其 ADJ 应按现金入账，而不是被当作普通标的忽略
+    db = str(tmp_path / "other.db")
+    raw = sqlite3.connect(db)
+    raw.executescript(LEGACY_SCHEMA + """
+INSERT INTO config(key, value) VALUES('cash_ts_code', 'MY.CASH');
+INSERT INTO txn(ts_code, trade_date, action, shares, price, amount, fee) VALUES('MY.CASH', '2024-01-02', 'ADJ', 0, 0, 500, 0);
+INSERT INTO position(ts_code, shares, avg_cost, last_update) VALUES('MY.CASH', 500, 1, '2024-01-05');
+""")
+    raw.close()
+
+    apply_migrations(db)
+    with get_conn(db) as conn:
+        ledger = conn.execute(
+            "SELECT valid_from, shares, source FROM position_ledger WHERE ts_code='MY.CASH'"
+        ).fetchall()
+    assert [tuple(r) for r in ledger] == [("2024-01-02", 500.0, "TXN")]
+
+
+def test_fresh_db_uses_query_indexes(tmp_db_path):
+    apply_migrations()
+    assert migration_status()["pending"] == []
+    with get_conn() as conn:
+        plan = " ".join(r[3] for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM txn WHERE ts_code=? AND trade_date<=?", ("a", "b")).fetchall())
+        assert "idx_txn_code_date" in plan
+        plan = " ".join(r[3] for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM signal WHERE trade_date=? AND type=?", ("a", "b")).fetchall())
+        assert "idx_signal_date_type" in plan
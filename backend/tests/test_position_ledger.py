@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import pytest
+
+from backend.db import get_conn
+from backend.logs import OperationLogContext
+from backend.services import position_ledger_svc
+from backend.services.dashboard_svc import aggregate_kpi, get_dashboard
+from backend.services.position_svc import set_opening_position
+from backend.services.txn_svc import create_txn
+
+
+def _seed():
+    with get_conn() as conn:
+        conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES(?,?,?)", ("c", "s", 0))
+        cat_id = conn.execute("SELECT id FROM category LIMIT 1").fetchone()["id"]
+        for code, typ in (("A.SZ", "STOCK"), ("B.SZ", "STOCK"), ("CASH.CNY", "CASH")):
+            conn.execute(
+                "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,?,?,1)",
+                (code, code, typ, cat_id),
+            )
+        days = [f"2024-01-{d:02d}" for d in range(2, 20)]
+        conn.executemany(
+            "INSERT INTO price_eod(ts_code, trade_date, close) VALUES(?,?,?)",
+            [(code, d, base + k * 0.1) for code, base in (("A.SZ", 10.0), ("B.SZ", 20.0)) for k, d in enumerate(days)],
+        )
+        conn.commit()
+
+
+def _txn(code, date, action, shares, price, fee=0.0):
+    create_txn({"ts_code": code, "date": date, "action": action, "shares": shares, "price": price, "fee": fee},
+               OperationLogContext("TEST"))
+
+
+def _ledger():
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT ts_code, valid_from, valid_to, shares, avg_cost, source FROM position_ledger ORDER BY ts_code, valid_from"
+        ).fetchall()
+    return [tuple(r) for r in rows]
+
+
+def _open_matches_position():
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT p.ts_code, p.shares, p.avg_cost, l.shares AS ls, l.avg_cost AS lc FROM position p "
+            "JOIN position_ledger l ON l.ts_code=p.ts_code AND l.valid_to IS NULL"
+        ).fetchall()
+        n = conn.execute("SELECT COUNT(1) FROM position").fetchone()[0]
+    assert len(rows) == n
+    for r in rows:
+        assert r["shares"] == pytest.approx(r["ls"]) and r["avg_cost"] == pytest.approx(r["lc"])
+
+
+def test_incremental_ledger_matches_replay_and_drives_historical_kpi(tmp_db_path):
+    _seed()
+    _txn("A.SZ", "2024-01-03", "BUY", 100, 10.0, 1.0)
+    _txn("A.SZ", "2024-01-05", "BUY", 100, 11.0)
+    _txn("A.SZ", "2024-01-05", "SELL", 50, 11.5)
+    _txn("B.SZ", "2024-01-08", "BUY", 10, 20.0)
+    _txn("A.SZ", "2024-01-10", "SELL", 150, 12.0)   # 清仓
+    set_opening_position("B.SZ", 30, 19.0, "2024-01-12", OperationLogContext("TEST"))
+
+    incremental = _ledger()
+    _open_matches_position()
+    with get_conn() as conn:
+        conn.execute("BEGIN")
+        position_ledger_svc.rebuild_all(conn)
+        conn.commit()
+    assert _ledger() == incremental
+
+    a = [r for r in incremental if r[0] == "A.SZ"]
+    assert [(r[1], r[2], r[3]) for r in a] == [
+        ("2024-01-03", "2024-01-05", 100.0),
+        ("2024-01-05", "2024-01-10", 150.0),
+        ("2024-01-10", None, 0.0),
+    ]
+    assert ("B.SZ", "2024-01-12", None, 30.0, 19.0, "MANUAL") in incremental
+
+    # 历史日期使用当时的持仓，而不是当前 position
+    assert get_dashboard("20240102")["kpi"]["market_value"] == 0.0
+    k = get_dashboard("20240106")["kpi"]
+    assert k["market_value"] == pytest.approx(150 * (10.0 + 4 * 0.1))
+
+    items = aggregate_kpi("20240101", "20240118", "day")
+    for it in items:
+        kd = get_dashboard(it["date"].replace("-", ""))["kpi"]
+        assert it["market_value"] == pytest.approx(kd["market_value"], rel=1e-12)
+        assert it["cost"] == pytest.approx(kd["cost"], rel=1e-12)
+
+
+def test_backdated_txn_replays_code(tmp_db_path):
+    _seed()
+    _txn("A.SZ", "2024-01-05", "BUY", 100, 10.0)
+    _txn("A.SZ", "2024-01-09", "BUY", 100, 12.0)
+    _txn("A.SZ", "2024-01-03", "BUY", 100, 9.0)      # 倒签
+
+    a = [r for r in _ledger() if r[0] == "A.SZ"]
+    assert [(r[1], r[3]) for r in a] == [("2024-01-03", 100.0), ("2024-01-05", 200.0), ("2024-01-09", 300.0)]
+    _open_matches_position()
+    assert get_dashboard("20240104")["kpi"]["cost"] == pytest.approx(900.0)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from backend.db import get_conn
+from backend.repository import price_repo, reporting_repo
+
+
+def _seed_instruments(codes: list[str]):
+    with get_conn() as conn:
+        conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES(?,?,?)", ("c", "s", 0))
+        cat_id = conn.execute("SELECT id FROM category LIMIT 1").fetchone()["id"]
+        for code in codes:
+            conn.execute(
+                "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,?,?,1)",
+                (code, code, "STOCK", cat_id),
+            )
+            conn.execute("INSERT INTO position(ts_code, shares, avg_cost) VALUES(?,?,?)", (code, 100, 1.0))
+        conn.commit()
+
+
+def _bar(code: str, d: str, close: float, pre_close: float | None = None) -> dict:
+    return {"ts_code": code, "trade_date": d, "close": close, "pre_close": pre_close}
+
+
+def _latest_table():
+    with get_conn() as conn:
+        rows = conn.execute("SELECT * FROM price_latest ORDER BY ts_code").fetchall()
+    return [tuple(r) for r in rows]
+
+
+def test_upsert_maintains_price_latest_with_legacy_change_semantics(tmp_db_path):
+    with get_conn() as conn:
+        price_repo.upsert_price_eod_many(conn, [
+            _bar("A.SZ", "2024-01-02", 10.0, None),
+            _bar("A.SZ", "2024-01-03", 11.0, None),      # 无 pre_close：取上一根收盘价
+            _bar("B.SZ", "2024-01-02", 20.0, 19.0),
+            _bar("B.SZ", "2024-01-03", 21.0, 0.0),       # pre_close 非正：回退上一根收盘价
+            _bar("C.SZ", "2024-01-03", 5.0, None),       # 只有一根 K 线：无涨跌幅
+        ])
+        # 历史回补不改变最新价
+        price_repo.upsert_price_eod_many(conn, [_bar("A.SZ", "2023-12-29", 9.0, None)])
+
+        for code in ("A.SZ", "B.SZ", "C.SZ"):
+            lp = price_repo.get_latest_prices(conn, [code], "2024-01-05")[code]
+            last = price_repo.get_last_close_on_or_before(conn, code, "2024-01-05")
+            assert (lp["trade_date"], lp["close"]) == last
+            assert lp["pct_chg"] == price_repo.get_price_change_percentage(conn, code, last[0])
+
+        incremental = _latest_table()
+        conn.execute("BEGIN")
+        price_repo.rebuild_price_latest(conn)
+        conn.commit()
+    assert _latest_table() == incremental
+    assert [r[1] for r in incremental] == ["2024-01-03"] * 3
+
+
+def test_as_of_path_matches_correlated_lookup_for_past_dates(tmp_db_path):
+    codes = ["A.SZ", "B.SZ", "C.SZ"]
+    _seed_instruments(codes)
+    bars = [
+        _bar(code, f"2024-01-{day:02d}", 10.0 + k + day * 0.5, 10.0 + k + (day - 1) * 0.5)
+        for k, code in enumerate(codes)
+        for day in range(2, 12)
+        if not (code == "B.SZ" and day in (5, 6))   # B 在 1/5、1/6 停牌
+    ]
+    with get_conn() as conn:
+        price_repo.upsert_price_eod_many(conn, bars)
+        # 绕过 upsert 直接写入的标的：price_latest 无记录，也应回退到 as-of 查询
+        conn.execute("INSERT INTO instrument(ts_code, name, type, category_id, active) "
+                     "SELECT 'D.SZ', 'D.SZ', 'STOCK', id, 1 FROM category LIMIT 1")
+        conn.execute("INSERT INTO price_eod(ts_code, trade_date, close) VALUES('D.SZ', '2024-01-04', 7.0)")
+        conn.commit()
+
+        for d in ("2024-01-01", "2024-01-05", "2024-01-06", "2024-01-11", "2024-02-01"):
+            latest = price_repo.get_latest_prices(conn, codes + ["D.SZ"], d)
+            rows = {r["ts_code"]: r["eod_close"] for r in reporting_repo.active_instruments_with_pos_and_price(conn, d)}
+            for code in codes + ["D.SZ"]:
+                last = price_repo.get_last_close_on_or_before(conn, code, d)
+                assert rows[code] == (last[1] if last else None), (code, d)
+                if last is None:
+                    assert code not in latest
+                else:
+                    assert (latest[code]["trade_date"], latest[code]["close"]) == last
+                    assert latest[code]["pct_chg"] == price_repo.get_price_change_percentage(conn, code, last[0])
+
+
+def test_gap_fill_before_latest_bar_refreshes_change(tmp_db_path):
+    # 基金没有 pre_close：回补最新日之前的缺口会改变上一根收盘价
+    with get_conn() as conn:
+        price_repo.upsert_price_eod_many(conn, [_bar("F.OF", "2025-01-08", 1.0)])
+        price_repo.upsert_price_eod_many(conn, [_bar("F.OF", "2025-01-10", 1.2)])
+        price_repo.upsert_price_eod_many(conn, [_bar("F.OF", "2025-01-09", 1.1)])
+
+        lp = price_repo.get_latest_prices(conn, ["F.OF"], "2025-01-10")["F.OF"]
+        assert lp["trade_date"] == "2025-01-10" and lp["prev_close"] == 1.1
+        assert lp["pct_chg"] == price_repo.get_price_change_percentage(conn, "F.OF", "2025-01-10")
+        assert round(lp["pct_chg"], 2) == 9.09
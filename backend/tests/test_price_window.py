@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import contextlib
+
+import numpy as np
+
+from backend.db import get_conn
+from backend.services import signal_svc
+from backend.services.signal_svc import TdxStructureSignalGenerator, load_close_window
+
+
+def _seed(n_codes: int, days: int = 80, seed: int = 5):
+    rng = np.random.default_rng(seed)
+    dates = [f"2024-{1 + i // 28:02d}-{1 + i % 28:02d}" for i in range(days)]
+    with get_conn() as conn:
+        conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES(?,?,?)", ("c", "s", 0))
+        cat_id = conn.execute("SELECT id FROM category LIMIT 1").fetchone()["id"]
+        for k in range(n_codes):
+            code = f"W{k:03d}.SZ"
+            conn.execute(
+                "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,?,?,?)",
+                (code, code, "STOCK", cat_id, 0 if k == 1 else 1),
+            )
+            closes = 20 * np.exp(np.cumsum(rng.normal(0, 0.03, days)))
+            start = 70 if k == 2 else 0  # W002 只有 10 根 K 线
+            conn.executemany(
+                "INSERT INTO price_eod(ts_code, trade_date, close) VALUES(?,?,?)",
+                [(code, d, round(float(c), 3)) for d, c in zip(dates[start:], closes[start:])],
+            )
+        conn.commit()
+    return dates
+
+
+def test_close_window_is_right_aligned(tmp_db_path):
+    dates = _seed(4)
+    with get_conn() as conn:
+        w = load_close_window(conn, dates[-1], 30)
+        last = conn.execute(
+            "SELECT close FROM price_eod WHERE ts_code='W000.SZ' ORDER BY trade_date DESC LIMIT 30"
+        ).fetchall()
+    assert w.codes == ["W000.SZ", "W002.SZ", "W003.SZ"]  # 不含不活跃的 W001
+    assert w.closes.shape == (3, 30)
+    assert list(w.counts) == [30, 10, 30]
+    assert np.isnan(w.closes[1, :20]).all() and len(w.series(1)) == 10
+    assert np.allclose(w.series(0), [r[0] for r in reversed(last)])
+    assert w.last_dates[0] == dates[-1]
+
+
+def test_batched_structure_matches_per_code_path(tmp_db_path):
+    dates = _seed(6)
+    with get_conn() as conn:
+        w30 = load_close_window(conn, dates[-1], 30)
+    for i, code in enumerate(w30.codes):
+        closes = list(w30.series(i))
+        legacy = TdxStructureSignalGenerator.calculate_structure_signals(code, dates[-1])
+        if len(closes) >= 15:
+            assert legacy == (TdxStructureSignalGenerator._calculate_buy_structure(closes),
+                              TdxStructureSignalGenerator._calculate_sell_structure(closes))
+
+
+def _count_statements(monkeypatch, fn) -> int:
+    seen: list[str] = []
+    real = signal_svc.get_conn
+
+    @contextlib.contextmanager
+    def counting_conn(*args, **kwargs):
+        with real(*args, **kwargs) as conn:
+            conn.set_trace_callback(seen.append)
+            yield conn
+
+    monkeypatch.setattr(signal_svc, "get_conn", counting_conn)
+    fn()
+    monkeypatch.setattr(signal_svc, "get_conn", real)
+    return len(seen)
+
+
+def test_structure_generation_query_count_independent_of_universe(tmp_db_path, monkeypatch):
+    def flat_universe(n):
+        with get_conn() as conn:
+            conn.execute("DELETE FROM price_eod")
+            conn.execute("DELETE FROM instrument")
+            conn.execute("DELETE FROM category")
+            conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES(?,?,?)", ("c", "s", 0))
+            cat_id = conn.execute("SELECT id FROM category LIMIT 1").fetchone()["id"]
+            for k in range(n):
+                code = f"F{k:03d}.SZ"
+                conn.execute(
+                    "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,?,?,1)",
+                    (code, code, "STOCK", cat_id),
+                )
+                conn.executemany(
+                    "INSERT INTO price_eod(ts_code, trade_date, close) VALUES(?,?,?)",
+                    [(code, f"2024-03-{d:02d}", 10.0) for d in range(1, 29)],
+                )
+
+    counts = []
+    for n in (3, 30):
+        flat_universe(n)
+        counts.append(_count_statements(
+            monkeypatch,
+            lambda: TdxStructureSignalGenerator.generate_structure_signals_for_date("2024-03-28"),
+        ))
+    assert counts[0] == counts[1]
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import pandas as pd
 
-from backend.services.pricing_orchestrator import sync_prices
+from backend.services.pricing_orchestrator import sync_prices, sync_prices_range, frame_to_bars
 from backend.db import get_conn
 
 
@@ -114,3 +114,274 @@ def test_orchestrator_etf_and_fund_windows(tmp_db_path):
         fnd = conn.execute("SELECT trade_date, close FROM price_eod WHERE ts_code=?", ("FUND1.OF",)).fetchone()
         assert etf is not None and etf["trade_date"] == "2025-01-09" and abs(etf["close"] - 1.23) < 1e-6
         assert fnd is not None and fnd["trade_date"] == "2025-01-10" and abs(fnd["close"] - 2.34) < 1e-6
+
+
+def test_frame_to_bars_columnar_normalization():
+    df = pd.DataFrame([
+        {"ts_code": "AAA.STK", "trade_date": "20250102", "close": 10.5, "open": 10.0, "high": 10.6, "low": 9.9, "vol": float("nan"), "amount": 100},
+        {"ts_code": "BBB.STK", "trade_date": "20250102", "close": float("nan"), "open": 1.0, "high": 1.0, "low": 1.0, "vol": 1, "amount": 1},
+        {"ts_code": "ZZZ.STK", "trade_date": "20250102", "close": 3.0, "open": 3.0, "high": 3.0, "low": 3.0, "vol": 1, "amount": 1},
+    ])
+
+    bars = frame_to_bars(df, codes=["AAA.STK", "BBB.STK"])
+    # ZZZ 不在关注列表；BBB 无收盘价被丢弃
+    assert [b["ts_code"] for b in bars] == ["AAA.STK"]
+    bar = bars[0]
+    assert bar["trade_date"] == "2025-01-02"
+    assert bar["vol"] is None and bar["pre_close"] is None
+    assert isinstance(bar["amount"], float) and bar["amount"] == 100.0
+
+    # 显式指定日期时覆盖帧内日期
+    bars = frame_to_bars(df, codes=["ZZZ.STK"], trade_date="20250103")
+    assert bars[0]["trade_date"] == "2025-01-03"
+
+
+class RangeProvider(DummyProvider):
+    """区间模式：5 个交易日，记录每类接口的调用次数"""
+    OPEN = ["20250106", "20250107", "20250108", "20250109", "20250110"]
+
+    def trade_cal_open_dates(self, start, end):
+        return [d for d in self.OPEN if start <= d <= end]
+
+    def _bar(self, code, d, px):
+        return {"ts_code": code, "trade_date": d, "close": px, "open": px, "high": px, "low": px, "vol": 1, "amount": 1}
+
+    def daily_for_date(self, d):
+        self.calls.setdefault("daily", []).append(d)
+        return pd.DataFrame([self._bar(f"S{i}.SZ", d, 10.0 + i) for i in range(8)])
+
+    def daily_window(self, code, s, e):
+        self.calls.setdefault("daily_window", []).append(code)
+        return pd.DataFrame([self._bar(code, d, 1.0) for d in self.OPEN if s <= d <= e])
+
+    def fund_daily_window(self, code, s, e):
+        self.calls.setdefault("fund_daily_window", []).append(code)
+        return pd.DataFrame([self._bar(code, d, 2.0) for d in self.OPEN if s <= d <= e])
+
+    def fund_daily_for_date(self, d):
+        self.calls.setdefault("fund_daily", []).append(d)
+        return pd.DataFrame([])
+
+    def fund_nav_window(self, code, s, e):
+        self.calls.setdefault("fund_nav_window", []).append(code)
+        rows = [{"nav_date": d, "unit_nav": 3.0} for d in self.OPEN if s <= d <= e]
+        rows.append({"nav_date": "20250110", "unit_nav": 3.5})  # 重复公告，取最后一条
+        return pd.DataFrame(rows)
+
+
+def _seed_instruments(rows):
+    with get_conn() as conn:
+        conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES(?,?,?)", ("c", "s", 0))
+        cat_id = conn.execute("SELECT id FROM category LIMIT 1").fetchone()["id"]
+        for code, typ in rows:
+            conn.execute(
+                "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,?,?,1)",
+                (code, code, typ, cat_id),
+            )
+        conn.commit()
+
+
+def test_range_sync_picks_fewer_calls_per_bucket(tmp_db_path):
+    # 8 只股票 > 5 个交易日 -> 按日全市场；1 只 ETF、1 只基金 -> 按标的窗口
+    _seed_instruments([(f"S{i}.SZ", "STOCK") for i in range(8)] + [("ETF1.SH", "ETF"), ("FUND1.OF", "FUND")])
+    prov = RangeProvider()
+
+    out = sync_prices_range("20250104", "20250110", prov, DummyLog())
+
+    assert out["plan"]["STOCK"]["mode"] == "per_day"
+    assert out["plan"]["ETF"]["mode"] == "per_code"
+    assert out["plan"]["FUND"]["mode"] == "per_code"
+    assert len(prov.calls["daily"]) == 5
+    assert prov.calls["fund_daily_window"] == ["ETF1.SH"]
+    assert prov.calls["fund_nav_window"] == ["FUND1.OF"]
+    assert "daily_window" not in prov.calls
+    assert out["calls"] == 7
+    assert out["updated"] == 8 * 5 + 5 + 5
+    assert out["used_dates_uniq"] == RangeProvider.OPEN
+
+    with get_conn() as conn:
+        n = conn.execute("SELECT COUNT(1) AS c FROM price_eod").fetchone()["c"]
+        nav = conn.execute(
+            "SELECT close FROM price_eod WHERE ts_code='FUND1.OF' AND trade_date='2025-01-10'"
+        ).fetchone()["close"]
+    assert n == 50
+    assert abs(nav - 3.5) < 1e-9
+
+    # 第二次运行：全部已覆盖，不再请求数据源
+    prov2 = RangeProvider()
+    out2 = sync_prices_range("20250104", "20250110", prov2, DummyLog())
+    assert out2["calls"] == 0 and out2["skipped"] == 10
+    assert prov2.calls == {}
+
+
+def test_range_sync_per_code_when_few_codes(tmp_db_path):
+    _seed_instruments([("S0.SZ", "STOCK")])
+    prov = RangeProvider()
+
+    out = sync_prices_range("20250106", "20250110", prov, DummyLog())
+
+    assert out["plan"]["STOCK"]["mode"] == "per_code"
+    assert prov.calls["daily_window"] == ["S0.SZ"]
+    assert "daily" not in prov.calls
+    assert out["updated"] == 5
+
+
+def test_deferred_refresh_coalesces_zig_across_dates(tmp_db_path, monkeypatch):
+    from backend.services.signal_refresh_svc import deferred_signal_refresh
+    from backend.services.signal_svc import TdxZigSignalGenerator
+
+    _seed_instruments([("ETF1.SH", "ETF"), ("ETF2.SH", "ETF")])
+    calls = []
+    monkeypatch.setattr(
+        TdxZigSignalGenerator, "update_zig_signals_incremental",
+        staticmethod(lambda d, codes, written_from=None: calls.append((d, codes, dict(written_from or {}))) or {
+            "processed_instruments": len(codes), "deleted_signals": 0, "generated_signals": 0}),
+    )
+    prov = DummyProvider()
+    prov.fund_daily_window = lambda code, s, e: pd.DataFrame(
+        [{"trade_date": e, "close": 1.0 if code == "ETF1.SH" else 2.0}]
+    )
+
+    # 逐日（从近到远）同步：批次内只登记，结束时每个标的按最早变动日刷新一次
+    with deferred_signal_refresh(DummyLog()) as refresh:
+        for d in ("20250110", "20250109", "20250108"):
+            sync_prices(d, prov, DummyLog(), ["ETF1.SH", "ETF2.SH"])
+        assert calls == []
+    assert calls == [("2025-01-10", ["ETF1.SH", "ETF2.SH"], {"ETF1.SH": "2025-01-08", "ETF2.SH": "2025-01-08"})]
+    assert refresh.result["zig_signals"]["processed"] == 2
+
+    # 不在批次内：每次同步后立即刷新
+    calls.clear()
+    sync_prices("20250113", prov, DummyLog(), ["ETF1.SH"])
+    assert len(calls) == 1
+
+
+def test_concurrent_fund_fetch_single_writer(tmp_db_path):
+    import threading
+    import time as _time
+
+    codes = [f"F{i:03d}.OF" for i in range(24)]
+    with get_conn() as conn:
+        conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES(?,?,?)", ("c", "s", 0))
+        cat_id = conn.execute("SELECT id FROM category LIMIT 1").fetchone()["id"]
+        for c in codes:
+            conn.execute(
+                "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,?,?,1)",
+                (c, c, "FUND", cat_id),
+            )
+        conn.commit()
+
+    prov = DummyProvider()
+    lock = threading.Lock()
+    state = {"inflight": 0, "peak": 0}
+
+    def nav_window(code, s, e):
+        with lock:
+            state["inflight"] += 1
+            state["peak"] = max(state["peak"], state["inflight"])
+        _time.sleep(0.02)
+        with lock:
+            state["inflight"] -= 1
+        # 同一净值日重复公告 + 窗口外的未来日期
+        return pd.DataFrame([
+            {"nav_date": "20250109", "unit_nav": 1.0},
+            {"nav_date": "20250110", "unit_nav": 2.0},
+            {"nav_date": "20250110", "unit_nav": 2.5},
+            {"nav_date": "20250113", "unit_nav": 9.9},
+        ])
+
+    prov.fund_nav_window = nav_window
+    out = sync_prices("20250110", prov, DummyLog(), max_workers=6)
+
+    assert out["updated"] == len(codes)
+    assert 1 < state["peak"] <= 6
+    assert out["fetch"]["calls"] == len(codes) and out["fetch"]["workers"] == 6
+    assert out["fetch"]["write_batches"] == 1
+    assert out["fetch"]["calls_per_min"] > 0
+    with get_conn() as conn:
+        rows = conn.execute("SELECT trade_date, close FROM price_eod").fetchall()
+    assert len(rows) == len(codes)
+    assert all(r["trade_date"] == "2025-01-10" and abs(r["close"] - 2.5) < 1e-9 for r in rows)
+
+
+def test_token_bucket_shared_across_threads():
+    import threading
+    import time as _time
+    from backend.providers.rate_limit import TokenBucket
+
+    bucket = TokenBucket(rate_per_min=600, burst=5)  # 10/s，初始可突发 5 次
+    t0 = _time.monotonic()
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = _time.monotonic() - t0
+    stats = bucket.stats()
+    assert stats["calls"] == 8
+    # 超出突发的 3 次需要补充令牌（约 0.3s）
+    assert elapsed >= 0.25
+    assert TokenBucket(None).stats()["rate_per_min"] is None
+
+
+def test_token_bucket_cold_start_stays_within_rate():
+    import threading
+    import time as _time
+    from backend.providers.rate_limit import TokenBucket
+
+    # 1200/min = 20/s：冷启动后任一 0.5s 窗口内最多 10 次（默认不突发）
+    bucket = TokenBucket(rate_per_min=1200)
+    window = 0.5
+    t0 = _time.monotonic()
+    stamps: list[float] = []
+    lock = threading.Lock()
+
+    def _worker():
+        while True:
+            bucket.acquire()
+            now = _time.monotonic() - t0
+            if now >= window + 0.2:
+                return
+            with lock:
+                stamps.append(now)
+
+    threads = [threading.Thread(target=_worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    first_window = [s for s in stamps if s < window]
+    assert len(first_window) <= 10 + 1  # 计时抖动容差；满桶启动时会先一次突发 1200 次
+    assert len(first_window) >= 5
+
+
+def test_range_sync_refreshes_zig_over_whole_range(client):
+    from backend.services.signal_svc import TdxZigSignalGenerator
+    from backend.tests.test_zig_state import _db_zig, _full_history_signals
+
+    code = "ZR.SZ"
+    _seed_instruments([(code, "STOCK")])
+    days = [d.strftime("%Y%m%d") for d in pd.bdate_range("2025-01-02", periods=60)]
+    # 每 5 个交易日反向一次、幅度超过 10% 的锯齿走势：区间中段也有拐点
+    closes = [round(10 * (1.04 ** (i % 10 if i % 10 < 5 else 10 - i % 10)) * (1 + i / 200), 3) for i in range(60)]
+    dash = [f"{d[:4]}-{d[4:6]}-{d[6:]}" for d in days]
+
+    with get_conn() as conn:
+        conn.executemany(
+            "INSERT INTO price_eod(ts_code, trade_date, close) VALUES(?,?,?)",
+            [(code, d, c) for d, c in zip(dash[:30], closes[:30])],
+        )
+    TdxZigSignalGenerator.update_zig_signals_incremental(dash[29], [code])
+
+    class ZigProvider(RangeProvider):
+        OPEN = days[30:]
+
+        def daily_window(self, c, s, e):
+            return pd.DataFrame([self._bar(c, d, px) for d, px in zip(days, closes) if s <= d <= e])
+
+    out = sync_prices_range(days[30], days[-1], ZigProvider(), DummyLog())
+    assert out["updated"] == 30
+
+    expected = _full_history_signals(dash, closes)
+    assert any(dash[30] < d < dash[-1] for d, _ in expected)
+    assert _db_zig(code) == expected
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from backend.providers.response_cache import ResponseCache, _covers
+from backend.providers.tushare_provider import TuShareProvider
+
+
+class FakePro:
+    def __init__(self):
+        self.calls = []
+
+    def fund_daily(self, ts_code=None, start_date=None, end_date=None, trade_date=None):
+        self.calls.append(("fund_daily", ts_code, start_date, end_date))
+        days = pd.bdate_range(pd.Timestamp(start_date), pd.Timestamp(end_date))
+        return pd.DataFrame([
+            {"ts_code": ts_code, "trade_date": d.strftime("%Y%m%d"), "close": 1.0 + i / 100}
+            for i, d in enumerate(days)
+        ])
+
+    def daily(self, trade_date=None, **_):
+        self.calls.append(("daily", trade_date))
+        return pd.DataFrame([{"ts_code": "AAA.SZ", "trade_date": trade_date, "close": 10.0}])
+
+
+def _provider(cache: ResponseCache) -> tuple[TuShareProvider, FakePro]:
+    prov = TuShareProvider("dummy-token", cache=cache)
+    fake = FakePro()
+    prov.pro = fake
+    return prov, fake
+
+
+def test_covers_merges_adjacent_intervals():
+    assert _covers([("20250101", "20250110"), ("20250111", "20250120")], "20250105", "20250118")
+    assert not _covers([("20250101", "20250110"), ("20250112", "20250120")], "20250105", "20250118")
+    assert not _covers([("20250103", "20250120")], "20250101", "20250110")
+
+
+def test_window_served_from_persistent_cache_across_instances(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    prov, fake = _provider(cache)
+    full = prov.fund_daily_window("ETF1.SH", "20240101", "20240131")
+    assert len(fake.calls) == 1
+
+    # 新实例（模拟重启后重新构造）+ 被覆盖的子区间：不再请求远端
+    cache2 = ResponseCache(str(tmp_path / "cache.db"))
+    prov2, fake2 = _provider(cache2)
+    sub = prov2.fund_daily_window("ETF1.SH", "20240110", "20240120")
+    assert fake2.calls == []
+    assert set(sub["trade_date"]) == {d for d in full["trade_date"] if "20240110" <= d <= "20240120"}
+    assert cache2.stats()["endpoints"]["fund_daily"]["window_hits"] == 1
+
+    # 超出已缓存范围 -> 未命中，请求远端
+    prov2.fund_daily_window("ETF1.SH", "20240120", "20240210")
+    assert len(fake2.calls) == 1
+
+
+def test_ttl_closed_history_never_expires_today_does(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    assert cache.expires_at("daily", "20200102") is None
+    today = datetime.now().strftime("%Y%m%d")
+    assert cache.expires_at("daily", today) is not None
+    # fund_nav 净值有发布滞后：昨天仍视为未封闭
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+    assert cache.expires_at("fund_nav", yesterday) is not None
+
+    prov, fake = _provider(cache)
+    prov.daily_for_date("20200102")
+    prov2, fake2 = _provider(cache)
+    prov2.daily_for_date("20200102")
+    assert fake2.calls == []
+    stats = cache.stats()
+    assert stats["hits"] >= 1 and stats["entries"]["daily"] == 1
+
+
+def test_cache_stats_api(client):
+    r = client.get("/api/provider/cache-stats")
+    assert r.status_code == 200
+    body = r.json()
+    assert "hits" in body and "misses" in body and "entries" in body
+
+
+def test_empty_closed_date_result_refetched_after_ttl(tmp_path, monkeypatch):
+    import backend.providers.response_cache as rc
+
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    assert cache.expires_at("fund_nav", "20200102", empty=True) is not None
+
+    calls = []
+
+    def fetch_empty():
+        prov, fake = _provider(cache)
+        fake.daily = lambda trade_date=None, **_: calls.append(trade_date) or pd.DataFrame([])
+        return prov.daily_for_date("20200102")
+
+    assert fetch_empty().empty
+    assert fetch_empty().empty
+    assert calls == ["20200102"]  # TTL 内命中缓存
+
+    # 过了接口 TTL：空结果失效，重新请求远端
+    now = rc.time.time()
+    monkeypatch.setattr(rc.time, "time", lambda: now + rc.ENDPOINT_TTL["daily"] + 1)
+    fetch_empty()
+    assert len(calls) == 2
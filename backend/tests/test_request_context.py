@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import threading
+
+from backend.db import get_conn
+from backend.repository import price_repo, reporting_repo
+from backend.services import config_svc, request_context
+from backend.services.aggregator_svc import aggregator_service
+from backend.services.dashboard_svc import get_dashboard, list_category, list_position
+
+
+def _seed():
+    with get_conn() as conn:
+        cat = conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES('equity','a',2)").lastrowid
+        conn.executemany(
+            "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,'STOCK',?,1)",
+            [("000001.SZ", "a", cat), ("600000.SH", "b", cat), ("000002.SZ", "c", cat)],
+        )
+        conn.executemany(
+            "INSERT INTO position(ts_code, shares, avg_cost, last_update) VALUES(?,?,?,'2024-01-02')",
+            [("000001.SZ", 100, 10.0), ("600000.SH", 200, 8.0)],
+        )
+        price_repo.upsert_price_eod_many(conn, [
+            {"ts_code": "000001.SZ", "trade_date": "2024-01-03", "close": 12.0},
+            {"ts_code": "600000.SH", "trade_date": "2024-01-03", "close": 7.5},
+        ])
+
+
+def test_dashboard_sections_share_one_holdings_query(tmp_db_path, monkeypatch):
+    _seed()
+    expected = {
+        "dashboard": get_dashboard("20240103"),
+        "categories": list_category("20240103"),
+        "positions": list_position("20240103"),
+    }
+
+    calls = {"holdings": 0, "config": 0}
+    real_holdings, real_config = reporting_repo.active_instruments_with_pos_and_price, config_svc._read_config
+
+    def counting_holdings(conn, d):
+        calls["holdings"] += 1
+        return real_holdings(conn, d)
+
+    def counting_config(conn):
+        calls["config"] += 1
+        return real_config(conn)
+
+    monkeypatch.setattr(reporting_repo, "active_instruments_with_pos_and_price", counting_holdings)
+    monkeypatch.setattr(config_svc, "_read_config", counting_config)
+    aggregator_service.fetcher._cache.clear()
+
+    result = aggregator_service.fetch_dashboard_full("20240103")
+    assert "errors" not in result["_meta"]
+    assert calls == {"holdings": 1, "config": 1}
+    for key, value in expected.items():
+        assert result[key] == value
+    # 没有持仓记录的 000002.SZ 不列出
+    assert [(p["ts_code"], p["shares"], p["close"], p["price_source"]) for p in result["positions"]] == [
+        ("000001.SZ", 100.0, 12.0, "eod"), ("600000.SH", 200.0, 7.5, "eod")]
+
+
+def test_context_reads_one_snapshot(tmp_db_path):
+    _seed()
+
+    def count(conn):
+        return conn.execute("SELECT COUNT(1) FROM price_eod").fetchone()[0]
+
+    def write():
+        with get_conn() as conn:
+            price_repo.upsert_price_eod_many(conn, [{"ts_code": "000002.SZ", "trade_date": "2024-01-03", "close": 5.0}])
+
+    with request_context.request_context() as ctx:
+        assert request_context.shared(("before",), count) == 2
+        t = threading.Thread(target=write)
+        t.start()
+        t.join()
+        # 其它连接的写入已提交，但上下文内后算的结果仍来自同一快照
+        assert request_context.shared(("after",), count) == 2
+        assert request_context.shared(("before",), count) == 2
+        assert ctx.stats == {"hits": 1, "misses": 2}
+    assert request_context.current() is None
+    assert request_context.shared(("after",), count) == 3
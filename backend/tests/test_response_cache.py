@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from backend.db import get_conn
+from backend.http_cache import get_response_cache
+from backend.logs import OperationLogContext
+from backend.repository import data_version_repo, price_repo, signal_repo, txn_repo
+from backend.services.config_svc import update_config
+
+URL = "/api/dashboard/aggregate?start=20240101&end=20240131&period=day"
+
+
+def _versions() -> dict:
+    with get_conn() as conn:
+        return data_version_repo.get_versions(conn)
+
+
+def test_writes_bump_data_versions(client):
+    v0 = _versions()
+    assert v0 is not None and "price_eod" in v0
+
+    with get_conn() as conn:
+        price_repo.upsert_price_eod_many(conn, [
+            {"ts_code": "000001.SZ", "trade_date": "2024-01-02", "close": 10.0},
+            {"ts_code": "000001.SZ", "trade_date": "2024-01-03", "close": 10.5},
+        ])
+    v1 = _versions()
+    # 整批只递增一次；price_latest 由触发器逐行递增
+    assert v1["price_eod"] == v0["price_eod"] + 1
+    assert v1["price_latest"] > v0["price_latest"]
+
+    with get_conn() as conn:
+        txn_repo.insert_txn(conn, "000001.SZ", "2024-01-02", "BUY", 100, 10.0, None, 0, None)
+        signal_repo.insert_signal(conn, "2024-01-03", "000001.SZ", level="HIGH", signal_type="BUY_SIGNAL", message="x")
+    update_config({"unit_amount": 5000}, OperationLogContext("TEST"))
+    v2 = _versions()
+    for table in ("txn", "signal", "config"):
+        assert v2[table] > v1[table]
+    assert v2["price_eod"] == v1["price_eod"]
+
+
+def test_etag_and_invalidation(client):
+    cache = get_response_cache()
+    before = cache.stats()
+
+    r1 = client.get(URL)
+    assert r1.status_code == 200
+    etag = r1.headers["etag"]
+    assert r1.headers["cache-control"] == "no-cache"
+
+    r2 = client.get(URL)
+    assert r2.headers["etag"] == etag and r2.json() == r1.json()
+    r3 = client.get(URL, headers={"If-None-Match": etag})
+    assert r3.status_code == 304 and r3.content == b""
+
+    after = cache.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+    assert after["not_modified"] - before["not_modified"] == 1
+
+    # 其它参数是另一条缓存
+    assert client.get(URL.replace("period=day", "period=week")).headers["etag"] != etag
+
+    # 写入后版本变化：旧 ETag 不再 304，重新计算
+    with get_conn() as conn:
+        txn_repo.insert_txn(conn, "000001.SZ", "2024-01-02", "BUY", 100, 10.0, None, 0, None)
+    r4 = client.get(URL, headers={"If-None-Match": etag})
+    assert r4.status_code == 200 and r4.headers["etag"] != etag
+
+    # 空库上 categories 板块失败：部分结果不带 ETag，也不进缓存
+    entries = cache.stats()["entries"]
+    r5 = client.get("/api/aggregated/dashboard?date=20240131")
+    assert r5.status_code == 200 and "categories" in r5.json()["_meta"]["errors"]
+    assert "etag" not in r5.headers
+    assert cache.stats()["entries"] == entries
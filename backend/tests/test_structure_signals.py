@@ -92,6 +92,13 @@ class TestTdxStructureSignalGenerator:
             if "SELECT DISTINCT p.ts_code" in sql:
                 # 返回标的列表
                 mock_result.fetchall.return_value = mock_instruments
+            elif "ROW_NUMBER()" in sql:
+                # 批量窗口查询：所有标的的最近收盘价 (ts_code, trade_date, close)
+                mock_result.fetchall.return_value = [
+                    (code, f"2025-01-{i+1:02d}", 100.0 - i * 0.1)
+                    for (code,) in mock_instruments
+                    for i in range(20)
+                ]
             else:
                 # 返回价格数据（构造足够的数据用于计算）
                 mock_price_data = []
@@ -185,6 +192,135 @@ def test_integration_with_existing_signal_system(setup_test_data):
     assert signal_level == "HIGH"
 
 
+def _seed_structure_universe():
+    """构造带趋势段的价格序列：含停牌缺口、不活跃标的与区间前已有信号"""
+    import numpy as np
+    from datetime import date, timedelta
+    from backend.db import get_conn
+
+    rng = np.random.default_rng(42)
+    days = []
+    d = date(2024, 1, 1)
+    while len(days) < 160:
+        if d.weekday() < 5:
+            days.append(d.isoformat())
+        d += timedelta(days=1)
+
+    with get_conn() as conn:
+        conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES(?,?,?)", ("c", "s", 0))
+        cat_id = conn.execute("SELECT id FROM category LIMIT 1").fetchone()["id"]
+        for k in range(6):
+            code = f"S{k}.SZ"
+            conn.execute(
+                "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,?,?,?)",
+                (code, code, "STOCK", cat_id, 0 if k == 5 else 1),
+            )
+            drift = np.repeat(rng.choice([-0.8, 0.8], size=len(days) // 10 + 1), 10)[: len(days)]
+            closes = 50 + np.cumsum(drift + rng.normal(0, 0.4, len(days)))
+            rows = [
+                (code, day, round(float(c), 2))
+                for i, (day, c) in enumerate(zip(days, closes))
+                if not (k == 2 and 70 <= i < 78)  # S2 停牌 8 天
+            ]
+            conn.executemany("INSERT INTO price_eod(ts_code, trade_date, close) VALUES(?,?,?)", rows)
+        # 区间开始前已有的结构信号，会抑制区间开头的新信号
+        conn.execute(
+            "INSERT INTO signal(trade_date, ts_code, scope_type, scope_data, level, type, message) "
+            "VALUES(?,?,?,?,?,?,?)",
+            (days[39], "S1.SZ", "INSTRUMENT", '["S1.SZ"]', "HIGH", "BUY_STRUCTURE", "pre-existing"),
+        )
+        conn.commit()
+    return days
+
+
+def _structure_snapshot():
+    from backend.db import get_conn
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT trade_date, ts_code, scope_type, scope_data, level, type, message FROM signal "
+            "WHERE type IN ('BUY_STRUCTURE','SELL_STRUCTURE') ORDER BY trade_date, ts_code, type"
+        ).fetchall()
+    return [tuple(r) for r in rows]
+
+
+def test_single_pass_rebuild_matches_per_day_path(tmp_db_path):
+    from backend.services.signal_svc import SignalGenerationService
+
+    days = _seed_structure_universe()
+    start, end = days[40], days[-1]
+
+    legacy = SignalGenerationService.rebuild_structure_signals_for_period(start, end, engine="per_day")
+    expected = _structure_snapshot()
+
+    fast = SignalGenerationService.rebuild_structure_signals_for_period(start, end, engine="vector")
+    actual = _structure_snapshot()
+
+    assert legacy["total_signals"] > 0
+    assert fast["total_signals"] == legacy["total_signals"]
+    assert fast["processed_dates"] == legacy["processed_dates"]
+    assert actual == expected
+
+
+def test_parallel_rebuild_matches_single_process(tmp_db_path):
+    from backend.db import get_conn
+    from backend.services.signal_svc import rebuild_historical_signals, rebuild_zig_signals
+
+    days = _seed_structure_universe()
+    start, end = days[40], days[-1]
+
+    def _zig_snapshot():
+        with get_conn() as conn:
+            signals = conn.execute(
+                "SELECT trade_date, ts_code, type, message FROM signal "
+                "WHERE type IN ('ZIG_BUY','ZIG_SELL') ORDER BY trade_date, ts_code, type"
+            ).fetchall()
+            states = conn.execute("SELECT ts_code, state, prev_state FROM zig_state ORDER BY ts_code").fetchall()
+        return [tuple(r) for r in signals], [tuple(r) for r in states]
+
+    serial = rebuild_historical_signals(start, end)
+    expected = _structure_snapshot()
+    serial_zig = rebuild_zig_signals(start, end)
+    expected_zig = _zig_snapshot()
+
+    parallel = rebuild_historical_signals(start, end, workers=2)
+    parallel_zig = rebuild_zig_signals(start, end, workers=2)
+
+    assert serial["generated_signals"] > 0 and serial_zig["generated_signals"] > 0
+    assert parallel["generated_signals"] == serial["generated_signals"]
+    assert parallel_zig["generated_signals"] == serial_zig["generated_signals"]
+    assert _structure_snapshot() == expected
+    assert _zig_snapshot() == expected_zig
+
+    per_worker = parallel["structure"]["per_worker"]
+    assert sum(w["codes"] for w in per_worker) == parallel["structure"]["instruments"] == 5
+    assert sum(w["signals"] for w in per_worker) == parallel["generated_signals"]
+
+
+def test_rebuild_for_codes_from_dirty_date_matches_per_day_path(tmp_db_path):
+    from backend.db import get_conn
+    from backend.services.signal_svc import SignalGenerationService
+
+    days = _seed_structure_universe()
+    SignalGenerationService.rebuild_structure_signals_for_period(days[40], days[-1], engine="per_day")
+    expected = _structure_snapshot()
+
+    # 回补改写后：变动日之后的结构信号缺失 / 过时
+    with get_conn() as conn:
+        conn.execute("DELETE FROM signal WHERE ts_code='S0.SZ' AND trade_date>=? AND type LIKE '%STRUCTURE'", (days[100],))
+        conn.execute(
+            "INSERT INTO signal(trade_date, ts_code, scope_type, scope_data, level, type, message) "
+            "VALUES(?,?,?,?,?,?,?)",
+            (days[120], "S3.SZ", "INSTRUMENT", '["S3.SZ"]', "HIGH", "SELL_STRUCTURE", "stale"),
+        )
+    assert _structure_snapshot() != expected
+
+    out = TdxStructureSignalGenerator.rebuild_structure_signals_for_codes(
+        {"S0.SZ": days[100], "S3.SZ": days[90], "S5.SZ": days[100]}  # S5 不活跃
+    )
+    assert out["codes"] == 2 and out["dates"] == len(days) - 90
+    assert _structure_snapshot() == expected
+
+
 if __name__ == "__main__":
     # 可以单独运行此测试文件
     pytest.main([__file__])
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import pandas as pd
+
+from backend.db import get_conn
+from backend.domain.trade_calendar import TradingCalendar
+from backend.repository import calendar_repo
+from backend.services import calendar_svc
+from backend.services.pricing_orchestrator import sync_prices
+
+
+def _week_rows():
+    # 2025-01-01 元旦休市；01-04/05 周末
+    days = [f"202501{d:02d}" for d in range(1, 13)]
+    closed = {"20250101", "20250104", "20250105", "20250111", "20250112"}
+    return [(d, 0 if d in closed else 1) for d in days]
+
+
+def test_calendar_lookups():
+    cal = TradingCalendar(_week_rows())
+    assert cal.is_open("20250102") is True
+    assert cal.is_open("2025-01-04") is False
+    assert cal.is_open("20240601") is None  # 未覆盖
+
+    assert cal.prev_open("20250106") == "20250103"
+    assert cal.prev_open("20250105") == "20250103"
+    assert cal.prev_open("20250105", inclusive=True) == "20250103"
+    assert cal.prev_open("20250102") is None
+    assert cal.next_open("20250103") == "20250106"
+    assert cal.next_open("2025-01-04") == "2025-01-06"
+
+    assert cal.n_trading_days_back("20250108", 0) == "20250108"
+    assert cal.n_trading_days_back("20250108", 3) == "20250103"
+    assert cal.n_trading_days_back("2025-01-05", 1) == "2025-01-02"
+    assert cal.open_days_between("20250101", "20250107") == ["20250102", "20250103", "20250106", "20250107"]
+
+
+class _NoRemoteCalProvider:
+    def __init__(self):
+        self.daily_calls = []
+
+    def daily_for_date(self, d):
+        self.daily_calls.append(d)
+        if d == "20250103":
+            return pd.DataFrame([{"ts_code": "AAA.STK", "close": 10.5, "open": 10.0, "high": 10.6,
+                                  "low": 9.9, "vol": 1000, "amount": 10000}])
+        return pd.DataFrame([])
+
+    def trade_cal_is_open(self, d):
+        raise AssertionError("remote trade_cal must not be called when the local calendar covers the date")
+
+    def trade_cal_backfill_recent_open(self, d, lookback_days=30):
+        raise AssertionError("remote trade_cal must not be called when the local calendar covers the date")
+
+    def trade_cal_frame(self, start, end):
+        return pd.DataFrame([{"cal_date": d, "is_open": o} for d, o in _week_rows()])
+
+
+class _Log:
+    def set_after(self, obj): self.after = obj
+    def set_payload(self, obj): self.payload = obj
+    def write(self, result="OK", err=None): pass
+
+
+def test_sync_on_weekend_uses_local_calendar(tmp_db_path):
+    calendar_svc.invalidate_calendar()
+    with get_conn() as conn:
+        calendar_repo.upsert_days(conn, [(f"{d[0:4]}-{d[4:6]}-{d[6:8]}", o) for d, o in _week_rows()])
+        conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES(?,?,?)", ("c", "s", 0))
+        cat_id = conn.execute("SELECT id FROM category LIMIT 1").fetchone()["id"]
+        conn.execute(
+            "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,?,?,1)",
+            ("AAA.STK", "AAA", "STOCK", cat_id),
+        )
+        conn.commit()
+    calendar_svc.invalidate_calendar()
+
+    prov = _NoRemoteCalProvider()
+    out = sync_prices("20250105", prov, _Log())
+
+    # 休市日不请求当天行情，直接取上一开市日
+    assert prov.daily_calls == ["20250103"]
+    assert out["used_dates_uniq"] == ["20250103"]
+    calendar_svc.invalidate_calendar()
+
+
+def test_ensure_years_loads_from_provider_once(tmp_db_path):
+    calendar_svc.invalidate_calendar()
+
+    class P:
+        calls = 0
+
+        def trade_cal_frame(self, start, end):
+            P.calls += 1
+            days = pd.date_range(start, end)
+            return pd.DataFrame({"cal_date": days.strftime("%Y%m%d"), "is_open": (days.weekday < 5).astype(int)})
+
+    loaded = calendar_svc.ensure_years([2023], P())
+    assert loaded[2023]["days"] == 365 and loaded[2023]["source"] == "provider"
+    assert calendar_svc.ensure_years([2023], P()) == {}
+    assert P.calls == 1
+    cal = calendar_svc.get_calendar()
+    assert cal.is_open("2023-07-01") is False and cal.is_open("2023-07-03") is True
+    calendar_svc.invalidate_calendar()
+
+
+def test_failed_year_is_retried_after_backoff(tmp_db_path, monkeypatch):
+    calendar_svc.invalidate_calendar()
+
+    class Failing:
+        calls = 0
+
+        def trade_cal_frame(self, start, end):
+            Failing.calls += 1
+            raise RuntimeError("no token")
+
+    monkeypatch.setattr(calendar_svc, "DEFAULT_CSV_PATH", "")
+    calendar_svc.ensure_calendar_for("20390605", Failing())
+    calendar_svc.ensure_calendar_for("20390606", Failing())
+    assert Failing.calls == 1  # 退避期内不再重复请求
+
+    now = calendar_svc.time.monotonic()
+    monkeypatch.setattr(calendar_svc.time, "monotonic", lambda: now + calendar_svc.CALENDAR_RETRY_SECONDS + 1)
+    calendar_svc.ensure_calendar_for("20390606", Failing())
+    assert Failing.calls == 2
+    calendar_svc.invalidate_calendar()
+
+
+def test_structure_window_uses_exchange_calendar_only_for_a_shares(tmp_db_path):
+    from backend.repository import signal_repo
+
+    calendar_svc.invalidate_calendar()
+    with get_conn() as conn:
+        calendar_repo.upsert_days(conn, [(f"{d[0:4]}-{d[4:6]}-{d[6:8]}", o) for d, o in _week_rows()])
+        for code in ("A.SZ", "H.HK"):
+            # 该标的 01-07 没有 K 线（港股休市）：最近 2 个交易日按自身 K 线为 01-06、01-08
+            conn.executemany(
+                "INSERT INTO price_eod(ts_code, trade_date, close) VALUES(?,?,1.0)",
+                [(code, d) for d in ("2025-01-03", "2025-01-06", "2025-01-08")],
+            )
+            signal_repo.insert_signal(conn, "2025-01-06", ts_code=code, level="HIGH",
+                                      signal_type="BUY_STRUCTURE", message="x")
+        conn.commit()
+    calendar_svc.invalidate_calendar()
+
+    with get_conn() as conn:
+        assert signal_repo.has_recent_structure_signal(conn, "A.SZ", "2025-01-08", days_back=2) is False
+        assert signal_repo.has_recent_structure_signal(conn, "H.HK", "2025-01-08", days_back=2) is True
+    calendar_svc.invalidate_calendar()
+
+
+def test_missing_dates_lookup_does_not_build_provider(tmp_db_path, monkeypatch):
+    from backend.services import pricing_svc
+
+    def _no_provider(*a, **k):
+        raise AssertionError("read-only lookup must not build a provider")
+
+    monkeypatch.setattr(pricing_svc, "_provider_from_config", _no_provider)
+    assert isinstance(pricing_svc.find_missing_price_dates(3), dict)
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from backend.db import get_conn
+from backend.logs import OperationLogContext
+from backend.services.txn_svc import bulk_txn, create_txn
+
+TABLES = ("txn", "position", "position_ledger", "watchlist")
+
+SEED = {"ts_code": "000001.SZ", "date": "2024-01-03", "action": "BUY", "shares": 100, "price": 10.0, "fee": 1.0}
+BATCH = [
+    {"ts_code": "000001.SZ", "date": "2024-01-03", "action": "SELL", "shares": 100, "price": 10.5, "fee": 1.0},  # 与已有行成 T
+    {"ts_code": "000001.SZ", "date": "2024-01-04", "action": "BUY", "shares": 300, "price": 9.8, "fee": 2.0},
+    {"ts_code": "000001.SZ", "date": "2024-01-05", "action": "BUY", "shares": 50, "price": 9.9, "fee": 0.5},
+    {"ts_code": "000001.SZ", "date": "2024-01-05", "action": "SELL", "shares": 50, "price": 10.1, "fee": 0.5},  # 批内 T
+    {"ts_code": "000001.SZ", "date": "2024-01-08", "action": "DIV", "shares": 0, "amount": 30.0},
+    {"ts_code": "000001.SZ", "date": "2024-01-09", "action": "SELL", "shares": 300, "price": 11.0, "fee": 3.0},  # 清仓
+    {"ts_code": "600000.SH", "date": "2024-01-04", "action": "BUY", "shares": 200, "price": 8.0, "fee": 1.0},
+    {"ts_code": "600000.SH", "date": "2024-01-10", "action": "FEE", "shares": 0, "fee": 5.0},
+    {"ts_code": "600000.SH", "date": "2024-01-11", "action": "SELL", "shares": 80, "price": 8.8, "fee": 1.0},
+]
+
+
+def _seed_instruments():
+    with get_conn() as conn:
+        cat_id = conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES('c','s',0)").lastrowid
+        conn.executemany(
+            "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,?,?,1)",
+            [("000001.SZ", "a", "STOCK", cat_id), ("600000.SH", "b", "STOCK", cat_id), ("CASH.CNY", "cash", "CASH", cat_id)],
+        )
+
+
+def _reset():
+    with get_conn() as conn:
+        for t in TABLES:
+            conn.execute(f"DELETE FROM {t}")
+        conn.execute("DELETE FROM sqlite_sequence WHERE name='txn'")
+
+
+def _snapshot() -> dict:
+    with get_conn() as conn:
+        return {
+            "txn": [tuple(r) for r in conn.execute(
+                "SELECT id, ts_code, trade_date, action, shares, price, amount, fee, notes, group_id, realized_pnl "
+                "FROM txn ORDER BY id").fetchall()],
+            "position": [tuple(r) for r in conn.execute(
+                "SELECT ts_code, shares, avg_cost, last_update FROM position ORDER BY ts_code").fetchall()],
+            "position_ledger": [tuple(r) for r in conn.execute(
+                "SELECT * FROM position_ledger ORDER BY ts_code, valid_from").fetchall()],
+            "watchlist": [r[0] for r in conn.execute("SELECT ts_code FROM watchlist ORDER BY ts_code").fetchall()],
+        }
+
+
+def test_bulk_matches_sequential_create_txn(tmp_db_path):
+    _seed_instruments()
+    _reset()
+    create_txn(SEED, OperationLogContext("TEST"))
+    for r in BATCH:
+        create_txn(r, OperationLogContext("TEST"))
+    expected = _snapshot()
+
+    _reset()
+    create_txn(SEED, OperationLogContext("TEST"))
+    # 输入按日期交错，批量路径自行按 (ts_code, trade_date) 排序
+    res = bulk_txn(sorted(BATCH, key=lambda r: r["date"]), OperationLogContext("TEST"))
+    assert res == {"ok": len(BATCH), "fail": 0, "errors": []}
+    got = _snapshot()
+    assert got["txn"] == expected["txn"]
+    assert got["watchlist"] == expected["watchlist"] == ["000001.SZ"]
+
+    # 逐笔写入时现金按标的顺序（非时间顺序）变动，均价因此不同；批量路径按日期重放现金，份额一致
+    def split(rows, key):
+        return [r for r in rows if r[0] != "CASH.CNY"], [(r[0], r[1], r[key]) for r in rows if r[0] == "CASH.CNY"]
+
+    for table, key in (("position", 1), ("position_ledger", 3)):
+        exp_other, exp_cash = split(expected[table], key)
+        got_other, got_cash = split(got[table], key)
+        assert got_other == exp_other
+        assert got_cash == exp_cash
+
+
+def test_bulk_per_row_and_atomic_modes(tmp_db_path, client):
+    _seed_instruments()
+    rows = [
+        {"ts_code": "600000.SH", "date": "2024-01-04", "action": "BUY", "shares": 100, "price": 8.0},
+        {"ts_code": "600000.SH", "date": "2024-01-05", "action": "SELL", "shares": 500, "price": 8.0},  # 超卖
+        {"ts_code": "600000.SH", "date": "2024/01/06", "action": "BUY", "shares": 10, "price": 8.0},   # 日期非法
+        {"ts_code": "600000.SH", "date": "2024-01-06", "action": "SWAP", "shares": 10, "price": 8.0},  # 动作非法
+    ]
+
+    r = client.post("/api/txn/bulk", json={"items": rows, "recalc": "none", "mode": "atomic"})
+    assert r.status_code == 400
+    assert [e["index"] for e in r.json()["detail"]["errors"]] == [2, 3]
+    assert _snapshot()["txn"] == []
+
+    res = bulk_txn(rows[:2], OperationLogContext("TEST"), mode="atomic")
+    assert res["ok"] == 0 and [e["index"] for e in res["errors"]] == [1]
+    assert _snapshot()["txn"] == []
+
+    r = client.post("/api/txn/bulk", json={"items": rows, "recalc": "none"})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["ok"] == 1 and body["fail"] == 3
+    assert [e["index"] for e in body["errors"]] == [1, 2, 3]
+    snap = _snapshot()
+    assert [t[3] for t in snap["txn"]] == ["BUY", "ADJ"]
+    assert snap["position"] == [("600000.SH", 100.0, 8.0, "2024-01-04"), ("CASH.CNY", -800.0, 0.0, "2024-01-04")]
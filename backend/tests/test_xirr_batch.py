@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.db import get_conn
+from backend.domain.xirr import cashflow_matrix, xirr_many
+from backend.services.analytics_svc import compute_position_xirr, compute_position_xirr_batch
+
+
+def _npv(series, r):
+    a, t = cashflow_matrix([series])
+    return float((a * (1 + r) ** t).sum())
+
+
+def test_xirr_many_closed_form_and_bracket_fallback():
+    series = [
+        [("2023-01-01", -100.0), ("2024-01-01", 110.0)],                      # 365 天 → 10%
+        [("2016-05-22", -330.069), ("2017-12-03", 1229.767), ("2022-12-11", 527.512)],  # 牛顿发散，二分兜底
+        [("2024-01-01", -100.0)],                                             # 不足两笔
+        [("2024-01-01", -100.0), ("2024-01-01", 50.0)],                       # 同日流水：无解
+    ]
+    r = xirr_many(series)
+    assert r[0] == pytest.approx(0.10, abs=1e-10)
+    assert r[1] is not None and abs(_npv(series[1], r[1])) < 1e-6
+    assert r[2] is None and r[3] is None
+
+
+def test_batch_matches_single_position(tmp_db_path):
+    rng = np.random.default_rng(3)
+    codes = [f"{i:06d}.SZ" for i in range(6)]
+    with get_conn() as conn:
+        cat_id = conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES('c','s',0)").lastrowid
+        conn.executemany(
+            "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,?,?,1)",
+            [(c, c, "STOCK", cat_id) for c in codes] + [("CASH.CNY", "cash", "CASH", cat_id)],
+        )
+        for i, c in enumerate(codes[:4]):
+            days = np.sort(rng.choice(300, 8, replace=False))
+            for k, day in enumerate(days):
+                action = "SELL" if k % 3 == 2 else "BUY"
+                conn.execute(
+                    "INSERT INTO txn(ts_code, trade_date, action, shares, price, fee) VALUES(?,?,?,?,?,?)",
+                    (c, str(np.datetime64("2023-01-02") + int(day)), action, 100, 10 + rng.normal(), 1.0),
+                )
+            conn.execute("INSERT INTO position(ts_code, shares, avg_cost, last_update) VALUES(?,?,?,?)",
+                         (c, 300.0, 10.0, "2023-11-01"))
+        # 无流水：走 建仓→估值 推算
+        conn.execute("INSERT INTO position(ts_code, shares, avg_cost, last_update, opening_date) VALUES(?,?,?,?,?)",
+                     (codes[4], 100.0, 8.0, "2023-06-01", "2023-03-01"))
+        conn.execute("INSERT INTO position(ts_code, shares, avg_cost, last_update) VALUES(?,?,?,?)",
+                     ("CASH.CNY", 1000.0, 1.0, "2023-06-01"))
+        conn.executemany(
+            "INSERT INTO price_eod(ts_code, trade_date, close) VALUES(?,?,?)",
+            [(c, "2023-12-29", 11.0 + i) for i, c in enumerate(codes[:5])],
+        )
+        conn.commit()
+
+    batch = compute_position_xirr_batch("20240105")
+    by_code = {r["ts_code"]: r for r in batch}
+    assert by_code["CASH.CNY"]["irr_reason"] == "skip_cash"
+    assert by_code[codes[4]]["irr_reason"] == "fallback_opening_date"
+    for c in codes[:5]:
+        assert by_code[c] == pytest.approx(compute_position_xirr(c, "20240105"))
+    assert all(by_code[c]["irr_reason"] == "ok" for c in codes[:4])
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import numpy as np
+
+from backend.db import get_conn
+from backend.domain import zig_state
+from backend.services.signal_svc import TdxZigSignalGenerator
+
+
+def _series(n: int, seed: int, vol: float = 0.03) -> list[float]:
+    rng = np.random.default_rng(seed)
+    return [round(float(v), 3) for v in 10 * np.exp(np.cumsum(rng.normal(0, vol, n)))]
+
+
+def _full_history_signals(dates, closes) -> set[tuple[str, str]]:
+    """原有实现：整段历史计算 ZIG 线并逐日检测拐头"""
+    z = TdxZigSignalGenerator.calculate_zig_indicator(closes, turn_percent=10.0)
+    out = set()
+    for i in range(2, len(z)):
+        if z[i] > z[i - 1] and z[i - 1] < z[i - 2]:
+            out.add((dates[i], "ZIG_BUY"))
+        if z[i] < z[i - 1] and z[i - 1] > z[i - 2]:
+            out.add((dates[i], "ZIG_SELL"))
+    return out
+
+
+def test_streaming_state_matches_full_recompute_on_every_prefix():
+    for seed in range(40):
+        closes = _series(90, seed, vol=[0.004, 0.03, 0.06][seed % 3])
+        dates = [f"2024-{1 + i // 28:02d}-{1 + i % 28:02d}" for i in range(len(closes))]
+        state, live = zig_state.new_state(), set()
+        for k, (d, c) in enumerate(zip(dates, closes)):
+            nxt = zig_state.advance(state, d, c)
+            added, removed = zig_state.diff(state, nxt)
+            live = (live - removed) | added
+            state = nxt
+            if k >= 1:
+                assert live == _full_history_signals(dates[: k + 1], closes[: k + 1]), (seed, k)
+        assert set(zig_state.replay(zip(dates, closes))[2]) == live
+
+
+def test_replacing_last_bar_from_previous_state():
+    closes = _series(60, 7)
+    dates = [f"D{i:03d}" for i in range(60)]
+    state, prev, _ = zig_state.replay(zip(dates, closes))
+    live = _full_history_signals(dates, closes)
+    closes2 = closes[:-1] + [closes[-1] * 1.25]
+    redo = zig_state.advance(prev, dates[-1], closes2[-1])
+    added, removed = zig_state.diff(state, redo, base=prev)
+    assert (live - removed) | added == _full_history_signals(dates, closes2)
+
+
+def _seed_code(code: str):
+    with get_conn() as conn:
+        conn.execute("INSERT INTO category(name, sub_name, target_units) VALUES(?,?,?)", ("c", "s", 0))
+        cat_id = conn.execute("SELECT id FROM category LIMIT 1").fetchone()["id"]
+        conn.execute(
+            "INSERT INTO instrument(ts_code, name, type, category_id, active) VALUES(?,?,?,?,1)",
+            (code, code, "STOCK", cat_id),
+        )
+        conn.commit()
+
+
+def _db_zig(code: str) -> set[tuple[str, str]]:
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT trade_date, type FROM signal WHERE ts_code=? AND type IN ('ZIG_BUY','ZIG_SELL')", (code,)
+        ).fetchall()
+    return {(r["trade_date"], r["type"]) for r in rows}
+
+
+def _put(code: str, d: str, c: float):
+    with get_conn() as conn:
+        conn.execute(
+            "INSERT INTO price_eod(ts_code, trade_date, close) VALUES(?,?,?) "
+            "ON CONFLICT(ts_code, trade_date) DO UPDATE SET close=excluded.close",
+            (code, d, c),
+        )
+
+
+def test_incremental_updates_keep_signals_in_sync(tmp_db_path):
+    code = "ZIG1.SZ"
+    _seed_code(code)
+    closes = _series(70, 11, vol=0.04)
+    dates = [f"2024-{1 + i // 28:02d}-{1 + i % 28:02d}" for i in range(len(closes))]
+
+    for d, c in zip(dates[:30], closes[:30]):
+        _put(code, d, c)
+    first = TdxZigSignalGenerator.update_zig_signals_incremental(dates[29], [code])
+    assert first["full_recompute"] == 1
+
+    incremental = 0
+    for k in range(30, len(dates)):
+        _put(code, dates[k], closes[k])
+        res = TdxZigSignalGenerator.update_zig_signals_incremental(dates[k], [code], {code: dates[k]})
+        incremental += res["incremental"]
+        assert _db_zig(code) == _full_history_signals(dates[: k + 1], closes[: k + 1])
+    assert incremental == len(dates) - 30
+
+    # 同日重复同步改写最后一根 K 线：从上一状态重新推进
+    closes[-1] = round(closes[-1] * 0.8, 3)
+    _put(code, dates[-1], closes[-1])
+    res = TdxZigSignalGenerator.update_zig_signals_incremental(dates[-1], [code], {code: dates[-1]})
+    assert res["incremental"] == 1
+    assert _db_zig(code) == _full_history_signals(dates, closes)
+
+    # 改写历史 K 线：该标的全量重算
+    closes[20] = round(closes[20] * 1.3, 3)
+    _put(code, dates[20], closes[20])
+    res = TdxZigSignalGenerator.update_zig_signals_incremental(dates[-1], [code], {code: dates[20]})
+    assert res["full_recompute"] == 1
+    assert _db_zig(code) == _full_history_signals(dates, closes)
+
+    # 区间重建走同一状态机，结果一致
+    out = TdxZigSignalGenerator.rebuild_zig_signals_for_period(dates[0], dates[-1], [code])
+    assert out["generated_signals"] == len(_full_history_signals(dates, closes))
+    assert _db_zig(code) == _full_history_signals(dates, closes)
+
+
+def test_history_rewrite_detected_from_dirty_set(client):
+    from backend.repository import price_repo
+
+    code = "ZIG2.SZ"
+    _seed_code(code)
+    closes = _series(50, 5, vol=0.04)
+    dates = [f"2024-{1 + i // 28:02d}-{1 + i % 28:02d}" for i in range(len(closes))]
+
+    def _upsert(pairs):
+        with get_conn() as conn:
+            price_repo.upsert_price_eod_many(conn, [{"ts_code": code, "trade_date": d, "close": c} for d, c in pairs])
+
+    _upsert(zip(dates, closes))
+    first = TdxZigSignalGenerator.update_zig_signals_incremental(dates[-1])
+    assert first["full_recompute"] == 1
+
+    # 未指定标的与写入日时从变更集取出：内容未变的重复写入不产生变更，历史改写触发全量重算
+    _upsert(zip(dates, closes))
+    assert TdxZigSignalGenerator.update_zig_signals_incremental(dates[-1])["processed_instruments"] == 0
+    closes[10] = round(closes[10] * 1.4, 3)
+    _upsert([(dates[10], closes[10])])
+    res = TdxZigSignalGenerator.update_zig_signals_incremental(dates[-1])
+    assert res["full_recompute"] == 1
+    assert _db_zig(code) == _full_history_signals(dates, closes)
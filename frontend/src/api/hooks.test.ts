@@ -7,7 +7,8 @@ import {
   fetchPosition,
   fetchSignals,
   fetchSignalsByTsCode,
-  fetchAllSignals
+  fetchAllSignals,
+  runJob
 } from './hooks'
 import client from './client'
 import type { DashboardResp, CategoryRow, PositionRow, SignalRow } from './types'
@@ -251,4 +252,26 @@ describe('API hooks', () => {
       })
     })
   })
-})
\ No newline at end of file
+
+  describe('runJob', () => {
+    it('should poll the job until it succeeds and return its result', async () => {
+      mockedClient.post.mockResolvedValueOnce({ status: 202, data: { job_id: 7, status: 'queued' } })
+      mockedClient.get
+        .mockResolvedValueOnce({ data: { id: 7, status: 'running' } })
+        .mockResolvedValueOnce({ data: { id: 7, status: 'succeeded', result: { message: 'ok' } } })
+
+      const result = await runJob('/api/calc', { date: '20231201' }, 0)
+
+      expect(mockedClient.post).toHaveBeenCalledWith('/api/calc', { date: '20231201' })
+      expect(mockedClient.get).toHaveBeenCalledWith('/api/jobs/7')
+      expect(result).toEqual({ message: 'ok' })
+    })
+
+    it('should reject with the job error when the job fails', async () => {
+      mockedClient.post.mockResolvedValueOnce({ status: 202, data: { job_id: 8, status: 'queued' } })
+      mockedClient.get.mockResolvedValueOnce({ data: { id: 8, status: 'failed', error: 'boom' } })
+
+      await expect(runJob('/api/calc', { date: '20231201' }, 0)).rejects.toThrow('boom')
+    })
+  })
+})
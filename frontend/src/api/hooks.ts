@@ -64,13 +64,23 @@ export async function createSignal(payload: SignalCreatePayload) {
   return data;
 }
 
+// 长耗时接口默认入队并返回 202 + job_id：轮询 /api/jobs/{id} 直到结束，返回任务结果
+export async function runJob<T = any>(url: string, body?: any, pollMs = 1000): Promise<T> {
+  const { data, status } = await client.post(url, body);
+  if (status !== 202 || !data?.job_id) return data;
+  for (;;) {
+    await new Promise((resolve) => setTimeout(resolve, pollMs));
+    const { data: job } = await client.get(`/api/jobs/${data.job_id}`);
+    if (job.status === "succeeded") return job.result as T;
+    if (job.status === "failed") throw new Error(job.error || "任务执行失败");
+  }
+}
+
 export async function postCalc(date: string) {
-  const { data } = await client.post("/api/calc", { date });
-  return data;
+  return runJob("/api/calc", { date });
 }
 export async function postSyncPrices(date: string) {
-  const { data } = await client.post("/api/sync-prices", { date, recalc: true });
-  return data;
+  return runJob("/api/sync-prices", { date, recalc: true });
 }
 export async function createTxn(payload: TxnCreate) {
   const { data } = await client.post("/api/txn/create", payload);
@@ -313,13 +323,11 @@ export async function removeWatchlist(ts_code: string) {
 }
 
 export async function rebuildHistoricalSignals() {
-  const { data } = await client.post("/api/signal/rebuild-historical");
-  return data;
+  return runJob("/api/signal/rebuild-historical");
 }
 
 export async function rebuildZigSignals() {
-  const { data } = await client.post("/api/signal/rebuild-zig");
-  return data;
+  return runJob("/api/signal/rebuild-zig");
 }
 
 // 同步价格数据
@@ -341,8 +349,7 @@ export type SyncPricesResult = {
 };
 
 export async function syncPrices(params: SyncPricesParams): Promise<SyncPricesResult> {
-  const { data } = await client.post("/api/sync-prices", params);
-  return data;
+  return runJob<SyncPricesResult>("/api/sync-prices", params);
 }
 
 // 增强的价格同步：自动检测并补齐过去几天缺失的价格数据
@@ -364,8 +371,7 @@ export type SyncPricesEnhancedResult = {
 };
 
 export async function syncPricesEnhanced(params: SyncPricesEnhancedParams = {}): Promise<SyncPricesEnhancedResult> {
-  const { data } = await client.post("/api/sync-prices-enhanced", params);
-  return data;
+  return runJob<SyncPricesEnhancedResult>("/api/sync-prices-enhanced", params);
 }
 
 // 检测最近有效交易日：通过获取一个代表性标的的最近价格来判断
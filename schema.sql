@@ -55,6 +55,28 @@ CREATE TABLE
     PRIMARY KEY (ts_code, trade_date)
   );
 
+-- 历史持仓台账：按日期分段的 (shares, avg_cost)，由 txn 重放并随交易增量维护，见 backend/services/position_ledger_svc.py
+CREATE TABLE
+  IF NOT EXISTS position_ledger (
+    ts_code TEXT NOT NULL,
+    valid_from TEXT NOT NULL,
+    valid_to TEXT,
+    shares REAL NOT NULL,
+    avg_cost REAL NOT NULL,
+    source TEXT NOT NULL DEFAULT 'TXN',
+    PRIMARY KEY (ts_code, valid_from)
+  );
+
+-- 每个标的最近一根 K 线：由 price_repo.upsert_price_eod_many 在同一事务内维护
+CREATE TABLE
+  IF NOT EXISTS price_latest (
+    ts_code TEXT PRIMARY KEY,
+    trade_date TEXT NOT NULL,
+    close REAL NOT NULL,
+    prev_close REAL,
+    pct_chg REAL
+  );
+
 CREATE TABLE
   IF NOT EXISTS ma_cache (
     ts_code TEXT NOT NULL,
@@ -74,6 +96,24 @@ CREATE TABLE
     opening_date TEXT
   );
 
+-- 交易日历：按年从数据源批量加载（或离线 CSV），内存索引见 backend/domain/trade_calendar.py
+CREATE TABLE
+  IF NOT EXISTS trade_cal (
+    cal_date TEXT PRIMARY KEY,
+    is_open INTEGER NOT NULL
+  );
+
+-- ZIG 增量状态：每个标的一行，新 K 线到来时 O(1) 推进，见 backend/domain/zig_state.py
+CREATE TABLE
+  IF NOT EXISTS zig_state (
+    ts_code TEXT PRIMARY KEY,
+    last_date TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    prev_state TEXT,
+    updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+  );
+
 -- portfolio_daily and category_daily tables removed
 -- All portfolio and category data is now calculated dynamically from:
 -- - position table (current holdings)
@@ -123,6 +163,9 @@ CREATE TABLE
 CREATE INDEX IF NOT EXISTS idx_log_ts ON operation_log(ts);
 CREATE INDEX IF NOT EXISTS idx_log_action ON operation_log(action);
 
+-- 日志 keyset 分页（全文索引 operation_log_fts 由 backend/migrations/m0006_operation_log_fts.py 创建）
+CREATE INDEX IF NOT EXISTS idx_log_ts_id ON operation_log(ts, id);
+
 -- 信号表说明：
 -- 存储历史交易信号，每个标的每种信号类型在特定日期只能有一条记录
 -- trade_date: 信号首次触发的日期 (YYYY-MM-DD格式)
@@ -134,3 +177,14 @@ CREATE INDEX IF NOT EXISTS idx_log_action ON operation_log(action);
 --
 -- 重要：信号记录是历史性的，不应在重新计算时被清除
 -- calc_svc中的insert_signal_instrument/insert_signal_category会自动去重
+
+-- 热点查询索引（旧库由 backend/migrations/m0005_query_indexes.py 补建）
+CREATE INDEX IF NOT EXISTS idx_txn_code_date ON txn(ts_code, trade_date);
+CREATE INDEX IF NOT EXISTS idx_txn_date_id ON txn(trade_date, id);
+CREATE INDEX IF NOT EXISTS idx_signal_code_type_date ON signal(ts_code, type, trade_date);
+CREATE INDEX IF NOT EXISTS idx_signal_date_type ON signal(trade_date, type);
+CREATE INDEX IF NOT EXISTS idx_price_eod_date ON price_eod(trade_date);
+
+-- 数据版本（响应缓存 / ETag 的失效依据）：data_version 表及各表触发器由 backend/migrations/m0007_data_version.py 创建
+
+-- 变更集（增量重算的依据）：dirty_set / dirty_cursor 表及各表触发器由 backend/migrations/m0009_dirty_set.py 创建